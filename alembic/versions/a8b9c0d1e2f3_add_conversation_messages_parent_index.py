@@ -0,0 +1,33 @@
+"""Add expression index on conversation_messages parent id for version chains
+
+Revision ID: a8b9c0d1e2f3
+Revises: f7a8b9c0d1e2
+Create Date: 2025-09-24 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8b9c0d1e2f3'
+down_revision: Union[str, None] = 'f7a8b9c0d1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Lets the recursive version-chain query walk from a message to its later edits;
+    # walking to earlier versions already uses the primary key.
+    op.create_index(
+        'ix_conversation_messages_parent_id',
+        'conversation_messages',
+        [sa.text("(meta->>'parentId')")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversation_messages_parent_id', table_name='conversation_messages')
@@ -0,0 +1,50 @@
+"""Add review_runs for the orchestrated review mode
+
+Revision ID: b9c0d1e2f3a4
+Revises: a8b9c0d1e2f3
+Create Date: 2025-09-25 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9c0d1e2f3a4'
+down_revision: Union[str, None] = 'a8b9c0d1e2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per orchestrated review: the next step to run and its arguments, plus
+    # a lease held by the orchestrator process running it. A run whose lease lapses
+    # (its worker died) is claimed by another orchestrator and resumed at that step.
+    op.create_table(
+        'review_runs',
+        sa.Column('review_id', sa.String(length=255), nullable=False),
+        sa.Column('step', sa.String(length=32), nullable=False),
+        sa.Column('state', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default='{}'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('owner', sa.String(length=255), nullable=True),
+        sa.Column('lease_expires_at', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['review_id'], ['reviews.review_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('review_id'),
+    )
+    # Recovery scans only unfinished runs.
+    op.create_index(
+        'idx_review_runs_unfinished_lease',
+        'review_runs',
+        ['lease_expires_at'],
+        postgresql_where=sa.text("step NOT IN ('done', 'failed')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_review_runs_unfinished_lease', table_name='review_runs')
+    op.drop_table('review_runs')
@@ -0,0 +1,49 @@
+"""Add the per-room archival ledger
+
+Revision ID: c0d1e2f3a4b5
+Revises: b9c0d1e2f3a4
+Create Date: 2025-09-26 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c0d1e2f3a4b5'
+down_revision: Union[str, None] = 'b9c0d1e2f3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # archive_due_at: when the room's oldest unarchived message leaves the memory
+    # window (NULL when there is nothing to archive). Set by the message insert's
+    # room update and recomputed after each archival run, so the daily dispatcher
+    # only visits due rooms. archived_through: the archival watermark; every
+    # message before it has been archived.
+    op.add_column('rooms', sa.Column('archive_due_at', sa.BigInteger(), nullable=True))
+    op.add_column('rooms', sa.Column('archived_through', sa.BigInteger(), nullable=False, server_default='0'))
+    op.create_index(
+        'ix_rooms_archive_due_at',
+        'rooms',
+        ['archive_due_at', 'room_id'],
+        unique=False,
+        postgresql_where=sa.text('archive_due_at IS NOT NULL'),
+    )
+    # Rooms with messages are due on the first run, which sets their real due time.
+    op.execute(
+        """
+        UPDATE rooms SET archive_due_at = oldest.timestamp
+        FROM (SELECT room_id, MIN(timestamp) AS timestamp FROM messages GROUP BY room_id) AS oldest
+        WHERE rooms.room_id = oldest.room_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rooms_archive_due_at', table_name='rooms')
+    op.drop_column('rooms', 'archived_through')
+    op.drop_column('rooms', 'archive_due_at')
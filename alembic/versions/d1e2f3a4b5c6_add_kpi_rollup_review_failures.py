@@ -0,0 +1,28 @@
+"""Count failed reviews in the KPI rollups
+
+Revision ID: d1e2f3a4b5c6
+Revises: c0d1e2f3a4b5
+Create Date: 2025-09-27 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e2f3a4b5c6'
+down_revision: Union[str, None] = 'c0d1e2f3a4b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Reviews that failed for good, bumped once per review alongside reviews_count
+    # (which counts completed reviews), so the dashboard's success rate is a rollup read.
+    op.add_column('kpi_rollups', sa.Column('reviews_failed', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('kpi_rollups', 'reviews_failed')
@@ -0,0 +1,56 @@
+"""Add incremental KPI rollup tables
+
+Revision ID: d4e5f6a7b8c9
+Revises: 57f8c41a6674, 7b8c9d0e1f23
+Create Date: 2025-09-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4e5f6a7b8c9'
+down_revision: Union[str, Sequence[str], None] = ('57f8c41a6674', '7b8c9d0e1f23')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per (granularity, bucket). Counters are bumped in place by upserts so
+    # dashboard reads only touch the buckets in the requested window.
+    op.create_table(
+        'kpi_rollups',
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.BigInteger(), nullable=False),
+        sa.Column('active_users', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('reviews_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('review_duration_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('review_tokens_sum', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('review_cost_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('tokens_prompt', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('tokens_completion', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('tokens_total', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('cost_usd', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('latency_histogram', postgresql.ARRAY(sa.BigInteger()), nullable=True),
+        sa.Column('review_tokens_histogram', postgresql.ARRAY(sa.BigInteger()), nullable=True),
+        sa.Column('updated_at', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('granularity', 'bucket_start', name='pk_kpi_rollups'),
+    )
+
+    # Distinct-user ledger; the primary key doubles as the index used for WAU/MAU.
+    op.create_table(
+        'kpi_rollup_active_users',
+        sa.Column('granularity', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint('granularity', 'bucket_start', 'user_id', name='pk_kpi_rollup_active_users'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('kpi_rollup_active_users')
+    op.drop_table('kpi_rollups')
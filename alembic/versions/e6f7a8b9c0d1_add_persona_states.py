@@ -0,0 +1,41 @@
+"""Add persona_states for incremental persona generation
+
+Revision ID: e6f7a8b9c0d1
+Revises: d4e5f6a7b8c9
+Create Date: 2025-09-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd4e5f6a7b8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Running persona per user plus a (timestamp, message_id) watermark into the
+    # user's main room, so each generation run only reads messages past it.
+    op.create_table(
+        'persona_states',
+        sa.Column('user_id', sa.String(length=255), nullable=False),
+        sa.Column('persona', postgresql.JSONB(astext_type=sa.Text()), nullable=False, server_default='{}'),
+        sa.Column('last_message_ts', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('last_message_id', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('messages_processed', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('tokens_used', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('last_run_rows_scanned', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_run_tokens', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('persona_states')
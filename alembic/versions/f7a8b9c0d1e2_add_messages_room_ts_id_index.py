@@ -0,0 +1,29 @@
+"""Add (room_id, timestamp, message_id) index for keyset history paging
+
+Revision ID: f7a8b9c0d1e2
+Revises: e6f7a8b9c0d1
+Create Date: 2025-09-22 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a8b9c0d1e2'
+down_revision: Union[str, None] = 'e6f7a8b9c0d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Covers the (timestamp, message_id) row comparison used by cursor paging; the old
+    # (room_id, timestamp) index is a strict prefix of it and only adds write cost.
+    op.create_index('ix_messages_room_ts_id', 'messages', ['room_id', 'timestamp', 'message_id'], unique=False)
+    op.drop_index('ix_messages_room_id_timestamp', table_name='messages')
+
+
+def downgrade() -> None:
+    op.create_index('ix_messages_room_id_timestamp', 'messages', ['room_id', 'timestamp'], unique=False)
+    op.drop_index('ix_messages_room_ts_id', table_name='messages')
@@ -20,7 +20,7 @@ from app.services.audit_service import AuditService
 from app.services.admin_service import AdminService
 from app.services.user_fact_service import UserFactService
 from app.services.fact_extractor_service import FactExtractorService
-from app.services.cache_service import CacheService
+from app.services.cache_service import CacheService, get_shared_cache_service
 from app.services.intent_classifier_service import IntentClassifierService
 from app.services.background_task_service import BackgroundTaskService
 from app.core.secrets import SecretProvider, env_secrets_provider
@@ -35,7 +35,6 @@ logger = logging.getLogger(__name__)
 # --- Service Singletons ---
 _admin_service: Optional[AdminService] = None
 _audit_service: Optional[AuditService] = None
-_cache_service: Optional[CacheService] = None
 _redis_client: Optional[redis.Redis] = None
 _redis_url_signature: Optional[str] = None
 _secret_provider: Optional[SecretProvider] = None
@@ -189,12 +188,8 @@ def get_redis_client() -> Optional[redis.Redis]:
     return _redis_client
 
 def get_cache_service() -> CacheService:
-    """Dependency to get the CacheService instance."""
-    global _cache_service
-    if _cache_service is None:
-        redis_client = get_redis_client()
-        _cache_service = CacheService(redis_client=redis_client)
-    return _cache_service
+    """Dependency to get the process-wide two-tier CacheService."""
+    return get_shared_cache_service()
 
 
 def get_intent_classifier_service() -> IntentClassifierService:
@@ -232,13 +227,16 @@ async def require_auth(request: Request) -> Dict[str, str]:
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
 
-from app.services.conversation_service import get_conversation_service
+from app.services.token_budget import get_token_budget
 
 AUTH_DEPENDENCY = Depends(require_auth)
 
-def check_budget(user_info: Dict[str, Any] = AUTH_DEPENDENCY):
+async def check_budget(user_info: Dict[str, Any] = AUTH_DEPENDENCY):
     """
-    A dependency that checks if the user has exceeded their daily token budget.
+    A dependency that rejects requests from users who have used up their daily token budget.
+
+    This is a cheap early rejection; the authoritative check is the atomic
+    reservation made when the LLM call starts (see ``app.services.token_budget``).
     """
     if not settings.DAILY_TOKEN_BUDGET:
         return # If no budget is set, do nothing.
@@ -247,8 +245,7 @@ def check_budget(user_info: Dict[str, Any] = AUTH_DEPENDENCY):
     if not user_id or user_id == "anonymous":
         return # Don't check budget for anonymous users
 
-    convo_service = get_conversation_service()
-    current_usage = convo_service.get_today_usage(user_id)
+    current_usage = await get_token_budget().usage(user_id)
 
     if current_usage >= settings.DAILY_TOKEN_BUDGET:
         raise HTTPException(
@@ -3,7 +3,7 @@ Admin-only API endpoints for managing and monitoring the system.
 """
 import logging
 from typing import Dict, Any, List
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query
 
 from app.api.dependencies import require_role, get_admin_service, get_audit_service
 from app.services.admin_service import AdminService
@@ -27,6 +27,15 @@ async def get_dashboard_data(admin_service: AdminService = Depends(get_admin_ser
     kpis = await maybe_await(admin_service.get_dashboard_kpis())
     return kpis
 
+@router.get("/kpis/rollups", response_model=List[Dict[str, Any]])
+async def get_kpi_rollups(
+    granularity: str = Query("hour", pattern="^(hour|day)$"),
+    hours: int = Query(24, ge=1, le=24 * 90),
+    admin_service: AdminService = Depends(get_admin_service),
+):
+    """Get hourly or daily KPI rollup buckets for charting."""
+    return await maybe_await(admin_service.get_kpi_rollups(granularity, hours))
+
 # --- Provider Configuration ---
 @router.get("/providers", response_model=List[Dict[str, Any]])
 async def get_providers(admin_service: AdminService = Depends(get_admin_service)):
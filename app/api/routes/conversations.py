@@ -4,7 +4,7 @@ import json
 import logging
 import zipfile
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import JSONResponse, Response, StreamingResponse
@@ -23,16 +23,23 @@ from app.models.conversation_schemas import (
 )
 from pydantic import BaseModel, Field
 from app.services.conversation_service import ConversationService, get_conversation_service
+from app.services.kpi_service import get_kpi_service
 from app.services.llm_adapters import get_llm_adapter
 from app.services.realtime_service import RealtimeService
+from app.services.sse_replay import get_sse_journal, message_stream_channel
 from app.services.memory_service import MemoryService, get_memory_service
 from app.services.rag_service import get_rag_service
 from app.services.cloud_storage_service import get_cloud_storage_service
+from app.services.token_budget import get_token_budget
 from app.utils.helpers import maybe_await
+from app.utils.tokens import count_tokens
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Message generations in flight, referenced until they finish.
+_stream_producers: Set[asyncio.Task] = set()
+
 AVAILABLE_MODELS = [{"id": "gpt-4o", "name": "GPT-4o"}, {"id": "claude-3-opus-20240229", "name": "Claude 3 Opus"}]
 
 
@@ -138,6 +145,37 @@ async def stream_message(
     if user_id == "anonymous":
         raise HTTPException(status_code=401, detail="Could not identify user for streaming.")
 
+    journal = get_sse_journal()
+    stream_channel = message_stream_channel(message_id)
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        replay = await journal.replay(stream_channel, last_event_id, "message_stream")
+        if replay is not None:
+            # A reconnect: send what was missed and follow the generation still running.
+            async def resumed_generator():
+                SSE_SESSIONS_ACTIVE.inc()
+                try:
+                    async for event in journal.follow(
+                        request,
+                        stream_channel,
+                        last_event_id,
+                        lambda event: {"event": event.event, "data": event.data},
+                        lambda: {"event": "ping", "data": RealtimeService.format_event("ping", {"message_id": message_id})},
+                        replay=replay,
+                        idle_timeout=settings.SSE_STREAM_IDLE_TIMEOUT_SECONDS,
+                        on_idle=lambda: {
+                            "event": "error",
+                            "data": RealtimeService.format_event(
+                                "error", {"message_id": message_id, "error": "The stream was interrupted."}
+                            ),
+                        },
+                    ):
+                        yield event
+                finally:
+                    SSE_SESSIONS_ACTIVE.dec()
+
+            return EventSourceResponse(resumed_generator())
+
     thread_id = draft_message.get("thread_id")
     if not thread_id:
         raise HTTPException(status_code=404, detail="Thread ID not found in message.")
@@ -180,8 +218,16 @@ async def stream_message(
 
     adapter = get_llm_adapter(draft_message.get("model", "gpt-4o-mini"))
 
-    async def event_generator():
-        SSE_SESSIONS_ACTIVE.inc()
+    # Hold the worst case (prompt plus max_tokens) against the daily budgets before
+    # calling the provider; the actual usage is settled when the stream ends.
+    max_tokens = 2048
+    prompt_tokens = sum(count_tokens(m["content"]) for m in messages_for_llm)
+    token_budget = get_token_budget()
+    reservation = await token_budget.reserve(prompt_tokens + max_tokens, user_id=user_id)
+    if not reservation.granted:
+        raise HTTPException(status_code=429, detail=reservation.detail)
+
+    async def produce(emit: Callable[..., Awaitable[None]]) -> None:
         content, usage_meta, total_tokens = "", {}, 0
         chunk_count = 0
         stream_completed = False
@@ -215,23 +261,18 @@ async def stream_message(
                 return _as_dict(decoded)
             return {"value": raw}
 
+        llm_stream = adapter.generate_stream(
+            message_id=message_id,
+            messages=messages_for_llm,
+            model=draft_message.get("model", "gpt-4o-mini"),
+            temperature=0.7,
+            max_tokens=max_tokens,
+        )
+
         try:
-            yield {"event": "ping", "data": _serialize("ping", {"message": "Connection established"})}
-
-            async for sse_event in adapter.generate_stream(
-                message_id=message_id,
-                messages=messages_for_llm,
-                model=draft_message.get("model", "gpt-4o-mini"),
-                temperature=0.7,
-                max_tokens=2048,
-            ):
-                if await request.is_disconnected():
-                    logger.warning(f"Client disconnected from stream {message_id}")
-                    if not error_sent:
-                        yield {"event": "error", "data": _serialize("error", {"error": "Client disconnected"})}
-                        error_sent = True
-                    break
+            await emit({"event": "ping", "data": _serialize("ping", {"message": "Connection established"})})
 
+            async for sse_event in llm_stream:
                 event_type = sse_event.event
                 data_dict = _as_dict(sse_event.data)
 
@@ -240,25 +281,25 @@ async def stream_message(
                     if isinstance(chunk, str) and chunk:
                         chunk_count += 1
                         content += chunk
-                        yield {
+                        await emit({
                             "event": "delta",
                             "data": _serialize(
                                 "delta",
                                 {"delta": chunk, "content": chunk, "text": chunk},
                                 {"chunk_index": chunk_count},
                             ),
-                        }
+                        })
                     continue
 
                 if event_type == "usage":
                     usage_meta = data_dict
                     total_tokens = usage_meta.get("total_tokens", 0)
-                    yield {"event": "usage", "data": _serialize("usage", {"usage": usage_meta}, usage_meta)}
+                    await emit({"event": "usage", "data": _serialize("usage", {"usage": usage_meta}, usage_meta)})
                     continue
 
                 if event_type == "error":
                     payload = data_dict if data_dict else {"error": "An error occurred during streaming."}
-                    yield {"event": "error", "data": _serialize("error", payload)}
+                    await emit({"event": "error", "data": _serialize("error", payload)}, final=True)
                     error_sent = True
                     break
 
@@ -267,7 +308,7 @@ async def stream_message(
                     continue
 
                 # Forward other event types (e.g., tool calls) with metadata for observability
-                yield {"event": event_type, "data": _serialize(event_type, data_dict)}
+                await emit({"event": event_type, "data": _serialize(event_type, data_dict)})
 
             if not error_sent:
                 stream_completed = True
@@ -275,29 +316,46 @@ async def stream_message(
         except Exception as exc:
             logger.error(f"Error during SSE stream for {message_id}: {exc}", exc_info=True)
             if not error_sent:
-                yield {"event": "error", "data": _serialize("error", {"error": "An error occurred during streaming."})}
+                await emit(
+                    {"event": "error", "data": _serialize("error", {"error": "An error occurred during streaming."})},
+                    final=True,
+                )
                 error_sent = True
 
         finally:
-            SSE_SESSIONS_ACTIVE.dec()
+            # Close the provider stream now rather than at garbage collection when generation stops early.
+            await llm_stream.aclose()
+            # A cancelled or failed stream is charged for what it consumed; the rest is refunded.
+            consumed_tokens = total_tokens or (prompt_tokens + count_tokens(content) if content else 0)
+            await token_budget.settle(reservation, consumed_tokens)
             if stream_completed and not error_sent:
                 convo_service.update_message(message_id, content, "complete", usage_meta)
                 if total_tokens > 0 and user_id != "anonymous":
-                    convo_service.increment_token_usage(user_id, total_tokens)
-
-                yield {
-                    "event": "done",
-                    "data": _serialize(
-                        "done",
-                        {
-                            "status": "completed",
-                            "message_id": message_id,
-                            "total_tokens": total_tokens,
-                            "chunk_count": chunk_count,
-                        },
-                        {"status": "completed", "chunk_count": chunk_count},
-                    ),
-                }
+                    await asyncio.to_thread(
+                        get_kpi_service().record_token_usage,
+                        user_id,
+                        prompt_tokens=int(usage_meta.get("prompt_tokens") or 0),
+                        completion_tokens=int(usage_meta.get("completion_tokens") or 0),
+                        total_tokens=total_tokens,
+                        cost_usd=float(usage_meta.get("cost_usd") or 0.0),
+                    )
+
+                await emit(
+                    {
+                        "event": "done",
+                        "data": _serialize(
+                            "done",
+                            {
+                                "status": "completed",
+                                "message_id": message_id,
+                                "total_tokens": total_tokens,
+                                "chunk_count": chunk_count,
+                            },
+                            {"status": "completed", "chunk_count": chunk_count},
+                        ),
+                    },
+                    final=True,
+                )
 
             redis_client = convo_service.redis_client
             if redis_client:
@@ -306,6 +364,48 @@ async def stream_message(
                 except RedisError as exc:
                     logger.warning("Failed to clear stream cache for %s: %s", message_id, exc)
 
+    # Generation runs as its own task and journals every event. The connection that
+    # started it reads the events from a local queue; if it drops, generation runs to
+    # completion so a reconnect can resume from the journal. Without the journal
+    # nothing could resume, so generation stops with the connection as before.
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    journaled = False
+    consumer_gone = False
+
+    async def emit(event: Dict[str, Any], final: bool = False) -> None:
+        nonlocal journaled
+        event_id = await journal.append(stream_channel, event["event"], event["data"], final=final)
+        if event_id is not None:
+            journaled = True
+            event = {"id": event_id, **event}
+        if not consumer_gone:
+            queue.put_nowait(event)
+
+    async def run_producer() -> None:
+        try:
+            await produce(emit)
+        finally:
+            queue.put_nowait(None)
+
+    async def event_generator():
+        nonlocal consumer_gone
+        SSE_SESSIONS_ACTIVE.inc()
+        producer = asyncio.create_task(run_producer())
+        _stream_producers.add(producer)
+        producer.add_done_callback(_stream_producers.discard)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            SSE_SESSIONS_ACTIVE.dec()
+            consumer_gone = True
+            if not journaled and not producer.done():
+                logger.warning(f"Client disconnected from stream {message_id}")
+                producer.cancel()
+
     return EventSourceResponse(event_generator())
 
 @router.get("/threads/{thread_id}/messages", response_model=List[ConversationMessage])
@@ -377,8 +477,10 @@ async def get_message_versions(message_id: str, convo_service: ConversationServi
 
 @router.get("/messages/{message_id}/diff", response_model=Dict[str, str])
 async def get_message_diff(message_id: str, against: str, convo_service: ConversationService = Depends(get_conversation_service)):
-    msg1 = convo_service.get_message_by_id(message_id)
-    msg2 = convo_service.get_message_by_id(against)
+    # Versions being compared are normally in the same chain, which one query returns.
+    chain = {version["id"]: version for version in convo_service.get_message_versions(message_id)}
+    msg1 = chain.get(message_id)
+    msg2 = chain.get(against) or (convo_service.get_message_by_id(against) if msg1 else None)
     if not msg1 or not msg2:
         raise HTTPException(status_code=404, detail="One or both messages not found.")
 
@@ -7,7 +7,7 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException, Request, Depends, File, UploadFile, Form
+from fastapi import APIRouter, HTTPException, Query, Request, Response, Depends, File, UploadFile, Form
 from sse_starlette.sse import EventSourceResponse
 
 from app.api.dependencies import (
@@ -47,6 +47,7 @@ from app.utils.helpers import (
 from app.models.schemas import Message
 from app.config.settings import settings
 from app.services.realtime_service import get_realtime_service, RealtimeService
+from app.services.sse_replay import get_journal_fanout, get_sse_journal
 from app.services.file_validation_service import (
     FileValidationError,
     get_file_validation_service,
@@ -128,15 +129,30 @@ async def _maybe_get_room(storage_service: StorageService, room_id: str):
 @router.get("/{room_id}/messages", response_model=List[Message])
 async def get_messages(
     room_id: str,
+    response: Response,
+    before: Optional[str] = Query(None, description="Return messages older than this message id."),
+    after: Optional[str] = Query(None, description="Return messages newer than this message id."),
+    limit: int = Query(settings.MESSAGE_PAGE_DEFAULT_SIZE, ge=1, le=settings.MESSAGE_PAGE_MAX_SIZE),
     user_info: Dict[str, str] = AUTH_DEPENDENCY,
     storage_service: StorageService = Depends(get_storage_service),
 ):
-    """Get messages for a room"""
+    """Get one page of a room's messages, oldest first (the newest page by default).
+
+    ``X-Has-More`` tells whether more messages exist in the paging direction and
+    ``X-Next-Cursor`` is the message id to pass as ``before``/``after`` next.
+    """
     try:
         if not user_info or "user_id" not in user_info:
             logger.error(f"Invalid user_info: {user_info}")
             raise HTTPException(status_code=400, detail="Invalid user information")
-        messages = storage_service.get_messages(room_id)
+        if before and after:
+            raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
+        messages, has_more = await asyncio.to_thread(
+            storage_service.get_messages_page, room_id, before=before, after=after, limit=limit
+        )
+        response.headers["X-Has-More"] = "true" if has_more else "false"
+        if messages:
+            response.headers["X-Next-Cursor"] = messages[-1].message_id if after else messages[0].message_id
         return messages
     except HTTPException:
         raise
@@ -161,6 +177,49 @@ async def stream_room_message_events(
     if not settings.AUTH_OPTIONAL and room.owner_id != user_info.get("user_id"):
         raise HTTPException(status_code=403, detail="Access denied to room events")
 
+    def heartbeat() -> Dict[str, Any]:
+        return {
+            "event": "heartbeat",
+            "data": RealtimeService.format_event(
+                "heartbeat",
+                {"status": "keep-alive"},
+                {"delivery": "sse"},
+            ),
+        }
+
+    journal = get_sse_journal()
+    if journal.enabled:
+        fanout = get_journal_fanout()
+        # Subscribe before replaying, so nothing appended in between is missed.
+        journal_queue = await fanout.subscribe(room_id)
+        if journal_queue is not None:
+            last_event_id = request.headers.get("last-event-id")
+            replay = await journal.replay(room_id, last_event_id, "room") if last_event_id else None
+
+            async def journal_generator():
+                if last_event_id and replay is None:
+                    # Events were missed beyond the journal: the client reloads the room instead.
+                    yield {
+                        "event": "resync",
+                        "data": RealtimeService.format_event(
+                            "resync",
+                            {"reason": "replay_unavailable"},
+                            {"delivery": "sse"},
+                        ),
+                    }
+                async for event in fanout.follow(
+                    request,
+                    room_id,
+                    journal_queue,
+                    lambda data: {"event": "new_message", "data": data},
+                    heartbeat,
+                    replay=replay,
+                    after_id=last_event_id if replay is not None else None,
+                ):
+                    yield event
+
+            return EventSourceResponse(journal_generator())
+
     listener_queue = realtime_service.register_listener(room_id)
 
     async def event_generator():
@@ -169,16 +228,9 @@ async def stream_room_message_events(
                 if await request.is_disconnected():
                     break
                 try:
-                    message = await asyncio.wait_for(listener_queue.get(), timeout=15)
+                    message = await asyncio.wait_for(listener_queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
                 except asyncio.TimeoutError:
-                    yield {
-                        "event": "heartbeat",
-                        "data": RealtimeService.format_event(
-                            "heartbeat",
-                            {"status": "keep-alive"},
-                            {"delivery": "sse"},
-                        ),
-                    }
+                    yield heartbeat()
                     continue
 
                 yield {"event": "new_message", "data": message}
@@ -7,8 +7,10 @@ import time
 from collections import defaultdict
 from typing import Dict, Optional, List, Any
 from fastapi import APIRouter, HTTPException, Depends
-import numpy as np
 
+from app.config.settings import settings
+from app.repositories.kpi_rollup_repository import DAY
+from app.services.kpi_service import KPIService, get_kpi_service
 from app.services.storage_service import StorageService
 from app.api.dependencies import require_auth, get_storage_service
 from app.models.schemas import MetricsResponse, MetricsSummary, ReviewMetrics
@@ -34,17 +36,15 @@ def _empty_summary() -> MetricsSummary:
     )
 
 
-def _build_summary(all_metrics: List[ReviewMetrics]) -> MetricsSummary:
-    if not all_metrics:
+def _build_summary(rollup: Dict[str, Any], recent_metrics: List[ReviewMetrics]) -> MetricsSummary:
+    """Build the summary from precomputed rollups; raw rows only feed per-provider detail."""
+    if not rollup.get("reviews_count") and not recent_metrics:
         return _empty_summary()
 
-    durations = [m.total_duration_seconds for m in all_metrics]
-    tokens = [m.total_tokens_used for m in all_metrics]
-
     provider_summary = defaultdict(
         lambda: {"total_calls": 0, "total_success": 0, "total_failures": 0, "total_tokens": 0, "total_duration": 0.0}
     )
-    for m in all_metrics:
+    for m in recent_metrics:
         for provider, stats in m.provider_metrics.items():
             provider_summary[provider]["total_calls"] += stats.get("success", 0) + stats.get("fail", 0)
             provider_summary[provider]["total_success"] += stats.get("success", 0)
@@ -65,20 +65,20 @@ def _build_summary(all_metrics: List[ReviewMetrics]) -> MetricsSummary:
     now_ts = int(time.time())
     system_info = {
         "status": "ok",
-        "active_reviews": sum(1 for metric in all_metrics if metric.total_duration_seconds == 0),
+        "active_reviews": sum(1 for metric in recent_metrics if metric.total_duration_seconds == 0),
         "timestamp": now_ts,
     }
-    llm_info = {"total_tokens": int(sum(tokens)), "providers": final_provider_summary}
+    llm_info = {"total_tokens": int(rollup.get("tokens_total", 0)), "providers": final_provider_summary}
     errors_info = {"total": 0, "by_type": {}}
 
     return MetricsSummary(
-        total_reviews=len(all_metrics),
-        avg_duration=float(np.mean(durations)) if durations else 0,
-        median_duration=float(np.median(durations)) if durations else 0,
-        p95_duration=float(np.percentile(durations, 95)) if durations else 0,
-        avg_tokens=float(np.mean(tokens)) if tokens else 0,
-        median_tokens=float(np.median(tokens)) if tokens else 0,
-        p95_tokens=float(np.percentile(tokens, 95)) if tokens else 0,
+        total_reviews=int(rollup.get("reviews_count", 0)),
+        avg_duration=float(rollup.get("avg_review_duration_seconds", 0.0)),
+        median_duration=float(rollup.get("review_latency_p50_ms", 0.0)) / 1000.0,
+        p95_duration=float(rollup.get("review_latency_p95_ms", 0.0)) / 1000.0,
+        avg_tokens=float(rollup.get("avg_review_tokens", 0.0)),
+        median_tokens=float(rollup.get("review_tokens_p50", 0.0)),
+        p95_tokens=float(rollup.get("review_tokens_p95", 0.0)),
         provider_summary=final_provider_summary,
         system=system_info,
         llm=llm_info,
@@ -86,6 +86,12 @@ def _build_summary(all_metrics: List[ReviewMetrics]) -> MetricsSummary:
     )
 
 
+async def _rollup_summary(kpi_service: KPIService, since: Optional[int]) -> Dict[str, Any]:
+    now_ts = int(time.time())
+    start_ts = since or now_ts - settings.KPI_METRICS_WINDOW_DAYS * 86400
+    return await kpi_service.get_cached_summary(DAY, start_ts, now_ts)
+
+
 # Create router
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
@@ -96,11 +102,12 @@ async def get_metrics(
     limit: int = 100,
     since: Optional[int] = None,
     storage_service: StorageService = Depends(get_storage_service),  # pyright: ignore[reportCallInDefaultInitializer]
+    kpi_service: KPIService = Depends(get_kpi_service),  # pyright: ignore[reportCallInDefaultInitializer]
 ) -> MetricsResponse:
     """Get aggregated review metrics."""
     try:
         all_metrics: List[ReviewMetrics] = storage_service.get_all_review_metrics(limit=limit, since=since)
-        summary = _build_summary(all_metrics)
+        summary = _build_summary(await _rollup_summary(kpi_service, since), all_metrics)
         return MetricsResponse(summary=summary, data=all_metrics)
     except Exception as e:
         logger.error(f"Error getting metrics: {e}", exc_info=True)
@@ -110,12 +117,11 @@ async def get_metrics(
 @router.get("/summary", response_model=MetricsSummary)
 async def get_metrics_summary(
     user_info: Dict[str, str] = Depends(require_auth),  # pyright: ignore[reportCallInDefaultInitializer]
-    storage_service: StorageService = Depends(get_storage_service),  # pyright: ignore[reportCallInDefaultInitializer]
+    kpi_service: KPIService = Depends(get_kpi_service),  # pyright: ignore[reportCallInDefaultInitializer]
 ) -> MetricsSummary:
     """Get metrics summary only."""
     try:
-        all_metrics: List[ReviewMetrics] = storage_service.get_all_review_metrics(limit=100, since=None)
-        return _build_summary(all_metrics)
+        return _build_summary(await _rollup_summary(kpi_service, None), [])
     except Exception as e:
         logger.error(f"Error getting metrics summary: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to get metrics summary")
@@ -11,6 +11,7 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
 from app.api.dependencies import AUTH_DEPENDENCY, get_storage_service, get_review_service
+from app.config.settings import settings
 from app.models.schemas import ReviewMeta
 from app.services.storage_service import StorageService
 from app.services.review_service import ReviewService
@@ -288,17 +289,37 @@ async def get_review_status_summary(
 
 from sse_starlette.sse import EventSourceResponse
 from app.services.realtime_service import realtime_service
+from app.services.sse_replay import JournalEvent, get_sse_journal, review_channel
 
-async def review_event_generator(
-    review_id: str,
-    request: Request,
-    storage_service: StorageService,
-):
-    """
-    Yields server-sent events for a specific review's progress.
-    Listens to a Redis Pub/Sub channel.
-    """
-    # First, send all historical events for this review
+
+def _review_heartbeat() -> Dict[str, Any]:
+    return {
+        "event": "heartbeat",
+        "data": realtime_service.format_event(
+            "heartbeat",
+            {"status": "alive"},
+            {"delivery": "live"},
+        ),
+    }
+
+
+def _live_review_event(message: str) -> Dict[str, Any]:
+    structured = _parse_live_review_message(message)
+    return dict(
+        event="live_event",
+        data=realtime_service.format_event(
+            structured["type"],
+            structured["payload"],
+            {**structured["meta"], "delivery": "live"},
+        ),
+    )
+
+
+def _journaled_review_event(event: JournalEvent) -> Dict[str, Any]:
+    return _live_review_event(event.data)
+
+
+async def _historical_review_events(review_id: str, storage_service: StorageService):
     historical_events = await asyncio.to_thread(
         storage_service.get_review_events, review_id
     )
@@ -313,6 +334,43 @@ async def review_event_generator(
             ),
         )
 
+
+async def review_event_generator(
+    review_id: str,
+    request: Request,
+    storage_service: StorageService,
+    last_event_id: Optional[str] = None,
+):
+    """
+    Yields server-sent events for a specific review's progress.
+
+    Live events come from the review's SSE journal and carry ids; a client that
+    reconnects with ``Last-Event-ID`` is sent only the events it missed. Without
+    the journal this falls back to the full history followed by the Pub/Sub feed.
+    """
+    journal = get_sse_journal()
+    channel = review_channel(review_id)
+    if journal.enabled:
+        replay = await journal.replay(channel, last_event_id, "review") if last_event_id else None
+        if replay is not None:
+            after_id = last_event_id
+        else:
+            # Take the journal position before reading the history so no event
+            # published in between is lost.
+            after_id = await journal.last_id(channel)
+        if after_id is not None:
+            if replay is None:
+                async for event in _historical_review_events(review_id, storage_service):
+                    yield event
+            async for event in journal.follow(
+                request, channel, after_id, _journaled_review_event, _review_heartbeat, replay=replay
+            ):
+                yield event
+            return
+
+    async for event in _historical_review_events(review_id, storage_service):
+        yield event
+
     listener_queue = realtime_service.register_listener(review_id)
 
     try:
@@ -320,30 +378,15 @@ async def review_event_generator(
             if await request.is_disconnected():
                 break
             try:
-                message = await asyncio.wait_for(listener_queue.get(), timeout=15)
+                message = await asyncio.wait_for(listener_queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
             except asyncio.TimeoutError:
-                yield {
-                    "event": "heartbeat",
-                    "data": realtime_service.format_event(
-                        "heartbeat",
-                        {"status": "alive"},
-                        {"delivery": "live"},
-                    ),
-                }
+                yield _review_heartbeat()
                 continue
 
             if message is None:
                 continue
 
-            structured = _parse_live_review_message(message)
-            yield dict(
-                event="live_event",
-                data=realtime_service.format_event(
-                    structured["type"],
-                    structured["payload"],
-                    {**structured["meta"], "delivery": "live"},
-                ),
-            )
+            yield _live_review_event(message)
     finally:
         realtime_service.unregister_listener(review_id, listener_queue)
 
@@ -366,7 +409,9 @@ async def get_review_events_stream(
         raise HTTPException(status_code=403, detail="Access denied to review")
 
     return EventSourceResponse(
-        review_event_generator(review_id, request, storage_service)
+        review_event_generator(
+            review_id, request, storage_service, last_event_id=request.headers.get("last-event-id")
+        )
     )
 
 
@@ -145,6 +145,11 @@ async def create_room(
             if room_request.type == RoomType.REVIEW and parent_room.type != RoomType.SUB:
                 raise InvalidRequestError("Review rooms must have a sub room as a parent.")
 
+        if room_request.copy_from_room_id:
+            source_room = await asyncio.to_thread(storage_service.get_room, room_request.copy_from_room_id)
+            if not source_room or source_room.owner_id != user_id:
+                raise NotFoundError("room", room_request.copy_from_room_id)
+
         room_id = generate_id()
         new_room = await asyncio.to_thread(
             storage_service.create_room,
@@ -155,6 +160,12 @@ async def create_room(
             parent_id=room_request.parent_id,
         )
 
+        if room_request.copy_from_room_id:
+            # A single set-based copy inside Postgres; nothing is decrypted or re-embedded.
+            await asyncio.to_thread(
+                storage_service.copy_room_messages, room_request.copy_from_room_id, new_room.room_id
+            )
+
         if new_room.type == RoomType.SUB and new_room.parent_id:
             try:
                 await context_service.initialize_sub_room(
@@ -203,36 +214,27 @@ async def get_rooms(
     if not user_id:
         raise InvalidRequestError("Invalid user information.")
 
-    cache_key = f"rooms:{user_id}"
-
-    # 1. Try to get from cache
-    cached_rooms_data = await cache_service.get(cache_key)
-    if cached_rooms_data:
-        return [Room(**room_data) for room_data in cached_rooms_data]
-
-    # 2. If miss, get from DB
-    rooms = await asyncio.to_thread(storage_service.get_rooms_by_owner, user_id)
-
-    # 3. If no rooms exist for the user, create a default Main Room
-    if not rooms:
-        new_room_id = generate_id()
-        # Run synchronous DB call in a separate thread
-        main_room = await asyncio.to_thread(
-            storage_service.create_room,
-            room_id=new_room_id,
-            name="Main Room",
-            owner_id=user_id,
-            room_type=RoomType.MAIN,
-            parent_id=None
-        )
-        rooms = [main_room]
-        # The cache was missed, so we don't need to invalidate, just set it below.
-
-    # 4. Store in cache for next time
-    if rooms:
-        await cache_service.set(cache_key, [room.model_dump() for room in rooms])
+    async def load_rooms() -> List[Dict]:
+        # On a miss, get from DB; concurrent misses for the same user share this call
+        rooms = await asyncio.to_thread(storage_service.get_rooms_by_owner, user_id)
+
+        # If no rooms exist for the user, create a default Main Room
+        if not rooms:
+            new_room_id = generate_id()
+            # Run synchronous DB call in a separate thread
+            main_room = await asyncio.to_thread(
+                storage_service.create_room,
+                room_id=new_room_id,
+                name="Main Room",
+                owner_id=user_id,
+                room_type=RoomType.MAIN,
+                parent_id=None
+            )
+            rooms = [main_room]
+        return [room.model_dump() for room in rooms] or None
 
-    return rooms
+    rooms_data = await cache_service.get_or_set(f"rooms:{user_id}", load_rooms)
+    return [Room(**room_data) for room_data in rooms_data or []]
 
 
 @router.get("/{room_id}", response_model=Room)
@@ -330,10 +332,9 @@ def export_room_data(
     if not room or room.owner_id != user_info.get("user_id"):
         raise NotFoundError("room", room_id)
 
-    messages = storage_service.get_messages(room_id)
     messages = [
         msg
-        for msg in messages
+        for msg in storage_service.iter_messages(room_id)
         if getattr(msg, "role", "") in {"user", "ai", "system"}
     ]
     messages = sorted(
@@ -407,6 +408,7 @@ class CreateReviewRoomInteractiveRequest(BaseModel):
 class PromoteMemoryRequest(BaseModel):
     sub_room_id: str
     criteria_text: str = "General summary of key findings."
+    message_ids: Optional[List[str]] = None  # Sub-room messages to copy into the main room verbatim
 
 class CreateReviewRoomInteractiveResponse(BaseModel):
     status: Literal["created", "needs_more_context"]
@@ -442,6 +444,7 @@ async def promote_memory_from_sub_room(
                 main_room_id=room_id,
                 user_id=user_id,
                 criteria_text=request.criteria_text,
+                message_ids=request.message_ids,
             )
         )
         return {"status": "success", "summary": summary}
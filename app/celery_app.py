@@ -1,6 +1,7 @@
 import logging
 
 from celery import Celery, Task
+from celery.signals import worker_init, worker_process_shutdown, worker_ready
 
 from app.config.settings import get_effective_celery_url
 from app.utils.trace_id import trace_id_var
@@ -28,12 +29,14 @@ celery_app = Celery(
     backend=redis_url,
     include=[
         "app.tasks.review_tasks",
+        "app.tasks.review_orchestrator",
         "app.tasks.persona_tasks",
         "app.tasks.fact_tasks",
         "app.tasks.memory_tasks",
         "app.tasks.kpi_tasks",
         "app.tasks.embedding_tasks",
         "app.tasks.diagnostic_tasks",
+        "app.tasks.attachment_tasks",
     ],
     Task=ContextTask,  # Use the custom task class
 )
@@ -47,6 +50,10 @@ celery_app.conf.update(  # type: ignore
         Queue("default", routing_key="task.default"),
         Queue("high_priority", routing_key="task.high_priority"),
         Queue("low_priority", routing_key="task.low_priority"),
+        # CPU-bound document ingestion; consumed by prefork workers, which may start process pools.
+        Queue("ingestion", routing_key="task.ingestion"),
+        # Whole reviews run by the asyncio orchestrator (REVIEW_ORCHESTRATOR_ENABLED).
+        Queue("review_orchestrator", routing_key="task.review_orchestrator"),
     ),
     task_default_queue="default",
     task_default_exchange="tasks",
@@ -58,6 +65,48 @@ def route_task(name, args, kwargs, options, task=None, **kw):
         return {'queue': 'high_priority', 'routing_key': 'task.high_priority'}
     if name == 'app.tasks.review_tasks.generate_consolidated_report':
         return {'queue': 'low_priority', 'routing_key': 'task.low_priority'}
+    if name == 'app.tasks.review_orchestrator.orchestrate_review':
+        return {'queue': 'review_orchestrator', 'routing_key': 'task.review_orchestrator'}
+    if name == 'tasks.process_attachment':
+        return {'queue': 'ingestion', 'routing_key': 'task.ingestion'}
     return {'queue': 'default', 'routing_key': 'task.default'}
 
 celery_app.conf.task_routes = (route_task,)
+
+
+@worker_process_shutdown.connect
+def flush_audit_log(**_kwargs):
+    # Prefork children can exit without running atexit hooks; flush buffered audit rows explicitly.
+    from app.services.audit_service import shutdown_audit_service
+
+    shutdown_audit_service()
+
+
+@worker_init.connect
+def configure_cooperative_worker(sender=None, **_kwargs):
+    # With -P gevent every task runs in a greenlet of this one process: make DB and
+    # gRPC waits yield, and give each greenlet a chance at its own DB connection.
+    from app.config.settings import settings
+    from app.core.green import enable_cooperative_io
+    from app.services.database_service import get_database_service
+
+    concurrency = getattr(sender, "concurrency", None) or settings.DB_POOL_MAX_SIZE
+    if not enable_cooperative_io(threadpool_size=concurrency):
+        return
+    pool_size = min(concurrency, settings.DB_WORKER_POOL_MAX_SIZE)
+    database = get_database_service()
+    database.configure_pool(max_size=pool_size, name="worker")
+    logger.info("gevent worker: concurrency=%s, database pool max_size=%s", concurrency, database.pool_max_size)
+
+
+@worker_ready.connect
+def start_review_orchestrator(sender=None, **_kwargs):
+    # A worker consuming the orchestrator queue starts its event loop right away, so it
+    # takes over reviews left behind by a crashed worker before any new one arrives.
+    task_consumer = getattr(sender, "task_consumer", None)
+    queues = {queue.name for queue in getattr(task_consumer, "queues", None) or ()}
+    if "review_orchestrator" not in queues:
+        return
+    from app.tasks.review_orchestrator import get_review_orchestrator
+
+    get_review_orchestrator().start()
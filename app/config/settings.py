@@ -55,6 +55,21 @@ class Settings(BaseSettings):
                 ))
         return v
 
+    # --- Database Connection Pool ---
+    DB_POOL_MIN_SIZE: int = 5
+    DB_POOL_MAX_SIZE: int = 20
+    # How long a request/greenlet waits for a free pooled connection before failing.
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    # Upper bound for gevent workers, whose pool is otherwise sized to --concurrency.
+    DB_WORKER_POOL_MAX_SIZE: int = 50
+    # Total connections all API and worker processes may hold together (0 disables the
+    # budget). Each process gets an even share across DB_POOL_PROCESS_COUNT processes;
+    # keep it at or below PgBouncer's max_client_conn.
+    DB_CONNECTION_BUDGET: int = 0
+    DB_POOL_PROCESS_COUNT: int = 1
+    # Rows per INSERT ... SELECT when copying a room's messages; progress is reported per batch.
+    MESSAGE_COPY_BATCH_SIZE: int = 5000
+
     # --- General API Configuration ---
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
 
@@ -86,6 +101,16 @@ class Settings(BaseSettings):
     LLM_CIRCUIT_BREAKER_TIMEOUT: float = 60.0
     LLM_EXPONENTIAL_BASE: float = 2.0
     LLM_JITTER_FACTOR: float = 0.25
+    PROVIDER_CONFIG_MAX_AGE_SECONDS: int = 60  # Safety-net reload if a pub/sub invalidation is missed
+    LLM_LATENCY_ROUTING_ENABLED: bool = True  # Route interactive calls to the fastest healthy provider
+    LLM_ROUTER_WINDOW_SIZE: int = 200  # Latency samples kept per provider/model
+    LLM_ROUTER_WINDOW_SECONDS: int = 300  # Samples older than this are ignored
+    LLM_ROUTER_MIN_SAMPLES: int = 5  # Below this a provider's stats are treated as unknown
+    LLM_ROUTER_MAX_ERROR_RATE: float = 0.25  # Providers failing more often than this are avoided
+    LLM_ROUTER_REFRESH_SECONDS: float = 5.0  # How often shared stats are re-read from Redis
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 2.0  # Hedge delay until the primary has a measured p95
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.25
 
     # --- Conversation Feature Flag ---
     ENABLE_CONVERSATION: bool = True
@@ -100,6 +125,13 @@ class Settings(BaseSettings):
     TIME_DECAY_ENABLED: bool = True # This seems redundant now, but we'll keep for compatibility
     TIME_DECAY_LAMBDA: float = 0.03 # This seems redundant now
 
+    # --- Attachment Ingestion ---
+    INGESTION_CHUNK_TOKENS: int = 400  # Upper bound per embedded chunk
+    INGESTION_CHUNK_OVERLAP_TOKENS: int = 50  # Trailing sentences repeated at the start of the next chunk
+    INGESTION_EMBED_BATCH_SIZE: int = 64  # Chunks per embeddings request and INSERT
+    INGESTION_EXTRACT_WORKERS: int = 0  # PDF extraction processes; 0 = min(4, CPU count)
+    INGESTION_PDF_PAGES_PER_TASK: int = 16
+
     # --- Re-ranker Configuration ---
     RERANK_ENABLED: bool = False
     RERANK_PROVIDER: str = "cohere"  # "openai" or "cohere"
@@ -122,6 +154,13 @@ class Settings(BaseSettings):
     WEATHER_CACHE_SECONDS: int = 900
     WEATHER_DEFAULT_LANGUAGE: str = "ko"
 
+    # --- Cache ---
+    CACHE_LOCAL_MAX_ENTRIES: int = 2048
+    # Upper bound on how long a process serves its local copy without asking Redis.
+    CACHE_LOCAL_TTL_SECONDS: float = 5.0
+    # XFetch beta: >1 refreshes hot keys earlier, <1 later.
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+
     # --- Firebase Configuration ---
     FIREBASE_SERVICE_ACCOUNT_PATH: Optional[str] = None
     FIREBASE_PROJECT_ID: Optional[str] = None
@@ -179,6 +218,16 @@ class Settings(BaseSettings):
     # --- Rate Limiting ---
     RATE_LIMIT_PER_MINUTE: int = 60
 
+    # --- In-process Background Tasks ---
+    # Context refreshes and fact extraction run in the API process, at most this many
+    # at a time per kind; repeated refreshes of a room collapse into one pending job.
+    BACKGROUND_TASK_CONCURRENCY: Dict[str, int] = {"context_refresh": 2, "fact_extraction": 4}
+    BACKGROUND_TASK_DEFAULT_CONCURRENCY: int = 4
+    BACKGROUND_TASK_MAX_PENDING: int = 1000  # Queued plus running; beyond this new jobs are rejected
+    BACKGROUND_TASK_RESULT_TTL_SECONDS: int = 3600
+    BACKGROUND_TASK_MAX_RESULTS: int = 10000
+    BACKGROUND_TASK_DRAIN_TIMEOUT_SECONDS: float = 10.0
+
     # --- Real-time Delivery Guardrails ---
     REALTIME_MAX_CONNECTIONS_PER_ROOM: int = 64
     REALTIME_MAX_SSE_QUEUE_SIZE: int = 256
@@ -186,6 +235,18 @@ class Settings(BaseSettings):
     REALTIME_SEND_MAX_RETRIES: int = 1
     REALTIME_SEND_RETRY_BACKOFF_SECONDS: float = 0.5
     REALTIME_DISCONNECT_ON_SLOW_CONSUMER: bool = True
+    # Each WebSocket has its own bounded send queue drained by a writer task.
+    # When a queue is full: "drop_oldest" drops the oldest queued delta,
+    # "coalesce" merges the new delta into the queued one, "disconnect" drops the client.
+    REALTIME_OUTBOUND_QUEUE_SIZE: int = 256
+    REALTIME_OVERFLOW_POLICY: str = "coalesce"
+    # SSE events are journaled per channel in a bounded Redis stream so a client
+    # reconnecting with Last-Event-ID gets exactly the events it missed.
+    SSE_REPLAY_ENABLED: bool = True
+    SSE_REPLAY_MAX_EVENTS: int = 1000  # Per channel; older events are trimmed
+    SSE_REPLAY_TTL_SECONDS: int = 3600  # Journals of idle channels expire
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_STREAM_IDLE_TIMEOUT_SECONDS: float = 120.0  # A resumed message stream gives up on a silent producer
 
     # --- Metrics and Alerting Configuration ---
     METRICS_ENABLED: bool = True
@@ -197,13 +258,73 @@ class Settings(BaseSettings):
     DAILY_TOKEN_BUDGET: Optional[int] = 200000
     DAILY_COST_BUDGET: float = 50.0
     DAILY_ORG_TOKEN_BUDGET: Optional[int] = None  # e.g., 100000
+    # Requests reserve their estimated tokens against the daily budgets up front and
+    # settle the actual usage when they finish. A reservation that is never settled
+    # (e.g. the process died) stops counting after its lease expires.
+    TOKEN_BUDGET_LEASE_SECONDS: int = 600
+    TOKEN_BUDGET_REVIEW_LEASE_SECONDS: int = 3600
+    TOKEN_BUDGET_REVIEW_ESTIMATE: int = 30000  # Used when PER_REVIEW_TOKEN_BUDGET is unset
+    TOKEN_BUDGET_REDIS_MAX_CONNECTIONS: int = 50
+    REVIEW_CHECKPOINT_TTL_SECONDS: int = 86400  # Panelist outputs kept for round task retries
     ALERT_LATENCY_SECONDS_THRESHOLD: int = 300  # Alert if a single review takes more than 5 minutes
     ALERT_FAILURE_RATE_THRESHOLD: float = 0.2  # Alert if overall failure rate exceeds 20%
 
+    # --- KPI Rollups ---
+    KPI_DASHBOARD_CACHE_SECONDS: int = 30  # Short cache in front of rollup-backed dashboard reads
+    KPI_METRICS_WINDOW_DAYS: int = 30  # Default window for /api/metrics summaries
+
+    # --- Audit Log Writer ---
+    AUDIT_BATCH_SIZE: int = 100
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    AUDIT_MAX_QUEUE_SIZE: int = 10000  # Beyond this, entries go straight to the spill file
+    AUDIT_SPILL_PATH: str = "/tmp/origin-audit-spill.jsonl"
+
+    # --- Review Orchestration ---
+    # Run each review as one asyncio state machine on the review_orchestrator worker
+    # instead of chaining a Celery task per round.
+    REVIEW_ORCHESTRATOR_ENABLED: bool = False
+    REVIEW_ORCHESTRATOR_MAX_CONCURRENCY: int = 100  # Reviews in flight per orchestrator process
+    REVIEW_ORCHESTRATOR_LEASE_SECONDS: int = 120  # Runs not renewed for this long are taken over
+    REVIEW_ORCHESTRATOR_STEP_MAX_RETRIES: int = 3
+    # Tokens a panelist's round prompt may use; the instruction, own history and digests
+    # of the other panelists are shortened, lowest priority first, to stay within it.
+    REVIEW_PROMPT_TOKEN_BUDGET: int = 2000
+    # Stream panelist output to review subscribers while it is generated.
+    REVIEW_STREAMING_ENABLED: bool = False
+    REVIEW_STREAM_MAX_EVENT_CHARS: int = 512
+    REVIEW_STREAM_FLUSH_SECONDS: float = 0.25
+
+    # --- Persona Generation ---
+    PERSONA_MIN_INITIAL_MESSAGES: int = 10  # User turns required before the first persona is built
+    PERSONA_MIN_NEW_MESSAGES: int = 5  # New user turns required before an existing persona is refreshed
+    PERSONA_MAX_MESSAGES_PER_RUN: int = 200
+    PERSONA_MAX_HISTORY_CHARS: int = 10000  # Approx 2500 tokens of new history per run
+
+    # --- Room History Paging ---
+    MESSAGE_PAGE_DEFAULT_SIZE: int = 100
+    MESSAGE_PAGE_MAX_SIZE: int = 500
+    MESSAGE_PAGE_CACHE_MAX_PAGES: int = 512  # Decrypted pages kept in process memory
+    MESSAGE_PAGE_CACHE_TTL_SECONDS: int = 60
+
+    # --- Sub Room Context ---
+    SUB_ROOM_HIGHLIGHT_WINDOW: int = 500  # Most recent parent messages scanned for sub-room highlights
+    SUB_ROOM_HIGHLIGHT_LIMIT: int = 3
+
     # --- Memory Archive Configuration ---
     MEMORY_ARCHIVE_AFTER_DAYS: int = 14  # Archive conversations after 14 days
     MEMORY_ARCHIVE_BATCH_SIZE: int = 300  # Process 300 conversations per batch (balanced between 200-500)
     MEMORY_ARCHIVE_MIN_MESSAGES: int = 10  # Minimum messages required for archival
+    MEMORY_ARCHIVE_MAX_BATCHES_PER_ROOM: int = 10  # Per room per run; a room with more stays due
+    MEMORY_ARCHIVE_DISPATCH_PAGE_SIZE: int = 500  # Due rooms read per page by the daily dispatcher
+
+    # --- Weekly Room Digests ---
+    # Every Monday each room active in the previous week gets a digest in summary_notes,
+    # written with the previous week's digest as context; the latest ones are served as
+    # long-range context instead of raw history.
+    WEEKLY_DIGEST_CONTEXT_WEEKS: int = 4  # Digests per room included in hierarchical context
+    WEEKLY_DIGEST_MAX_MESSAGES: int = 2000  # Messages of one week read for its digest
+    WEEKLY_DIGEST_MAX_INPUT_TOKENS: int = 6000  # Transcript tokens sent to the summarizer
+    WEEKLY_DIGEST_DISPATCH_PAGE_SIZE: int = 500
 
     # --- Test Configuration ---
     ALLOW_TEST_DB_ENCRYPTION_KEY: bool = False
@@ -0,0 +1,100 @@
+"""
+Helpers for running the app's blocking I/O cooperatively under gevent.
+
+Celery workers run with ``-P gevent``, which monkey-patches the stdlib so Redis
+and the HTTP-based LLM SDKs already yield while they wait on sockets. Two
+things are not covered by monkey-patching and are fixed here:
+
+* psycopg2 is a C extension; without a wait callback every query blocks the
+  whole worker until Postgres answers.
+* asyncio keeps its "running loop" per OS thread, so two greenlets calling
+  ``asyncio.run`` at the same time collide. Coroutines are therefore run on
+  gevent's native thread pool while the calling greenlet waits cooperatively.
+"""
+import asyncio
+import logging
+from typing import Any, Coroutine, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_cooperative_io_enabled = False
+
+
+def is_gevent_patched() -> bool:
+    """True when gevent has monkey-patched sockets in this process."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that parks the current greenlet instead of the process."""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def enable_cooperative_io(threadpool_size: Optional[int] = None) -> bool:
+    """
+    Make psycopg2 and gRPC (used by the Gemini SDK) yield to other greenlets.
+
+    ``threadpool_size`` bounds how many coroutines :func:`run_coroutine_sync`
+    runs at once; pass the worker concurrency. Safe to call more than once;
+    does nothing unless gevent has patched the process. Returns whether
+    cooperative I/O is active.
+    """
+    global _cooperative_io_enabled
+    if not is_gevent_patched():
+        return False
+    if threadpool_size:
+        import gevent
+
+        gevent.get_hub().threadpool.maxsize = threadpool_size
+    if _cooperative_io_enabled:
+        return True
+
+    from psycopg2 import extensions
+
+    extensions.set_wait_callback(_gevent_wait_callback)
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+
+        grpc_gevent.init_gevent()
+    except ImportError:
+        pass
+    except Exception as e:  # pragma: no cover - depends on grpc build
+        logger.warning(f"gRPC gevent integration unavailable, Gemini calls will block: {e}")
+
+    _cooperative_io_enabled = True
+    logger.info("Cooperative gevent I/O enabled for psycopg2 and gRPC.")
+    return True
+
+
+def run_coroutine_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run ``coro`` to completion from synchronous (task) code and return its result.
+
+    Under gevent the event loop runs on a native thread from the hub's pool so
+    concurrent greenlets never share a running loop; otherwise this is
+    ``asyncio.run``.
+    """
+    if not is_gevent_patched():
+        return asyncio.run(coro)
+    import gevent
+
+    return gevent.get_hub().threadpool.apply(asyncio.run, (coro,))
@@ -17,6 +17,13 @@ LLM_LATENCY_SECONDS = Histogram(
     ["provider"]
 )
 
+# Hedged duplicate requests, labeled by the provider of the hedge and whether it won the race.
+LLM_HEDGED_REQUESTS_TOTAL = Counter(
+    "origin_llm_hedged_requests_total",
+    "Duplicate LLM requests issued after the primary exceeded its p95 latency",
+    ["provider", "outcome"] # outcome can be "won" or "lost"
+)
+
 # A counter for total tokens used, labeled by provider and kind (prompt/completion).
 LLM_TOKENS_TOTAL = Counter(
     "origin_tokens_total",
@@ -46,8 +53,285 @@ SSE_SESSIONS_ACTIVE = Gauge(
     "Number of active SSE sessions"
 )
 
+SSE_RESUMES_TOTAL = Counter(
+    "origin_sse_resumes_total",
+    "SSE reconnects with a Last-Event-ID, by whether the journal still covered it",
+    ["channel_type", "outcome"]
+)
+
+SSE_REPLAYED_EVENTS_TOTAL = Counter(
+    "origin_sse_replayed_events_total",
+    "Missed events replayed from the SSE journal on reconnect",
+    ["channel_type"]
+)
+
+REALTIME_OUTBOUND_QUEUE_DEPTH = Histogram(
+    "origin_realtime_outbound_queue_depth",
+    "Depth of a subscriber's outbound queue after each enqueue",
+    ["transport"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+
+REALTIME_OUTBOUND_DROPS_TOTAL = Counter(
+    "origin_realtime_outbound_drops_total",
+    "Messages dropped or coalesced, and subscribers disconnected, because an outbound queue was full",
+    ["transport", "reason"]
+)
+
+REALTIME_SEND_SECONDS = Histogram(
+    "origin_realtime_send_seconds",
+    "Time to send one message to a WebSocket, including retries",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 3.0, 10.0)
+)
+
 # A counter for total conversation costs
 CONVO_COST_USD_TOTAL = Counter(
     "origin_convo_cost_usd_total",
     "Total estimated cost of conversations in USD"
 )
+
+# --- Persona Generation Metrics ---
+
+PERSONA_ROWS_SCANNED_TOTAL = Counter(
+    "origin_persona_rows_scanned_total",
+    "Message rows read by incremental persona generation runs"
+)
+
+PERSONA_TOKENS_TOTAL = Counter(
+    "origin_persona_tokens_total",
+    "LLM tokens spent by persona generation runs"
+)
+
+# --- Memory Archival Metrics ---
+
+MEMORY_ARCHIVE_ROOMS_TOTAL = Counter(
+    "origin_memory_archive_rooms_total",
+    "Rooms visited by memory archival, by outcome",
+    ["outcome"]  # archived, skipped (below the minimum), failed
+)
+
+MEMORY_ARCHIVED_MESSAGES_TOTAL = Counter(
+    "origin_memory_archived_messages_total",
+    "Messages summarized into long-term memory and removed from the room"
+)
+
+# --- Weekly Room Digest Metrics ---
+
+WEEKLY_DIGESTS_TOTAL = Counter(
+    "origin_weekly_digests_total",
+    "Weekly room digest runs, by outcome",
+    ["outcome"]  # created, exists, inactive, failed
+)
+
+WEEKLY_DIGEST_TOKENS_SAVED = Histogram(
+    "origin_weekly_digest_tokens_saved",
+    "Estimated tokens of a room's week of messages minus those of the digest replacing them",
+    buckets=(100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000),
+)
+
+CONTEXT_DIGEST_TOKENS_SAVED_TOTAL = Counter(
+    "origin_context_digest_tokens_saved_total",
+    "Tokens of retrieved raw messages replaced by the weekly digest covering them, minus the digest's tokens"
+)
+
+# --- Audit Log Writer Metrics ---
+
+AUDIT_QUEUE_DEPTH = Gauge(
+    "origin_audit_queue_depth",
+    "Audit log rows waiting in memory for the batched writer"
+)
+
+AUDIT_FLUSH_LAG_SECONDS = Histogram(
+    "origin_audit_flush_lag_seconds",
+    "Time between queuing an audit log row and writing it to the database"
+)
+
+AUDIT_SPILLED_TOTAL = Counter(
+    "origin_audit_spilled_total",
+    "Audit log rows written to the local spill file"
+)
+
+AUDIT_DROPPED_TOTAL = Counter(
+    "origin_audit_dropped_total",
+    "Audit log rows lost because neither the database nor the spill file accepted them"
+)
+
+# --- Database Connection Pool Metrics ---
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    "origin_db_pool_wait_seconds",
+    "Time spent waiting to check out a pooled database connection",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+DB_POOL_CONNECTIONS_IN_USE = Gauge(
+    "origin_db_pool_connections_in_use",
+    "Database connections currently checked out of the pool",
+    ["pool"]
+)
+
+DB_POOL_MAX_CONNECTIONS = Gauge(
+    "origin_db_pool_max_connections",
+    "Configured maximum size of the database connection pool",
+    ["pool"]
+)
+
+DB_POOL_TIMEOUTS_TOTAL = Counter(
+    "origin_db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a free database connection",
+    ["pool"]
+)
+
+# --- Cache Metrics ---
+
+CACHE_REQUESTS_TOTAL = Counter(
+    "origin_cache_requests_total",
+    "Cache lookups by key prefix and result (local_hit, redis_hit, miss)",
+    ["prefix", "result"]
+)
+
+CACHE_OPERATION_SECONDS = Histogram(
+    "origin_cache_operation_seconds",
+    "Latency of cache operations by key prefix, including loader time for get_or_set misses",
+    ["prefix", "operation"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# --- Attachment Ingestion Metrics ---
+
+ATTACHMENT_INGEST_SECONDS = Histogram(
+    "origin_attachment_ingest_seconds",
+    "Wall time to extract, chunk, embed and store an attachment",
+    ["format"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+
+ATTACHMENT_CHUNKS_TOTAL = Counter(
+    "origin_attachment_chunks_total",
+    "Chunks embedded and stored from attachments",
+    ["format"]
+)
+
+# --- Token Budget Metrics ---
+
+TOKEN_BUDGET_RESERVATIONS_TOTAL = Counter(
+    "origin_token_budget_reservations_total",
+    "Token budget reservations by outcome",
+    ["outcome"] # outcome can be "granted", "rejected" or "unavailable"
+)
+
+TOKEN_BUDGET_SETTLEMENTS_TOTAL = Counter(
+    "origin_token_budget_settlements_total",
+    "Token budget reservations settled with actual usage or refunded",
+    ["outcome"] # outcome can be "settled", "refunded" or "expired"
+)
+
+TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL = Counter(
+    "origin_token_budget_overshoot_tokens_total",
+    "Tokens used beyond a daily limit because actual usage exceeded the reservation",
+    ["scope"]
+)
+
+# --- Review Round Checkpoint Metrics ---
+
+REVIEW_CHECKPOINT_RESUMES_TOTAL = Counter(
+    "origin_review_checkpoint_resumes_total",
+    "Panelist outputs reused from a checkpoint instead of calling the LLM again on a round retry",
+    ["round"]
+)
+
+REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL = Counter(
+    "origin_review_retry_duplicate_tokens_total",
+    "Tokens spent re-running a panelist whose output for the round had already been checkpointed",
+    ["round"]
+)
+
+# --- Review Prompt Budget Metrics ---
+
+REVIEW_PROMPT_TOKENS = Histogram(
+    "origin_review_prompt_tokens",
+    "Prompt tokens of one panelist's round prompt after budgeting",
+    ["round"],
+    buckets=(250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000),
+)
+
+REVIEW_PROMPT_SECTIONS_COMPRESSED_TOTAL = Counter(
+    "origin_review_prompt_sections_compressed_total",
+    "Round prompt sections shortened or cut to fit the prompt token budget",
+    ["round", "section"]
+)
+
+# --- Review Live Stream Metrics ---
+
+REVIEW_STREAM_FIRST_OUTPUT_SECONDS = Histogram(
+    "origin_review_stream_first_output_seconds",
+    "Time from the start of a review round's panel calls to the first streamed panelist text",
+    ["round"],
+    buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
+
+REVIEW_STREAM_EVENTS_TOTAL = Counter(
+    "origin_review_stream_events_total",
+    "Live panelist stream events published to review subscribers",
+    ["type"]
+)
+
+# --- In-process Background Task Metrics ---
+
+BACKGROUND_TASKS_QUEUED = Gauge(
+    "origin_background_tasks_queued",
+    "Background tasks waiting for a concurrency slot",
+    ["kind"]
+)
+
+BACKGROUND_TASKS_RUNNING = Gauge(
+    "origin_background_tasks_running",
+    "Background tasks currently running",
+    ["kind"]
+)
+
+BACKGROUND_TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "origin_background_task_queue_wait_seconds",
+    "Time a background task waited for a concurrency slot",
+    ["kind"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+BACKGROUND_TASK_DURATION_SECONDS = Histogram(
+    "origin_background_task_duration_seconds",
+    "Run time of a background task including retries",
+    ["kind", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+)
+
+BACKGROUND_TASKS_DEDUPED_TOTAL = Counter(
+    "origin_background_tasks_deduped_total",
+    "Background tasks not created because an identical job was already pending",
+    ["kind"]
+)
+
+BACKGROUND_TASKS_REJECTED_TOTAL = Counter(
+    "origin_background_tasks_rejected_total",
+    "Background tasks rejected because the queue was full or the service was shutting down",
+    ["kind", "reason"]
+)
+
+# --- Review Orchestrator Metrics ---
+
+REVIEW_ORCHESTRATOR_ACTIVE_REVIEWS = Gauge(
+    "origin_review_orchestrator_active_reviews",
+    "Reviews currently running in this orchestrator process"
+)
+
+REVIEW_ORCHESTRATOR_STEP_SECONDS = Histogram(
+    "origin_review_orchestrator_step_seconds",
+    "Wall time of one orchestrated review step",
+    ["step"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+
+REVIEW_ORCHESTRATOR_RECOVERED_TOTAL = Counter(
+    "origin_review_orchestrator_recovered_total",
+    "Orchestrated reviews taken over from a worker whose lease expired"
+)
@@ -1,16 +1,48 @@
-"""Realtime connection management utilities shared across WebSocket and SSE paths."""
+"""Realtime connection management utilities shared across WebSocket and SSE paths.
+
+Every subscriber has its own bounded outbound queue, so a broadcast is one
+non-blocking enqueue per subscriber and a slow client only ever delays
+itself. Each WebSocket is drained by its own writer task; SSE generators
+drain their listener queue directly. When a subscriber's queue is full the
+channel's overflow policy decides what gives:
+
+``drop_oldest``
+    Drop the oldest queued streaming delta (or the oldest message, if none
+    is a delta) to make room.
+``coalesce``
+    Merge a new delta into a queued delta of the same stream, so the client
+    receives the same text in fewer events; falls back to ``drop_oldest``.
+``disconnect``
+    Disconnect the subscriber; it reconnects and resumes from the SSE journal.
+"""
 
 import asyncio
+import json
 import logging
+from collections import deque
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from fastapi import WebSocket
 
 from app.config.settings import settings
+from app.core.metrics import (
+    REALTIME_OUTBOUND_DROPS_TOTAL,
+    REALTIME_OUTBOUND_QUEUE_DEPTH,
+    REALTIME_SEND_SECONDS,
+)
 
 logger = logging.getLogger(__name__)
 
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Streaming increments whose loss only costs a client some intermediate text.
+DELTA_EVENT_TYPES = frozenset({"delta", "panelist_delta"})
+# Payload fields that carry delta text; coalescing concatenates them.
+_DELTA_TEXT_FIELDS = ("delta", "content", "text")
+# Payload fields that identify a stream; only deltas of the same stream coalesce.
+_DELTA_STREAM_FIELDS = ("message_id", "review_id", "round", "persona")
+
 
 @dataclass(frozen=True)
 class RealtimeConfig:
@@ -22,9 +54,15 @@ class RealtimeConfig:
     send_retries: int
     retry_backoff: float
     disconnect_on_backpressure: bool
+    outbound_queue_size: int = 256
+    overflow_policy: str = "coalesce"
 
     @classmethod
     def from_settings(cls) -> "RealtimeConfig":
+        policy = settings.REALTIME_OVERFLOW_POLICY
+        if policy not in OVERFLOW_POLICIES:
+            logger.warning("Unknown REALTIME_OVERFLOW_POLICY %r; using 'disconnect'", policy)
+            policy = "disconnect"
         return cls(
             max_connections=max(settings.REALTIME_MAX_CONNECTIONS_PER_ROOM, 0),
             sse_queue_size=max(settings.REALTIME_MAX_SSE_QUEUE_SIZE, 0),
@@ -32,6 +70,8 @@ class RealtimeConfig:
             send_retries=max(settings.REALTIME_SEND_MAX_RETRIES, 0),
             retry_backoff=max(settings.REALTIME_SEND_RETRY_BACKOFF_SECONDS, 0.0),
             disconnect_on_backpressure=settings.REALTIME_DISCONNECT_ON_SLOW_CONSUMER,
+            outbound_queue_size=max(settings.REALTIME_OUTBOUND_QUEUE_SIZE, 1),
+            overflow_policy=policy,
         )
 
 
@@ -39,11 +79,92 @@ class ConnectionLimitError(Exception):
     """Raised when a channel exceeds its concurrent connection limit."""
 
 
+def _parse_delta(message: str) -> Optional[Dict[str, Any]]:
+    """The message as a dict if it is a streaming delta event, else None."""
+    # Cheap pre-check: only delta events are ever parsed, and only on overflow.
+    if "delta" not in message:
+        return None
+    try:
+        event = json.loads(message)
+    except ValueError:
+        return None
+    if not isinstance(event, dict) or event.get("type") not in DELTA_EVENT_TYPES:
+        return None
+    if not isinstance(event.get("payload"), dict):
+        return None
+    return event
+
+
+def _coalesce(older: Dict[str, Any], newer: Dict[str, Any]) -> Optional[str]:
+    """``older`` and ``newer`` merged into one event, or None if they belong to different streams."""
+    if older["type"] != newer["type"]:
+        return None
+    first, second = older["payload"], newer["payload"]
+    if any(first.get(field) != second.get(field) for field in _DELTA_STREAM_FIELDS):
+        return None
+    payload = dict(second)
+    for field in _DELTA_TEXT_FIELDS:
+        if isinstance(first.get(field), str) and isinstance(second.get(field), str):
+            payload[field] = first[field] + second[field]
+    if "seq" in first:
+        # Clients track seq to detect gaps; the merged event covers first_seq..seq.
+        payload["first_seq"] = first.get("first_seq", first["seq"])
+    return json.dumps({**newer, "payload": payload}, ensure_ascii=False)
+
+
+class OutboundQueue(asyncio.Queue):
+    """A subscriber's bounded queue of outgoing messages that applies an overflow policy when full.
+
+    ``put_nowait`` raises :class:`asyncio.QueueFull` only under the ``disconnect``
+    policy; the other policies make room instead.
+    """
+
+    def __init__(self, limit: int, policy: str, transport: str) -> None:
+        # Unbounded underneath: the limit is enforced by put_nowait so the policy can make room.
+        super().__init__()
+        self.limit = limit
+        self.policy = policy
+        self.transport = transport
+
+    def put_nowait(self, item: str) -> None:
+        if self.limit and self.qsize() >= self.limit:
+            if self.policy == "disconnect":
+                REALTIME_OUTBOUND_DROPS_TOTAL.labels(transport=self.transport, reason="disconnected").inc()
+                raise asyncio.QueueFull
+            if self.policy == "coalesce" and self._coalesce_tail(item):
+                REALTIME_OUTBOUND_DROPS_TOTAL.labels(transport=self.transport, reason="coalesced").inc()
+                return
+            self._drop_oldest()
+            REALTIME_OUTBOUND_DROPS_TOTAL.labels(transport=self.transport, reason="dropped").inc()
+        super().put_nowait(item)
+        REALTIME_OUTBOUND_QUEUE_DEPTH.labels(transport=self.transport).observe(self.qsize())
+
+    def _coalesce_tail(self, item: str) -> bool:
+        queued: deque = self._queue  # type: ignore[attr-defined]
+        newer = _parse_delta(item)
+        older = _parse_delta(queued[-1]) if newer is not None and queued else None
+        merged = _coalesce(older, newer) if older is not None else None
+        if merged is None:
+            return False
+        queued[-1] = merged
+        return True
+
+    def _drop_oldest(self) -> None:
+        queued: deque = self._queue  # type: ignore[attr-defined]
+        for index, message in enumerate(queued):
+            if _parse_delta(message) is not None:
+                del queued[index]
+                return
+        queued.popleft()
+
+
 class ConnectionManager:
     def __init__(self, config: Optional[RealtimeConfig] = None) -> None:
         self._config = config or RealtimeConfig.from_settings()
         self.active_connections: dict[str, list[WebSocket]] = {}
         self.sse_listeners: dict[str, list[asyncio.Queue[str]]] = {}
+        self._outbound: dict[WebSocket, OutboundQueue] = {}
+        self._writers: dict[WebSocket, asyncio.Task] = {}
 
     @property
     def config(self) -> RealtimeConfig:
@@ -61,6 +182,9 @@ class ConnectionManager:
 
         await websocket.accept()
         room_connections.append(websocket)
+        queue = OutboundQueue(self.config.outbound_queue_size, self.config.overflow_policy, "websocket")
+        self._outbound[websocket] = queue
+        self._writers[websocket] = asyncio.create_task(self._write(websocket, channel_id, queue))
         logger.info("WebSocket connected for channel %s", channel_id)
 
     def disconnect(self, websocket: WebSocket, channel_id: str) -> None:
@@ -76,10 +200,15 @@ class ConnectionManager:
         if not connections:
             del self.active_connections[channel_id]
 
+        self._outbound.pop(websocket, None)
+        writer = self._writers.pop(websocket, None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
+
         logger.info("WebSocket disconnected from channel %s", channel_id)
 
     def register_sse_listener(self, channel_id: str) -> asyncio.Queue[str]:
-        queue: asyncio.Queue[str] = asyncio.Queue(maxsize=self.config.sse_queue_size)
+        queue = OutboundQueue(self.config.sse_queue_size, self.config.overflow_policy, "sse")
         listeners = self.sse_listeners.setdefault(channel_id, [])
         listeners.append(queue)
         return queue
@@ -125,35 +254,38 @@ class ConnectionManager:
 
         return False
 
+    async def _write(self, websocket: WebSocket, channel_id: str, queue: OutboundQueue) -> None:
+        """Drain one WebSocket's outbound queue; runs until the socket is disconnected."""
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await queue.get()
+            started = loop.time()
+            sent = await self._send_with_retry(websocket, message)
+            REALTIME_SEND_SECONDS.observe(loop.time() - started)
+            if not sent and self.config.disconnect_on_backpressure:
+                logger.warning("Dropping slow WebSocket consumer in %s", channel_id)
+                self.disconnect(websocket, channel_id)
+                return
+
+    def _drop_subscriber(self, websocket: WebSocket, channel_id: str) -> None:
+        logger.warning("Disconnecting WebSocket consumer in %s with a full send queue", channel_id)
+        self.disconnect(websocket, channel_id)
+        # Close it so the client reconnects (and resumes) rather than waiting on a dead subscription.
+        close = asyncio.create_task(websocket.close(code=1013))
+        close.add_done_callback(lambda task: task.cancelled() or task.exception())
+
     async def broadcast(self, message: str, channel_id: str) -> None:
+        """Queue ``message`` for every subscriber of the channel without waiting on any of them."""
         logger.info("Broadcasting to %s: %s", channel_id, message[:100])
 
-        connections = list(self.active_connections.get(channel_id, []))
-        if connections:
-            results = await asyncio.gather(
-                *(self._send_with_retry(connection, message) for connection in connections),
-                return_exceptions=True,
-            )
-
-            for connection, result in zip(connections, results):
-                disconnect = False
-                if isinstance(result, Exception):
-                    logger.error(
-                        "Broadcast task errored for %s: %s",
-                        channel_id,
-                        result,
-                        exc_info=True,
-                    )
-                    disconnect = True
-                elif result is False:
-                    logger.warning(
-                        "Dropping slow WebSocket consumer in %s",
-                        channel_id,
-                    )
-                    disconnect = self.config.disconnect_on_backpressure
-
-                if disconnect:
-                    self.disconnect(connection, channel_id)
+        for connection in list(self.active_connections.get(channel_id, [])):
+            queue = self._outbound.get(connection)
+            if queue is None:
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop_subscriber(connection, channel_id)
 
         for listener in list(self.sse_listeners.get(channel_id, [])):
             try:
@@ -172,6 +304,8 @@ connection_manager = ConnectionManager()
 __all__ = [
     "ConnectionManager",
     "ConnectionLimitError",
+    "OutboundQueue",
+    "OVERFLOW_POLICIES",
     "RealtimeConfig",
     "connection_manager",
 ]
@@ -1,4 +1,4 @@
-import { useCallback, useEffect, useMemo, useRef } from 'react';
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import toast from 'react-hot-toast';
 
@@ -11,10 +11,13 @@ import useRealtimeChannel from '../hooks/useRealtimeChannel';
 import apiClient from '../lib/apiClient';
 
 
-const fetchMessages = async (roomId) => {
-  if (!roomId) return [];
-  const { data } = await apiClient.get(`/api/rooms/${roomId}/messages`);
-  return data || [];
+const PAGE_SIZE = 100;
+
+const fetchMessagesPage = async (roomId, before) => {
+  const params = { limit: PAGE_SIZE };
+  if (before) params.before = before;
+  const { data, headers } = await apiClient.get(`/api/rooms/${roomId}/messages`, { params });
+  return { messages: data || [], hasMore: headers?.['x-has-more'] === 'true' };
 };
 
 const promoteMemory = async ({ mainRoomId, subRoomId }) => {
@@ -27,7 +30,10 @@ const promoteMemory = async ({ mainRoomId, subRoomId }) => {
 
 const MessageList = ({ roomId, currentRoom }) => {
   const messagesEndRef = useRef(null);
+  const lastMessageIdRef = useRef(null);
   const queryClient = useQueryClient();
+  const [hasOlder, setHasOlder] = useState(false);
+  const [isLoadingOlder, setIsLoadingOlder] = useState(false);
 
   // All hooks must be called before any conditional returns
   const promoteMemoryMutation = useMutation({
@@ -60,8 +66,14 @@ const MessageList = ({ roomId, currentRoom }) => {
         handleNewMessage(envelope.payload);
       }
     },
+    // The server could not replay what was missed since the last event; reload the room.
+    resync: () => {
+      if (roomId) {
+        queryClient.invalidateQueries({ queryKey: ['messages', roomId] });
+      }
+    },
     heartbeat: () => {},
-  }), [handleNewMessage]);
+  }), [handleNewMessage, queryClient, roomId]);
 
   const eventsUrl = (roomId && currentRoom) ? `/api/rooms/${roomId}/messages/events` : null;
   const { status: connectionStatus } = useRealtimeChannel({
@@ -75,7 +87,12 @@ const MessageList = ({ roomId, currentRoom }) => {
 
   const { data: messages = [], isLoading } = useQuery({
     queryKey: ['messages', roomId],
-    queryFn: () => fetchMessages(roomId),
+    queryFn: async () => {
+      if (!roomId) return [];
+      const page = await fetchMessagesPage(roomId);
+      setHasOlder(page.hasMore);
+      return page.messages;
+    },
     enabled: !!roomId && !!currentRoom,
     staleTime: 1000 * 60 * 5, // 5 minutes
     retry: 1,
@@ -102,9 +119,32 @@ const MessageList = ({ roomId, currentRoom }) => {
     return messages.filter((msg) => msg.message_id !== contextMessage.message_id);
   }, [messages, contextMessage]);
 
+  const loadOlderMessages = useCallback(async () => {
+    const oldest = messages[0];
+    if (!roomId || !oldest || isLoadingOlder) return;
+    setIsLoadingOlder(true);
+    try {
+      const page = await fetchMessagesPage(roomId, oldest.message_id);
+      queryClient.setQueryData(['messages', roomId], (oldData = []) => {
+        const known = new Set(oldData.map((m) => m.message_id));
+        return [...page.messages.filter((m) => !known.has(m.message_id)), ...oldData];
+      });
+      setHasOlder(page.hasMore);
+    } catch (error) {
+      console.error('Failed to load earlier messages:', error);
+      toast.error('이전 메시지를 불러오지 못했어요.');
+    } finally {
+      setIsLoadingOlder(false);
+    }
+  }, [messages, roomId, isLoadingOlder, queryClient]);
+
   useEffect(() => {
-    // Scroll to bottom when new messages are added
-    messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
+    // Scroll to bottom only when a newer message arrives, not when older pages are prepended
+    const lastId = displayMessages[displayMessages.length - 1]?.message_id ?? null;
+    if (lastId !== lastMessageIdRef.current) {
+      lastMessageIdRef.current = lastId;
+      messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
+    }
   }, [displayMessages]);
 
   // Now safe to do conditional returns after all hooks are called
@@ -169,6 +209,17 @@ const MessageList = ({ roomId, currentRoom }) => {
       )}
       <ConnectionStatusBanner status={connectionStatus} />
       <div className="flex-1 overflow-y-auto p-4 space-y-4">
+        {hasOlder && (
+          <div className="flex justify-center">
+            <button
+              onClick={loadOlderMessages}
+              disabled={isLoadingOlder}
+              className="px-3 py-1 text-sm text-muted border border-border rounded hover:bg-bg-alt disabled:opacity-50"
+            >
+              {isLoadingOlder ? 'Loading...' : 'Load earlier messages'}
+            </button>
+          </div>
+        )}
         {contextMessage && currentRoom?.type === ROOM_TYPES.SUB && (
           <ContextSummaryCard content={contextMessage.content} />
         )}
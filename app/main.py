@@ -4,6 +4,7 @@ Main FastAPI Application
 
 # pyright: reportUntypedFunctionDecorator=false
 # pyright: reportUnknownMemberType=false
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -77,6 +78,9 @@ def limit_typed(
     )
 
 
+from app.services.audit_service import get_audit_service
+from app.services.provider_config_service import get_provider_config_service
+from app.api.dependencies import get_background_task_service
 from app.services.redis_pubsub import redis_pubsub_manager
 from app.core.startup_checks import run_startup_checks
 from app.core.telemetry import setup_telemetry
@@ -93,9 +97,13 @@ async def lifespan(app: FastAPI):
     # Configure OpenTelemetry on startup
     setup_telemetry()
     redis_pubsub_manager.start_listener()
+    # Load the provider config snapshot before requests arrive; later reloads run in the background.
+    await asyncio.to_thread(get_provider_config_service().refresh)
     yield
     logger.info("Shutting down application...")
     await redis_pubsub_manager.stop_listener()
+    await get_background_task_service().shutdown()
+    await asyncio.to_thread(get_audit_service().shutdown)
 
 
 import uuid
@@ -143,6 +151,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type", "X-Trace-ID", "Idempotency-Key"],
+    # Paged room history reports its cursor in headers the browser must be allowed to read.
+    expose_headers=["X-Has-More", "X-Next-Cursor"],
 )
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 app.state.limiter = limiter
@@ -41,6 +41,9 @@ class Room(Base):
     created_at = Column(BigInteger, nullable=False)
     updated_at = Column(BigInteger, nullable=False)
     message_count = Column(Integer, nullable=False, server_default='0')
+    # Archival ledger: when the oldest unarchived message leaves the memory window, and the watermark.
+    archive_due_at = Column(BigInteger, nullable=True)
+    archived_through = Column(BigInteger, nullable=False, server_default='0')
 
     # Relationships from existing models
     parent = relationship('Room', remote_side=[room_id], back_populates='children')
@@ -173,6 +176,45 @@ class KpiSnapshot(Base):
     details = Column(JSONB, nullable=True)
 
 
+class KpiRollup(Base):
+    __tablename__ = 'kpi_rollups'
+    granularity = Column(String(8), primary_key=True)
+    bucket_start = Column(BigInteger, primary_key=True)
+    active_users = Column(Integer, nullable=False, server_default='0')
+    reviews_count = Column(Integer, nullable=False, server_default='0')
+    reviews_failed = Column(Integer, nullable=False, server_default='0')
+    review_duration_sum = Column(Float, nullable=False, server_default='0')
+    review_tokens_sum = Column(BigInteger, nullable=False, server_default='0')
+    review_cost_sum = Column(Float, nullable=False, server_default='0')
+    tokens_prompt = Column(BigInteger, nullable=False, server_default='0')
+    tokens_completion = Column(BigInteger, nullable=False, server_default='0')
+    tokens_total = Column(BigInteger, nullable=False, server_default='0')
+    cost_usd = Column(Float, nullable=False, server_default='0')
+    latency_histogram = Column(ARRAY(BigInteger), nullable=True)
+    review_tokens_histogram = Column(ARRAY(BigInteger), nullable=True)
+    updated_at = Column(BigInteger, nullable=False)
+
+
+class KpiRollupActiveUser(Base):
+    __tablename__ = 'kpi_rollup_active_users'
+    granularity = Column(String(8), primary_key=True)
+    bucket_start = Column(BigInteger, primary_key=True)
+    user_id = Column(String(255), primary_key=True)
+
+
+class PersonaState(Base):
+    __tablename__ = 'persona_states'
+    user_id = Column(String(255), primary_key=True)
+    persona = Column(JSONB, nullable=False, server_default='{}')
+    last_message_ts = Column(BigInteger, nullable=False, server_default='0')
+    last_message_id = Column(String(255), nullable=False, server_default='')
+    messages_processed = Column(BigInteger, nullable=False, server_default='0')
+    tokens_used = Column(BigInteger, nullable=False, server_default='0')
+    last_run_rows_scanned = Column(Integer, nullable=False, server_default='0')
+    last_run_tokens = Column(Integer, nullable=False, server_default='0')
+    updated_at = Column(BigInteger, nullable=False)
+
+
 class ProviderConfig(Base):
     __tablename__ = 'provider_configs'
     provider_name = Column(String(100), primary_key=True)
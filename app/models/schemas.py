@@ -38,6 +38,7 @@ class CreateRoomRequest(BaseModel):
     name: str
     type: Literal["main", "sub", "review"] = "sub"
     parent_id: Optional[str] = None
+    copy_from_room_id: Optional[str] = None  # Copy this room's messages into the new room
 
 
 class CreateReviewRequest(BaseModel):
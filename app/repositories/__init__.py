@@ -1,5 +1,17 @@
 """Repository layer for database access abstractions."""
 
+from .kpi_rollup_repository import KPIRollupRepository, get_kpi_rollup_repository
+from .persona_state_repository import PersonaStateRepository, get_persona_state_repository
+from .review_run_repository import ReviewRunRepository, get_review_run_repository
 from .room_repository import RoomRepository, get_room_repository
 
-__all__ = ["RoomRepository", "get_room_repository"]
+__all__ = [
+    "KPIRollupRepository",
+    "PersonaStateRepository",
+    "ReviewRunRepository",
+    "RoomRepository",
+    "get_kpi_rollup_repository",
+    "get_persona_state_repository",
+    "get_review_run_repository",
+    "get_room_repository",
+]
@@ -0,0 +1,237 @@
+"""Database repository helpers for incremental KPI rollups."""
+
+from __future__ import annotations
+
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from psycopg2.extensions import cursor as Cursor
+
+from app.services.database_service import DatabaseService
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITY_SECONDS: Dict[str, int] = {HOUR: 3600, DAY: 86400}
+
+# Upper bounds (inclusive) of the fixed histogram buckets. A trailing overflow
+# bucket catches everything above the last bound.
+LATENCY_BUCKETS_MS: Tuple[int, ...] = (
+    500, 1000, 2500, 5000, 10000, 20000, 30000, 45000,
+    60000, 90000, 120000, 180000, 300000, 600000,
+)
+TOKEN_BUCKETS: Tuple[int, ...] = (
+    500, 1000, 2000, 4000, 8000, 12000, 16000, 24000, 32000, 48000, 64000, 100000,
+)
+
+_MERGE_HISTOGRAM_SQL = (
+    "(SELECT array_agg(COALESCE(cur, 0) + COALESCE(inc, 0) ORDER BY ord) "
+    "FROM unnest(kpi_rollups.{column}, EXCLUDED.{column}) WITH ORDINALITY AS h(cur, inc, ord))"
+)
+
+_UPSERT_ROLLUP_SQL = f"""
+    INSERT INTO kpi_rollups (
+        granularity, bucket_start, active_users, reviews_count, reviews_failed, review_duration_sum,
+        review_tokens_sum, review_cost_sum, tokens_prompt, tokens_completion,
+        tokens_total, cost_usd, latency_histogram, review_tokens_histogram, updated_at
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (granularity, bucket_start) DO UPDATE SET
+        active_users = kpi_rollups.active_users + EXCLUDED.active_users,
+        reviews_count = kpi_rollups.reviews_count + EXCLUDED.reviews_count,
+        reviews_failed = kpi_rollups.reviews_failed + EXCLUDED.reviews_failed,
+        review_duration_sum = kpi_rollups.review_duration_sum + EXCLUDED.review_duration_sum,
+        review_tokens_sum = kpi_rollups.review_tokens_sum + EXCLUDED.review_tokens_sum,
+        review_cost_sum = kpi_rollups.review_cost_sum + EXCLUDED.review_cost_sum,
+        tokens_prompt = kpi_rollups.tokens_prompt + EXCLUDED.tokens_prompt,
+        tokens_completion = kpi_rollups.tokens_completion + EXCLUDED.tokens_completion,
+        tokens_total = kpi_rollups.tokens_total + EXCLUDED.tokens_total,
+        cost_usd = kpi_rollups.cost_usd + EXCLUDED.cost_usd,
+        latency_histogram = {_MERGE_HISTOGRAM_SQL.format(column="latency_histogram")},
+        review_tokens_histogram = {_MERGE_HISTOGRAM_SQL.format(column="review_tokens_histogram")},
+        updated_at = EXCLUDED.updated_at
+"""
+
+_ROLLUP_COLUMNS = (
+    "granularity, bucket_start, active_users, reviews_count, reviews_failed, review_duration_sum, "
+    "review_tokens_sum, review_cost_sum, tokens_prompt, tokens_completion, tokens_total, "
+    "cost_usd, latency_histogram, review_tokens_histogram"
+)
+
+
+def bucket_start(timestamp: int, granularity: str) -> int:
+    """Align a Unix timestamp to the start of its UTC hour/day bucket."""
+    width = GRANULARITY_SECONDS[granularity]
+    return int(timestamp) - (int(timestamp) % width)
+
+
+def histogram_index(value: float, bounds: Sequence[int]) -> int:
+    for index, upper in enumerate(bounds):
+        if value <= upper:
+            return index
+    return len(bounds)
+
+
+def one_hot_histogram(value: Optional[float], bounds: Sequence[int]) -> List[int]:
+    counts = [0] * (len(bounds) + 1)
+    if value is not None:
+        counts[histogram_index(value, bounds)] = 1
+    return counts
+
+
+def merge_histograms(histograms: Iterable[Optional[Sequence[int]]], bounds: Sequence[int]) -> List[int]:
+    merged = [0] * (len(bounds) + 1)
+    for histogram in histograms:
+        if not histogram:
+            continue
+        for index, count in enumerate(histogram[: len(merged)]):
+            merged[index] += int(count or 0)
+    return merged
+
+
+def estimate_percentile(histogram: Sequence[int], bounds: Sequence[int], quantile: float) -> float:
+    """Estimate a percentile by interpolating linearly inside the matching bucket."""
+    total = sum(histogram)
+    if total <= 0:
+        return 0.0
+    rank = quantile * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count <= 0:
+            continue
+        if seen + count >= rank:
+            lower = bounds[index - 1] if index > 0 else 0
+            upper = bounds[index] if index < len(bounds) else bounds[-1]
+            fraction = (rank - seen) / count
+            return float(lower + (upper - lower) * fraction)
+        seen += count
+    return float(bounds[-1])
+
+
+class KPIRollupRepository:
+    """Encapsulates incremental writes to and bucketed reads from the KPI rollup tables."""
+
+    def __init__(self, db_service: DatabaseService) -> None:
+        self._db = db_service
+
+    def _apply(
+        self,
+        cursor: Cursor,
+        *,
+        user_id: Optional[str],
+        timestamp: int,
+        reviews_count: int = 0,
+        reviews_failed: int = 0,
+        review_duration_seconds: float = 0.0,
+        review_tokens: int = 0,
+        review_cost_usd: float = 0.0,
+        tokens_prompt: int = 0,
+        tokens_completion: int = 0,
+        tokens_total: int = 0,
+        cost_usd: float = 0.0,
+        latency_ms: Optional[float] = None,
+    ) -> None:
+        now = int(time.time())
+        latency_histogram = one_hot_histogram(latency_ms, LATENCY_BUCKETS_MS)
+        tokens_histogram = one_hot_histogram(review_tokens if reviews_count else None, TOKEN_BUCKETS)
+        for granularity in (HOUR, DAY):
+            start = bucket_start(timestamp, granularity)
+            new_user = 0
+            if user_id:
+                cursor.execute(
+                    "INSERT INTO kpi_rollup_active_users (granularity, bucket_start, user_id) "
+                    "VALUES (%s, %s, %s) ON CONFLICT DO NOTHING",
+                    (granularity, start, user_id),
+                )
+                new_user = 1 if cursor.rowcount else 0
+            cursor.execute(
+                _UPSERT_ROLLUP_SQL,
+                (
+                    granularity, start, new_user, reviews_count, reviews_failed, review_duration_seconds,
+                    review_tokens, review_cost_usd, tokens_prompt, tokens_completion,
+                    tokens_total, cost_usd, latency_histogram, tokens_histogram, now,
+                ),
+            )
+
+    def _run(self, cursor: Optional[Cursor], **kwargs: Any) -> None:
+        if cursor is not None:
+            self._apply(cursor, **kwargs)
+            return
+        with self._db.transaction(query_type="kpi_rollup") as cur:
+            self._apply(cur, **kwargs)
+
+    def record_review(
+        self,
+        *,
+        user_id: Optional[str],
+        completed_at: int,
+        duration_seconds: float,
+        total_tokens: int,
+        cost_usd: float,
+        cursor: Optional[Cursor] = None,
+    ) -> None:
+        self._run(
+            cursor,
+            user_id=user_id,
+            timestamp=completed_at,
+            reviews_count=1,
+            review_duration_seconds=duration_seconds,
+            review_tokens=total_tokens,
+            review_cost_usd=cost_usd,
+            tokens_total=total_tokens,
+            cost_usd=cost_usd,
+            latency_ms=duration_seconds * 1000.0,
+        )
+
+    def record_review_failure(
+        self,
+        *,
+        user_id: Optional[str],
+        failed_at: int,
+        cursor: Optional[Cursor] = None,
+    ) -> None:
+        self._run(cursor, user_id=user_id, timestamp=failed_at, reviews_failed=1)
+
+    def record_token_usage(
+        self,
+        *,
+        user_id: Optional[str],
+        timestamp: int,
+        prompt_tokens: int,
+        completion_tokens: int,
+        total_tokens: int,
+        cost_usd: float,
+        cursor: Optional[Cursor] = None,
+    ) -> None:
+        self._run(
+            cursor,
+            user_id=user_id,
+            timestamp=timestamp,
+            tokens_prompt=prompt_tokens,
+            tokens_completion=completion_tokens,
+            tokens_total=total_tokens,
+            cost_usd=cost_usd,
+        )
+
+    def fetch_buckets(self, granularity: str, start_ts: int, end_ts: int) -> List[Dict[str, Any]]:
+        query = (
+            f"SELECT {_ROLLUP_COLUMNS} FROM kpi_rollups "
+            "WHERE granularity = %s AND bucket_start >= %s AND bucket_start <= %s "
+            "ORDER BY bucket_start ASC"
+        )
+        start = bucket_start(start_ts, granularity)
+        return self._db.execute_query(query, (granularity, start, end_ts))
+
+    def count_distinct_users(self, granularity: str, start_ts: int, end_ts: int) -> int:
+        query = (
+            "SELECT COUNT(DISTINCT user_id) AS users FROM kpi_rollup_active_users "
+            "WHERE granularity = %s AND bucket_start >= %s AND bucket_start <= %s"
+        )
+        start = bucket_start(start_ts, granularity)
+        rows = self._db.execute_query(query, (granularity, start, end_ts))
+        return int(rows[0]["users"]) if rows else 0
+
+
+def get_kpi_rollup_repository() -> KPIRollupRepository:
+    from app.services.database_service import get_database_service
+
+    return KPIRollupRepository(get_database_service())
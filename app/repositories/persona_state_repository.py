@@ -0,0 +1,84 @@
+"""Database repository helpers for incremental persona generation state."""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Dict, Optional
+
+from psycopg2.extensions import cursor as Cursor
+
+from app.services.database_service import DatabaseService
+
+_UPSERT_STATE_SQL = """
+    INSERT INTO persona_states (
+        user_id, persona, last_message_ts, last_message_id, messages_processed,
+        tokens_used, last_run_rows_scanned, last_run_tokens, updated_at
+    )
+    VALUES (%s, %s::jsonb, %s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (user_id) DO UPDATE SET
+        persona = EXCLUDED.persona,
+        last_message_ts = EXCLUDED.last_message_ts,
+        last_message_id = EXCLUDED.last_message_id,
+        messages_processed = persona_states.messages_processed + EXCLUDED.messages_processed,
+        tokens_used = persona_states.tokens_used + EXCLUDED.tokens_used,
+        last_run_rows_scanned = EXCLUDED.last_run_rows_scanned,
+        last_run_tokens = EXCLUDED.last_run_tokens,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+class PersonaStateRepository:
+    """Encapsulates reads and writes of the per-user persona watermark and running persona."""
+
+    def __init__(self, db_service: DatabaseService) -> None:
+        self._db = db_service
+
+    def get_state(self, user_id: str) -> Optional[Dict[str, Any]]:
+        query = (
+            "SELECT user_id, persona, last_message_ts, last_message_id, messages_processed, tokens_used "
+            "FROM persona_states WHERE user_id = %s"
+        )
+        rows = self._db.execute_query(query, (user_id,))
+        if not rows:
+            return None
+        state = dict(rows[0])
+        persona = state.get("persona")
+        if isinstance(persona, str):
+            state["persona"] = json.loads(persona) if persona else {}
+        state["persona"] = state.get("persona") or {}
+        return state
+
+    def save_state(
+        self,
+        user_id: str,
+        *,
+        persona: Dict[str, Any],
+        last_message_ts: int,
+        last_message_id: str,
+        messages_processed: int,
+        rows_scanned: int,
+        tokens_used: int,
+        cursor: Optional[Cursor] = None,
+    ) -> None:
+        params = (
+            user_id,
+            json.dumps(persona, ensure_ascii=False),
+            last_message_ts,
+            last_message_id,
+            messages_processed,
+            tokens_used,
+            rows_scanned,
+            tokens_used,
+            int(time.time()),
+        )
+        if cursor is not None:
+            cursor.execute(_UPSERT_STATE_SQL, params)
+            return
+        self._db.execute_update(_UPSERT_STATE_SQL, params)
+
+
+def get_persona_state_repository() -> PersonaStateRepository:
+    from app.services.database_service import get_database_service
+
+    return PersonaStateRepository(get_database_service())
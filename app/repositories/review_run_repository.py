@@ -0,0 +1,107 @@
+"""Database repository helpers for durable orchestrated review runs."""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.database_service import DatabaseService
+
+DONE = "done"
+FAILED = "failed"
+
+_UNFINISHED = f"step NOT IN ('{DONE}', '{FAILED}')"
+
+
+def _decode(row: Dict[str, Any]) -> Dict[str, Any]:
+    run = dict(row)
+    state = run.get("state")
+    if isinstance(state, str):
+        run["state"] = json.loads(state) if state else {}
+    return run
+
+
+class ReviewRunRepository:
+    """Reads and advances the next-step checkpoint and lease of orchestrated reviews."""
+
+    def __init__(self, db_service: DatabaseService) -> None:
+        self._db = db_service
+
+    def create(self, review_id: str, step: str, state: Dict[str, Any]) -> None:
+        """Record a new run; a redelivered start message leaves the existing run alone."""
+        now = int(time.time())
+        self._db.execute_update(
+            "INSERT INTO review_runs (review_id, step, state, created_at, updated_at) "
+            "VALUES (%s, %s, %s::jsonb, %s, %s) ON CONFLICT (review_id) DO NOTHING",
+            (review_id, step, json.dumps(state, ensure_ascii=False), now, now),
+        )
+
+    def claim(self, review_id: str, owner: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Take the lease on an unfinished run that is free, expired or already ours."""
+        now = int(time.time())
+        rows = self._db.execute_returning(
+            f"""
+            UPDATE review_runs SET owner = %s, lease_expires_at = %s, updated_at = %s
+            WHERE review_id = %s AND {_UNFINISHED}
+              AND (owner IS NULL OR owner = %s OR lease_expires_at < %s)
+            RETURNING review_id, step, state, attempts
+            """,
+            (owner, now + lease_seconds, now, review_id, owner, now),
+        )
+        return _decode(rows[0]) if rows else None
+
+    def claim_expired(self, owner: str, lease_seconds: int, limit: int) -> List[str]:
+        """Take over unfinished runs whose owner stopped renewing its lease."""
+        now = int(time.time())
+        rows = self._db.execute_returning(
+            f"""
+            UPDATE review_runs SET owner = %s, lease_expires_at = %s, updated_at = %s
+            WHERE review_id IN (
+                SELECT review_id FROM review_runs
+                WHERE {_UNFINISHED} AND lease_expires_at < %s
+                ORDER BY lease_expires_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING review_id
+            """,
+            (owner, now + lease_seconds, now, now, limit),
+        )
+        return [row["review_id"] for row in rows]
+
+    def renew(self, owner: str, review_ids: Sequence[str], lease_seconds: int) -> None:
+        if not review_ids:
+            return
+        self._db.execute_update(
+            "UPDATE review_runs SET lease_expires_at = %s WHERE owner = %s AND review_id = ANY(%s)",
+            (int(time.time()) + lease_seconds, owner, list(review_ids)),
+        )
+
+    def advance(self, review_id: str, owner: str, step: str, state: Dict[str, Any]) -> bool:
+        """Checkpoint the next step; False if another orchestrator has taken the run over."""
+        updated = self._db.execute_update(
+            "UPDATE review_runs SET step = %s, state = %s::jsonb, attempts = 0, updated_at = %s "
+            "WHERE review_id = %s AND owner = %s",
+            (step, json.dumps(state, ensure_ascii=False), int(time.time()), review_id, owner),
+        )
+        return updated > 0
+
+    def record_attempt(self, review_id: str, owner: str, attempts: int) -> None:
+        self._db.execute_update(
+            "UPDATE review_runs SET attempts = %s, updated_at = %s WHERE review_id = %s AND owner = %s",
+            (attempts, int(time.time()), review_id, owner),
+        )
+
+    def finish(self, review_id: str, owner: str, step: str = DONE) -> None:
+        self._db.execute_update(
+            "UPDATE review_runs SET step = %s, owner = NULL, lease_expires_at = 0, updated_at = %s "
+            "WHERE review_id = %s AND owner = %s",
+            (step, int(time.time()), review_id, owner),
+        )
+
+
+def get_review_run_repository() -> ReviewRunRepository:
+    from app.services.database_service import get_database_service
+
+    return ReviewRunRepository(get_database_service())
@@ -94,14 +94,48 @@ class RoomRepository:
         params = (new_name, int(time.time()), room_id)
         return self._db.execute_update(query, params) > 0
 
-    def increment_message_count(self, room_id: str, cursor: Optional[Cursor] = None) -> None:
-        query = "UPDATE rooms SET message_count = message_count + 1, updated_at = %s WHERE room_id = %s"
-        params = (int(time.time()), room_id)
+    def increment_message_count(
+        self,
+        room_id: str,
+        cursor: Optional[Cursor] = None,
+        archive_due_at: Optional[int] = None,
+    ) -> None:
+        """Count a new message; ``archive_due_at`` marks the room for archival if it is not already due earlier."""
+        query = (
+            "UPDATE rooms SET message_count = message_count + 1, updated_at = %s, "
+            "archive_due_at = COALESCE(archive_due_at, %s) WHERE room_id = %s"
+        )
+        params = (int(time.time()), archive_due_at, room_id)
         if cursor is not None:
             cursor.execute(query, params)
         else:
             self._db.execute_update(query, params)
 
+    def list_rooms_due_for_archival(
+        self, now: int, limit: int, after: Optional[tuple[int, str]] = None
+    ) -> List[tuple[int, str]]:
+        """(archive_due_at, room_id) of rooms due for archival, in keyset pages after ``after``."""
+        if after is None:
+            query = (
+                "SELECT archive_due_at, room_id FROM rooms WHERE archive_due_at <= %s "
+                "ORDER BY archive_due_at, room_id LIMIT %s"
+            )
+            params: tuple = (now, limit)
+        else:
+            query = (
+                "SELECT archive_due_at, room_id FROM rooms WHERE archive_due_at <= %s "
+                "AND (archive_due_at, room_id) > (%s, %s) ORDER BY archive_due_at, room_id LIMIT %s"
+            )
+            params = (now, after[0], after[1], limit)
+        rows = self._db.execute_query(query, params)
+        return [(row["archive_due_at"], row["room_id"]) for row in rows]
+
+    def list_rooms_updated_since(self, since: int, limit: int, after: Optional[str] = None) -> List[str]:
+        """Ids of rooms updated (e.g. sent a message) at or after ``since``, in keyset pages after ``after``."""
+        query = "SELECT room_id FROM rooms WHERE updated_at >= %s AND room_id > %s ORDER BY room_id LIMIT %s"
+        rows = self._db.execute_query(query, (since, after or "", limit))
+        return [row["room_id"] for row in rows]
+
 
 def get_room_repository() -> RoomRepository:
     from app.services.database_service import get_database_service
@@ -1,19 +1,32 @@
 """
 Service for administrative-level operations and data retrieval.
 """
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 import json
+import time
 from datetime import datetime, timedelta
 
+from app.config.settings import settings
+from app.repositories.kpi_rollup_repository import DAY, HOUR, bucket_start
 from app.services.database_service import DatabaseService, get_database_service
+from app.services.kpi_service import KPIService, get_kpi_service
+from app.services.provider_config_service import ProviderConfigService, get_provider_config_service
 from app.models.schemas import ApiPanelistConfig as PanelistConfig # Assuming this is the right schema
 
 logger = logging.getLogger(__name__)
 
 class AdminService:
-    def __init__(self, db_service: DatabaseService):
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        kpi_service: Optional[KPIService] = None,
+        provider_configs: Optional[ProviderConfigService] = None,
+    ):
         self.db = db_service
+        self.kpi_service = kpi_service or KPIService(db_service)
+        self.provider_configs = provider_configs or get_provider_config_service()
 
     # Provider Config Methods
     async def get_provider_configs(self) -> List[Dict[str, Any]]:
@@ -28,6 +41,9 @@ class AdminService:
         """
         params = (config['model'], config['timeout_ms'], config['retries'], config['enabled'], provider_name)
         self.db.execute_update(query, params)
+        # Tell every API pod and worker to drop its cached provider snapshot.
+        version = await asyncio.to_thread(self.provider_configs.publish_update)
+        logger.info(f"Provider '{provider_name}' updated; config snapshot version is now {version}.")
 
     # System Settings Methods
     async def get_system_settings(self) -> Dict[str, Any]:
@@ -48,26 +64,38 @@ class AdminService:
 
     # Dashboard Methods
     async def get_dashboard_kpis(self) -> Dict[str, Any]:
-        # Placeholder for complex KPI query logic
+        """Today's KPIs, read from the precomputed rollups behind a short cache."""
+        now = int(time.time())
+        today_start = bucket_start(now, DAY)
+        today = await self.kpi_service.get_cached_summary(DAY, today_start, today_start)
+        last_hour = await self.kpi_service.get_cached_summary(HOUR, now - 3600, now)
+        budget = float(settings.DAILY_COST_BUDGET or 0.0)
         return {
-           "date": datetime.utcnow().strftime("%Y-%m-%d"),
-           "reviews_today": 0,
-           "success_rate": 1.0,
-           "latency_p95_ms": 0,
-           "tokens_prompt_today": 0,
-           "tokens_completion_today": 0,
-           "tokens_total_today": 0,
-           "cost_estimate_usd_today": 0.0,
-           "budget_today_usd": 0.0,
-           "budget_used_ratio": 0.0,
+           "date": datetime.utcfromtimestamp(today_start).strftime("%Y-%m-%d"),
+           "reviews_today": today["reviews_count"],
+           "active_users_today": today["active_users"] or 0,
+           "success_rate": today.get("review_success_rate", 1.0),
+           "latency_p50_ms": today["review_latency_p50_ms"],
+           "latency_p95_ms": today["review_latency_p95_ms"],
+           "latency_p95_ms_last_hour": last_hour["review_latency_p95_ms"],
+           "tokens_prompt_today": today["tokens_prompt"],
+           "tokens_completion_today": today["tokens_completion"],
+           "tokens_total_today": today["tokens_total"],
+           "cost_estimate_usd_today": round(today["cost_usd"], 4),
+           "budget_today_usd": budget,
+           "budget_used_ratio": (today["cost_usd"] / budget) if budget else 0.0,
            "provider_alerts": []
         }
 
+    async def get_kpi_rollups(self, granularity: str, hours: int) -> List[Dict[str, Any]]:
+        now = int(time.time())
+        return self.kpi_service.get_rollup_series(granularity, now - hours * 3600, now)
+
 # Singleton
 _admin_service_instance: Optional[AdminService] = None
 
 def get_admin_service() -> AdminService:
     global _admin_service_instance
     if _admin_service_instance is None:
-        _admin_service_instance = AdminService(db_service=get_database_service())
+        _admin_service_instance = AdminService(db_service=get_database_service(), kpi_service=get_kpi_service())
     return _admin_service_instance
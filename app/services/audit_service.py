@@ -1,20 +1,197 @@
 """
 Service for logging administrator actions.
 """
+import atexit
 import logging
 import json
+import os
+import threading
 import time
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Deque, Dict, Any, List, Optional, Tuple
 
+from app.config.settings import settings
+from app.core.metrics import (
+    AUDIT_DROPPED_TOTAL,
+    AUDIT_FLUSH_LAG_SECONDS,
+    AUDIT_QUEUE_DEPTH,
+    AUDIT_SPILLED_TOTAL,
+)
 from app.services.database_service import DatabaseService, get_database_service
 
 logger = logging.getLogger(__name__)
 
+# (timestamp, admin_user_id, action, details_json) - the audit_logs column order.
+AuditRow = Tuple[int, str, str, str]
+
+
+class AuditLogWriter:
+    """
+    Buffers audit rows in memory and writes them to ``audit_logs`` in multi-row
+    batches from a background thread.
+
+    A batch is flushed once ``batch_size`` rows are pending or every
+    ``flush_interval`` seconds. When the database rejects a batch, or the
+    in-memory queue is full, rows are appended to a local JSONL spill file that
+    is replayed on a later successful flush, so entries are not lost while the
+    database is slow or unavailable.
+    """
+
+    def __init__(
+        self,
+        db_service: DatabaseService,
+        *,
+        batch_size: int,
+        flush_interval: float,
+        max_queue_size: int,
+        spill_path: str,
+    ) -> None:
+        self.db = db_service
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._max_queue_size = max(self._batch_size, max_queue_size)
+        self._spill_path = spill_path
+        self._pending: Deque[Tuple[float, AuditRow]] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, row: AuditRow) -> None:
+        with self._lock:
+            overflow = len(self._pending) >= self._max_queue_size
+            if not overflow:
+                self._pending.append((time.monotonic(), row))
+            depth = len(self._pending)
+        AUDIT_QUEUE_DEPTH.set(depth)
+
+        if overflow:
+            # The database is not keeping up; go straight to the durable spill file.
+            self._spill([row])
+            return
+        self._ensure_started()
+        if depth >= self._batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write everything currently pending, then replay the spill file. Returns rows written."""
+        with self._flush_lock:
+            written = 0
+            while True:
+                with self._lock:
+                    take = min(self._batch_size, len(self._pending))
+                    batch = [self._pending.popleft() for _ in range(take)]
+                    depth = len(self._pending)
+                AUDIT_QUEUE_DEPTH.set(depth)
+                if not batch:
+                    break
+                rows = [row for _, row in batch]
+                try:
+                    self._insert(rows)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(rows)} audit log rows, spilling to disk: {e}")
+                    with self._lock:
+                        rows.extend(row for _, row in self._pending)
+                        self._pending.clear()
+                    AUDIT_QUEUE_DEPTH.set(0)
+                    self._spill(rows)
+                    return written
+                flushed_at = time.monotonic()
+                for enqueued_at, _ in batch:
+                    AUDIT_FLUSH_LAG_SECONDS.observe(flushed_at - enqueued_at)
+                written += len(rows)
+            return written + self._replay_spill()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the background thread and flush whatever is still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        self.flush()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None or self._stopped.is_set():
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:  # pragma: no cover - the writer thread must never die
+                logger.error(f"Audit log writer flush failed: {e}", exc_info=True)
+
+    def _insert(self, rows: List[AuditRow]) -> None:
+        values_sql = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+        query = f"INSERT INTO audit_logs (timestamp, admin_user_id, action, details) VALUES {values_sql}"
+        params: List[Any] = []
+        for row in rows:
+            params.extend(row)
+        self.db.execute_update(query, tuple(params))
+
+    def _spill(self, rows: List[AuditRow]) -> None:
+        try:
+            with self._spill_lock, open(self._spill_path, "a", encoding="utf-8") as spill:
+                for row in rows:
+                    spill.write(json.dumps(list(row), ensure_ascii=False) + "\n")
+                spill.flush()
+                os.fsync(spill.fileno())
+            AUDIT_SPILLED_TOTAL.inc(len(rows))
+        except OSError as e:
+            AUDIT_DROPPED_TOTAL.inc(len(rows))
+            logger.critical(f"Dropped {len(rows)} audit log rows; spill file unavailable: {e}")
+
+    def _replay_spill(self) -> int:
+        if not os.path.exists(self._spill_path):
+            return 0
+        # Claim the file with an atomic rename so only one process replays it.
+        claimed = f"{self._spill_path}.{os.getpid()}.replay"
+        try:
+            with self._spill_lock:
+                os.replace(self._spill_path, claimed)
+        except FileNotFoundError:
+            return 0
+
+        with open(claimed, encoding="utf-8") as spill:
+            rows = [tuple(json.loads(line)) for line in spill if line.strip()]
+        written = 0
+        try:
+            for start in range(0, len(rows), self._batch_size):
+                chunk = rows[start:start + self._batch_size]
+                self._insert(chunk)  # type: ignore[arg-type]
+                written += len(chunk)
+        except Exception as e:
+            logger.warning(f"Audit spill replay deferred, database still unavailable: {e}")
+            self._spill(rows[written:])  # type: ignore[arg-type]
+        os.remove(claimed)
+        if written:
+            logger.info(f"Replayed {written} spilled audit log rows.")
+        return written
+
+
 class AuditService:
     """Service to handle writing audit trail events."""
 
-    def __init__(self, db_service: DatabaseService):
+    def __init__(self, db_service: DatabaseService, writer: Optional[AuditLogWriter] = None):
         self.db = db_service
+        self.writer = writer or AuditLogWriter(
+            db_service,
+            batch_size=settings.AUDIT_BATCH_SIZE,
+            flush_interval=settings.AUDIT_FLUSH_INTERVAL_SECONDS,
+            max_queue_size=settings.AUDIT_MAX_QUEUE_SIZE,
+            spill_path=settings.AUDIT_SPILL_PATH,
+        )
 
     async def log_action(
         self,
@@ -22,25 +199,13 @@ class AuditService:
         action: str,
         details: Dict[str, Any]
     ):
-        """Logs an administrative action to the audit_logs table."""
-        query = """
-            INSERT INTO audit_logs (timestamp, admin_user_id, action, details)
-            VALUES (%s, %s, %s, %s)
-        """
-        params = (
-            int(time.time()),
-            admin_user_id,
-            action,
-            json.dumps(details)
-        )
-        try:
-            self.db.execute_update(query, params)
-            logger.info(f"Audit log: User '{admin_user_id}' performed action '{action}'.")
-        except Exception as e:
-            logger.error(f"Failed to write to audit log: {e}")
-            # In a real system, this failure might trigger a critical alert,
-            # as failing to audit is a serious security event.
-            pass
+        """Queues an administrative action for the batched audit_logs writer."""
+        self.writer.enqueue((int(time.time()), admin_user_id, action, json.dumps(details)))
+        logger.info(f"Audit log: User '{admin_user_id}' performed action '{action}'.")
+
+    def shutdown(self) -> None:
+        """Flush pending audit rows; called from the application shutdown hook."""
+        self.writer.close()
 
 # Singleton instance (though it might be better to inject this via dependencies)
 _audit_service_instance: Optional[AuditService] = None
@@ -50,3 +215,9 @@ def get_audit_service() -> AuditService:
     if _audit_service_instance is None:
         _audit_service_instance = AuditService(db_service=get_database_service())
     return _audit_service_instance
+
+
+def shutdown_audit_service() -> None:
+    """Flush the singleton's pending audit rows if it was ever created."""
+    if _audit_service_instance is not None:
+        _audit_service_instance.shutdown()
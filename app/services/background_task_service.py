@@ -1,16 +1,36 @@
 """
 Background Task Service
 백그라운드 작업의 안정성과 재시도 로직을 관리
+
+작업은 종류(kind)별 동시 실행 한도 안에서 실행되고, 같은 ``dedupe_key``로
+대기 중인 작업이 있으면 새로 만들지 않는다 (예: 같은 방의 컨텍스트 갱신 반복).
+완료된 결과는 ``result_ttl_seconds`` 동안만 보관되며, 종료 시 ``shutdown``이
+진행 중인 작업을 기다렸다가 남은 작업을 취소한다.
 """
 import logging
 import asyncio
+import time
+from collections import OrderedDict
 from typing import Callable, Any, Dict, Optional
 from dataclasses import dataclass
 from enum import Enum
 import traceback
 
+from app.config.settings import settings
+from app.core.metrics import (
+    BACKGROUND_TASK_DURATION_SECONDS,
+    BACKGROUND_TASK_QUEUE_WAIT_SECONDS,
+    BACKGROUND_TASKS_DEDUPED_TOTAL,
+    BACKGROUND_TASKS_QUEUED,
+    BACKGROUND_TASKS_REJECTED_TOTAL,
+    BACKGROUND_TASKS_RUNNING,
+)
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_TASK_KIND = "default"
+
+
 class TaskStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -19,6 +39,7 @@ class TaskStatus(Enum):
     RETRYING = "retrying"
     MAX_RETRIES_EXCEEDED = "max_retries_exceeded"
 
+
 @dataclass
 class TaskResult:
     status: TaskStatus
@@ -26,19 +47,72 @@ class TaskResult:
     error: Optional[Exception] = None
     retry_count: int = 0
     execution_time: float = 0.0
+    finished_at: Optional[float] = None  # time.time() when the task reached a final status
+
+
+class BackgroundTaskRejected(RuntimeError):
+    """대기열이 가득 찼거나 종료 중이라 작업을 받을 수 없을 때 발생"""
+
 
 class BackgroundTaskService:
     """백그라운드 작업 관리 서비스"""
-    
-    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        *,
+        concurrency: Optional[Dict[str, int]] = None,
+        default_concurrency: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        result_ttl_seconds: Optional[float] = None,
+        max_results: Optional[int] = None,
+    ):
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.max_delay = max_delay
+        self.concurrency = dict(settings.BACKGROUND_TASK_CONCURRENCY if concurrency is None else concurrency)
+        self.default_concurrency = max(
+            default_concurrency if default_concurrency is not None else settings.BACKGROUND_TASK_DEFAULT_CONCURRENCY,
+            1,
+        )
+        self.max_pending = max_pending if max_pending is not None else settings.BACKGROUND_TASK_MAX_PENDING
+        self.result_ttl_seconds = (
+            result_ttl_seconds if result_ttl_seconds is not None else settings.BACKGROUND_TASK_RESULT_TTL_SECONDS
+        )
+        self.max_results = max_results if max_results is not None else settings.BACKGROUND_TASK_MAX_RESULTS
         self.running_tasks: Dict[str, asyncio.Task] = {}
-        self.task_results: Dict[str, TaskResult] = {}
+        # Ordered by last update, so expired results are always at the front.
+        self.task_results: "OrderedDict[str, TaskResult]" = OrderedDict()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending: Dict[str, asyncio.Task] = {}  # dedupe_key -> task still waiting for a slot
+        self._closing = False
+
+    def _set_result(self, task_id: str, result: TaskResult) -> TaskResult:
+        self.task_results[task_id] = result
+        self.task_results.move_to_end(task_id)
+        self._evict_results()
+        return result
+
+    def _evict_results(self) -> None:
+        cutoff = time.time() - self.result_ttl_seconds
+        while self.task_results:
+            oldest = next(iter(self.task_results.values()))
+            expired = oldest.finished_at is not None and oldest.finished_at < cutoff
+            if not expired and len(self.task_results) <= self.max_results:
+                break
+            self.task_results.popitem(last=False)
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(kind)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(self.concurrency.get(kind, self.default_concurrency), 1))
+            self._semaphores[kind] = semaphore
+        return semaphore
 
     async def execute_with_retry(
-        self, 
+        self,
         task_id: str,
         coro_func: Callable,
         *args,
@@ -46,51 +120,45 @@ class BackgroundTaskService:
     ) -> TaskResult:
         """
         재시도 로직이 포함된 백그라운드 작업 실행
-        
+
         Args:
             task_id: 작업 고유 ID
             coro_func: 실행할 코루틴 함수
             *args, **kwargs: 함수에 전달할 인자들
         """
-        import time
         start_time = time.time()
-        
+
         for attempt in range(self.max_retries + 1):
             try:
                 logger.info(f"Executing background task {task_id}, attempt {attempt + 1}/{self.max_retries + 1}")
-                
+
                 # 작업 상태 업데이트
-                if attempt > 0:
-                    self.task_results[task_id] = TaskResult(
-                        status=TaskStatus.RETRYING,
-                        retry_count=attempt
-                    )
-                else:
-                    self.task_results[task_id] = TaskResult(
-                        status=TaskStatus.RUNNING,
-                        retry_count=attempt
-                    )
-                
+                self._set_result(task_id, TaskResult(
+                    status=TaskStatus.RETRYING if attempt > 0 else TaskStatus.RUNNING,
+                    retry_count=attempt
+                ))
+
                 # 작업 실행
                 result = await coro_func(*args, **kwargs)
-                
+
                 # 성공
                 execution_time = time.time() - start_time
-                self.task_results[task_id] = TaskResult(
+                self._set_result(task_id, TaskResult(
                     status=TaskStatus.SUCCESS,
                     result=result,
                     retry_count=attempt,
-                    execution_time=execution_time
-                )
-                
+                    execution_time=execution_time,
+                    finished_at=time.time()
+                ))
+
                 logger.info(f"Background task {task_id} completed successfully in {execution_time:.2f}s")
                 return self.task_results[task_id]
-                
+
             except Exception as e:
                 execution_time = time.time() - start_time
                 error_msg = f"Background task {task_id} failed on attempt {attempt + 1}: {str(e)}"
                 logger.error(error_msg, exc_info=True)
-                
+
                 # 마지막 시도가 아니면 재시도
                 if attempt < self.max_retries:
                     delay = min(self.base_delay * (2 ** attempt), self.max_delay)
@@ -99,16 +167,17 @@ class BackgroundTaskService:
                     continue
                 else:
                     # 최대 재시도 횟수 초과
-                    self.task_results[task_id] = TaskResult(
+                    self._set_result(task_id, TaskResult(
                         status=TaskStatus.MAX_RETRIES_EXCEEDED,
                         error=e,
                         retry_count=attempt,
-                        execution_time=execution_time
-                    )
-                    
+                        execution_time=execution_time,
+                        finished_at=time.time()
+                    ))
+
                     # 에러 로깅 (Sentry 등에 전송 가능)
                     await self._log_error(task_id, e, execution_time)
-                    
+
                     logger.error(f"Background task {task_id} failed after {self.max_retries + 1} attempts")
                     return self.task_results[task_id]
 
@@ -121,35 +190,84 @@ class BackgroundTaskService:
             "execution_time": execution_time,
             "traceback": traceback.format_exc()
         }
-        
+
         # 현재는 로그로만 출력, 나중에 Sentry 등으로 확장 가능
         logger.error(f"Background task error details: {error_details}")
-        
+
         # TODO: Sentry나 다른 에러 추적 서비스로 전송
         # await self._send_to_sentry(error_details)
 
     def create_background_task(
-        self, 
+        self,
         task_id: str,
         coro_func: Callable,
         *args,
+        kind: str = DEFAULT_TASK_KIND,
+        dedupe_key: Optional[str] = None,
         **kwargs
     ) -> asyncio.Task:
         """
         백그라운드 작업을 생성하고 실행
-        
+
+        작업은 ``kind``별 동시 실행 한도에 따라 대기한다. 같은 ``dedupe_key``의
+        작업이 아직 시작 전이면 그 작업을 그대로 반환한다.
+
         Returns:
             asyncio.Task: 생성된 작업 객체
+
+        Raises:
+            BackgroundTaskRejected: 종료 중이거나 대기 작업 수가 한도에 도달한 경우
         """
+        if dedupe_key is not None and dedupe_key in self._pending:
+            BACKGROUND_TASKS_DEDUPED_TOTAL.labels(kind=kind).inc()
+            logger.debug(f"Background task {task_id} deduplicated onto pending {dedupe_key}")
+            return self._pending[dedupe_key]
+        if self._closing:
+            BACKGROUND_TASKS_REJECTED_TOTAL.labels(kind=kind, reason="shutdown").inc()
+            raise BackgroundTaskRejected("Background task service is shutting down")
+        if self.max_pending and len(self.running_tasks) >= self.max_pending:
+            BACKGROUND_TASKS_REJECTED_TOTAL.labels(kind=kind, reason="queue_full").inc()
+            raise BackgroundTaskRejected(f"{len(self.running_tasks)} background tasks already pending")
+
+        semaphore = self._semaphore(kind)
+        queued_at = time.monotonic()
+
         async def wrapper():
-            return await self.execute_with_retry(task_id, coro_func, *args, **kwargs)
-        
+            BACKGROUND_TASKS_QUEUED.labels(kind=kind).inc()
+            try:
+                await semaphore.acquire()
+            finally:
+                BACKGROUND_TASKS_QUEUED.labels(kind=kind).dec()
+                if dedupe_key is not None and self._pending.get(dedupe_key) is task:
+                    del self._pending[dedupe_key]
+            started = time.monotonic()
+            BACKGROUND_TASK_QUEUE_WAIT_SECONDS.labels(kind=kind).observe(started - queued_at)
+            BACKGROUND_TASKS_RUNNING.labels(kind=kind).inc()
+            status = "cancelled"
+            try:
+                result = await self.execute_with_retry(task_id, coro_func, *args, **kwargs)
+                status = result.status.value
+                return result
+            finally:
+                semaphore.release()
+                BACKGROUND_TASKS_RUNNING.labels(kind=kind).dec()
+                BACKGROUND_TASK_DURATION_SECONDS.labels(kind=kind, status=status).observe(time.monotonic() - started)
+
+        self._set_result(task_id, TaskResult(status=TaskStatus.PENDING))
         task = asyncio.create_task(wrapper())
         self.running_tasks[task_id] = task
-        
-        # 작업 완료 시 정리
-        task.add_done_callback(lambda t: self.running_tasks.pop(task_id, None))
-        
+        if dedupe_key is not None:
+            self._pending[dedupe_key] = task
+
+        # 작업 완료 시 정리 (같은 ID로 나중에 만든 작업은 남겨 둔다)
+        def cleanup(done: asyncio.Task) -> None:
+            if self.running_tasks.get(task_id) is done:
+                del self.running_tasks[task_id]
+            if dedupe_key is not None and self._pending.get(dedupe_key) is done:
+                del self._pending[dedupe_key]
+
+        task.add_done_callback(cleanup)
+
         logger.info(f"Created background task {task_id}")
         return task
 
@@ -165,9 +283,9 @@ class BackgroundTaskService:
         """작업 완료 대기"""
         if task_id not in self.running_tasks:
             return self.task_results.get(task_id, TaskResult(TaskStatus.FAILED))
-        
+
         try:
-            await asyncio.wait_for(self.running_tasks[task_id], timeout=timeout)
+            await asyncio.wait_for(asyncio.shield(self.running_tasks[task_id]), timeout=timeout)
             return self.task_results.get(task_id, TaskResult(TaskStatus.FAILED))
         except asyncio.TimeoutError:
             logger.warning(f"Task {task_id} timed out after {timeout}s")
@@ -183,18 +301,29 @@ class BackgroundTaskService:
 
     async def cleanup_completed_tasks(self, max_age_hours: int = 24):
         """완료된 작업 결과 정리"""
-        import time
-        current_time = time.time()
-        max_age_seconds = max_age_hours * 3600
-        
-        to_remove = []
-        for task_id, result in self.task_results.items():
-            if (result.status in [TaskStatus.SUCCESS, TaskStatus.MAX_RETRIES_EXCEEDED] and 
-                current_time - result.execution_time > max_age_seconds):
-                to_remove.append(task_id)
-        
+        cutoff = time.time() - max_age_hours * 3600
+
+        to_remove = [
+            task_id for task_id, result in self.task_results.items()
+            if result.finished_at is not None and result.finished_at < cutoff
+        ]
         for task_id in to_remove:
             self.task_results.pop(task_id, None)
-        
+
         if to_remove:
             logger.info(f"Cleaned up {len(to_remove)} completed task results")
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """새 작업을 거부하고, 대기·실행 중인 작업을 ``timeout``초까지 기다린 뒤 남은 작업은 취소"""
+        self._closing = True
+        tasks = list(self.running_tasks.values())
+        if not tasks:
+            return
+        timeout = settings.BACKGROUND_TASK_DRAIN_TIMEOUT_SECONDS if timeout is None else timeout
+        logger.info(f"Draining {len(tasks)} background tasks (timeout {timeout}s)")
+        _, still_running = await asyncio.wait(tasks, timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        if still_running:
+            logger.warning(f"Cancelled {len(still_running)} background tasks still running at shutdown")
+            await asyncio.gather(*still_running, return_exceptions=True)
@@ -1,20 +1,49 @@
+"""
+Two-tier cache: a bounded per-process LRU in front of Redis.
+
+* Values are stored as msgpack envelopes ``[value, compute_seconds, expires_at]``.
+* :meth:`CacheService.get_or_set` coalesces concurrent misses for a key into a
+  single loader call (singleflight) and refreshes hot keys probabilistically
+  shortly before they expire ("XFetch"), so an expiring key does not send every
+  request to the database at once.
+* Writes and deletes are broadcast on ``CACHE_INVALIDATION_CHANNEL`` so other
+  processes drop their local copy; the short local TTL bounds staleness if a
+  message is missed.
+"""
+import asyncio
 import json
 import logging
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from dataclasses import asdict, is_dataclass
-from typing import Optional, Any
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import msgpack
 import redis.asyncio as redis
 from redis.exceptions import RedisError
 
 from app.config.settings import get_effective_redis_url, settings
+from app.core.metrics import CACHE_OPERATION_SECONDS, CACHE_REQUESTS_TOTAL
 
 logger = logging.getLogger(__name__)
 
+CACHE_INVALIDATION_CHANNEL = "cache_invalidation"
+
+# A packed 3-element envelope always starts with this msgpack fixarray byte, which
+# can never begin a JSON document written by the previous JSON-only cache.
+_ENVELOPE_MARKER = b"\x93"
+
 
 def _normalize_for_json(value: Any) -> Any:
     """Normalize complex values into JSON-serialisable structures."""
     if hasattr(value, "model_dump"):
         try:
-            return value.model_dump()
+            return value.model_dump(mode="json")
         except TypeError:
             # model_dump may expect keyword arguments in older Pydantic versions
             return value.model_dump(exclude_none=False)
@@ -26,95 +55,304 @@ def _normalize_for_json(value: Any) -> Any:
         return [_normalize_for_json(item) for item in value]
     return value
 
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    normalized = _normalize_for_json(value)
+    if normalized is value:
+        raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+    return normalized
+
+
+def _pack(value: Any, compute_seconds: float, expires_at: float) -> bytes:
+    return msgpack.packb([value, compute_seconds, expires_at], default=_msgpack_default, use_bin_type=True)
+
+
+def _unpack(data: bytes) -> Tuple[Any, float, float]:
+    """Decode an envelope; legacy JSON values are treated as fresh with unknown cost."""
+    if data[:1] == _ENVELOPE_MARKER:
+        value, compute_seconds, expires_at = msgpack.unpackb(data, raw=False)
+        return value, compute_seconds, expires_at
+    return json.loads(data), 0.0, math.inf
+
+
+def _prefix(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+class LocalCache:
+    """Thread-safe bounded LRU of packed envelopes with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes, ttl: float) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + min(ttl, self._ttl), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
 class CacheService:
-    def __init__(self, redis_client: Optional[redis.Redis]):
+    def __init__(self, redis_client: Optional[redis.Redis], local_cache: Optional[LocalCache] = None):
         self.redis = redis_client
+        self.local = local_cache or get_local_cache()
         self.default_ttl = 300  # 5 minutes
+        self._inflight: Dict[Tuple[int, str], asyncio.Future] = {}
 
     async def get(self, key: str) -> Optional[Any]:
         """Get data from cache."""
-        if not self.redis:
-            logger.info(f"Cache MISS for key: {key} (Redis not available)")
-            return None
+        started = time.perf_counter()
         try:
-            data = await self.redis.get(key)
-            if data:
-                logger.info(f"Cache HIT for key: {key}")
-                return json.loads(data)
-            logger.info(f"Cache MISS for key: {key}")
-            return None
-        except Exception as e:
-            logger.error(f"Cache get failed for key {key}: {e}", exc_info=True)
-            return None
+            entry = await self._lookup(key)
+            return entry[0] if entry else None
+        finally:
+            CACHE_OPERATION_SECONDS.labels(prefix=_prefix(key), operation="get").observe(time.perf_counter() - started)
 
-    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+    ) -> Any:
+        """
+        Return the cached value for ``key`` or compute it with ``loader``.
+
+        Concurrent misses in this process share one ``loader`` call, and a value
+        close to expiry is recomputed early by a single caller chosen at random,
+        weighted by how long the value took to compute. ``None`` is not cached.
+        """
+        started = time.perf_counter()
+        try:
+            entry = await self._lookup(key)
+            if entry is not None:
+                value, compute_seconds, expires_at = entry
+                if not self._should_refresh_early(compute_seconds, expires_at):
+                    return value
+            return await self._load_once(key, loader, ttl)
+        finally:
+            CACHE_OPERATION_SECONDS.labels(prefix=_prefix(key), operation="get_or_set").observe(
+                time.perf_counter() - started
+            )
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None, compute_seconds: float = 0.0) -> bool:
         """Set data in cache with a TTL."""
+        ttl = ttl or self.default_ttl
+        try:
+            data = _pack(_normalize_for_json(value), compute_seconds, time.time() + ttl)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cache set failed for key {key}: {e}")
+            return False
+
+        self.local.set(key, data, ttl)
         if not self.redis:
-            logger.info(f"Cache SET skipped for key: {key} (Redis not available)")
             return False
         try:
-            ttl = ttl or self.default_ttl
-            if hasattr(value, "model_dump_json"):
-                value_to_cache = value.model_dump_json()
-            else:
-                normalized = _normalize_for_json(value)
-                value_to_cache = json.dumps(normalized)
-
-            await self.redis.setex(key, ttl, value_to_cache)
-            logger.info(f"Cache SET for key: {key} with TTL: {ttl}")
+            await self.redis.setex(key, ttl, data)
+            await self._publish_invalidation(key)
+            logger.debug(f"Cache SET for key: {key} with TTL: {ttl}")
             return True
         except Exception as e:
             logger.error(f"Cache set failed for key {key}: {e}", exc_info=True)
             return False
 
     async def delete(self, key: str) -> bool:
-        """Delete data from cache."""
+        """Delete data from both tiers and tell other processes to drop it."""
+        self.local.delete(key)
         if not self.redis:
-            logger.info(f"Cache DELETE skipped for key: {key} (Redis not available)")
             return False
         try:
             await self.redis.delete(key)
-            logger.info(f"Cache DELETE for key: {key}")
+            await self._publish_invalidation(key)
+            logger.debug(f"Cache DELETE for key: {key}")
             return True
         except Exception as e:
             logger.error(f"Cache delete failed for key {key}: {e}", exc_info=True)
             return False
 
-_redis_client: Optional[redis.Redis] = None
-_redis_url_signature: Optional[str] = None
+    async def _lookup(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        prefix = _prefix(key)
+        data = self.local.get(key)
+        if data is not None:
+            CACHE_REQUESTS_TOTAL.labels(prefix=prefix, result="local_hit").inc()
+            return _unpack(data)
+        if not self.redis:
+            CACHE_REQUESTS_TOTAL.labels(prefix=prefix, result="miss").inc()
+            return None
+        try:
+            data = await self.redis.get(key)
+        except Exception as e:
+            logger.error(f"Cache get failed for key {key}: {e}", exc_info=True)
+            data = None
+        if not data:
+            CACHE_REQUESTS_TOTAL.labels(prefix=prefix, result="miss").inc()
+            return None
+        try:
+            entry = _unpack(data)
+        except (ValueError, msgpack.UnpackException) as e:
+            logger.warning(f"Discarding undecodable cache entry for key {key}: {e}")
+            CACHE_REQUESTS_TOTAL.labels(prefix=prefix, result="miss").inc()
+            return None
+        CACHE_REQUESTS_TOTAL.labels(prefix=prefix, result="redis_hit").inc()
+        remaining = entry[2] - time.time()
+        if remaining > 0:
+            self.local.set(key, data, remaining)
+        return entry
 
-async def get_redis_client() -> Optional[redis.Redis]:
-    """Get a singleton Redis client instance."""
-    global _redis_client, _redis_url_signature
+    @staticmethod
+    def _should_refresh_early(compute_seconds: float, expires_at: float) -> bool:
+        if compute_seconds <= 0 or math.isinf(expires_at):
+            return False
+        # XFetch: -log(U) is exponentially distributed, so refreshes cluster just before expiry.
+        jitter = -compute_seconds * settings.CACHE_EARLY_REFRESH_BETA * math.log(1.0 - random.random())
+        return time.time() + jitter >= expires_at
+
+    async def _load_once(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: Optional[int]) -> Any:
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        inflight = self._inflight.get(flight_key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future: asyncio.Future = loop.create_future()
+        self._inflight[flight_key] = future
+        try:
+            started = time.perf_counter()
+            value = await loader()
+            if value is not None:
+                await self.set(key, value, ttl=ttl, compute_seconds=time.perf_counter() - started)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unwaited future does not warn.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(flight_key, None)
+
+    async def _publish_invalidation(self, key: str) -> None:
+        await self.redis.publish(CACHE_INVALIDATION_CHANNEL, f"{_INSTANCE_ID}|{key}")
+
+
+_INSTANCE_ID = uuid.uuid4().hex
+_local_cache: Optional[LocalCache] = None
+_listener: Optional[threading.Thread] = None
+_listener_lock = threading.Lock()
 
-    redis_url = get_effective_redis_url()
-    if not redis_url:
-        if _redis_client is not None:
-            try:
-                await _redis_client.close()
-            except Exception:
-                pass
-        _redis_client = None
-        _redis_url_signature = None
-        return None
 
-    if _redis_client is None or _redis_url_signature != redis_url:
-        if _redis_client is not None:
+def get_local_cache() -> LocalCache:
+    global _local_cache
+    if _local_cache is None:
+        _local_cache = LocalCache(
+            max_entries=settings.CACHE_LOCAL_MAX_ENTRIES,
+            ttl_seconds=settings.CACHE_LOCAL_TTL_SECONDS,
+        )
+    return _local_cache
+
+
+def _ensure_invalidation_listener() -> None:
+    global _listener
+    if _listener is not None or not get_effective_redis_url():
+        return
+    with _listener_lock:
+        if _listener is not None:
+            return
+        _listener = threading.Thread(target=_listen_for_invalidations, name="cache-invalidation-listener", daemon=True)
+        _listener.start()
+
+
+def _listen_for_invalidations() -> None:
+    import redis as sync_redis
+
+    while True:
+        redis_url = get_effective_redis_url()
+        if not redis_url:
+            return
+        client = sync_redis.from_url(redis_url, decode_responses=True, socket_connect_timeout=2)
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            # Entries cached while we were disconnected may have been invalidated meanwhile.
+            get_local_cache().clear()
+            for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                origin, _, key = str(message.get("data", "")).partition("|")
+                if origin != _INSTANCE_ID and key:
+                    get_local_cache().delete(key)
+        except Exception as e:
+            logger.debug(f"Cache invalidation listener disconnected: {e}")
+            time.sleep(5)
+        finally:
             try:
-                await _redis_client.close()
+                client.close()
             except Exception:
                 pass
+
+
+_redis_client: Optional[redis.Redis] = None
+_redis_url_signature: Optional[str] = None
+_cache_service: Optional[CacheService] = None
+
+
+def get_shared_cache_service() -> CacheService:
+    """Return the process-wide CacheService, rebuilding it if the Redis URL changed."""
+    global _redis_client, _redis_url_signature, _cache_service
+
+    redis_url = get_effective_redis_url()
+    if _cache_service is not None and _redis_url_signature == redis_url:
+        return _cache_service
+
+    _redis_client = None
+    if redis_url:
         try:
-            _redis_client = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
-            _redis_url_signature = redis_url
+            # Binary responses: values are msgpack envelopes.
+            _redis_client = redis.from_url(redis_url, decode_responses=False)
         except RedisError as exc:
             logger.error("Failed to create Redis client for cache at %s: %s", redis_url, exc)
-            _redis_client = None
-            _redis_url_signature = None
+    _redis_url_signature = redis_url
+    _cache_service = CacheService(_redis_client)
+    if _redis_client is not None:
+        _ensure_invalidation_listener()
+    return _cache_service
+
+
+async def get_redis_client() -> Optional[redis.Redis]:
+    """Get the cache's singleton Redis client instance."""
+    return get_shared_cache_service().redis
 
-    return _redis_client
 
 async def get_cache_service() -> CacheService:
     """Dependency provider for CacheService."""
-    redis_client = await get_redis_client()
-    return CacheService(redis_client)
+    return get_shared_cache_service()
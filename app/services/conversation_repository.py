@@ -310,20 +310,64 @@ class ConversationRepository:
         parent_id = room_rows[0].get("parent_id") if room_rows else None
         return {"current_room": room_id, "parent_room": parent_id}
 
-    def list_message_versions(self, message_id: str, max_depth: int = 20) -> List[Dict[str, Any]]:
-        versions: List[Dict[str, Any]] = []
-        current_id = message_id
-        for _ in range(max_depth):
-            message = self.get_message(current_id)
-            if not message:
-                break
-            versions.append(message)
-            meta = message.get("meta")
-            if isinstance(meta, dict) and meta.get("parentId"):
-                current_id = meta["parentId"]
-            else:
-                break
-        return list(reversed(versions))
+    def list_message_versions(self, message_id: str, max_depth: int = 200) -> List[Dict[str, Any]]:
+        """
+        Return every version in ``message_id``'s edit chain, oldest first, in one query.
+
+        Earlier versions are followed through ``meta->>'parentId'``; later edits
+        of the same role are found through the parent-id expression index.
+        """
+        sql = """
+            WITH RECURSIVE earlier AS (
+                SELECT id, thread_id, user_id, role, content, model, status, created_at, meta, 0 AS depth
+                FROM conversation_messages WHERE id = %s
+                UNION ALL
+                SELECT m.id, m.thread_id, m.user_id, m.role, m.content, m.model, m.status, m.created_at, m.meta,
+                       e.depth - 1
+                FROM conversation_messages m
+                JOIN earlier e ON m.id = e.meta->>'parentId'
+                WHERE e.depth > -%s
+            ), later AS (
+                SELECT id, role, 0 AS depth FROM conversation_messages WHERE id = %s
+                UNION ALL
+                SELECT m.id, m.role, l.depth + 1
+                FROM conversation_messages m
+                JOIN later l ON m.meta->>'parentId' = l.id AND m.role = l.role
+                WHERE l.depth < %s
+            )
+            SELECT id, thread_id, user_id, role, content, model, status, created_at, meta, depth FROM earlier
+            UNION ALL
+            SELECT m.id, m.thread_id, m.user_id, m.role, m.content, m.model, m.status, m.created_at, m.meta, l.depth
+            FROM later l JOIN conversation_messages m ON m.id = l.id
+            WHERE l.depth > 0
+            ORDER BY depth, created_at, id
+        """
+        rows = self.db.execute_query(sql, (message_id, max_depth, message_id, max_depth))
+        return [self._map_message_row(row) for row in rows]
+
+    def create_message_version(self, original_message_id: str, content: str) -> Optional[Dict[str, Any]]:
+        """
+        Insert an edited copy of a user message linked to it via ``meta.parentId``.
+
+        The original is read by the ``INSERT ... SELECT`` itself, so this is a
+        single round trip. Returns ``None`` if it is missing or not a user message.
+        """
+        sql = """
+            WITH inserted AS (
+                INSERT INTO conversation_messages (id, thread_id, user_id, role, content, model, status, meta)
+                SELECT %s, thread_id, user_id, role, %s, model, 'complete',
+                       COALESCE(meta, '{}'::jsonb) || jsonb_build_object('parentId', id)
+                FROM conversation_messages
+                WHERE id = %s AND role = 'user'
+                RETURNING id, thread_id, user_id, role, content, model, status, created_at, meta
+            ), touched AS (
+                UPDATE conversation_threads SET updated_at = NOW()
+                WHERE id IN (SELECT thread_id FROM inserted)
+            )
+            SELECT id, thread_id, user_id, role, content, model, status, created_at, meta FROM inserted
+        """
+        rows = self.db.execute_returning(sql, (f"msg_{generate_id()}", content, original_message_id))
+        return self._map_message_row(rows[0]) if rows else None
 
     # --- Private helpers ------------------------------------------------
 
@@ -122,22 +122,7 @@ class ConversationService:
 
     def create_new_message_version(self, original_message_id: str, new_content: str) -> Optional[Dict[str, Any]]:
         """Creates a new version of a user message, linking it to the original."""
-        original_message = self.get_message_by_id(original_message_id)
-        if not original_message or original_message.get("role") != "user":
-            return None
-
-        new_meta = original_message.get("meta", {}) or {}
-        new_meta["parentId"] = original_message_id
-
-        # Create a new message with the new content and parentId
-        new_message = self.create_message(
-            thread_id=original_message["thread_id"],
-            role="user",
-            content=new_content,
-            status="complete",
-            meta=new_meta
-        )
-        return new_message
+        return self.repository.create_message_version(original_message_id, new_content)
 
     def get_attachment_by_id(self, attachment_id: str) -> Optional[Dict[str, Any]]:
         return self.repository.get_attachment(attachment_id)
@@ -1,22 +1,81 @@
 import psycopg2
 import logging
+import threading
 import time
 import os
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Callable, Optional, List, Dict, Any, Sequence, Tuple
 from contextlib import contextmanager
 from urllib.parse import urlparse, urlunparse
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from psycopg2.extensions import connection, cursor as CursorClass
 
 from app.core.secrets import SecretProvider
 from app.core.errors import AppError
-from app.models.schemas import Message
-from app.utils.helpers import generate_id
 from pgvector.psycopg2 import register_vector
-from app.core.metrics import DB_QUERY_DURATION
+from app.core.metrics import (
+    DB_POOL_CONNECTIONS_IN_USE,
+    DB_POOL_MAX_CONNECTIONS,
+    DB_POOL_TIMEOUTS_TOTAL,
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_DURATION,
+)
+from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+
+def budgeted_pool_size(requested: int) -> int:
+    """
+    Cap a per-process pool so that all processes together stay within
+    ``DB_CONNECTION_BUDGET`` (an even share across ``DB_POOL_PROCESS_COUNT``).
+    """
+    budget = settings.DB_CONNECTION_BUDGET
+    if budget <= 0:
+        return max(1, requested)
+    share = max(1, budget // max(1, settings.DB_POOL_PROCESS_COUNT))
+    return max(1, min(requested, share))
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    Thread- and greenlet-safe pool that waits for a free connection instead of
+    failing when all ``maxconn`` connections are checked out.
+
+    Under gevent the lock and semaphore are monkey-patched, so a greenlet
+    waiting for a connection yields to the others. Wait time, connections in
+    use and timeouts are exported per pool ``name``.
+    """
+
+    def __init__(self, minconn: int, maxconn: int, *args, timeout: float = 10.0, name: str = "default", **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        self.name = name
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        DB_POOL_MAX_CONNECTIONS.labels(pool=name).set(maxconn)
+
+    def getconn(self, key=None):
+        started = time.monotonic()
+        acquired = self._slots.acquire(timeout=self._timeout)
+        DB_POOL_WAIT_SECONDS.labels(pool=self.name).observe(time.monotonic() - started)
+        if not acquired:
+            DB_POOL_TIMEOUTS_TOTAL.labels(pool=self.name).inc()
+            raise PoolError(f"timed out after {self._timeout}s waiting for a database connection")
+        try:
+            conn = super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+        DB_POOL_CONNECTIONS_IN_USE.labels(pool=self.name).inc()
+        return conn
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            DB_POOL_CONNECTIONS_IN_USE.labels(pool=self.name).dec()
+            self._slots.release()
+
+
 class DatabaseService:
     def __init__(self, secret_provider: SecretProvider) -> None:
         super().__init__()
@@ -44,7 +103,12 @@ class DatabaseService:
 
         self._apply_test_overrides()
         self._fallback_attempted = False
-        self.pool: Optional[SimpleConnectionPool] = None
+        self.pool: Optional[BlockingConnectionPool] = None
+        self.pool_name = "api"
+        self.pool_max_size = budgeted_pool_size(settings.DB_POOL_MAX_SIZE)
+        self.pool_min_size = min(settings.DB_POOL_MIN_SIZE, self.pool_max_size)
+        self._vector_registered: Optional[bool] = None
+        self._vector_lock = threading.Lock()
 
     def _apply_test_overrides(self) -> None:
         """Allow test-specific environment variables to override connection details."""
@@ -118,16 +182,43 @@ class DatabaseService:
 
         self.database_url = urlunparse(parsed._replace(netloc=netloc, path=path))
 
-    def _get_or_create_pool(self) -> SimpleConnectionPool:
+    def configure_pool(
+        self,
+        *,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        """Resize the pool before first use (e.g. to match a worker's concurrency).
+
+        ``max_size`` is still capped by the process's share of the connection budget.
+        """
+        if self.pool is not None:
+            logger.warning("Database pool already created; ignoring resize to max_size=%s.", max_size)
+            return
+        if name:
+            self.pool_name = name
+        if max_size is not None:
+            self.pool_max_size = budgeted_pool_size(max_size)
+        if min_size is not None:
+            self.pool_min_size = min_size
+        self.pool_min_size = max(0, min(self.pool_min_size, self.pool_max_size))
+
+    def _new_pool(self) -> BlockingConnectionPool:
+        return BlockingConnectionPool(
+            minconn=self.pool_min_size,
+            maxconn=self.pool_max_size,
+            dsn=self.database_url,
+            timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            name=self.pool_name,
+        )
+
+    def _get_or_create_pool(self) -> BlockingConnectionPool:
         """Lazily creates and returns the connection pool."""
         if self.pool is None:
             original_db_name = urlparse(self.database_url).path.lstrip("/") or None
             try:
-                self.pool = SimpleConnectionPool(
-                    minconn=5,
-                    maxconn=20,
-                    dsn=self.database_url
-                )
+                self.pool = self._new_pool()
                 logger.info("Database connection pool created successfully on first use.")
             except psycopg2.OperationalError as e:
                 logger.error(f"Failed to create database connection pool: {e}")
@@ -165,11 +256,7 @@ class DatabaseService:
 
                     secondary_error: Optional[BaseException] = None
                     try:
-                        self.pool = SimpleConnectionPool(
-                            minconn=5,
-                            maxconn=20,
-                            dsn=self.database_url
-                        )
+                        self.pool = self._new_pool()
                         logger.info(
                             "Fallback database connection pool created successfully (%s:%s).",
                             fallback_host,
@@ -197,11 +284,7 @@ class DatabaseService:
                                 database=fallback_db,
                             )
                             try:
-                                self.pool = SimpleConnectionPool(
-                                    minconn=5,
-                                    maxconn=20,
-                                    dsn=self.database_url
-                                )
+                                self.pool = self._new_pool()
                                 logger.info(
                                     "Secondary fallback database connection established (user=%s).",
                                     secondary_user,
@@ -273,20 +356,38 @@ class DatabaseService:
         finally:
             cursor.close()
 
+    def _ensure_vector_type(self, conn: connection) -> None:
+        """
+        Register the pgvector type once per process.
+
+        ``register_vector`` installs a process-wide typecaster keyed by the type
+        OID, so there is no need to repeat its lookup query on every checkout.
+        The lookup's implicit transaction is rolled back straight away so no
+        state is left on a connection that PgBouncer may hand to another client.
+        """
+        if self._vector_registered is not None:
+            return
+        with self._vector_lock:
+            if self._vector_registered is not None:
+                return
+            try:
+                register_vector(conn)
+                self._vector_registered = True
+            except psycopg2.ProgrammingError as e:
+                if "vector type not found" not in str(e):
+                    raise
+                logger.warning("pgvector extension not available, continuing without vector support")
+                self._vector_registered = False
+            finally:
+                conn.rollback()
+
     @contextmanager
     def get_connection(self) -> connection:
-        """Get a connection from the lazily-initialized pool and register pgvector."""
+        """Get a connection from the lazily-initialized pool."""
         pool = self._get_or_create_pool()
         conn = pool.getconn()
         try:
-            # Try to register vector extension, but don't fail if it's not available
-            try:
-                register_vector(conn)
-            except psycopg2.ProgrammingError as e:
-                if "vector type not found" in str(e):
-                    logger.warning("pgvector extension not available, continuing without vector support")
-                else:
-                    raise
+            self._ensure_vector_type(conn)
             # Clear test data if in test mode
             self._clear_test_data(conn)
             yield conn
@@ -344,46 +445,109 @@ class DatabaseService:
                 return [dict(zip(columns, row)) for row in cur.fetchall()]
             return []
 
-    def get_messages_for_promotion(self, room_id: str) -> List[Message]:
-        """Get and decrypt all messages for a room from the database."""
-        query = """
-            SELECT message_id, room_id, user_id, role,
-                   pgp_sym_decrypt(content, %s) as content,
-                   timestamp
-            FROM messages
-            WHERE room_id = %s
-            ORDER BY timestamp ASC
-        """
-        params = (self.db_encryption_key, room_id)
-        results = self.execute_query(query, params)
-        return [Message(**row) for row in results]
+    # Copies keep the stored ciphertext, searchable text and embedding of each source row:
+    # every row is encrypted with the same key, so nothing is decrypted, re-encrypted or
+    # re-embedded, and the rows never leave Postgres.
+    _COPY_COLUMNS = "user_id, role, content, content_searchable, timestamp, embedding"
 
-    def copy_messages_to_room(self, messages: List[Message], new_room_id: str, user_id: str) -> int:
+    def copy_messages_to_room(self, source_room_id: str, message_ids: Sequence[str], new_room_id: str) -> int:
         """
-        Copies a list of messages to a new room in a single transaction.
+        Copies the given messages of ``source_room_id`` to a new room with one ``INSERT ... SELECT``.
+
+        Only the message ids are sent; ids that do not belong to the source room
+        are skipped, and authorship is preserved from the source rows.
         """
-        insert_query = """
-            INSERT INTO messages (message_id, room_id, user_id, role, content, content_searchable, timestamp, embedding)
-            VALUES (%s, %s, %s, %s, pgp_sym_encrypt(%s, %s), %s, %s, %s)
+        if not message_ids:
+            return 0
+        insert_query = f"""
+            INSERT INTO messages (message_id, room_id, {self._COPY_COLUMNS})
+            SELECT gen_random_uuid()::text, %s, {self._COPY_COLUMNS}
+            FROM messages
+            WHERE room_id = %s AND message_id = ANY(%s)
+            ORDER BY timestamp, message_id
         """
-        copied_count = 0
         try:
             with self.transaction(query_type="write") as cur:
-                for message in messages:
-                    new_message_id = generate_id()
-                    author_id = message.user_id
-                    params = (
-                        new_message_id, new_room_id, author_id, message.role,
-                        message.content, self.db_encryption_key, message.content, message.timestamp, None
-                    )
-                    cur.execute(insert_query, params)
-                    copied_count += 1
+                cur.execute(insert_query, (new_room_id, source_room_id, list(message_ids)))
+                copied_count = cur.rowcount
+                self._bump_message_count(cur, new_room_id, copied_count)
         except Exception as e:
             logger.error(f"Failed to copy messages to room {new_room_id}: {e}")
             return 0
 
         return copied_count
 
+    def copy_room_messages(
+        self,
+        source_room_id: str,
+        target_room_id: str,
+        batch_size: Optional[int] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """
+        Copies every message of ``source_room_id`` into ``target_room_id`` in one transaction.
+
+        Rows are copied in keyset batches of ``batch_size`` along the
+        (room_id, timestamp, message_id) index, so each statement does a bounded
+        amount of work; ``progress(copied, total)`` is called after every batch.
+        Returns the number of messages copied.
+        """
+        batch_size = batch_size or settings.MESSAGE_COPY_BATCH_SIZE
+        batch_query = f"""
+            WITH batch AS (
+                SELECT message_id, {self._COPY_COLUMNS}
+                FROM messages
+                WHERE room_id = %s AND (timestamp, message_id) > (%s, %s)
+                ORDER BY timestamp, message_id
+                LIMIT %s
+            ), inserted AS (
+                INSERT INTO messages (message_id, room_id, {self._COPY_COLUMNS})
+                SELECT gen_random_uuid()::text, %s, {self._COPY_COLUMNS} FROM batch
+            )
+            SELECT (SELECT count(*) FROM batch) AS copied, timestamp, message_id
+            FROM batch
+            ORDER BY timestamp DESC, message_id DESC
+            LIMIT 1
+        """
+        copied = 0
+        started = time.monotonic()
+        with self.transaction(query_type="write") as cur:
+            cur.execute("SELECT count(*) FROM messages WHERE room_id = %s", (source_room_id,))
+            total = cur.fetchone()[0]
+            last_timestamp, last_message_id = -(2 ** 63), ""
+            while copied < total:
+                cur.execute(
+                    batch_query,
+                    (source_room_id, last_timestamp, last_message_id, batch_size, target_room_id),
+                )
+                row = cur.fetchone()
+                if row is None:
+                    break
+                batch_count, last_timestamp, last_message_id = row
+                copied += batch_count
+                if progress:
+                    progress(copied, total)
+                logger.debug(f"Copied {copied}/{total} messages from {source_room_id} to {target_room_id}")
+            self._bump_message_count(cur, target_room_id, copied)
+        logger.info(
+            f"Copied {copied} messages from room {source_room_id} to {target_room_id} "
+            f"in {time.monotonic() - started:.2f}s"
+        )
+        return copied
+
+    @staticmethod
+    def _bump_message_count(cur: CursorClass, room_id: str, count: int) -> None:
+        """Count copied messages; like a saved message, they make the room due for archival."""
+        if count:
+            window_seconds = max(settings.MEMORY_ARCHIVE_AFTER_DAYS, 1) * 86400
+            cur.execute(
+                "UPDATE rooms SET message_count = message_count + %s, updated_at = %s, "
+                "archive_due_at = COALESCE(archive_due_at, "
+                "(SELECT MIN(timestamp) FROM messages WHERE room_id = %s) + %s) "
+                "WHERE room_id = %s",
+                (count, int(time.time()), room_id, window_seconds, room_id),
+            )
+
     def close(self) -> None:
         """Close all connections in the pool."""
         if self.pool:
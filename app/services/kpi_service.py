@@ -1,20 +1,102 @@
 """Service for calculating and storing Key Performance Indicators (KPIs)."""
 
+import asyncio
 import json
 import logging
+import time
 from collections import defaultdict
-from datetime import date
-from typing import Any, Dict, Optional
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional
 
+from app.config.settings import settings
+from app.repositories.kpi_rollup_repository import (
+    DAY,
+    GRANULARITY_SECONDS,
+    LATENCY_BUCKETS_MS,
+    TOKEN_BUCKETS,
+    KPIRollupRepository,
+    bucket_start,
+    estimate_percentile,
+    merge_histograms,
+)
+from app.services.cache_service import get_cache_service
 from app.services.database_service import DatabaseService, get_database_service
 
 logger = logging.getLogger(__name__)
 
+
+def _day_start(snapshot_date: date) -> int:
+    return int(datetime(snapshot_date.year, snapshot_date.month, snapshot_date.day, tzinfo=timezone.utc).timestamp())
+
+
 class KPIService:
     """Service to handle KPI calculations and storage."""
 
-    def __init__(self, db_service: DatabaseService):
+    def __init__(self, db_service: DatabaseService, rollups: Optional[KPIRollupRepository] = None):
         self.db = db_service
+        self.rollups = rollups or KPIRollupRepository(db_service)
+
+    def summarize_window(self, granularity: str, start_ts: int, end_ts: int) -> Dict[str, Any]:
+        """Fold the rollup buckets of a window into one summary (O(buckets), no raw rows)."""
+        rows = self.rollups.fetch_buckets(granularity, start_ts, end_ts)
+        reviews = sum(int(row.get("reviews_count") or 0) for row in rows)
+        failed = sum(int(row.get("reviews_failed") or 0) for row in rows)
+        latency = merge_histograms((row.get("latency_histogram") for row in rows), LATENCY_BUCKETS_MS)
+        review_tokens = merge_histograms((row.get("review_tokens_histogram") for row in rows), TOKEN_BUCKETS)
+        duration_sum = sum(float(row.get("review_duration_sum") or 0.0) for row in rows)
+        review_tokens_sum = sum(int(row.get("review_tokens_sum") or 0) for row in rows)
+        review_cost_sum = sum(float(row.get("review_cost_sum") or 0.0) for row in rows)
+        return {
+            "buckets": len(rows),
+            "reviews_count": reviews,
+            "reviews_failed": failed,
+            # Share of reviews that finished in the window and completed rather than failed.
+            "review_success_rate": (reviews / (reviews + failed)) if reviews + failed else 1.0,
+            "avg_review_duration_seconds": (duration_sum / reviews) if reviews else 0.0,
+            "review_latency_p50_ms": estimate_percentile(latency, LATENCY_BUCKETS_MS, 0.5),
+            "review_latency_p95_ms": estimate_percentile(latency, LATENCY_BUCKETS_MS, 0.95),
+            "avg_review_tokens": (review_tokens_sum / reviews) if reviews else 0.0,
+            "review_tokens_p50": estimate_percentile(review_tokens, TOKEN_BUCKETS, 0.5),
+            "review_tokens_p95": estimate_percentile(review_tokens, TOKEN_BUCKETS, 0.95),
+            "avg_review_cost": (review_cost_sum / reviews) if reviews else 0.0,
+            "tokens_prompt": sum(int(row.get("tokens_prompt") or 0) for row in rows),
+            "tokens_completion": sum(int(row.get("tokens_completion") or 0) for row in rows),
+            "tokens_total": sum(int(row.get("tokens_total") or 0) for row in rows),
+            "cost_usd": sum(float(row.get("cost_usd") or 0.0) for row in rows),
+            # Summing per-bucket counts over-counts users active in several buckets,
+            # so only expose the exact figure for single-bucket windows.
+            "active_users": int(rows[0].get("active_users") or 0) if len(rows) == 1 else None,
+        }
+
+    async def get_cached_summary(self, granularity: str, start_ts: int, end_ts: int) -> Dict[str, Any]:
+        """:meth:`summarize_window` behind a short shared cache for dashboard reads."""
+        cache_key = (
+            f"kpi:summary:{granularity}:{bucket_start(start_ts, granularity)}:{bucket_start(end_ts, granularity)}"
+        )
+        cache = await get_cache_service()
+        return await cache.get_or_set(
+            cache_key,
+            lambda: asyncio.to_thread(self.summarize_window, granularity, start_ts, end_ts),
+            ttl=settings.KPI_DASHBOARD_CACHE_SECONDS,
+        )
+
+    def get_rollup_series(self, granularity: str, start_ts: int, end_ts: int) -> List[Dict[str, Any]]:
+        """Return per-bucket rollups with percentiles resolved, for charting."""
+        series: List[Dict[str, Any]] = []
+        for row in self.rollups.fetch_buckets(granularity, start_ts, end_ts):
+            latency = merge_histograms([row.get("latency_histogram")], LATENCY_BUCKETS_MS)
+            series.append(
+                {
+                    "bucket_start": row["bucket_start"],
+                    "active_users": row.get("active_users", 0),
+                    "reviews_count": row.get("reviews_count", 0),
+                    "tokens_total": row.get("tokens_total", 0),
+                    "cost_usd": row.get("cost_usd", 0.0),
+                    "review_latency_p50_ms": estimate_percentile(latency, LATENCY_BUCKETS_MS, 0.5),
+                    "review_latency_p95_ms": estimate_percentile(latency, LATENCY_BUCKETS_MS, 0.95),
+                }
+            )
+        return series
 
     async def calculate_and_store_daily_snapshot(self, snapshot_date: date):
         """
@@ -23,19 +105,23 @@ class KPIService:
         """
         logger.info(f"Calculating KPI snapshot for date: {snapshot_date}")
 
-        # In a real implementation, each of these would be a complex SQL query.
-        # For now, we'll use placeholder values.
+        day_start = _day_start(snapshot_date)
+        day_seconds = GRANULARITY_SECONDS[DAY]
+        summary = self.summarize_window(DAY, day_start, day_start)
+
         kpis = {
-            "daily_active_users": 100,
-            "weekly_active_users": 500,
-            "monthly_active_users": 2000,
-            "new_reviews_created": 20,
-            "avg_review_cost": 0.05,
-            "total_token_cost": 50.0,
+            "daily_active_users": summary["active_users"] or 0,
+            "weekly_active_users": self.rollups.count_distinct_users(DAY, day_start - 6 * day_seconds, day_start),
+            "monthly_active_users": self.rollups.count_distinct_users(DAY, day_start - 29 * day_seconds, day_start),
+            "new_reviews_created": summary["reviews_count"],
+            "avg_review_cost": summary["avg_review_cost"],
+            "total_token_cost": summary["cost_usd"],
+            "total_tokens": summary["tokens_total"],
+            "review_latency_p50_ms": summary["review_latency_p50_ms"],
+            "review_latency_p95_ms": summary["review_latency_p95_ms"],
         }
 
-        for name, value in kpis.items():
-            await self.save_snapshot(snapshot_date, name, value)
+        await self.save_snapshots(snapshot_date, kpis)
 
     async def save_snapshot(
         self,
@@ -58,6 +144,26 @@ class KPIService:
         except Exception as e:
             logger.error(f"Failed to save KPI snapshot for '{metric_name}': {e}")
 
+    async def save_snapshots(self, snapshot_date: date, values: Dict[str, float]) -> None:
+        """Saves several KPI values for one date with a single multi-row upsert."""
+        if not values:
+            return
+        rows_sql = ", ".join(["(%s, %s, %s, NULL)"] * len(values))
+        query = f"""
+            INSERT INTO kpi_snapshots (snapshot_date, metric_name, value, details)
+            VALUES {rows_sql}
+            ON CONFLICT (snapshot_date, metric_name) DO UPDATE SET
+                value = EXCLUDED.value,
+                details = EXCLUDED.details;
+        """
+        params: List[Any] = []
+        for name, value in values.items():
+            params.extend((snapshot_date, name, float(value)))
+        try:
+            self.db.execute_update(query, tuple(params))
+        except Exception as e:
+            logger.error(f"Failed to save KPI snapshots for {snapshot_date}: {e}")
+
     async def get_historical_kpis(self, start_date: date, end_date: date) -> Dict[str, list]:
         """Queries historical KPI data for the admin dashboard."""
         query = """
@@ -78,6 +184,28 @@ class KPIService:
 
         return pivoted_data
 
+    def record_token_usage(
+        self,
+        user_id: Optional[str],
+        prompt_tokens: int,
+        completion_tokens: int,
+        total_tokens: int,
+        cost_usd: float,
+        timestamp: Optional[int] = None,
+    ) -> None:
+        """Fold one completed LLM exchange into the hourly/daily rollups."""
+        try:
+            self.rollups.record_token_usage(
+                user_id=user_id,
+                timestamp=timestamp or int(time.time()),
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=total_tokens,
+                cost_usd=cost_usd,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record token usage rollup for user '{user_id}': {e}")
+
 # Singleton instance
 _kpi_service_instance: Optional[KPIService] = None
 
@@ -1,12 +1,11 @@
 import asyncio
-import json
 import logging
 import time
 from abc import ABC, abstractmethod
 from typing import AsyncGenerator, Dict, Any, List, Optional
 
 import openai
-from anthropic import AsyncAnthropic
+from anthropic import NOT_GIVEN, AsyncAnthropic
 from google.generativeai import GenerativeModel, configure, types as genai_types
 from openai.types.chat import ChatCompletionChunk
 
@@ -15,6 +14,16 @@ from redis.exceptions import RedisError
 from app.config.settings import get_effective_redis_url, settings
 from app.models.conversation_schemas import SSEEvent, SSEDelta, SSEToolCall, SSEUsage
 from app.core.metrics import LLM_CALLS_TOTAL, LLM_LATENCY_SECONDS, LLM_TOKENS_TOTAL, CONVO_COST_USD_TOTAL
+from app.services.llm_streaming import (
+    CancellationWatcher,
+    accumulate_anthropic_usage,
+    anthropic_text_delta,
+    close_stream,
+    estimate_cost_usd,
+    gemini_chunk_text,
+    gemini_usage_from_chunk,
+    usage_dict,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -49,20 +58,6 @@ if settings.GEMINI_API_KEY:
 class BaseLLMAdapter(ABC):
     """Abstract base class for LLM provider adapters."""
 
-    @abstractmethod
-    async def generate_stream(
-        self,
-        messages: List[Dict[str, Any]],
-        model: str,
-        temperature: float,
-        max_tokens: int,
-        tools: Optional[List[Dict[str, Any]]] = None,
-    ) -> AsyncGenerator[SSEEvent, None]:
-        """An async generator that yields Server-Sent Events for an LLM response."""
-        yield
-
-class OpenAIAdapter(BaseLLMAdapter):
-    """Adapter for OpenAI-compatible models."""
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
         self._redis_url_signature: Optional[str] = None
@@ -94,6 +89,32 @@ class OpenAIAdapter(BaseLLMAdapter):
 
         return self.redis_client
 
+    @abstractmethod
+    async def generate_stream(
+        self,
+        message_id: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """An async generator that yields Server-Sent Events for an LLM response."""
+        yield
+
+
+def _usage_event(provider: str, usage: Dict[str, int]) -> SSEEvent:
+    """Record token and cost metrics for a finished stream and build its ``usage`` event."""
+    cost = estimate_cost_usd(provider, usage["prompt_tokens"], usage["completion_tokens"])
+    LLM_TOKENS_TOTAL.labels(provider=provider, kind="prompt").inc(usage["prompt_tokens"])
+    LLM_TOKENS_TOTAL.labels(provider=provider, kind="completion").inc(usage["completion_tokens"])
+    CONVO_COST_USD_TOTAL.inc(cost)
+    return SSEEvent(event="usage", data=SSEUsage(**usage, cost_usd=cost))
+
+
+class OpenAIAdapter(BaseLLMAdapter):
+    """Adapter for OpenAI-compatible models."""
+
     async def generate_stream(
         self,
         message_id: str, # Added for cancellation checking
@@ -105,7 +126,6 @@ class OpenAIAdapter(BaseLLMAdapter):
     ) -> AsyncGenerator[SSEEvent, None]:
         start_time = time.time()
         was_successful = False
-        cancellation_key = f"cancel:stream:{message_id}"
 
         if openai_client is None:
             logger.debug("OpenAI client unavailable; returning mocked streaming response.")
@@ -114,8 +134,9 @@ class OpenAIAdapter(BaseLLMAdapter):
             yield SSEEvent(event="done", data={})
             return
 
+        stream = None
         try:
-            redis_client = self._ensure_redis_client()
+            watcher = CancellationWatcher(self._ensure_redis_client(), message_id)
             stream = await openai_client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -128,9 +149,8 @@ class OpenAIAdapter(BaseLLMAdapter):
 
             tool_calls: List[Any] = []
             async for chunk in stream:
-                if redis_client and redis_client.exists(cancellation_key):
+                if watcher.cancelled():
                     logger.info(f"Cancellation detected for stream {message_id}. Stopping.")
-                    redis_client.delete(cancellation_key)  # Clean up the key
                     break
 
                 chunk: ChatCompletionChunk
@@ -157,23 +177,7 @@ class OpenAIAdapter(BaseLLMAdapter):
                         yield SSEEvent(event="tool_call", data=SSEToolCall(id=tc["id"], name=tc["function"]["name"], arguments=tc["function"]["arguments"]))
 
                 if chunk.usage:
-                    prompt_cost = (chunk.usage.prompt_tokens / 1_000_000) * 5.0
-                    completion_cost = (chunk.usage.completion_tokens / 1_000_000) * 15.0
-                    total_cost = prompt_cost + completion_cost
-
-                    LLM_TOKENS_TOTAL.labels(provider="openai", kind="prompt").inc(chunk.usage.prompt_tokens)
-                    LLM_TOKENS_TOTAL.labels(provider="openai", kind="completion").inc(chunk.usage.completion_tokens)
-                    CONVO_COST_USD_TOTAL.inc(total_cost)
-
-                    yield SSEEvent(
-                        event="usage",
-                        data=SSEUsage(
-                            prompt_tokens=chunk.usage.prompt_tokens,
-                            completion_tokens=chunk.usage.completion_tokens,
-                            total_tokens=chunk.usage.total_tokens,
-                            cost_usd=total_cost,
-                        )
-                    )
+                    yield _usage_event("openai", usage_dict(chunk.usage.prompt_tokens, chunk.usage.completion_tokens))
             was_successful = True
         except Exception as e:
             LLM_CALLS_TOTAL.labels(provider="openai", outcome="failure").inc()
@@ -182,6 +186,8 @@ class OpenAIAdapter(BaseLLMAdapter):
             yield SSEEvent(event="error", data=error_data)
 
         finally:
+            if stream is not None:
+                await close_stream(stream)
             duration = time.time() - start_time
             LLM_LATENCY_SECONDS.labels(provider="openai").observe(duration)
             if was_successful:
@@ -189,14 +195,10 @@ class OpenAIAdapter(BaseLLMAdapter):
 
         yield SSEEvent(event="done", data={})
 
+
 class AnthropicAdapter(BaseLLMAdapter):
-    async def generate_stream(self, messages: List[Dict[str, Any]], model: str, temperature: float, max_tokens: int, tools: Optional[List[Dict[str, Any]]] = None) -> AsyncGenerator[SSEEvent, None]:
-        logger.warning("AnthropicAdapter is not fully implemented yet.")
-        yield SSEEvent(event="delta", data=SSEDelta(content="[Anthropic Response Placeholder]"))
-        await asyncio.sleep(0.1)
-        yield SSEEvent(event="done", data={})
+    """Adapter for Anthropic Claude models using the Messages streaming API."""
 
-class GoogleAdapter(BaseLLMAdapter):
     async def generate_stream(
         self,
         message_id: str,
@@ -209,15 +211,81 @@ class GoogleAdapter(BaseLLMAdapter):
         start_time = time.time()
         was_successful = False
 
-        # TODO: Implement Redis-based cancellation check for Gemini streams.
+        if anthropic_client is None:
+            logger.debug("Anthropic client unavailable; returning mocked streaming response.")
+            await asyncio.sleep(0)
+            yield SSEEvent(event="delta", data=SSEDelta(content="[mocked-anthropic-response]"))
+            yield SSEEvent(event="done", data={})
+            return
+
+        # The Messages API takes the system prompt as a dedicated parameter.
+        system_prompt = "\n\n".join(msg["content"] for msg in messages if msg["role"] == "system")
+        claude_messages = [
+            {"role": msg["role"], "content": msg["content"]} for msg in messages if msg["role"] != "system"
+        ]
 
-        gemini_model = GenerativeModel(model)
+        stream = None
+        try:
+            watcher = CancellationWatcher(self._ensure_redis_client(), message_id)
+            stream = await anthropic_client.messages.create(
+                model=model,
+                system=system_prompt or NOT_GIVEN,
+                messages=claude_messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+
+            usage = usage_dict(0, 0)
+            async for event in stream:
+                if watcher.cancelled():
+                    logger.info(f"Cancellation detected for stream {message_id}. Stopping.")
+                    break
+                accumulate_anthropic_usage(event, usage)
+                text = anthropic_text_delta(event)
+                if text:
+                    yield SSEEvent(event="delta", data=SSEDelta(content=text))
+
+            # After a cancellation this covers the tokens generated before the stream was closed.
+            if usage["total_tokens"]:
+                yield _usage_event("anthropic", usage)
+            was_successful = True
+        except Exception as e:
+            LLM_CALLS_TOTAL.labels(provider="anthropic", outcome="failure").inc()
+            logger.error(f"Anthropic streaming error: {e}", exc_info=True)
+            error_data = {"code": e.__class__.__name__, "message": str(e)}
+            yield SSEEvent(event="error", data=error_data)
+        finally:
+            if stream is not None:
+                await close_stream(stream)
+            duration = time.time() - start_time
+            LLM_LATENCY_SECONDS.labels(provider="anthropic").observe(duration)
+            if was_successful:
+                LLM_CALLS_TOTAL.labels(provider="anthropic", outcome="success").inc()
+
+        yield SSEEvent(event="done", data={})
+
+
+class GoogleAdapter(BaseLLMAdapter):
+    """Adapter for Google Gemini models."""
+
+    async def generate_stream(
+        self,
+        message_id: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        tools: Optional[List[Dict[str, Any]]] = None,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        start_time = time.time()
+        was_successful = False
 
         system_instruction = None
         gemini_messages = []
         for msg in messages:
             if msg["role"] == "system":
-                # The system instruction is handled by a dedicated parameter.
+                # The system instruction is bound to the model, not passed per request.
                 system_instruction = msg["content"]
                 continue
 
@@ -225,42 +293,43 @@ class GoogleAdapter(BaseLLMAdapter):
             role = "model" if msg["role"] == "assistant" else msg["role"]
             gemini_messages.append({"role": role, "parts": [{"text": msg["content"]}]})
 
+        gemini_model = GenerativeModel(model, system_instruction=system_instruction)
         generation_config = genai_types.GenerationConfig(
             temperature=temperature,
             max_output_tokens=max_tokens,
         )
 
+        response = None
         try:
-            # NOTE: Assuming `generate_content_async` is the correct method for async streaming
-            # based on library conventions, as direct documentation was ambiguous.
-            # The `stream=True` parameter is crucial.
+            watcher = CancellationWatcher(self._ensure_redis_client(), message_id)
             response = await gemini_model.generate_content_async(
                 contents=gemini_messages,
                 generation_config=generation_config,
-                system_instruction=system_instruction,
-                stream=True
+                stream=True,
             )
 
+            usage = None
             async for chunk in response:
-                if chunk.text:
-                    yield SSEEvent(event="delta", data=SSEDelta(content=chunk.text))
-
-            # TODO: Determine how to get token usage from the Gemini stream.
-            # This information does not appear to be in the standard stream chunks.
-
+                if watcher.cancelled():
+                    logger.info(f"Cancellation detected for stream {message_id}. Stopping.")
+                    break
+                text = gemini_chunk_text(chunk)
+                if text:
+                    yield SSEEvent(event="delta", data=SSEDelta(content=text))
+                # Counts are cumulative; the last chunk that reports them wins.
+                usage = gemini_usage_from_chunk(chunk) or usage
+
+            if usage:
+                yield _usage_event("google", usage)
             was_successful = True
-        except AttributeError:
-            logger.error(
-                "`generate_content_async` not found. The `google-generativeai` library may be outdated or lacks an async client."
-            )
-            yield SSEEvent(event="error", data={"error": "Gemini adapter is misconfigured or library is incompatible."})
-            raise
         except Exception as e:
             LLM_CALLS_TOTAL.labels(provider="google", outcome="failure").inc()
             logger.error(f"Google Gemini streaming error: {e}", exc_info=True)
             error_data = {"code": e.__class__.__name__, "message": str(e)}
             yield SSEEvent(event="error", data=error_data)
         finally:
+            if response is not None:
+                await close_stream(response)
             duration = time.time() - start_time
             LLM_LATENCY_SECONDS.labels(provider="google").observe(duration)
             if was_successful:
@@ -268,14 +337,15 @@ class GoogleAdapter(BaseLLMAdapter):
 
         yield SSEEvent(event="done", data={})
 
+
 def get_llm_adapter(provider: str) -> BaseLLMAdapter:
-    """Factory function to get an LLM adapter based on the provider."""
-    # A real implementation would inspect the model name to determine the provider
-    if provider.lower() in ["openai", "gpt-4o", "gpt-4-turbo"]:
+    """Factory function to get an LLM adapter for a provider name or model name."""
+    name = provider.lower()
+    if name in ["openai", "gpt-4o", "gpt-4-turbo"] or name.startswith(("gpt-", "o1")):
         return OpenAIAdapter()
-    elif provider.lower() in ["anthropic", "claude-3-opus-20240229"]:
+    elif name in ["anthropic", "claude"] or name.startswith("claude-"):
         return AnthropicAdapter()
-    elif provider.lower() in ["google", "gemini-1.5-pro-latest"]:
+    elif name in ["google", "gemini"] or name.startswith("gemini-"):
         return GoogleAdapter()
     else:
         logger.warning(f"Unknown LLM provider or model '{provider}'. Defaulting to OpenAI.")
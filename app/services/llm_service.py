@@ -8,7 +8,8 @@ import logging
 import os
 import re
 import time
-from typing import Dict, Any, Tuple, List, Optional
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, Tuple, List, Optional
 from abc import ABC, abstractmethod
 
 # Import both async and sync clients
@@ -36,7 +37,16 @@ from app.config.settings import settings
 from app.core.secrets import SecretProvider
 from app.core.errors import LLMError, LLMErrorCode
 from app.services.provider_errors import map_openai_error, map_anthropic_error, map_gemini_error
+from app.services.llm_streaming import (
+    accumulate_anthropic_usage,
+    anthropic_text_delta,
+    close_stream,
+    gemini_chunk_text,
+    gemini_usage_from_chunk,
+)
 from app.services.retry_policy import retry_manager
+from app.services.provider_config_service import ProviderRuntimeConfig, get_provider_config_service
+from app.services.provider_router import get_latency_router
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +63,13 @@ class LLMProvider(ABC):
         pass
 
     @abstractmethod
-    async def stream_invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str) -> AsyncGenerator[str, None]:
+    async def stream_invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text", usage: Optional[Dict[str, int]] = None) -> AsyncGenerator[str, None]:
+        """
+        Yield the response text as it is generated.
+
+        If the provider reports token usage, the counts are written into ``usage``
+        once the stream completes; otherwise ``usage`` is left untouched.
+        """
         yield
 
 
@@ -320,6 +336,8 @@ class OpenAIProvider(LLMProvider):
         system_prompt: str,
         user_prompt: str,
         request_id: str,
+        response_format: str = "text",
+        usage: Optional[Dict[str, int]] = None,
     ) -> AsyncGenerator[str, None]:
         start_time = time.time()
         try:
@@ -335,6 +353,8 @@ class OpenAIProvider(LLMProvider):
                     "max_tokens": 4000,
                     "stream": True,
                 }
+                if response_format == "json":
+                    kwargs["response_format"] = {"type": "json_object"}
                 stream = await self._openai_module.ChatCompletion.acreate(**kwargs)
                 async for chunk in stream:
                     delta = chunk["choices"][0]["delta"].get("content") or ""
@@ -346,6 +366,9 @@ class OpenAIProvider(LLMProvider):
                     temperature=0.7,
                     max_tokens=4000,
                     stream=True,
+                    response_format=(
+                        {"type": "json_object"} if response_format == "json" else {"type": "text"}
+                    ),
                 )
                 async for chunk in stream:
                     content = chunk.choices[0].delta.content or ""
@@ -405,11 +428,25 @@ class OpenAIProvider(LLMProvider):
         )
 
 
+MOCK_STREAM_PIECE_CHARS = 16
+
+
 class MockLLMProvider(LLMProvider):
     """Fallback provider that returns deterministic responses for tests."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        latency: Optional[Callable[[], float]] = None,
+        failure: Optional[Callable[[], bool]] = None,
+        completion_tokens: Optional[Callable[[], int]] = None,
+    ) -> None:
         super().__init__()
+        # Optional samplers for routing and review benchmarks: synthetic response delays
+        # (seconds), whether a call fails with a retryable rate limit after its delay, and
+        # the completion token count to report.
+        self._latency = latency
+        self._failure = failure
+        self._completion_tokens = completion_tokens
 
     async def invoke(
         self,
@@ -419,6 +456,9 @@ class MockLLMProvider(LLMProvider):
         request_id: str,
         response_format: str = "text",
     ) -> Tuple[str, Dict[str, Any]]:
+        if self._latency is not None:
+            await asyncio.sleep(self._latency())
+        self._maybe_fail()
         return self._build_response(system_prompt, user_prompt, response_format)
 
     def invoke_sync(
@@ -429,6 +469,9 @@ class MockLLMProvider(LLMProvider):
         request_id: str,
         response_format: str = "text",
     ) -> Tuple[str, Dict[str, Any]]:
+        if self._latency is not None:
+            time.sleep(self._latency())
+        self._maybe_fail()
         return self._build_response(system_prompt, user_prompt, response_format)
 
     async def stream_invoke(
@@ -437,9 +480,39 @@ class MockLLMProvider(LLMProvider):
         system_prompt: str,
         user_prompt: str,
         request_id: str,
+        response_format: str = "text",
+        usage: Optional[Dict[str, int]] = None,
     ) -> AsyncGenerator[str, None]:
-        content, _ = self._build_response(system_prompt, user_prompt, "text")
-        yield content
+        content, metrics = self._build_response(system_prompt, user_prompt, response_format)
+        if self._latency is None:
+            self._maybe_fail()
+            yield content
+            if usage is not None:
+                usage.update(metrics)
+            return
+        # Spread the synthetic latency over the pieces, like a model emitting tokens.
+        pieces = [content[start:start + MOCK_STREAM_PIECE_CHARS] for start in range(0, len(content), MOCK_STREAM_PIECE_CHARS)]
+        delay = self._latency() / max(1, len(pieces))
+        fail_at = len(pieces) // 2 if self._failure is not None and self._failure() else None
+        for index, piece in enumerate(pieces):
+            await asyncio.sleep(delay)
+            if index == fail_at:
+                raise self._rate_limit_error()
+            yield piece
+        if usage is not None:
+            usage.update(metrics)
+
+    def _maybe_fail(self) -> None:
+        if self._failure is not None and self._failure():
+            raise self._rate_limit_error()
+
+    def _rate_limit_error(self) -> LLMError:
+        return LLMError(
+            error_code=LLMErrorCode.RATE_LIMIT,
+            provider="mock",
+            retryable=True,
+            error_message="Simulated rate limit from mock provider",
+        )
 
     async def create_embedding_async(self, text: str):
         return self._build_embedding_response(text)
@@ -476,7 +549,10 @@ class MockLLMProvider(LLMProvider):
 
     def _build_metrics(self, user_prompt: str, content: str) -> Dict[str, int]:
         prompt_tokens = max(1, len(user_prompt.split()) or 1)
-        completion_tokens = max(1, len(content.split()) or 1)
+        if self._completion_tokens is not None:
+            completion_tokens = self._completion_tokens()
+        else:
+            completion_tokens = max(1, len(content.split()) or 1)
         return {
             "prompt_tokens": prompt_tokens,
             "completion_tokens": completion_tokens,
@@ -711,11 +787,49 @@ class GeminiProvider(LLMProvider):
         self._model_cache[target_name] = gemini_model
         return gemini_model
 
-    async def stream_invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str) -> AsyncGenerator[str, None]:
-        # Placeholder implementation
-        logger.warning("Streaming not implemented for Gemini, falling back to non-streaming.")
-        content, _ = await self.invoke(model, system_prompt, user_prompt, request_id)
-        yield content
+    async def stream_invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text", usage: Optional[Dict[str, int]] = None) -> AsyncGenerator[str, None]:
+        start_time = time.time()
+        model_name = model or self._default_model_name
+        response = None
+        reported: Optional[Dict[str, int]] = None
+        try:
+            full_prompt = f"{system_prompt}\n\n{user_prompt}"
+            gemini_model = self._get_model(model_name)
+            response = await gemini_model.generate_content_async(full_prompt, stream=True)
+            async for chunk in response:
+                reported = gemini_usage_from_chunk(chunk) or reported
+                text = gemini_chunk_text(chunk)
+                if text:
+                    yield text
+            if reported and usage is not None:
+                usage.update(reported)
+            metrics = reported or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            latency_ms = (time.time() - start_time) * 1000
+            logger.info(
+                "Gemini API stream completed successfully",
+                extra={"req_id": request_id, "provider": "gemini", "model": model_name, "latency_ms": latency_ms, "tokens_used": metrics["total_tokens"]},
+            )
+        except Exception as e:
+            llm_error = map_gemini_error(e, "gemini")
+            latency_ms = (time.time() - start_time) * 1000
+            logger.error(
+                "Gemini API stream failed",
+                extra={
+                    "req_id": request_id,
+                    "provider": "gemini",
+                    "model": model_name,
+                    "error_code": llm_error.error_code.value,
+                    "error_message": llm_error.error_message,
+                    "latency_ms": latency_ms,
+                    "retryable": llm_error.retryable,
+                    **llm_error.to_dict(),
+                },
+            )
+            raise llm_error
+        finally:
+            # Runs on consumer aclose()/cancellation too, so generation stops upstream.
+            if response is not None:
+                await close_stream(response)
 
     async def invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text") -> Tuple[str, Dict[str, Any]]:
         start_time = time.time()
@@ -793,11 +907,30 @@ class ClaudeProvider(LLMProvider):
         self.async_client = AsyncAnthropic(api_key=api_key)
         self.sync_client = Anthropic(api_key=api_key)
 
-    async def stream_invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str) -> AsyncGenerator[str, None]:
-        # Placeholder implementation
-        logger.warning("Streaming not implemented for Claude, falling back to non-streaming.")
-        content, _ = await self.invoke(model, system_prompt, user_prompt, request_id)
-        yield content
+    async def stream_invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text", usage: Optional[Dict[str, int]] = None) -> AsyncGenerator[str, None]:
+        start_time = time.time()
+        stream = None
+        metrics = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        try:
+            stream = await self.async_client.messages.create(model=model, system=system_prompt, messages=[{"role": "user", "content": user_prompt}], max_tokens=4000, stream=True)
+            async for event in stream:
+                accumulate_anthropic_usage(event, metrics)
+                text = anthropic_text_delta(event)
+                if text:
+                    yield text
+            if metrics["total_tokens"] and usage is not None:
+                usage.update(metrics)
+            latency_ms = (time.time() - start_time) * 1000
+            logger.info("Anthropic API stream completed successfully", extra={"req_id": request_id, "provider": "claude", "model": model, "latency_ms": latency_ms, "tokens_used": metrics["total_tokens"]})
+        except Exception as e:
+            llm_error = map_anthropic_error(e, "claude")
+            latency_ms = (time.time() - start_time) * 1000
+            logger.error("Anthropic API stream failed", extra={"req_id": request_id, "provider": "claude", "model": model, "error_code": llm_error.error_code.value, "error_message": llm_error.error_message, "latency_ms": latency_ms, "retryable": llm_error.retryable, **llm_error.to_dict()})
+            raise llm_error
+        finally:
+            # Runs on consumer aclose()/cancellation too, so generation stops upstream.
+            if stream is not None:
+                await close_stream(stream)
 
     async def invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text") -> Tuple[str, Dict[str, Any]]:
         start_time = time.time()
@@ -927,10 +1060,10 @@ class LLMService:
         except LLMError:
             raise
 
-        if provider_name not in self.providers:
+        if provider_name not in self.providers or not self._is_enabled(provider_name):
             if settings.FORCE_DEFAULT_PROVIDER:
                 default_provider = settings.LLM_PROVIDER
-                if default_provider in self.providers:
+                if default_provider in self.providers and self._is_enabled(default_provider):
                     logger.warning(
                         "Provider '%s' unavailable; forcing default provider '%s'.",
                         provider_name,
@@ -952,6 +1085,18 @@ class LLMService:
 
         return self.providers[provider_name]
 
+    def _runtime_config(self, provider_name: str) -> Optional[ProviderRuntimeConfig]:
+        """Admin-tuned settings for ``provider_name`` from the process-local snapshot."""
+        try:
+            return get_provider_config_service().snapshot().get(provider_name)
+        except Exception as exc:  # pragma: no cover - config overlay is best effort
+            logger.debug("Provider config snapshot unavailable: %s", exc)
+            return None
+
+    def _is_enabled(self, provider_name: str) -> bool:
+        runtime = self._runtime_config(provider_name)
+        return runtime.enabled if runtime else True
+
     def _ensure_mock_provider(self) -> MockLLMProvider:
         if self._mock_provider is None:
             self._mock_provider = MockLLMProvider()
@@ -982,8 +1127,15 @@ class LLMService:
         task: str,
         intent: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
+        interactive: bool = False,
     ) -> Tuple[str, str, str]:
-        """Choose the most suitable provider/model pair for the given task."""
+        """
+        Choose the most suitable provider/model pair for the given task.
+
+        Background tasks follow the static per-domain preference. Interactive
+        calls go to the fastest healthy provider by measured latency, with the
+        domain preference breaking ties and ordering unmeasured providers.
+        """
 
         self._initialize_providers()
         available = self.get_available_providers()
@@ -1021,13 +1173,6 @@ class LLMService:
         }
         preferred_providers = preference_map.get(domain, [settings.LLM_PROVIDER] + available)
 
-        provider_model_defaults: Dict[str, str] = {
-            "openai": settings.LLM_MODEL or "gpt-4o-mini",
-            "claude": "claude-3-haiku-20240307",
-            "gemini": "gemini-1.5-pro-latest",
-            "mock": "mock-model",
-        }
-
         selected_provider = None
         for provider in preferred_providers:
             if provider in self.providers:
@@ -1037,11 +1182,19 @@ class LLMService:
         if not selected_provider:
             selected_provider = available[0]
 
-        model = provider_model_defaults.get(selected_provider, settings.LLM_MODEL or "gpt-4o-mini")
+        model = self._default_model(selected_provider)
 
         reason = (
             f"Domain '{domain}' task '{task}' routed to {selected_provider}/{model}."
         )
+        if interactive and settings.LLM_LATENCY_ROUTING_ENABLED:
+            ranked = get_latency_router().rank(self._routing_candidates(preferred_providers + available))
+            if ranked and ranked[0] != (selected_provider, model):
+                selected_provider, model = ranked[0]
+                reason = (
+                    f"Domain '{domain}' task '{task}' routed to {selected_provider}/{model} "
+                    "(fastest healthy provider by recent latency)."
+                )
         if metadata:
             reason += f" Metadata: {metadata}"
 
@@ -1058,22 +1211,153 @@ class LLMService:
 
         return selected_provider, model, reason
 
+    def _default_model(self, provider_name: str) -> str:
+        provider_model_defaults: Dict[str, str] = {
+            "openai": settings.LLM_MODEL or "gpt-4o-mini",
+            "claude": "claude-3-haiku-20240307",
+            "gemini": "gemini-1.5-pro-latest",
+            "mock": "mock-model",
+        }
+        return provider_model_defaults.get(provider_name, settings.LLM_MODEL or "gpt-4o-mini")
+
+    def _routing_candidates(self, provider_names: List[str]) -> List[Tuple[str, str]]:
+        """Configured, enabled providers from ``provider_names`` (in order) with their default models."""
+        candidates: List[Tuple[str, str]] = []
+        for name in provider_names:
+            candidate = (name, self._default_model(name))
+            if name in self.providers and self._is_enabled(name) and candidate not in candidates:
+                candidates.append(candidate)
+        return candidates
+
     # --- ASYNC METHODS for FastAPI ---
     async def invoke(self, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text", provider_name: str = "openai") -> Tuple[str, Dict[str, Any]]:
         return await self.invoke_with_retry(provider_name, model, system_prompt, user_prompt, request_id, response_format)
 
+    async def _invoke_once(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str, runtime: Optional[ProviderRuntimeConfig]) -> Tuple[str, Dict[str, Any]]:
+        """One provider call, with its latency and outcome fed to the latency router."""
+        provider = self.get_or_create_provider(provider_name)
+        router = get_latency_router()
+        started = time.perf_counter()
+        try:
+            call = provider.invoke(model, system_prompt, user_prompt, request_id, response_format)
+            if runtime is None:
+                result = await call
+            else:
+                try:
+                    result = await asyncio.wait_for(call, timeout=runtime.timeout_ms / 1000)
+                except asyncio.TimeoutError:
+                    raise LLMError(
+                        error_code=LLMErrorCode.TIMEOUT,
+                        provider=provider_name,
+                        retryable=True,
+                        error_message=f"{provider_name} did not respond within {runtime.timeout_ms}ms",
+                    )
+        except asyncio.CancelledError:
+            # A cancelled hedge loser says nothing about the provider's health.
+            raise
+        except Exception:
+            router.record(provider_name, model, time.perf_counter() - started, ok=False)
+            raise
+        router.record(provider_name, model, time.perf_counter() - started, ok=True)
+        return result
+
     async def invoke_with_retry(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text") -> Tuple[str, Dict[str, Any]]:
+        runtime = self._runtime_config(provider_name)
+
         async def _invoke():
+            return await self._invoke_once(provider_name, model, system_prompt, user_prompt, request_id, response_format, runtime)
+        return await retry_manager.execute_with_retry(
+            _invoke, provider_name, max_retries=runtime.retries if runtime else None
+        )
+
+    async def invoke_hedged(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text") -> Tuple[str, Dict[str, Any]]:
+        """
+        Latency-sensitive invoke: if ``provider_name`` runs past its p95, the same
+        request is also sent to the fastest other healthy provider and the first
+        answer wins. A failure fails over to that provider instead of retrying.
+        """
+        if not settings.LLM_HEDGE_ENABLED:
+            return await self.invoke_with_retry(provider_name, model, system_prompt, user_prompt, request_id, response_format)
+        self._initialize_providers()
+        router = get_latency_router()
+        alternatives = [
+            candidate
+            for candidate in router.rank(self._routing_candidates(list(self.providers)))
+            if candidate[0] not in {provider_name, "mock"}
+        ]
+
+        def _attempt(name: str, attempt_model: str):
+            runtime = self._runtime_config(name)
+
+            async def _invoke():
+                return await self._invoke_once(name, attempt_model, system_prompt, user_prompt, request_id, response_format, runtime)
+
+            return lambda: retry_manager.execute_with_retry(_invoke, name, max_retries=0)
+
+        attempts = [((provider_name, model), _attempt(provider_name, model))]
+        attempts += [(candidate, _attempt(*candidate)) for candidate in alternatives[:1]]
+        return await router.hedged(attempts)
+
+    async def stream_invoke(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text", usage: Optional[Dict[str, int]] = None) -> AsyncGenerator[str, None]:
+        """
+        Stream a completion under the same policy as ``invoke``. Failures before
+        the first chunk are retried (and counted by the circuit breaker); once a
+        chunk has been yielded a failure is raised to the caller, which already
+        has part of the output. The provider's ``timeout_ms`` bounds the wait for
+        each chunk, and the stream's duration and outcome feed the latency router.
+        Token usage reported by the provider is written into ``usage`` when the
+        stream completes.
+        """
+        runtime = self._runtime_config(provider_name)
+        router = get_latency_router()
+
+        async def _next_chunk(chunks: AsyncGenerator[str, None]) -> str:
+            if runtime is None:
+                return await chunks.__anext__()
+            try:
+                return await asyncio.wait_for(chunks.__anext__(), timeout=runtime.timeout_ms / 1000)
+            except asyncio.TimeoutError:
+                raise LLMError(
+                    error_code=LLMErrorCode.TIMEOUT,
+                    provider=provider_name,
+                    retryable=True,
+                    error_message=f"{provider_name} stream stalled for {runtime.timeout_ms}ms",
+                )
+
+        async def _open():
             provider = self.get_or_create_provider(provider_name)
-            return await provider.invoke(model, system_prompt, user_prompt, request_id, response_format)
-        return await retry_manager.execute_with_retry(_invoke, provider_name)
+            started = time.perf_counter()
+            chunks = provider.stream_invoke(model, system_prompt, user_prompt, request_id, response_format=response_format, usage=usage)
+            try:
+                return chunks, await _next_chunk(chunks), started
+            except StopAsyncIteration:
+                return chunks, None, started
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                router.record(provider_name, model, time.perf_counter() - started, ok=False)
+                await chunks.aclose()
+                raise
 
-    async def stream_invoke(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str) -> AsyncGenerator[str, None]:
-        provider = self.get_or_create_provider(provider_name)
-        # Note: Retry logic is not applied to streaming calls by default, as it's more complex.
-        # A robust implementation might buffer the stream and retry on specific errors.
-        async for chunk in provider.stream_invoke(model, system_prompt, user_prompt, request_id):
-            yield chunk
+        chunks, chunk, started = await retry_manager.execute_with_retry(
+            _open, provider_name, max_retries=runtime.retries if runtime else None
+        )
+        try:
+            while chunk is not None:
+                yield chunk
+                try:
+                    chunk = await _next_chunk(chunks)
+                except StopAsyncIteration:
+                    chunk = None
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception:
+            router.record(provider_name, model, time.perf_counter() - started, ok=False)
+            retry_manager.get_circuit_breaker(provider_name).record_failure()
+            raise
+        finally:
+            await chunks.aclose()
+        router.record(provider_name, model, time.perf_counter() - started, ok=True)
 
     async def generate_embedding(self, text: str) -> Tuple[List[float], Dict[str, Any]]:
         provider = self.get_or_create_provider("openai")
@@ -1112,11 +1396,39 @@ class LLMService:
     def invoke_sync(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text") -> Tuple[str, Dict[str, Any]]:
         return self.invoke_with_retry_sync(provider_name, model, system_prompt, user_prompt, request_id, response_format)
 
+    def _invoke_sync_once(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str, runtime: Optional[ProviderRuntimeConfig]) -> Tuple[str, Dict[str, Any]]:
+        """
+        One blocking provider call, bounded by the provider's ``timeout_ms``.
+
+        The SDK call cannot be interrupted, so one that runs past the deadline is
+        left to finish on its own thread and its result is discarded.
+        """
+        provider = self.get_or_create_provider(provider_name)
+        if runtime is None:
+            return provider.invoke_sync(model, system_prompt, user_prompt, request_id, response_format)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"llm-{provider_name}")
+        try:
+            future = executor.submit(provider.invoke_sync, model, system_prompt, user_prompt, request_id, response_format)
+            try:
+                return future.result(timeout=runtime.timeout_ms / 1000)
+            except FutureTimeoutError:
+                raise LLMError(
+                    error_code=LLMErrorCode.TIMEOUT,
+                    provider=provider_name,
+                    retryable=True,
+                    error_message=f"{provider_name} did not respond within {runtime.timeout_ms}ms",
+                )
+        finally:
+            executor.shutdown(wait=False)
+
     def invoke_with_retry_sync(self, provider_name: str, model: str, system_prompt: str, user_prompt: str, request_id: str, response_format: str = "text") -> Tuple[str, Dict[str, Any]]:
+        runtime = self._runtime_config(provider_name)
+
         def _invoke_sync():
-            provider = self.get_or_create_provider(provider_name)
-            return provider.invoke_sync(model, system_prompt, user_prompt, request_id, response_format)
-        return retry_manager.execute_with_retry_sync(_invoke_sync, provider_name)
+            return self._invoke_sync_once(provider_name, model, system_prompt, user_prompt, request_id, response_format, runtime)
+        return retry_manager.execute_with_retry_sync(
+            _invoke_sync, provider_name, max_retries=runtime.retries if runtime else None
+        )
 
     def generate_embedding_sync(self, text: str) -> Tuple[List[float], Dict[str, Any]]:
         provider = self.get_or_create_provider("openai")
@@ -3,9 +3,12 @@ Service for managing LLM provider strategies from a configuration file.
 """
 import yaml
 import logging
-from typing import Iterable, List, Optional, Dict, Any
+from typing import TYPE_CHECKING, Iterable, List, Optional, Dict, Any
 from pydantic import BaseModel, Field, ValidationError
 
+if TYPE_CHECKING:
+    from app.services.provider_config_service import ProviderConfigService
+
 logger = logging.getLogger(__name__)
 
 CONFIG_PATH = "config/providers.yml"
@@ -28,8 +31,9 @@ class LLMStrategyService:
     """
     Loads, validates, and provides access to the LLM provider strategy.
     """
-    def __init__(self, config_path: str = CONFIG_PATH):
+    def __init__(self, config_path: str = CONFIG_PATH, provider_configs: Optional["ProviderConfigService"] = None):
         self._config: Optional[StrategyConfig] = None
+        self._provider_configs = provider_configs
         self._load_config(config_path)
 
     def _load_config(self, config_path: str):
@@ -50,10 +54,41 @@ class LLMStrategyService:
             raise
 
     def get_default_panelists(self) -> List[ProviderPanelistConfig]:
-        """Returns the default list of panelist configurations."""
+        """Returns the default panelists with the admin-managed provider overrides applied."""
         if not self._config:
             return []
-        return self._config.panelists
+        return self._apply_runtime_overrides(self._config.panelists)
+
+    def _apply_runtime_overrides(
+        self, panelists: List[ProviderPanelistConfig]
+    ) -> List[ProviderPanelistConfig]:
+        """Drop disabled providers and apply model/timeout/retry overrides from the snapshot."""
+        try:
+            if self._provider_configs is None:
+                from app.services.provider_config_service import get_provider_config_service
+
+                self._provider_configs = get_provider_config_service()
+            snapshot = self._provider_configs.snapshot()
+        except Exception as e:
+            logger.debug(f"Provider config snapshot unavailable, using {CONFIG_PATH} as-is: {e}")
+            return panelists
+
+        resolved: List[ProviderPanelistConfig] = []
+        for panelist in panelists:
+            runtime = snapshot.get(panelist.provider)
+            if runtime is None:
+                resolved.append(panelist)
+            elif runtime.enabled:
+                resolved.append(
+                    panelist.model_copy(
+                        update={
+                            "model": runtime.model,
+                            "timeout_s": runtime.timeout_s,
+                            "max_retries": runtime.retries,
+                        }
+                    )
+                )
+        return resolved
 
     def _build_mock_panelists(self) -> List[ProviderPanelistConfig]:
         """Return deterministic mock panelists when only the mock provider is available."""
@@ -0,0 +1,135 @@
+"""
+Shared helpers for incremental LLM streaming: usage extraction from provider
+stream events, cost estimates and cheap cancellation checks.
+"""
+import inspect
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Approximate list prices (USD per million prompt/completion tokens) of each
+# provider's default chat model, used for the per-conversation cost estimate.
+PRICE_PER_MILLION_TOKENS: Dict[str, Tuple[float, float]] = {
+    "openai": (5.0, 15.0),
+    "anthropic": (15.0, 75.0),
+    "google": (3.5, 10.5),
+}
+
+# Redis is polled at most this often while streaming, not once per chunk.
+CANCEL_CHECK_INTERVAL_SECONDS = 0.25
+
+
+def estimate_cost_usd(provider: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = PRICE_PER_MILLION_TOKENS.get(provider, (0.0, 0.0))
+    return (prompt_tokens / 1_000_000) * prompt_price + (completion_tokens / 1_000_000) * completion_price
+
+
+def usage_dict(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def accumulate_anthropic_usage(event: Any, usage: Dict[str, int]) -> None:
+    """
+    Fold token counts from an Anthropic stream event into ``usage``.
+
+    ``message_start`` carries the input tokens, ``message_delta`` the running
+    output token count, which is final once the stream ends.
+    """
+    event_type = getattr(event, "type", None)
+    if event_type == "message_start":
+        message_usage = getattr(getattr(event, "message", None), "usage", None)
+        if message_usage is not None:
+            usage["prompt_tokens"] = int(getattr(message_usage, "input_tokens", 0) or 0)
+            usage["completion_tokens"] = int(getattr(message_usage, "output_tokens", 0) or 0)
+    elif event_type == "message_delta":
+        delta_usage = getattr(event, "usage", None)
+        if delta_usage is not None:
+            usage["completion_tokens"] = int(getattr(delta_usage, "output_tokens", 0) or 0)
+    usage["total_tokens"] = usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)
+
+
+def anthropic_text_delta(event: Any) -> Optional[str]:
+    if getattr(event, "type", None) != "content_block_delta":
+        return None
+    delta = getattr(event, "delta", None)
+    return getattr(delta, "text", None) or None
+
+
+def gemini_usage_from_chunk(chunk: Any) -> Optional[Dict[str, int]]:
+    """
+    Token usage reported on a Gemini stream chunk (the final chunk carries the totals).
+
+    Newer API versions attach ``usage_metadata``; older ones only report the
+    candidate's output ``token_count``.
+    """
+    metadata = getattr(chunk, "usage_metadata", None)
+    if metadata is not None and getattr(metadata, "total_token_count", 0):
+        prompt_tokens = int(getattr(metadata, "prompt_token_count", 0) or 0)
+        completion_tokens = int(getattr(metadata, "candidates_token_count", 0) or 0)
+        return usage_dict(prompt_tokens, completion_tokens)
+    candidates = getattr(chunk, "candidates", None) or []
+    token_count = int(getattr(candidates[0], "token_count", 0) or 0) if candidates else 0
+    if token_count:
+        return usage_dict(0, token_count)
+    return None
+
+
+def gemini_chunk_text(chunk: Any) -> str:
+    # ``chunk.text`` raises when a chunk has no text part (e.g. a final usage-only chunk).
+    try:
+        return chunk.text or ""
+    except ValueError:
+        return ""
+
+
+async def close_stream(stream: Any) -> None:
+    """
+    Release an upstream stream before it is exhausted so the provider stops generating.
+
+    Anthropic and OpenAI streams expose ``close()``; Gemini's response wrapper
+    does not, so the gRPC iterator it wraps is closed instead.
+    """
+    target = stream if hasattr(stream, "close") else getattr(stream, "_iterator", None)
+    closer = getattr(target, "close", None) or getattr(target, "aclose", None) or getattr(target, "cancel", None)
+    if closer is None:
+        return
+    try:
+        result = closer()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.debug(f"Failed to close upstream LLM stream: {e}")
+
+
+class CancellationWatcher:
+    """Checks the ``cancel:stream:{message_id}`` flag at most every ``interval`` seconds."""
+
+    def __init__(self, redis_client: Optional[redis.Redis], message_id: str, interval: float = CANCEL_CHECK_INTERVAL_SECONDS):
+        self._redis = redis_client
+        self._key = f"cancel:stream:{message_id}"
+        self._interval = interval
+        self._next_check = 0.0
+
+    def cancelled(self) -> bool:
+        if self._redis is None:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self._interval
+        try:
+            if self._redis.exists(self._key):
+                self._redis.delete(self._key)  # Clean up the key
+                return True
+        except RedisError as e:
+            logger.debug(f"Stream cancellation check failed for {self._key}: {e}")
+        return False
@@ -6,7 +6,7 @@ import logging
 import json
 import re
 import asyncio
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional, Tuple, Dict, Any, Set
 
 from rank_bm25 import BM25Okapi
@@ -19,8 +19,17 @@ from app.services.user_fact_service import UserFactService
 from app.services.hybrid_search_service import get_hybrid_search_service
 from app.core.secrets import SecretProvider
 from app.utils.helpers import generate_id, get_current_timestamp
+from app.utils.tokens import count_tokens
 from app.config.settings import settings
+from app.core.metrics import (
+    CONTEXT_DIGEST_TOKENS_SAVED_TOTAL,
+    MEMORY_ARCHIVE_ROOMS_TOTAL,
+    MEMORY_ARCHIVED_MESSAGES_TOTAL,
+    WEEKLY_DIGEST_TOKENS_SAVED,
+    WEEKLY_DIGESTS_TOTAL,
+)
 from app.services.fact_types import FactType
+from app.services.message_page_cache import get_message_page_cache
 from app.services.storage_service import storage_service
 
 logger = logging.getLogger(__name__)
@@ -43,6 +52,26 @@ except (TypeError, ValueError):
     _archive_min_messages = 5
 ARCHIVE_MIN_MESSAGES = max(_archive_min_messages, 1)
 
+ARCHIVE_MAX_BATCHES_PER_ROOM = max(int(getattr(settings, "MEMORY_ARCHIVE_MAX_BATCHES_PER_ROOM", 10)), 1)
+
+# Context summaries only use the last 20 turns; read a slightly larger page.
+CONTEXT_MESSAGE_WINDOW = 50
+
+WEEKLY_DIGEST_CONTEXT_WEEKS = max(int(getattr(settings, "WEEKLY_DIGEST_CONTEXT_WEEKS", 4)), 0)
+WEEKLY_DIGEST_MAX_MESSAGES = max(int(getattr(settings, "WEEKLY_DIGEST_MAX_MESSAGES", 2000)), 1)
+WEEKLY_DIGEST_MAX_INPUT_TOKENS = max(int(getattr(settings, "WEEKLY_DIGEST_MAX_INPUT_TOKENS", 6000)), 1)
+
+
+def weekly_digest_bounds(week_start: date) -> Tuple[int, int]:
+    """Unix timestamps [start, end) of the UTC week starting on ``week_start``."""
+    start = int(datetime(week_start.year, week_start.month, week_start.day, tzinfo=timezone.utc).timestamp())
+    return start, start + 7 * 24 * 60 * 60
+
+
+def last_complete_week_start(today: date) -> date:
+    """The Monday of the last full Monday-Sunday week before ``today``."""
+    return today - timedelta(days=today.weekday() + 7)
+
 class MemoryService:
     def __init__(self, db_service: DatabaseService, llm_service: LLMService, secret_provider: SecretProvider, user_fact_service: UserFactService):
         self.db = db_service
@@ -205,6 +234,28 @@ class MemoryService:
                 }
             )
 
+        # Weekly digests stand in for the raw history of earlier weeks: retrieved
+        # messages from a week a digest covers are dropped in favour of the digest.
+        room_names = {room.room_id: getattr(room, "name", room.room_id) for room in room_chain}
+        digest_weeks: Dict[Tuple[str, int, int], str] = {}
+        for digest in self._load_weekly_digests(list(room_names)):
+            text = (digest.get("text") or "").strip()
+            if not text:
+                continue
+            week_start = digest.get("week_start")
+            if isinstance(week_start, date):
+                digest_weeks[(digest.get("room_id"), *weekly_digest_bounds(week_start))] = text
+            context_blocks.append(
+                {
+                    "content": text,
+                    "room_id": digest.get("room_id"),
+                    "room_name": room_names.get(digest.get("room_id"), digest.get("room_id")),
+                    "source": "digest",
+                    "week_start": week_start.isoformat() if hasattr(week_start, "isoformat") else week_start,
+                }
+            )
+        displaced_tokens: Dict[Tuple[str, int, int], int] = {}
+
         if query:
             try:
                 memories = await self.get_relevant_memories_hybrid(
@@ -231,8 +282,12 @@ class MemoryService:
                 if not normalized or normalized in seen_memories:
                     continue
                 seen_memories.add(normalized)
-                room_name = None
                 memory_room_id = getattr(memory, "room_id", None)
+                week = self._digest_week_of(digest_weeks, memory_room_id, getattr(memory, "timestamp", None))
+                if week is not None:
+                    displaced_tokens[week] = displaced_tokens.get(week, 0) + count_tokens(normalized)
+                    continue
+                room_name = None
                 for room_obj in room_chain:
                     if room_obj.room_id == memory_room_id:
                         room_name = getattr(room_obj, "name", None)
@@ -246,12 +301,35 @@ class MemoryService:
                     }
                 )
 
+        for week, tokens in displaced_tokens.items():
+            CONTEXT_DIGEST_TOKENS_SAVED_TOTAL.inc(max(tokens - count_tokens(digest_weeks[week]), 0))
+
         return context_blocks
 
+    @staticmethod
+    def _digest_week_of(
+        digest_weeks: Dict[Tuple[str, int, int], str], room_id: Optional[str], timestamp: Any
+    ) -> Optional[Tuple[str, int, int]]:
+        """The digested week of ``room_id`` that ``timestamp`` falls in, if any."""
+        if room_id is None or not isinstance(timestamp, int):
+            return None
+        for week in digest_weeks:
+            week_room_id, start, end = week
+            if week_room_id == room_id and start <= timestamp < end:
+                return week
+        return None
+
+    async def _load_recent_messages(self, room_id: str) -> List[Message]:
+        """Context summaries only look at the tail of a room, so read a single recent page."""
+        messages, _ = await asyncio.to_thread(
+            storage_service.get_messages_page, room_id, limit=CONTEXT_MESSAGE_WINDOW
+        )
+        return messages
+
     async def get_context(self, room_id: str, user_id: str) -> Optional[ConversationContext]:
         """Return the cached conversation context or generate a fresh one from recent messages."""
         try:
-            messages = await asyncio.to_thread(storage_service.get_messages, room_id)
+            messages = await self._load_recent_messages(room_id)
         except Exception as fetch_error:
             logger.warning(
                 "Failed to load messages for context generation (room=%s, user=%s): %s",
@@ -282,7 +360,7 @@ class MemoryService:
     async def refresh_context(self, room_id: str, user_id: str) -> Optional[ConversationContext]:
         """Force a refresh of the cached conversation context for a room."""
         try:
-            messages = await asyncio.to_thread(storage_service.get_messages, room_id)
+            messages = await self._load_recent_messages(room_id)
         except Exception as fetch_error:
             logger.warning(
                 "Failed to load messages for context refresh (room=%s, user=%s): %s",
@@ -911,13 +989,27 @@ class MemoryService:
             "total_candidates": len(filtered_messages),
             "keywords": keyword_candidates,
         }
-    async def promote_memories(self, sub_room_id: str, main_room_id: str, user_id: str, criteria_text: str) -> str:
+    async def promote_memories(
+        self,
+        sub_room_id: str,
+        main_room_id: str,
+        user_id: str,
+        criteria_text: str,
+        message_ids: Optional[List[str]] = None,
+    ) -> str:
         """
         Summarizes a sub-room's conversation and promotes the summary as a new
-        fact to the main room's memory.
+        fact to the main room's memory. ``message_ids`` (sub-room messages, e.g.
+        picked from the promotion candidates) are also copied into the main room.
         """
         user_fact_service = self.user_fact_service # Already a dependency
 
+        if message_ids:
+            copied = await asyncio.to_thread(
+                storage_service.copy_messages_to_room, sub_room_id, message_ids, main_room_id
+            )
+            logger.info(f"Copied {copied} promoted messages from sub-room {sub_room_id} to main-room {main_room_id}.")
+
         # 1. Get all messages from the sub-room
         try:
             messages = await asyncio.to_thread(storage_service.get_messages, sub_room_id)
@@ -1043,28 +1135,98 @@ class MemoryService:
                 review_id,
             )
 
-    async def archive_old_memories(self, room_id: str):
-        """Summarize and archive messages that fall outside the active memory window."""
-        cutoff_seconds = ARCHIVE_WINDOW_DAYS * 24 * 60 * 60
-        cutoff_timestamp = get_current_timestamp() - cutoff_seconds
+    async def archive_old_memories(self, room_id: str) -> int:
+        """Summarize and archive messages that fall outside the active memory window.
 
+        Messages are read in keyset batches of ``ARCHIVE_BATCH_SIZE`` starting at the
+        room's archival watermark; each batch becomes one long-term memory and is
+        removed with a single range delete. At most ``ARCHIVE_MAX_BATCHES_PER_ROOM``
+        batches run per call; the room stays due if more remain. Afterwards the
+        room's ``archive_due_at`` is set to when its next message leaves the window.
+        Returns the number of messages archived.
+        """
+        now = get_current_timestamp()
+        window_seconds = ARCHIVE_WINDOW_DAYS * 24 * 60 * 60
+        cutoff_timestamp = now - window_seconds
+
+        try:
+            rows = self.db.execute_query("SELECT archived_through FROM rooms WHERE room_id = %s", (room_id,))
+        except Exception as db_error:
+            logger.warning("Failed to load archival watermark (room=%s): %s", room_id, db_error, exc_info=True)
+            return 0
+        if not rows:
+            return 0
+        watermark = int(rows[0].get("archived_through") or 0)
+
+        archived = 0
+        more_due = False
+        for batch_number in range(ARCHIVE_MAX_BATCHES_PER_ROOM):
+            batch = await self._archive_batch(room_id, watermark, cutoff_timestamp)
+            if batch is None:
+                # A failed batch leaves the room due; the next run retries it.
+                MEMORY_ARCHIVE_ROOMS_TOTAL.labels(outcome="failed").inc()
+                return archived
+            batch_archived, watermark, full = batch
+            archived += batch_archived
+            if not full:
+                break
+            more_due = batch_number == ARCHIVE_MAX_BATCHES_PER_ROOM - 1
+
+        if more_due:
+            due_query = "UPDATE rooms SET archive_due_at = %s WHERE room_id = %s"
+            due_params: Tuple[Any, ...] = (now, room_id)
+        else:
+            # Whatever is left past the cutoff is below ARCHIVE_MIN_MESSAGES; look again
+            # once the next message crosses the window.
+            due_query = (
+                "UPDATE rooms SET archive_due_at = ("
+                "SELECT MIN(timestamp) + %s FROM messages WHERE room_id = %s AND timestamp >= %s"
+                ") WHERE room_id = %s"
+            )
+            due_params = (window_seconds, room_id, cutoff_timestamp, room_id)
+        try:
+            self.db.execute_update(due_query, due_params)
+        except Exception as db_error:
+            logger.warning("Failed to update archival due time (room=%s): %s", room_id, db_error, exc_info=True)
+
+        MEMORY_ARCHIVE_ROOMS_TOTAL.labels(outcome="archived" if archived else "skipped").inc()
+        MEMORY_ARCHIVED_MESSAGES_TOTAL.inc(archived)
+        return archived
+
+    async def _archive_batch(
+        self, room_id: str, watermark: int, cutoff_timestamp: int
+    ) -> Optional[Tuple[int, int, bool]]:
+        """Archive the next batch past the cutoff.
+
+        Returns (messages archived, new watermark, whether the batch was full), or
+        None if archiving it failed.
+        """
         fetch_query = (
             """
             SELECT message_id, room_id, user_id, role,
                    COALESCE(pgp_sym_decrypt(content, %s)::text, content_searchable) AS content,
                    timestamp
             FROM messages
-            WHERE room_id = %s AND timestamp < %s
-            ORDER BY timestamp ASC
+            WHERE room_id = %s AND timestamp >= %s AND timestamp < %s
+            ORDER BY timestamp ASC, message_id ASC
             LIMIT %s
             """
         )
-        params = (self.db_encryption_key, room_id, cutoff_timestamp, ARCHIVE_BATCH_SIZE)
+        params = (self.db_encryption_key, room_id, watermark, cutoff_timestamp, ARCHIVE_BATCH_SIZE)
         try:
             rows = self.db.execute_query(fetch_query, params)
         except Exception as db_error:
             logger.warning("Failed to load messages for archival (room=%s): %s", room_id, db_error, exc_info=True)
-            return
+            return None
+
+        if len(rows) < ARCHIVE_MIN_MESSAGES:
+            logger.debug(
+                "Skipping archival for room %s (messages available: %s, minimum required: %s)",
+                room_id,
+                len(rows),
+                ARCHIVE_MIN_MESSAGES,
+            )
+            return 0, watermark, False
 
         messages: List[Message] = []
         for row in rows:
@@ -1085,94 +1247,214 @@ class MemoryService:
                     timestamp=timestamp,
                 )
             )
+        first_row, last_row = rows[0], rows[-1]
+        full = len(rows) == ARCHIVE_BATCH_SIZE
 
-        if len(messages) < ARCHIVE_MIN_MESSAGES:
-            logger.debug(
-                "Skipping archival for room %s (messages available: %s, minimum required: %s)",
-                room_id,
-                len(messages),
-                ARCHIVE_MIN_MESSAGES,
+        summary = ""
+        if messages:
+            transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
+            system_prompt = (
+                "You compress historical chat logs into long-term memory. "
+                "Write a concise summary (3-5 sentences) emphasising facts, decisions, and follow-ups that should be remembered."
             )
-            return
+            user_prompt = "Conversation transcript:\n" + transcript
+            try:
+                summary, _ = await self.llm_service.invoke(
+                    provider_name="openai",
+                    model=settings.LLM_MODEL,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    request_id=f"memory-archive-{room_id}",
+                )
+            except Exception as llm_error:
+                logger.warning("Failed to generate archive summary for room %s: %s", room_id, llm_error)
+                summary = self._fallback_summary(messages)
+            summary = (summary or "").strip() or self._fallback_summary(messages)
 
-        transcript = "\n".join(f"{msg.role}: {msg.content}" for msg in messages)
-        system_prompt = (
-            "You compress historical chat logs into long-term memory. "
-            "Write a concise summary (3-5 sentences) emphasising facts, decisions, and follow-ups that should be remembered."
-        )
-        user_prompt = "Conversation transcript:\n" + transcript
-        try:
-            summary, _ = await self.llm_service.invoke(
-                provider_name="openai",
-                model=settings.LLM_MODEL,
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                request_id=f"memory-archive-{room_id}",
-            )
-        except Exception as llm_error:
-            logger.warning("Failed to generate archive summary for room %s: %s", room_id, llm_error)
-            summary = self._fallback_summary(messages)
+        embedding = None
+        if summary:
+            try:
+                embedding, _ = await self.llm_service.generate_embedding(summary)
+            except Exception as embed_error:
+                logger.warning("Failed to generate embedding for archive summary (room=%s): %s", room_id, embed_error)
+                return None
 
-        summary = (summary or "").strip()
-        if not summary:
-            logger.debug("Generated archive summary was empty for room %s; skipping archival.", room_id)
-            return
+            try:
+                room = await asyncio.to_thread(storage_service.get_room, room_id)
+            except Exception:
+                room = None
+            archive_user_id = getattr(room, "owner_id", None) or messages[0].user_id
 
+        created_at = get_current_timestamp()
         try:
-            embedding, _ = await self.llm_service.generate_embedding(summary)
-        except Exception as embed_error:
-            logger.warning("Failed to generate embedding for archive summary (room=%s): %s", room_id, embed_error)
-            return
+            with self.db.transaction(query_type="memory_archive") as cur:
+                if summary:
+                    cur.execute(
+                        """
+                        INSERT INTO memories (memory_id, user_id, room_id, key, value, embedding, importance, expires_at, created_at)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        (
+                            generate_id("mem"),
+                            archive_user_id,
+                            room_id,
+                            f"archive_{first_row['timestamp']}_{last_row['timestamp']}",
+                            summary,
+                            embedding,
+                            0.6,
+                            None,
+                            created_at,
+                        ),
+                    )
+                # The batch is exactly the keyset range it was read from, so one range
+                # delete on (room_id, timestamp, message_id) removes it.
+                cur.execute(
+                    "DELETE FROM messages WHERE room_id = %s AND timestamp >= %s "
+                    "AND (timestamp, message_id) <= (%s, %s)",
+                    (room_id, watermark, last_row["timestamp"], last_row["message_id"]),
+                )
+                deleted_count = cur.rowcount or 0
+                cur.execute(
+                    "UPDATE rooms SET message_count = GREATEST(message_count - %s, 0), "
+                    "archived_through = %s, updated_at = %s WHERE room_id = %s",
+                    (deleted_count, last_row["timestamp"], created_at, room_id),
+                )
+        except Exception as db_error:
+            logger.warning("Failed to archive messages for room %s: %s", room_id, db_error, exc_info=True)
+            return None
 
+        if deleted_count:
+            # Cached history pages may still hold the deleted messages.
+            await asyncio.to_thread(get_message_page_cache().invalidate, room_id)
+        return deleted_count, int(last_row["timestamp"]), full
+
+    async def generate_weekly_digest(self, room_id: str, week_start: date) -> Optional[Dict[str, Any]]:
+        """Summarize one week of a room into ``summary_notes``.
+
+        The previous week's digest is given to the model as context, so each digest
+        only has to read its own week. ``tokens_saved_estimate`` is the tokens of the
+        week's messages minus those of the digest that stands in for them. Returns the
+        stored digest, or None if the room had no messages that week, already has a
+        digest for it, or summarization failed.
+        """
+        week_start_ts, week_end_ts = weekly_digest_bounds(week_start)
         try:
-            room = await asyncio.to_thread(storage_service.get_room, room_id)
-        except Exception:
-            room = None
+            existing = self.db.execute_query(
+                "SELECT 1 FROM summary_notes WHERE room_id = %s AND week_start = %s LIMIT 1",
+                (room_id, week_start),
+            )
+            if existing:
+                WEEKLY_DIGESTS_TOTAL.labels(outcome="exists").inc()
+                return None
+            rows = self.db.execute_query(
+                """
+                SELECT role, COALESCE(pgp_sym_decrypt(content, %s)::text, content_searchable) AS content
+                FROM messages
+                WHERE room_id = %s AND timestamp >= %s AND timestamp < %s
+                ORDER BY timestamp ASC, message_id ASC
+                LIMIT %s
+                """,
+                (self.db_encryption_key, room_id, week_start_ts, week_end_ts, WEEKLY_DIGEST_MAX_MESSAGES),
+            )
+            previous = self.db.execute_query(
+                "SELECT text FROM summary_notes WHERE room_id = %s AND week_start < %s "
+                "ORDER BY week_start DESC LIMIT 1",
+                (room_id, week_start),
+            )
+        except Exception as db_error:
+            logger.warning("Failed to load week %s of room %s for its digest: %s", week_start, room_id, db_error, exc_info=True)
+            WEEKLY_DIGESTS_TOTAL.labels(outcome="failed").inc()
+            return None
 
-        archive_user_id = getattr(room, "owner_id", None) or messages[0].user_id
-        created_at = get_current_timestamp()
-        memory_id = generate_id("mem")
-        memory_key = f"archive_before_{cutoff_timestamp}"
+        lines = [f"{row.get('role', 'user')}: {(row.get('content') or '').strip()}" for row in rows]
+        lines = [line for line in lines if not line.endswith(": ")]
+        if not lines:
+            WEEKLY_DIGESTS_TOTAL.labels(outcome="inactive").inc()
+            return None
 
-        insert_query = (
-            """
-            INSERT INTO memories (memory_id, user_id, room_id, key, value, embedding, importance, expires_at, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
+        raw_tokens = sum(count_tokens(line) for line in lines)
+        transcript_lines: List[str] = []
+        budget = WEEKLY_DIGEST_MAX_INPUT_TOKENS
+        for line in lines:
+            line_tokens = count_tokens(line)
+            if line_tokens > budget:
+                transcript_lines.append("... (이후 대화 생략)")
+                break
+            transcript_lines.append(line)
+            budget -= line_tokens
+
+        previous_text = (previous[0].get("text") or "").strip() if previous else ""
+        system_prompt = (
+            "You write weekly digests of a chat room for long-term memory. "
+            "Summarize this week's conversation in 5-8 sentences: decisions, facts, open questions and follow-ups. "
+            "Use the previous week's digest only to resolve references and note what changed; do not repeat it. "
+            "Write in the language of the conversation."
         )
-        insert_params = (
-            memory_id,
-            archive_user_id,
-            room_id,
-            memory_key,
-            summary,
-            embedding,
-            0.6,
-            None,
-            created_at,
+        user_prompt = (
+            (f"Previous week's digest:\n{previous_text}\n\n" if previous_text else "")
+            + f"This week's conversation ({week_start.isoformat()}):\n"
+            + "\n".join(transcript_lines)
         )
         try:
-            self.db.execute_update(insert_query, insert_params)
-        except Exception as db_error:
-            logger.warning("Failed to persist archive summary for room %s: %s", room_id, db_error, exc_info=True)
-            return
+            digest, _ = await self.llm_service.invoke(
+                provider_name="openai",
+                model=settings.LLM_MODEL,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                request_id=f"weekly-digest-{room_id}-{week_start.isoformat()}",
+            )
+        except Exception as llm_error:
+            logger.warning("Failed to generate weekly digest for room %s (%s): %s", room_id, week_start, llm_error)
+            WEEKLY_DIGESTS_TOTAL.labels(outcome="failed").inc()
+            return None
+        digest = (digest or "").strip()
+        if not digest:
+            WEEKLY_DIGESTS_TOTAL.labels(outcome="failed").inc()
+            return None
 
-        message_ids = [msg.message_id for msg in messages]
-        placeholders = ",".join(["%s"] * len(message_ids))
-        delete_query = f"DELETE FROM messages WHERE message_id IN ({placeholders})"
+        tokens_saved = max(raw_tokens - count_tokens(digest), 0)
         try:
-            deleted_count = self.db.execute_update(delete_query, tuple(message_ids))
+            # Inserted only if no digest appeared for the week in the meantime.
+            self.db.execute_update(
+                """
+                INSERT INTO summary_notes (room_id, week_start, text, tokens_saved_estimate)
+                SELECT %s, %s, %s, %s
+                WHERE NOT EXISTS (SELECT 1 FROM summary_notes WHERE room_id = %s AND week_start = %s)
+                """,
+                (room_id, week_start, digest, tokens_saved, room_id, week_start),
+            )
         except Exception as db_error:
-            logger.warning("Failed to delete archived messages for room %s: %s", room_id, db_error, exc_info=True)
-            return
+            logger.warning("Failed to store weekly digest for room %s (%s): %s", room_id, week_start, db_error, exc_info=True)
+            WEEKLY_DIGESTS_TOTAL.labels(outcome="failed").inc()
+            return None
 
-        if deleted_count:
-            update_room_query = "UPDATE rooms SET message_count = GREATEST(message_count - %s, 0), updated_at = %s WHERE room_id = %s"
-            try:
-                self.db.execute_update(update_room_query, (deleted_count, created_at, room_id))
-            except Exception as db_error:
-                logger.warning("Failed to update room statistics after archival (room=%s): %s", room_id, db_error, exc_info=True)
+        WEEKLY_DIGESTS_TOTAL.labels(outcome="created").inc()
+        WEEKLY_DIGEST_TOKENS_SAVED.observe(tokens_saved)
+        return {"room_id": room_id, "week_start": week_start, "text": digest, "tokens_saved_estimate": tokens_saved}
 
+    def _load_weekly_digests(self, room_ids: List[str]) -> List[Dict[str, Any]]:
+        """The most recent weekly digests of the given rooms, newest first."""
+        if not room_ids or WEEKLY_DIGEST_CONTEXT_WEEKS <= 0:
+            return []
+        try:
+            # Limited per room, so a busy room cannot crowd out the digests of its parents.
+            return self.db.execute_query(
+                """
+                SELECT room_id, week_start, text, tokens_saved_estimate
+                FROM (
+                    SELECT room_id, week_start, text, tokens_saved_estimate,
+                           ROW_NUMBER() OVER (PARTITION BY room_id ORDER BY week_start DESC) AS recency
+                    FROM summary_notes
+                    WHERE room_id = ANY(%s)
+                ) recent
+                WHERE recency <= %s
+                ORDER BY week_start DESC
+                """,
+                (list(room_ids), WEEKLY_DIGEST_CONTEXT_WEEKS),
+            )
+        except Exception as db_error:
+            logger.warning("Failed to load weekly digests for rooms %s: %s", room_ids, db_error, exc_info=True)
+            return []
 
 # Global service instance
 memory_service: "MemoryService" = None
@@ -0,0 +1,121 @@
+"""
+Process-local cache of recently decrypted room history pages.
+
+Decrypted content never leaves the process. Cross-process invalidation uses a
+per-room generation counter in Redis: writers bump it, readers fold it into the
+cache key, so a page cached before a write is simply never looked up again.
+When Redis is unreachable the cache falls back to a local generation and the
+TTL bounds how stale another process's pages can get.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from app.config.settings import get_effective_redis_url, settings
+from app.models.schemas import Message
+
+logger = logging.getLogger(__name__)
+
+_GENERATION_KEY = "room_history_gen:{room_id}"
+_REDIS_RETRY_SECONDS = 30.0
+
+MessagePage = Tuple[List[Message], bool]
+
+
+class MessagePageCache:
+    """Bounded LRU of ``(messages, has_more)`` pages keyed by room generation and cursor."""
+
+    def __init__(self, max_pages: int, ttl_seconds: float) -> None:
+        self._max_pages = max_pages
+        self._ttl = ttl_seconds
+        self._pages: "OrderedDict[Hashable, Tuple[float, MessagePage]]" = OrderedDict()
+        self._local_generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_retry_at = 0.0
+
+    def get(self, room_id: str, cursor: Hashable) -> Optional[MessagePage]:
+        if self._max_pages <= 0:
+            return None
+        key = (room_id, self._generation(room_id), cursor)
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None:
+                return None
+            stored_at, page = entry
+            if time.monotonic() - stored_at > self._ttl:
+                del self._pages[key]
+                return None
+            self._pages.move_to_end(key)
+        messages, has_more = page
+        return list(messages), has_more
+
+    def put(self, room_id: str, cursor: Hashable, page: MessagePage) -> None:
+        if self._max_pages <= 0:
+            return
+        key = (room_id, self._generation(room_id), cursor)
+        messages, has_more = page
+        with self._lock:
+            self._pages[key] = (time.monotonic(), (list(messages), has_more))
+            self._pages.move_to_end(key)
+            while len(self._pages) > self._max_pages:
+                self._pages.popitem(last=False)
+
+    def invalidate(self, room_id: str) -> None:
+        """Retire every cached page of ``room_id`` in this and all other processes."""
+        with self._lock:
+            self._local_generations[room_id] = self._local_generations.get(room_id, 0) + 1
+            for key in [key for key in self._pages if key[0] == room_id]:
+                del self._pages[key]
+        client = self._redis_client()
+        if client is None:
+            return
+        try:
+            client.incr(_GENERATION_KEY.format(room_id=room_id))
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _generation(self, room_id: str) -> Tuple[int, int]:
+        local = self._local_generations.get(room_id, 0)
+        client = self._redis_client()
+        if client is None:
+            return local, -1
+        try:
+            return local, int(client.get(_GENERATION_KEY.format(room_id=room_id)) or 0)
+        except Exception as e:
+            self._redis_failed(e)
+            return local, -1
+
+    def _redis_client(self):
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        redis_url = get_effective_redis_url()
+        if not redis_url:
+            self._redis_retry_at = float("inf")
+            return None
+        import redis
+
+        self._redis = redis.from_url(redis_url, decode_responses=True, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.debug(f"Message page cache falling back to local generations: {error}")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+
+_message_page_cache: Optional[MessagePageCache] = None
+
+
+def get_message_page_cache() -> MessagePageCache:
+    global _message_page_cache
+    if _message_page_cache is None:
+        _message_page_cache = MessagePageCache(
+            max_pages=settings.MESSAGE_PAGE_CACHE_MAX_PAGES,
+            ttl_seconds=settings.MESSAGE_PAGE_CACHE_TTL_SECONDS,
+        )
+    return _message_page_cache
@@ -172,6 +172,8 @@ async def ensure_fact_extraction(
             user_fact_service,
             fact_extractor_service,
             message,
+            kind="fact_extraction",
+            dedupe_key=task_id,
         )
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.error(
@@ -263,34 +265,31 @@ async def build_fact_query_response(
         return None, None
 
     cache_key = f"fact_query:{user_id}:{queried_fact_type.value}"
-    facts_to_format: List[str] = []
 
-    cached = await maybe_await(cache_service.get(cache_key))
-    if cached:
-        facts_to_format = cached
-    else:
+    async def load_facts() -> Optional[List[str]]:
         if queried_fact_type == FactType.USER_NAME:
             profile = await maybe_await(user_fact_service.get_user_profile(user_id))
             if profile and getattr(profile, "name", None):
-                facts_to_format = [profile.name]
-        else:
-            user_facts = await maybe_await(
-                user_fact_service.list_facts(
-                    user_id=user_id,
-                    fact_type=queried_fact_type,
-                    latest_only=True,
-                )
-            )
-            if user_facts:
-                facts_to_format = [
-                    fact.get("content") or fact.get("value")
-                    for fact in user_facts
-                    if fact.get("content") or fact.get("value")
-                ]
-        if facts_to_format:
-            await maybe_await(
-                cache_service.set(cache_key, facts_to_format, ttl=3600)
+                return [profile.name]
+            return None
+        user_facts = await maybe_await(
+            user_fact_service.list_facts(
+                user_id=user_id,
+                fact_type=queried_fact_type,
+                latest_only=True,
             )
+        )
+        values = [
+            fact.get("content") or fact.get("value")
+            for fact in user_facts or []
+            if fact.get("content") or fact.get("value")
+        ]
+        # Nothing is cached for an empty result so a newly saved fact shows up at once.
+        return values or None
+
+    facts_to_format: List[str] = (
+        await maybe_await(cache_service.get_or_set(cache_key, load_facts, ttl=3600)) or []
+    )
 
     ai_content = (
         f"'{queried_fact_type.value}'에 대해 알려주신 정보가 아직 없어요."
@@ -419,6 +418,9 @@ def schedule_context_refresh(
             memory_service.refresh_context,
             room_id,
             user_id,
+            kind="context_refresh",
+            # A refresh reads the room's latest state, so one pending refresh covers every trigger.
+            dedupe_key=f"context_refresh:{room_id}:{user_id}",
         )
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.warning(
@@ -512,21 +514,13 @@ async def build_quick_intent_response(
         location = (
             entities.get("location") if isinstance(entities, dict) else None
         ) or "서울"
-        cache_key = f"weather:{location.lower()}"
-        cached_report = await maybe_await(cache_service.get(cache_key))
-        weather_report: Optional[Dict[str, Any]] = None
-        if cached_report:
-            weather_report = cached_report
-        else:
-            weather_report = await maybe_await(search_service.weather(location))
-            if weather_report:
-                await maybe_await(
-                    cache_service.set(
-                        cache_key,
-                        weather_report,
-                        ttl=settings.WEATHER_CACHE_SECONDS,
-                    )
-                )
+        weather_report: Optional[Dict[str, Any]] = await maybe_await(
+            cache_service.get_or_set(
+                f"weather:{location.lower()}",
+                lambda: maybe_await(search_service.weather(location)),
+                ttl=settings.WEATHER_CACHE_SECONDS,
+            )
+        )
 
         if not weather_report:
             return QuickIntentResult(
@@ -1046,6 +1040,7 @@ class MessagePipeline:
             task=tool_name,
             intent=tool_name,
             metadata={**tool_metadata, "tool": tool_name},
+            interactive=True,
         )
 
         system_prompt = (
@@ -1076,7 +1071,7 @@ class MessagePipeline:
         user_prompt = "\n\n".join(user_prompt_parts)
 
         try:
-            response_text, _ = await self.llm_service.invoke(
+            response_text, _ = await self.llm_service.invoke_hedged(
                 model=model_name,
                 system_prompt=system_prompt,
                 user_prompt=user_prompt,
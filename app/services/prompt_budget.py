@@ -0,0 +1,119 @@
+"""
+Token budgets for review round prompts.
+
+A round prompt is a ``prompts.yml`` template plus a few variable sections: the
+user's instruction, the panelist's own history, digests of the other
+panelists and an excerpt of the conversation so far. Those sections grow with
+panel size and verbosity, so each one is offered as a list of renderings from
+most to least detailed, with a priority and an optional cap on its share of
+the budget.
+
+Tokens are counted with the tokenizer of the model the prompt is sent to. The
+template's fixed text is counted once with every section empty; what is left
+of the budget goes to the sections. A section over its cap switches to a
+shorter rendering. If the sections together are still over budget, the
+lowest-priority section is shortened first, then the next one; a section with
+no shorter rendering left is cut at a token boundary.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+from app.utils.tokens import count_tokens, split_by_tokens
+
+ELLIPSIS = "…"
+
+
+@dataclass
+class PromptSection:
+    """A template field whose text can shrink; ``variants`` go from most to least detailed."""
+
+    name: str
+    variants: Sequence[str]
+    priority: int
+    max_share: float = 1.0
+
+
+@dataclass
+class BudgetedPrompt:
+    prompt: str
+    tokens: int
+    section_tokens: Dict[str, int]
+    compressed: List[str] = field(default_factory=list)
+
+
+class _Fitted:
+    def __init__(self, section: PromptSection, count: Callable[[str], int], model: Optional[str]) -> None:
+        self.section = section
+        self.level = 0
+        self.text = section.variants[0] if section.variants else ""
+        self.tokens = count(self.text)
+        self.truncated = False
+        self._count = count
+        self._model = model
+
+    @property
+    def compressed(self) -> bool:
+        return self.level > 0 or self.truncated
+
+    def shorten(self) -> bool:
+        """Switch to the next shorter rendering; False if there is none."""
+        if self.level + 1 >= len(self.section.variants):
+            return False
+        self.level += 1
+        self.text = self.section.variants[self.level]
+        self.tokens = self._count(self.text)
+        return True
+
+    def fit(self, max_tokens: int) -> None:
+        while self.tokens > max_tokens and self.shorten():
+            pass
+        if self.tokens > max_tokens:
+            self.text = _truncate(self.text, max_tokens, self._model)
+            self.tokens = self._count(self.text)
+            self.truncated = True
+
+
+def _truncate(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    if max_tokens <= 1:
+        return ""
+    return split_by_tokens(text, max_tokens - 1, model)[0].rstrip() + ELLIPSIS
+
+
+class PromptBudget:
+    """Fits prompt sections into ``max_tokens`` of the given model's tokenizer."""
+
+    def __init__(self, max_tokens: int, model: Optional[str] = None) -> None:
+        self.max_tokens = max_tokens
+        self.model = model
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def assemble(self, render: Callable[..., str], sections: Sequence[PromptSection]) -> BudgetedPrompt:
+        """Render the prompt with every section at the most detail that fits the budget."""
+        overhead = self.count(render(**{section.name: "" for section in sections}))
+        available = max(0, self.max_tokens - overhead)
+        fitted = [_Fitted(section, self.count, self.model) for section in sections]
+
+        for item in fitted:
+            if item.section.max_share < 1.0:
+                item.fit(int(available * item.section.max_share))
+
+        by_priority = sorted(fitted, key=lambda item: item.section.priority)
+        for item in by_priority:
+            while sum(f.tokens for f in fitted) > available and item.shorten():
+                pass
+        for item in by_priority:
+            excess = sum(f.tokens for f in fitted) - available
+            if excess <= 0:
+                break
+            item.fit(item.tokens - excess)
+
+        prompt = render(**{item.section.name: item.text for item in fitted})
+        return BudgetedPrompt(
+            prompt=prompt,
+            tokens=self.count(prompt),
+            section_tokens={item.section.name: item.tokens for item in fitted},
+            compressed=[item.section.name for item in fitted if item.compressed],
+        )
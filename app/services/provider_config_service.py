@@ -0,0 +1,210 @@
+"""
+Process-local, versioned snapshot of the admin-managed ``provider_configs`` table.
+
+Each API pod and Celery worker keeps one immutable snapshot in memory so the
+LLM call path never reads the database. Admin updates bump a version counter in
+Redis and publish on ``PROVIDER_CONFIG_CHANNEL``; every process listening on the
+channel marks its snapshot stale, and the next read starts a background reload
+while it keeps serving the current snapshot, so the async invoke path never
+waits on the database or Redis. A max-age refresh covers processes that miss a
+message (e.g. while Redis was unreachable). Only the very first read of a
+process loads synchronously; the API warms it at startup off the event loop.
+"""
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from app.config.settings import get_effective_redis_url, settings
+from app.services.database_service import DatabaseService, get_database_service
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_CONFIG_CHANNEL = "provider_config_updates"
+PROVIDER_CONFIG_VERSION_KEY = "provider_config:version"
+
+
+@dataclass(frozen=True)
+class ProviderRuntimeConfig:
+    """Runtime-tunable settings for a single provider."""
+    provider_name: str
+    model: str
+    timeout_ms: int
+    retries: int
+    enabled: bool = True
+
+    @property
+    def timeout_s(self) -> int:
+        return max(1, math.ceil(self.timeout_ms / 1000))
+
+
+@dataclass(frozen=True)
+class ProviderConfigSnapshot:
+    version: int
+    loaded_at: float
+    providers: Dict[str, ProviderRuntimeConfig] = field(default_factory=dict)
+
+    def get(self, provider_name: str) -> Optional[ProviderRuntimeConfig]:
+        return self.providers.get((provider_name or "").lower())
+
+    def is_enabled(self, provider_name: str) -> bool:
+        config = self.get(provider_name)
+        return config.enabled if config else True
+
+
+_EMPTY_SNAPSHOT = ProviderConfigSnapshot(version=0, loaded_at=0.0)
+
+
+class ProviderConfigService:
+    """Serves the cached provider snapshot and keeps it in sync across processes."""
+
+    def __init__(self, db_service: DatabaseService, max_age_seconds: Optional[float] = None):
+        self.db = db_service
+        self._max_age = settings.PROVIDER_CONFIG_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+        self._snapshot: ProviderConfigSnapshot = _EMPTY_SNAPSHOT
+        self._stale = True
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._refresher: Optional[threading.Thread] = None
+
+    def snapshot(self) -> ProviderConfigSnapshot:
+        """Return the current snapshot; when invalidated or expired it is reloaded in the background."""
+        self._ensure_listener()
+        current = self._snapshot
+        if current is _EMPTY_SNAPSHOT:
+            with self._load_lock:
+                if self._snapshot is _EMPTY_SNAPSHOT:
+                    self._reload()
+                return self._snapshot
+        if self._stale or time.monotonic() - current.loaded_at >= self._max_age:
+            self._refresh_in_background()
+        return current
+
+    def refresh(self) -> ProviderConfigSnapshot:
+        """Reload the snapshot now; blocking, so async callers run it in a thread."""
+        with self._load_lock:
+            self._reload()
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def publish_update(self) -> int:
+        """Bump the shared version and notify every process; returns the new version."""
+        self.invalidate()
+        client = self._redis_client()
+        if client is None:
+            return self._snapshot.version + 1
+        try:
+            version = int(client.incr(PROVIDER_CONFIG_VERSION_KEY))
+            client.publish(PROVIDER_CONFIG_CHANNEL, str(version))
+            return version
+        except Exception as e:
+            logger.warning(f"Failed to publish provider config update: {e}")
+            return self._snapshot.version + 1
+        finally:
+            client.close()
+
+    def _reload(self) -> None:
+        # Cleared first: an invalidation that arrives during the load marks it stale again.
+        self._stale = False
+        self._snapshot = self._load()
+
+    def _refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self.refresh, name="provider-config-refresh", daemon=True)
+            self._refresher.start()
+
+    def _load(self) -> ProviderConfigSnapshot:
+        version = self._read_version()
+        try:
+            rows = self.db.execute_query(
+                "SELECT provider_name, model, timeout_ms, retries, enabled FROM provider_configs"
+            )
+        except Exception as e:
+            # Keep serving the last good snapshot; retry after the max-age window.
+            logger.warning(f"Failed to load provider configs, keeping version {self._snapshot.version}: {e}")
+            return ProviderConfigSnapshot(
+                version=self._snapshot.version,
+                loaded_at=time.monotonic(),
+                providers=self._snapshot.providers,
+            )
+        providers = {
+            row["provider_name"].lower(): ProviderRuntimeConfig(
+                provider_name=row["provider_name"].lower(),
+                model=row["model"],
+                timeout_ms=int(row["timeout_ms"]),
+                retries=int(row["retries"]),
+                enabled=bool(row["enabled"]),
+            )
+            for row in rows
+        }
+        logger.info(f"Loaded provider config snapshot version {version} ({len(providers)} providers).")
+        return ProviderConfigSnapshot(version=version, loaded_at=time.monotonic(), providers=providers)
+
+    def _read_version(self) -> int:
+        client = self._redis_client()
+        if client is None:
+            return self._snapshot.version
+        try:
+            return int(client.get(PROVIDER_CONFIG_VERSION_KEY) or 0)
+        except Exception:
+            return self._snapshot.version
+        finally:
+            client.close()
+
+    @staticmethod
+    def _redis_client():
+        redis_url = get_effective_redis_url()
+        if not redis_url:
+            return None
+        import redis
+
+        return redis.from_url(redis_url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2)
+
+    def _ensure_listener(self) -> None:
+        if self._listener is not None or not get_effective_redis_url():
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(target=self._listen, name="provider-config-listener", daemon=True)
+            self._listener.start()
+
+    def _listen(self) -> None:
+        while True:
+            client = self._redis_client()
+            if client is None:
+                return
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(PROVIDER_CONFIG_CHANNEL)
+                # Anything published while we were (re)connecting is covered by a reload.
+                self.invalidate()
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        logger.info(f"Provider config version {message.get('data')} published; invalidating snapshot.")
+                        self.invalidate()
+            except Exception as e:
+                logger.debug(f"Provider config listener disconnected: {e}")
+                time.sleep(5)
+            finally:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+
+
+_provider_config_service_instance: Optional[ProviderConfigService] = None
+
+
+def get_provider_config_service() -> ProviderConfigService:
+    global _provider_config_service_instance
+    if _provider_config_service_instance is None:
+        _provider_config_service_instance = ProviderConfigService(db_service=get_database_service())
+    return _provider_config_service_instance
@@ -0,0 +1,308 @@
+"""
+Latency-aware LLM provider routing with hedged requests.
+
+Every provider call records its latency and outcome in a rolling window per
+provider/model. Windows are shared across processes through capped Redis lists.
+A background thread pushes this process's new samples and re-reads the windows
+of every candidate the process has recorded or been asked about, every
+``LLM_ROUTER_REFRESH_SECONDS`` (and at once when a new candidate shows up), in
+one pipeline; ``record`` and the routing decisions only touch memory, so no
+Redis round trip runs on the event loop. A process sees its own samples
+immediately. Interactive calls go to the healthy candidate with the
+lowest p50, and :meth:`LatencyRouter.hedged` starts a duplicate request on the
+next candidate once the primary has run past its p95, keeping whichever
+answers first and cancelling the other.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from app.config.settings import get_effective_redis_url, settings
+from app.core.metrics import LLM_HEDGED_REQUESTS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+Candidate = Tuple[str, str]  # (provider, model)
+Sample = Tuple[float, float, bool]  # (recorded_at, latency_seconds, ok)
+
+_SAMPLES_KEY = "llm_router:samples:{provider}:{model}"
+_REDIS_RETRY_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class ProviderHealth:
+    samples: int
+    p50: Optional[float]
+    p95: Optional[float]
+    error_rate: float
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class LatencyRouter:
+    """Rolling per-provider latency/error statistics and the routing decisions built on them."""
+
+    def __init__(
+        self,
+        window_size: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        max_error_rate: Optional[float] = None,
+        refresh_seconds: Optional[float] = None,
+        use_redis: bool = True,
+    ) -> None:
+        self._window_size = window_size or settings.LLM_ROUTER_WINDOW_SIZE
+        self._window_seconds = window_seconds or settings.LLM_ROUTER_WINDOW_SECONDS
+        self._min_samples = settings.LLM_ROUTER_MIN_SAMPLES if min_samples is None else min_samples
+        self._max_error_rate = settings.LLM_ROUTER_MAX_ERROR_RATE if max_error_rate is None else max_error_rate
+        self._refresh_seconds = settings.LLM_ROUTER_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._windows: Dict[Candidate, Deque[Sample]] = {}
+        self._known: Set[Candidate] = set()
+        self._unsynced: List[Tuple[Candidate, Sample]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._redis = None
+        self._redis_retry_at = 0.0 if use_redis else math.inf
+
+    # --- Statistics ---
+
+    def record(self, provider: str, model: str, latency_seconds: float, ok: bool) -> None:
+        """Add one finished call to the provider/model window; the sync thread shares it through Redis."""
+        candidate = (provider, model)
+        sample = (time.time(), latency_seconds, ok)
+        with self._lock:
+            self._window(candidate).append(sample)
+            if self._redis_retry_at != math.inf and len(self._unsynced) < self._window_size * 4:
+                self._unsynced.append((candidate, sample))
+        self._watch(candidate)
+
+    def health(self, provider: str, model: str) -> ProviderHealth:
+        self._watch((provider, model))
+        cutoff = time.time() - self._window_seconds
+        with self._lock:
+            samples = [sample for sample in self._windows.get((provider, model), ()) if sample[0] >= cutoff]
+        if not samples:
+            return ProviderHealth(samples=0, p50=None, p95=None, error_rate=0.0)
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        failures = sum(1 for _, _, ok in samples if not ok)
+        return ProviderHealth(
+            samples=len(samples),
+            p50=_percentile(latencies, 0.50),
+            p95=_percentile(latencies, 0.95),
+            error_rate=failures / len(samples),
+        )
+
+    def snapshot(self, candidates: Sequence[Candidate]) -> Dict[str, Dict[str, Optional[float]]]:
+        """Health of each candidate keyed ``provider/model``, for status endpoints and logs."""
+        return {f"{provider}/{model}": asdict(self.health(provider, model)) for provider, model in candidates}
+
+    # --- Routing ---
+
+    def rank(self, candidates: Sequence[Candidate]) -> List[Candidate]:
+        """
+        Order ``candidates`` for an interactive call.
+
+        Healthy providers with enough samples come first, fastest p50 first;
+        providers without enough samples keep their given (preference) order
+        after those; providers over the error-rate threshold go last.
+        """
+        measured: List[Tuple[float, int, Candidate]] = []
+        unknown: List[Candidate] = []
+        unhealthy: List[Candidate] = []
+        for index, candidate in enumerate(candidates):
+            health = self.health(*candidate)
+            if health.samples < self._min_samples:
+                unknown.append(candidate)
+            elif health.p50 is None or health.error_rate > self._max_error_rate:
+                unhealthy.append(candidate)
+            else:
+                measured.append((health.p50, index, candidate))
+        return [candidate for _, _, candidate in sorted(measured)] + unknown + unhealthy
+
+    def hedge_delay(self, provider: str, model: str) -> float:
+        """How long to wait on ``provider`` before hedging: its p95, or a default until measured."""
+        health = self.health(provider, model)
+        if health.samples >= self._min_samples and health.p95 is not None:
+            delay = health.p95
+        else:
+            delay = settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(settings.LLM_HEDGE_MIN_DELAY_SECONDS, delay)
+
+    async def hedged(self, attempts: Sequence[Tuple[Candidate, Callable[[], Awaitable[T]]]]) -> T:
+        """
+        Run ``attempts[0]`` and return the first successful result.
+
+        If the primary is still running after its hedge delay, the next attempt
+        is started alongside it; if an attempt fails, the next one starts
+        immediately. Attempts still running when one succeeds are cancelled.
+        Raises the last error when every attempt fails.
+        """
+        if not attempts:
+            raise ValueError("hedged() needs at least one attempt")
+        loop = asyncio.get_running_loop()
+        queue = list(attempts)
+        pending: Dict[asyncio.Future, Candidate] = {}
+        hedge: Optional[asyncio.Future] = None
+        hedge_candidate: Candidate = ("", "")
+        last_error: Optional[BaseException] = None
+
+        def start() -> asyncio.Future:
+            candidate, call = queue.pop(0)
+            task = asyncio.ensure_future(call())
+            pending[task] = candidate
+            return task
+
+        primary_candidate = queue[0][0]
+        hedge_at: Optional[float] = loop.time() + self.hedge_delay(*primary_candidate)
+        start()
+        try:
+            while pending:
+                timeout = None
+                if queue and hedge_at is not None:
+                    timeout = max(0.0, hedge_at - loop.time())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedge_at = None
+                    hedge = start()
+                    hedge_candidate = pending[hedge]
+                    logger.info(
+                        "Hedging LLM request",
+                        extra={"primary": "/".join(primary_candidate), "hedge": "/".join(hedge_candidate)},
+                    )
+                    continue
+                for task in done:
+                    candidate = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if hedge is not None:
+                            LLM_HEDGED_REQUESTS_TOTAL.labels(
+                                provider=hedge_candidate[0], outcome="won" if task is hedge else "lost"
+                            ).inc()
+                        return task.result()
+                    last_error = error
+                    logger.warning(f"LLM attempt on {candidate[0]}/{candidate[1]} failed: {error}")
+                if queue and not pending:
+                    hedge_at = None
+                    start()
+            assert last_error is not None
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    # --- Shared state ---
+
+    def _window(self, candidate: Candidate) -> Deque[Sample]:
+        window = self._windows.get(candidate)
+        if window is None:
+            window = self._windows[candidate] = deque(maxlen=self._window_size)
+        return window
+
+    def sync(self) -> None:
+        """Push unsynced samples and re-read every known candidate's window, in one Redis pipeline."""
+        client = self._redis_client()
+        with self._lock:
+            unsynced, self._unsynced = self._unsynced, []
+            candidates = list(self._known)
+        if client is None or not (unsynced or candidates):
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for (provider, model), (recorded_at, latency, ok) in unsynced:
+                key = _SAMPLES_KEY.format(provider=provider, model=model)
+                pipe.lpush(key, f"{recorded_at:.3f}:{latency:.4f}:{int(ok)}")
+                pipe.ltrim(key, 0, self._window_size - 1)
+                pipe.expire(key, int(self._window_seconds * 2))
+            for provider, model in candidates:
+                pipe.lrange(_SAMPLES_KEY.format(provider=provider, model=model), 0, self._window_size - 1)
+            results = pipe.execute()[len(unsynced) * 3:]
+        except Exception as e:
+            self._redis_failed(e)
+            return
+        for candidate, raw_samples in zip(candidates, results):
+            samples = []
+            for raw in reversed(raw_samples or []):
+                try:
+                    recorded_at, latency, ok = raw.split(":")
+                    samples.append((float(recorded_at), float(latency), ok == "1"))
+                except ValueError:
+                    continue
+            if samples:
+                with self._lock:
+                    window = self._window(candidate)
+                    window.clear()
+                    window.extend(samples)
+                    # Samples recorded while the pipeline ran are not in Redis yet.
+                    window.extend(sample for unsynced_candidate, sample in self._unsynced if unsynced_candidate == candidate)
+
+    def _watch(self, candidate: Candidate) -> None:
+        """Keep ``candidate``'s window synced; a newly seen candidate is fetched right away."""
+        if self._redis_retry_at == math.inf:
+            return
+        if candidate not in self._known:
+            with self._lock:
+                self._known.add(candidate)
+            self._wakeup.set()
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="llm-router-sync", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while self._redis_retry_at != math.inf:
+            try:
+                self.sync()
+            except Exception as e:  # pragma: no cover - the sync thread must never die
+                logger.error(f"LLM router sync failed: {e}", exc_info=True)
+            self._wakeup.wait(self._refresh_seconds)
+            self._wakeup.clear()
+
+    def _redis_client(self):
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        redis_url = get_effective_redis_url()
+        if not redis_url:
+            self._redis_retry_at = math.inf
+            return None
+        import redis
+
+        self._redis = redis.from_url(redis_url, decode_responses=True, socket_timeout=0.5, socket_connect_timeout=0.5)
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.debug(f"LLM router falling back to process-local latency stats: {error}")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+
+_latency_router: Optional[LatencyRouter] = None
+
+
+def get_latency_router() -> LatencyRouter:
+    global _latency_router
+    if _latency_router is None:
+        _latency_router = LatencyRouter()
+    return _latency_router
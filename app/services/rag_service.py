@@ -3,9 +3,10 @@ import json
 import logging
 import math
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import openai
+from psycopg2.extras import execute_values
 from types import SimpleNamespace
 from rank_bm25 import BM25Okapi
 from app.config.settings import settings
@@ -43,20 +44,58 @@ class RAGService:
         if not text_chunks:
             return
         try:
-            response = await self.openai_client.embeddings.create(input=text_chunks, model="text-embedding-3-small")
-            embeddings = [item.embedding for item in response.data]
-
-            # This is inefficient but simple. A real implementation should use batch inserts.
-            for i, chunk_text in enumerate(text_chunks):
-                chunk_id = f"cnk_{generate_id()}"
-                query = "INSERT INTO attachment_chunks (id, attachment_id, chunk_text, embedding) VALUES (%s, %s, %s, %s)"
-                params = (chunk_id, attachment_id, chunk_text, embeddings[i])
-                self.db.execute_update(query, params)
+            await self.store_chunk_batch(attachment_id, text_chunks)
             logger.info(f"Stored {len(text_chunks)} chunks for attachment {attachment_id}.")
         except Exception as e:
             logger.error(f"Failed to store chunks for attachment {attachment_id}: {e}", exc_info=True)
             raise
 
+    async def store_chunk_batch(self, attachment_id: str, text_chunks: List[str]) -> int:
+        """Embed ``text_chunks`` with one API call and insert them with one statement."""
+        if not text_chunks:
+            return 0
+        response = await self.openai_client.embeddings.create(input=text_chunks, model="text-embedding-3-small")
+        embeddings = [item.embedding for item in response.data]
+        rows = [
+            (f"cnk_{generate_id()}", attachment_id, chunk_text, embedding)
+            for chunk_text, embedding in zip(text_chunks, embeddings)
+        ]
+        with self.db.transaction(query_type="write") as cur:
+            execute_values(
+                cur,
+                "INSERT INTO attachment_chunks (id, attachment_id, chunk_text, embedding) VALUES %s",
+                rows,
+                page_size=len(rows),
+            )
+        return len(rows)
+
+    async def ingest_chunks(self, attachment_id: str, chunks: Iterable[str], batch_size: int) -> int:
+        """
+        Embed and store chunks as they are produced, ``batch_size`` at a time.
+
+        ``chunks`` is consumed lazily, so the producer (e.g. PDF extraction in
+        worker processes) keeps working ahead while a batch is being embedded.
+        Returns the number of chunks stored.
+        """
+        stored = 0
+        batch: List[str] = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= batch_size:
+                stored += await self.store_chunk_batch(attachment_id, batch)
+                batch = []
+        if batch:
+            stored += await self.store_chunk_batch(attachment_id, batch)
+        logger.info(f"Stored {stored} chunks for attachment {attachment_id}.")
+        return stored
+
+    def delete_chunks(self, attachment_id: str) -> int:
+        try:
+            return self.db.execute_update("DELETE FROM attachment_chunks WHERE attachment_id = %s", (attachment_id,))
+        except Exception as e:
+            logger.error(f"Failed to delete chunks for attachment {attachment_id}: {e}", exc_info=True)
+            return 0
+
     async def get_context_from_attachments(self, query: str, thread_id: str, top_k: int = 3) -> str:
         """
         Hybrid RAG search combining BM25 keyword search and vector similarity search.
@@ -206,6 +245,8 @@ class RAGService:
                         prefix_parts.append("요약")
                     elif source_label == "memory":
                         prefix_parts.append("기억")
+                    elif source_label == "digest":
+                        prefix_parts.append("주간 요약")
                     prefix = " ".join(prefix_parts)
                     memory_lines.append(f"{prefix}: {content}" if prefix else content)
                 else:
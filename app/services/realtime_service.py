@@ -6,6 +6,7 @@ import logging
 from typing import Any, Dict, Optional
 
 from app.core.realtime import ConnectionManager, connection_manager
+from app.services.sse_replay import get_sse_journal
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +29,12 @@ class RealtimeService:
         return json.dumps(envelope)
 
     async def publish(self, channel: str, event_type: str, payload: Dict[str, Any], *, meta: Optional[Dict[str, Any]] = None) -> None:
-        """Broadcast an event to all WebSocket and SSE listeners."""
+        """Broadcast an event to all WebSocket and SSE listeners.
+
+        The event is also journaled, which is how SSE followers on every replica receive it.
+        """
         message = self.format_event(event_type, payload, meta)
+        await get_sse_journal().append(channel, event_type, message)
         await self._manager.broadcast(message, channel)
 
     async def broadcast_raw(self, channel: str, raw_payload: str) -> None:
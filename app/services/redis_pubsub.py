@@ -1,13 +1,15 @@
 import asyncio
 import logging
+import threading
 from contextlib import asynccontextmanager
 from typing import AsyncIterator, Optional
 
 import redis.asyncio as redis
 from redis.exceptions import RedisError
 
-from app.config.settings import get_effective_redis_url
+from app.config.settings import get_effective_redis_url, settings
 from app.services.realtime_service import realtime_service
+from app.services.sse_replay import journal_entry
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +19,9 @@ class RedisPubSubManager:
         self._redis_url_signature = None
         self.pubsub = None
         self.is_running = False
+        self._sync_client = None
+        self._sync_url_signature = None
+        self._sync_lock = threading.Lock()
 
     async def _get_redis_client(self):
         target_url = get_effective_redis_url()
@@ -44,7 +49,14 @@ class RedisPubSubManager:
         if not client:
             logger.info("Skipping Redis publish to %s because Redis is unavailable", channel)
             return
-        await client.publish(channel, message)
+        if settings.SSE_REPLAY_ENABLED:
+            # Journal and publish together so the journal order is the publish order.
+            async with client.pipeline(transaction=True) as pipe:
+                journal_entry(pipe, channel, message)
+                pipe.publish(channel, message)
+                await pipe.execute()
+        else:
+            await client.publish(channel, message)
         logger.info(f"Published to {channel}: {message[:100]}")
 
     @asynccontextmanager
@@ -167,24 +179,45 @@ class RedisPubSubManager:
 
     def publish_sync(self, channel: str, message: str):
         """Publish a message to a Redis channel synchronously for Celery workers."""
-        import redis as sync_redis
-        sync_client = None
         target_url = get_effective_redis_url()
         if not target_url:
             logger.info("Skipping synchronous Redis publish to %s because Redis is unavailable", channel)
             return
         try:
-            # Create a new synchronous client for this operation.
-            # This is not the most efficient way, but it's simple and avoids
-            # managing a separate long-lived synchronous client.
-            sync_client = sync_redis.from_url(target_url, encoding="utf-8", decode_responses=True)
-            sync_client.publish(channel, message)
-            logger.info(f"Published synchronously to {channel}: {message[:100]}")
+            client = self._get_sync_client(target_url)
+            if settings.SSE_REPLAY_ENABLED:
+                with client.pipeline(transaction=True) as pipe:
+                    journal_entry(pipe, channel, message)
+                    pipe.publish(channel, message)
+                    pipe.execute()
+            else:
+                client.publish(channel, message)
+            logger.debug(f"Published synchronously to {channel}: {message[:100]}")
         except Exception as e:
             logger.error(f"Failed to publish synchronously to {channel}: {e}", exc_info=True)
-        finally:
-            if sync_client:
-                sync_client.close()
+            self._drop_sync_client()
+
+    def _get_sync_client(self, target_url: str):
+        # One pooled client per process: streamed review output publishes several
+        # times a second, too often to open a connection per message.
+        import redis as sync_redis
+
+        with self._sync_lock:
+            if self._sync_client is None or self._sync_url_signature != target_url:
+                if self._sync_client is not None:
+                    self._sync_client.close()
+                self._sync_client = sync_redis.from_url(target_url, encoding="utf-8", decode_responses=True)
+                self._sync_url_signature = target_url
+            return self._sync_client
+
+    def _drop_sync_client(self) -> None:
+        with self._sync_lock:
+            client, self._sync_client = self._sync_client, None
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
 
 # Singleton instance
 redis_pubsub_manager = RedisPubSubManager()
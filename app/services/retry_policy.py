@@ -91,13 +91,15 @@ class LLMRetryManager:
         func: Callable,
         provider: str,
         *args,
+        max_retries: Optional[int] = None,
         **kwargs
     ) -> Any:
         """재시도 로직으로 함수 실행"""
         
         circuit_breaker = self.get_circuit_breaker(provider)
+        retries = self.retry_config.max_retries if max_retries is None else max_retries
         
-        for attempt in range(self.retry_config.max_retries + 1):
+        for attempt in range(retries + 1):
             try:
                 # 회로차단기 확인
                 if not circuit_breaker.can_execute():
@@ -117,7 +119,7 @@ class LLMRetryManager:
                 
             except LLMError as e:
                 # 재시도 가능한 에러인지 확인
-                if not should_retry_error(e) or attempt >= self.retry_config.max_retries:
+                if not should_retry_error(e) or attempt >= retries:
                     circuit_breaker.record_failure()
                     raise e
                 
@@ -149,13 +151,15 @@ class LLMRetryManager:
         func: Callable,
         provider: str,
         *args,
+        max_retries: Optional[int] = None,
         **kwargs
     ) -> Any:
         """재시도 로직으로 함수를 동기적으로 실행"""
 
         circuit_breaker = self.get_circuit_breaker(provider)
+        retries = self.retry_config.max_retries if max_retries is None else max_retries
 
-        for attempt in range(self.retry_config.max_retries + 1):
+        for attempt in range(retries + 1):
             try:
                 if not circuit_breaker.can_execute():
                     raise LLMError(
@@ -171,7 +175,7 @@ class LLMRetryManager:
                 return result
 
             except LLMError as e:
-                if not should_retry_error(e) or attempt >= self.retry_config.max_retries:
+                if not should_retry_error(e) or attempt >= retries:
                     circuit_breaker.record_failure()
                     raise e
 
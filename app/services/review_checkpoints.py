@@ -0,0 +1,193 @@
+"""
+Per-panelist checkpoints for review rounds.
+
+Every panelist output is written to Redis under ``(review_id, round, persona)``
+as soon as its LLM call returns, together with the panelist config that
+produced it (which may be the OpenAI fallback). When Celery retries a round
+task after a late failure (a DB error while saving messages, a publish error),
+the retry loads the round's checkpoints and only calls the LLM for panelists
+that are still missing. The id of the room message saved for each output is
+recorded as well, so a retry does not post the same message twice, and once
+the message has been published to subscribers that is recorded too, so a
+retry re-publishes a saved message whose publish failed.
+
+Checkpoints are written with HSETNX: if a checkpoint already exists when a
+call finishes, the call re-did work that had already been billed, and its
+tokens are counted as duplicate spend. Redis errors fail open: the round runs
+without checkpoints, as it did before.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import redis
+from redis.exceptions import RedisError
+
+from app.config.settings import get_effective_redis_url, settings
+from app.core.metrics import (
+    REVIEW_CHECKPOINT_RESUMES_TOTAL,
+    REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL,
+)
+
+logger = logging.getLogger(__name__)
+
+_REDIS_RETRY_SECONDS = 30.0
+
+
+@dataclass
+class PanelistCheckpoint:
+    config: Dict[str, Any]
+    content: str
+    metrics: Dict[str, Any]
+
+
+def _checkpoint_key(review_id: str, round_num: int) -> str:
+    return f"review:{review_id}:round:{round_num}:checkpoints"
+
+
+def _messages_key(review_id: str, round_num: int) -> str:
+    return f"review:{review_id}:round:{round_num}:messages"
+
+
+def _published_field(persona: str) -> str:
+    return f"{persona}:published"
+
+
+class RoundCheckpoints:
+    """Checkpoints of one review round, loaded once when the round task starts."""
+
+    def __init__(
+        self,
+        store: "ReviewCheckpointStore",
+        review_id: str,
+        round_num: int,
+        outputs: Optional[Dict[str, PanelistCheckpoint]] = None,
+        message_ids: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self._store = store
+        self.review_id = review_id
+        self.round_num = round_num
+        self._outputs = outputs or {}
+        self._message_ids = message_ids or {}
+
+    def get(self, persona: str) -> Optional[PanelistCheckpoint]:
+        checkpoint = self._outputs.get(persona)
+        if checkpoint is not None:
+            REVIEW_CHECKPOINT_RESUMES_TOTAL.labels(round=str(self.round_num)).inc()
+        return checkpoint
+
+    def save(self, persona: str, config: Dict[str, Any], content: str, metrics: Dict[str, Any]) -> None:
+        checkpoint = PanelistCheckpoint(config=config, content=content, metrics=metrics or {})
+        self._outputs[persona] = checkpoint
+        if self._store.write(self.review_id, self.round_num, persona, checkpoint) is False:
+            # Another attempt already checkpointed this panelist: the call we just
+            # made was billed twice.
+            tokens = int((metrics or {}).get("total_tokens") or 0)
+            logger.warning(
+                f"Review {self.review_id} round {self.round_num}: {persona} was re-run after it had "
+                f"already completed ({tokens} duplicate tokens)"
+            )
+            REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL.labels(round=str(self.round_num)).inc(tokens)
+
+    def saved_message_id(self, persona: str) -> Optional[str]:
+        return self._message_ids.get(persona)
+
+    def mark_message_saved(self, persona: str, message_id: str) -> None:
+        self._message_ids[persona] = message_id
+        self._store.write_message_id(self.review_id, self.round_num, persona, message_id)
+
+    def message_published(self, persona: str) -> bool:
+        return _published_field(persona) in self._message_ids
+
+    def mark_message_published(self, persona: str) -> None:
+        message_id = self._message_ids.get(persona, "")
+        self._message_ids[_published_field(persona)] = message_id
+        self._store.write_message_id(self.review_id, self.round_num, _published_field(persona), message_id)
+
+
+class ReviewCheckpointStore:
+    """Reads and writes review round checkpoints in Redis."""
+
+    def __init__(self, redis_url: Optional[str] = None) -> None:
+        self._redis_url = redis_url
+        self._sync_client: Optional[redis.Redis] = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+
+    def load_round(self, review_id: str, round_num: int) -> RoundCheckpoints:
+        client = self._client()
+        if client is None:
+            return RoundCheckpoints(self, review_id, round_num)
+        try:
+            raw_outputs = client.hgetall(_checkpoint_key(review_id, round_num))
+            raw_message_ids = client.hgetall(_messages_key(review_id, round_num))
+        except RedisError as e:
+            self._failed(e)
+            return RoundCheckpoints(self, review_id, round_num)
+
+        outputs: Dict[str, PanelistCheckpoint] = {}
+        for persona, raw in dict(raw_outputs or {}).items():
+            try:
+                outputs[persona] = PanelistCheckpoint(**json.loads(raw))
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Ignoring malformed checkpoint for review {review_id} round {round_num} {persona}: {e}")
+        return RoundCheckpoints(self, review_id, round_num, outputs, dict(raw_message_ids or {}))
+
+    def write(self, review_id: str, round_num: int, persona: str, checkpoint: PanelistCheckpoint) -> Optional[bool]:
+        """Store a checkpoint; returns False if one already existed, None if Redis is unavailable."""
+        client = self._client()
+        if client is None:
+            return None
+        key = _checkpoint_key(review_id, round_num)
+        try:
+            created = client.hsetnx(key, persona, json.dumps(checkpoint.__dict__, ensure_ascii=False, default=str))
+            client.expire(key, settings.REVIEW_CHECKPOINT_TTL_SECONDS)
+        except RedisError as e:
+            self._failed(e)
+            return None
+        return bool(created)
+
+    def write_message_id(self, review_id: str, round_num: int, persona: str, message_id: str) -> None:
+        client = self._client()
+        if client is None:
+            return
+        key = _messages_key(review_id, round_num)
+        try:
+            client.hset(key, persona, message_id)
+            client.expire(key, settings.REVIEW_CHECKPOINT_TTL_SECONDS)
+        except RedisError as e:
+            self._failed(e)
+
+    def _failed(self, error: Exception) -> None:
+        logger.warning(f"Review checkpoints unavailable due to Redis error: {error}")
+        self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    def _client(self) -> Optional[redis.Redis]:
+        if time.monotonic() < self._retry_at:
+            return None
+        url = self._redis_url or get_effective_redis_url()
+        if not url:
+            return None
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = redis.from_url(
+                    url,
+                    decode_responses=True,
+                    socket_timeout=1.0,
+                    socket_connect_timeout=1.0,
+                )
+            return self._sync_client
+
+
+_review_checkpoints: Optional[ReviewCheckpointStore] = None
+
+
+def get_review_checkpoints() -> ReviewCheckpointStore:
+    global _review_checkpoints
+    if _review_checkpoints is None:
+        _review_checkpoints = ReviewCheckpointStore()
+    return _review_checkpoints
@@ -11,6 +11,7 @@ from unittest.mock import Mock
 
 from app.services.storage_service import StorageService, storage_service
 from app.celery_app import celery_app
+from app.config.settings import settings
 from app.models.schemas import (
     Room,
     ReviewMeta,
@@ -368,9 +369,15 @@ class ReviewService:
 
         # Use .delay() to call the task, which respects task_always_eager for tests.
         # Access the task from the app's registry by name to avoid circular imports.
-        task = celery_app.tasks.get("app.tasks.review_tasks.run_initial_panel_turn")
+        # The orchestrated mode runs the whole review from one task on its own worker.
+        task_name = (
+            "app.tasks.review_orchestrator.orchestrate_review"
+            if settings.REVIEW_ORCHESTRATOR_ENABLED
+            else "app.tasks.review_tasks.run_initial_panel_turn"
+        )
+        task = celery_app.tasks.get(task_name)
         if not task:
-            logger.error("Could not find Celery task: app.tasks.review_tasks.run_initial_panel_turn")
+            logger.error(f"Could not find Celery task: {task_name}")
             self._log_status_event(review_id, "queue_unavailable")
             await asyncio.to_thread(
                 self._run_mock_review,
@@ -0,0 +1,224 @@
+"""
+Live panelist output for review subscribers.
+
+With ``REVIEW_STREAMING_ENABLED`` panelists generate through
+``LLMService.stream_invoke`` and their output is published on the review's
+Pub/Sub channel while it is written, instead of only after the round's
+message has been saved.
+
+Panelists answer in JSON, so the stream carries only the visible text: the
+value of the ``message`` field (``final_position`` in the resolution round),
+decoded as it arrives. Deltas are coalesced into ``panelist_delta`` events of
+at most ``REVIEW_STREAM_MAX_EVENT_CHARS`` characters. An event goes out once
+that much text is buffered, or with the first chunk that arrives
+``REVIEW_STREAM_FLUSH_SECONDS`` after the oldest buffered text. Each event
+carries a sequence number per (round, persona) so clients can drop duplicates
+and spot gaps; a ``panelist_stream_end`` event closes the stream. The ``new_message`` event published once the message is
+saved remains authoritative: clients replace the streamed text with it.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config.settings import settings
+from app.core.metrics import REVIEW_STREAM_EVENTS_TOTAL, REVIEW_STREAM_FIRST_OUTPUT_SECONDS
+from app.models.schemas import WebSocketMessage
+from app.services.llm_service import LLMService
+from app.services.redis_pubsub import redis_pubsub_manager
+from app.utils.helpers import get_current_timestamp
+from app.utils.tokens import count_tokens
+
+VISIBLE_FIELDS = ("message", "final_position")
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class VisibleTextReader:
+    """Incrementally decodes the first visible string field of a streamed JSON object."""
+
+    def __init__(self, fields: Sequence[str] = VISIBLE_FIELDS) -> None:
+        names = "|".join(re.escape(name) for name in fields)
+        self._key = re.compile(r'"(?:%s)"\s*:\s*"' % names)
+        self._raw = ""
+        self._pos: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        """Add raw model output; returns the newly decoded visible text."""
+        self._raw += chunk
+        if self.done:
+            return ""
+        if self._pos is None:
+            match = self._key.search(self._raw)
+            if match is None:
+                return ""
+            self._pos = match.end()
+
+        out: List[str] = []
+        raw, pos = self._raw, self._pos
+        while pos < len(raw):
+            char = raw[pos]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                out.append(char)
+                pos += 1
+                continue
+            if pos + 1 >= len(raw):
+                break  # the escape is split across chunks
+            code = raw[pos + 1]
+            if code == "u":
+                if pos + 6 > len(raw):
+                    break
+                try:
+                    out.append(chr(int(raw[pos + 2:pos + 6], 16)))
+                except ValueError:
+                    pass
+                pos += 6
+                continue
+            out.append(_ESCAPES.get(code, code))
+            pos += 2
+        self._pos = pos
+        return "".join(out)
+
+
+class RoundStream:
+    """Live output of one review round; records when the round first showed text."""
+
+    def __init__(self, review_id: str, round_num: int) -> None:
+        self.review_id = review_id
+        self.round_num = round_num
+        self.started_at = time.monotonic()
+        self.first_output_at: Optional[float] = None
+        self._seq: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def channel(self) -> str:
+        return f"review_{self.review_id}"
+
+    def panelist(self, persona: str) -> "PanelistStream":
+        return PanelistStream(self, persona)
+
+    def _next_seq(self, persona: str) -> int:
+        # Per persona across the round, so a fallback's stream continues the numbering.
+        with self._lock:
+            self._seq[persona] = self._seq.get(persona, 0) + 1
+            return self._seq[persona]
+
+    def _first_output(self) -> None:
+        with self._lock:
+            if self.first_output_at is not None:
+                return
+            self.first_output_at = time.monotonic()
+        REVIEW_STREAM_FIRST_OUTPUT_SECONDS.labels(round=str(self.round_num)).observe(
+            self.first_output_at - self.started_at
+        )
+
+
+class PanelistStream:
+    """Coalesces one panelist's visible output into bounded, sequenced delta events."""
+
+    def __init__(self, round_stream: RoundStream, persona: str) -> None:
+        self._round = round_stream
+        self.persona = persona
+        self._reader = VisibleTextReader()
+        self._buffer = ""
+        self._buffered_at: Optional[float] = None
+
+    def feed(self, chunk: str) -> List[str]:
+        """Take a raw chunk; returns the events that are due."""
+        text = self._reader.feed(chunk)
+        if text:
+            if not self._buffer:
+                self._buffered_at = time.monotonic()
+            self._buffer += text
+        max_chars = settings.REVIEW_STREAM_MAX_EVENT_CHARS
+        events = []
+        while len(self._buffer) >= max_chars:
+            events.append(self._delta(self._buffer[:max_chars]))
+            self._buffer = self._buffer[max_chars:]
+            self._buffered_at = time.monotonic() if self._buffer else None
+        if (
+            self._buffer
+            and self._buffered_at is not None
+            and time.monotonic() - self._buffered_at >= settings.REVIEW_STREAM_FLUSH_SECONDS
+        ):
+            events.append(self._delta(self._buffer))
+            self._buffer, self._buffered_at = "", None
+        return events
+
+    def close(self, failed: bool = False) -> List[str]:
+        """Flush what is buffered and end the stream."""
+        events = []
+        if self._buffer and not failed:
+            events.append(self._delta(self._buffer))
+        self._buffer, self._buffered_at = "", None
+        events.append(self._event("panelist_stream_end", {"status": "failed" if failed else "complete"}))
+        return events
+
+    def _delta(self, text: str) -> str:
+        self._round._first_output()
+        return self._event("panelist_delta", {"delta": text})
+
+    def _event(self, event_type: str, fields: Dict[str, Any]) -> str:
+        seq = self._round._next_seq(self.persona)
+        REVIEW_STREAM_EVENTS_TOTAL.labels(type=event_type).inc()
+        return WebSocketMessage(
+            type=event_type,
+            review_id=self._round.review_id,
+            ts=get_current_timestamp(),
+            payload={"round": self._round.round_num, "persona": self.persona, "seq": seq, **fields},
+        ).model_dump_json()
+
+
+async def stream_panelist_turn(
+    llm_service: LLMService,
+    round_stream: RoundStream,
+    persona: str,
+    provider: str,
+    model: str,
+    system_prompt: str,
+    prompt: str,
+    request_id: str,
+) -> Tuple[str, Dict[str, Any]]:
+    """Generate a panelist's output while publishing its visible text; returns ``(content, metrics)``."""
+    stream = round_stream.panelist(persona)
+    chunks: List[str] = []
+
+    async def publish(events: List[str]) -> None:
+        for event in events:
+            # Publishing is a blocking call; keep it off the loop, in order.
+            await asyncio.to_thread(redis_pubsub_manager.publish_sync, round_stream.channel, event)
+
+    usage: Dict[str, int] = {}
+    try:
+        async for chunk in llm_service.stream_invoke(
+            provider, model, system_prompt, prompt, request_id, response_format="json", usage=usage
+        ):
+            if not chunk:
+                continue
+            chunks.append(chunk)
+            await publish(stream.feed(chunk))
+    except Exception:
+        await publish(stream.close(failed=True))
+        raise
+    await publish(stream.close())
+
+    content = "".join(chunks)
+    if usage.get("total_tokens"):
+        return content, dict(usage)
+    # Not every provider reports usage on a stream; count with the model's tokenizer.
+    prompt_tokens = count_tokens(system_prompt, model) + count_tokens(prompt, model)
+    completion_tokens = count_tokens(content, model)
+    metrics = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "usage_estimated": True,
+    }
+    return content, metrics
@@ -0,0 +1,389 @@
+"""
+Resumable SSE channels.
+
+Every event sent on an SSE channel (a room, a review, a streamed assistant
+message) is also appended to a per-channel Redis stream, the channel's
+journal. The stream entry id is the SSE event id: ids increase monotonically
+per channel and are the same on every API replica. A journal keeps the last
+``SSE_REPLAY_MAX_EVENTS`` events and expires ``SSE_REPLAY_TTL_SECONDS`` after
+its last event.
+
+A client that reconnects with ``Last-Event-ID`` is sent the journal entries
+after that id and then follows the journal live, so a reconnect costs the
+events it missed rather than the channel's whole history. When the id has
+been trimmed from the journal (or the journal expired) the caller falls back
+to what it sent before journaling existed.
+
+Review events are journaled by ``RedisPubSubManager`` in the same transaction
+as their Pub/Sub publish; room events by ``RealtimeService.publish``. Redis
+errors fail open: events are still delivered live, without ids.
+
+Room SSE clients do not read the journal themselves: ``JournalFanout`` keeps
+one blocking reader per room per process and fans its events out to each
+client's bounded ``OutboundQueue``, so an open tab does not hold a Redis
+connection of its own and the realtime overflow policy applies to it.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as aioredis
+from fastapi import Request
+from redis.exceptions import RedisError
+
+from app.config.settings import get_effective_redis_url, settings
+from app.core.metrics import SSE_REPLAYED_EVENTS_TOTAL, SSE_RESUMES_TOTAL
+from app.core.realtime import OutboundQueue, RealtimeConfig, connection_manager
+
+logger = logging.getLogger(__name__)
+
+_REDIS_RETRY_SECONDS = 30.0
+
+
+def journal_key(channel: str) -> str:
+    return f"sse:journal:{channel}"
+
+
+def review_channel(review_id: str) -> str:
+    """The review's Pub/Sub channel, which is also its journal channel."""
+    return f"review_{review_id}"
+
+
+def message_stream_channel(message_id: str) -> str:
+    return f"message_stream_{message_id}"
+
+
+def journal_entry(pipe: Any, channel: str, data: str, event: str = "message", final: bool = False) -> None:
+    """Queue the commands that journal one event on a Redis pipeline (sync or async)."""
+    key = journal_key(channel)
+    fields = {"event": event, "data": data}
+    if final:
+        fields["final"] = "1"
+    pipe.xadd(key, fields, maxlen=settings.SSE_REPLAY_MAX_EVENTS, approximate=True)
+    pipe.expire(key, settings.SSE_REPLAY_TTL_SECONDS)
+
+
+def _id_tuple(event_id: str) -> Optional[Tuple[int, int]]:
+    millis, _, seq = event_id.partition("-")
+    try:
+        return int(millis), int(seq or 0)
+    except ValueError:
+        return None
+
+
+@dataclass
+class JournalEvent:
+    id: str
+    event: str
+    data: str
+    final: bool = False
+
+    @classmethod
+    def from_entry(cls, entry_id: str, fields: Dict[str, str]) -> "JournalEvent":
+        return cls(
+            id=entry_id,
+            event=fields.get("event", "message"),
+            data=fields.get("data", ""),
+            final=fields.get("final") == "1",
+        )
+
+
+@dataclass
+class Replay:
+    """The events after a client's Last-Event-ID; ``finished`` if the channel has sent its final event."""
+
+    events: List[JournalEvent]
+    finished: bool
+
+
+class SSEJournal:
+    """Appends SSE events to per-channel Redis streams and replays them on reconnect."""
+
+    def __init__(self, redis_url: Optional[str] = None) -> None:
+        self._redis_url = redis_url
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis: Optional[aioredis.Redis] = None
+        self._retry_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SSE_REPLAY_ENABLED and self._url() is not None
+
+    async def append(self, channel: str, event: str, data: str, final: bool = False) -> Optional[str]:
+        """Journal an event; returns its id, or None if it could not be journaled."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            async with client.pipeline(transaction=True) as pipe:
+                journal_entry(pipe, channel, data, event, final)
+                event_id, _ = await pipe.execute()
+        except RedisError as e:
+            self._failed(e)
+            return None
+        return event_id
+
+    async def replay(self, channel: str, last_event_id: str, channel_type: str) -> Optional[Replay]:
+        """The events after ``last_event_id``, or None if the journal no longer covers it."""
+        client = self._client()
+        if client is None or _id_tuple(last_event_id) is None:
+            return None
+        try:
+            # Inclusive of the client's last event: if it is still the first entry
+            # returned, nothing after it has been trimmed.
+            entries = await client.xrange(journal_key(channel), min=last_event_id, max="+")
+        except RedisError as e:
+            self._failed(e)
+            return None
+        if not entries or entries[0][0] != last_event_id:
+            SSE_RESUMES_TOTAL.labels(channel_type=channel_type, outcome="expired").inc()
+            return None
+        anchor = JournalEvent.from_entry(*entries[0])
+        events = [JournalEvent.from_entry(entry_id, fields) for entry_id, fields in entries[1:]]
+        SSE_RESUMES_TOTAL.labels(channel_type=channel_type, outcome="replayed").inc()
+        SSE_REPLAYED_EVENTS_TOTAL.labels(channel_type=channel_type).inc(len(events))
+        return Replay(events, finished=anchor.final or any(event.final for event in events))
+
+    async def last_id(self, channel: str) -> Optional[str]:
+        """Id of the newest journaled event; ``0-0`` for an empty journal, None if Redis is unavailable."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            entries = await client.xrevrange(journal_key(channel), max="+", min="-", count=1)
+        except RedisError as e:
+            self._failed(e)
+            return None
+        return entries[0][0] if entries else "0-0"
+
+    async def read(self, channel: str, after_id: str, block_seconds: float) -> Optional[List[JournalEvent]]:
+        """Events after ``after_id``, waiting up to ``block_seconds`` for the next one; None if Redis is unavailable."""
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            response = await client.xread({journal_key(channel): after_id}, block=int(block_seconds * 1000))
+        except RedisError as e:
+            self._failed(e)
+            return None
+        events: List[JournalEvent] = []
+        for _, entries in response or []:
+            events.extend(JournalEvent.from_entry(entry_id, fields) for entry_id, fields in entries)
+        return events
+
+    async def follow(
+        self,
+        request: Request,
+        channel: str,
+        after_id: str,
+        render: Callable[[JournalEvent], Dict[str, Any]],
+        heartbeat: Callable[[], Dict[str, Any]],
+        replay: Optional[Replay] = None,
+        idle_timeout: Optional[float] = None,
+        on_idle: Optional[Callable[[], Dict[str, Any]]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the replayed events, then the channel's new ones, as SSE dicts with ids until a final event.
+
+        Ends when Redis becomes unavailable, so the client reconnects to a fallback
+        stream, or after ``idle_timeout`` seconds without an event (yielding ``on_idle()``).
+        """
+        if replay is not None:
+            for event in replay.events:
+                yield {"id": event.id, **render(event)}
+                after_id = event.id
+            if replay.finished:
+                return
+
+        last_event_at = time.monotonic()
+        while True:
+            if await request.is_disconnected():
+                return
+            events = await self.read(channel, after_id, settings.SSE_HEARTBEAT_SECONDS)
+            if events is None:
+                return
+            if not events:
+                if idle_timeout is not None and time.monotonic() - last_event_at > idle_timeout:
+                    if on_idle is not None:
+                        yield on_idle()
+                    return
+                yield heartbeat()
+                continue
+            last_event_at = time.monotonic()
+            for event in events:
+                yield {"id": event.id, **render(event)}
+                after_id = event.id
+                if event.final:
+                    return
+
+    def _failed(self, error: Exception) -> None:
+        logger.warning(f"SSE journal unavailable due to Redis error: {error}")
+        self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    def _url(self) -> Optional[str]:
+        if time.monotonic() < self._retry_at:
+            return None
+        return self._redis_url or get_effective_redis_url()
+
+    def _client(self) -> Optional[aioredis.Redis]:
+        if not settings.SSE_REPLAY_ENABLED:
+            return None
+        url = self._url()
+        if not url:
+            return None
+        # redis.asyncio pools are bound to the event loop that created their connections.
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._client_loop is not loop:
+            self._redis = aioredis.from_url(
+                url,
+                decode_responses=True,
+                # Followers block in XREAD for up to a heartbeat interval.
+                socket_timeout=settings.SSE_HEARTBEAT_SECONDS + 5.0,
+                socket_connect_timeout=1.0,
+            )
+            self._client_loop = loop
+        return self._redis
+
+
+class JournaledMessage(str):
+    """An event's data as queued for a subscriber, carrying its journal id."""
+
+    event_id: Optional[str]
+
+    def __new__(cls, data: str, event_id: Optional[str]) -> "JournaledMessage":
+        message = super().__new__(cls, data)
+        message.event_id = event_id
+        return message
+
+
+class JournalFanout:
+    """One journal reader per channel per process, fanned out to the local subscribers' queues.
+
+    A subscriber is dropped when its queue overflows under the ``disconnect``
+    policy or the journal becomes unavailable; its stream then ends and the
+    client reconnects with Last-Event-ID.
+    """
+
+    def __init__(self, journal: SSEJournal, config: Optional[RealtimeConfig] = None) -> None:
+        self._journal = journal
+        self._config = config
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, List[OutboundQueue]] = {}
+        self._readers: Dict[str, asyncio.Task] = {}
+
+    async def subscribe(self, channel: str) -> Optional[OutboundQueue]:
+        """A queue that receives the channel's events from now on; None if the journal is unavailable."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Readers are tasks of the loop that started them.
+            self._loop, self._subscribers, self._readers = loop, {}, {}
+        if channel not in self._readers:
+            after_id = await self._journal.last_id(channel)
+            if after_id is None:
+                return None
+            # Another subscriber may have started the reader while this one waited.
+            if channel not in self._readers:
+                self._readers[channel] = asyncio.create_task(self._read(channel, after_id))
+        config = self._config or connection_manager.config
+        queue = OutboundQueue(config.sse_queue_size, config.overflow_policy, "sse")
+        self._subscribers.setdefault(channel, []).append(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: OutboundQueue) -> None:
+        subscribers = self._subscribers.get(channel)
+        if not subscribers:
+            return
+        try:
+            subscribers.remove(queue)
+        except ValueError:
+            pass
+        if not subscribers:
+            self._subscribers.pop(channel, None)
+
+    def is_subscribed(self, channel: str, queue: OutboundQueue) -> bool:
+        return queue in self._subscribers.get(channel, ())
+
+    async def follow(
+        self,
+        request: Request,
+        channel: str,
+        queue: OutboundQueue,
+        render: Callable[[str], Dict[str, Any]],
+        heartbeat: Callable[[], Dict[str, Any]],
+        replay: Optional[Replay] = None,
+        after_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the replayed events, then the subscriber's queued ones, as SSE dicts; unsubscribes when done.
+
+        Queued events up to ``after_id`` or the last replayed event are skipped:
+        the reader may deliver events the client has already been sent.
+        """
+        try:
+            if replay is not None:
+                for event in replay.events:
+                    yield {"id": event.id, **render(event.data)}
+                    after_id = event.id
+            last_seen = _id_tuple(after_id) if after_id else None
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if not self.is_subscribed(channel, queue):
+                        return
+                    yield heartbeat()
+                    continue
+                event_id = getattr(message, "event_id", None)
+                if event_id is None:
+                    # Merged by the overflow policy; it no longer matches one journal entry.
+                    yield render(str(message))
+                    continue
+                position = _id_tuple(event_id)
+                if last_seen is not None and position is not None and position <= last_seen:
+                    continue
+                yield {"id": event_id, **render(str(message))}
+        finally:
+            self.unsubscribe(channel, queue)
+
+    async def _read(self, channel: str, after_id: str) -> None:
+        """Follow the channel's journal while it has subscribers."""
+        try:
+            while self._subscribers.get(channel):
+                events = await self._journal.read(channel, after_id, settings.SSE_HEARTBEAT_SECONDS)
+                if events is None:
+                    return
+                for event in events:
+                    after_id = event.id
+                    message = JournaledMessage(event.data, event.id)
+                    for queue in list(self._subscribers.get(channel, ())):
+                        try:
+                            queue.put_nowait(message)
+                        except asyncio.QueueFull:
+                            logger.warning(f"Dropping SSE subscriber of {channel} with a full queue")
+                            self.unsubscribe(channel, queue)
+        except Exception as e:
+            logger.error(f"SSE journal reader for {channel} failed: {e}", exc_info=True)
+        finally:
+            if self._readers.get(channel) is asyncio.current_task():
+                del self._readers[channel]
+                # Whoever is left reconnects, and resumes through a new reader or the fallback stream.
+                self._subscribers.pop(channel, None)
+
+
+_sse_journal: Optional[SSEJournal] = None
+_journal_fanout: Optional[JournalFanout] = None
+
+
+def get_sse_journal() -> SSEJournal:
+    global _sse_journal
+    if _sse_journal is None:
+        _sse_journal = SSEJournal()
+    return _sse_journal
+
+
+def get_journal_fanout() -> JournalFanout:
+    global _journal_fanout
+    if _journal_fanout is None:
+        _journal_fanout = JournalFanout(get_sse_journal())
+    return _journal_fanout
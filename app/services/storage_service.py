@@ -3,7 +3,7 @@
 import json
 import time
 import logging
-from typing import Dict, Any, List, Optional, Literal, TypedDict, Final, cast
+from typing import Callable, Dict, Any, Iterator, List, Optional, Literal, Sequence, Tuple, TypedDict, Final, cast
 
 from app.models.enums import RoomType
 from app.models.schemas import (
@@ -15,8 +15,10 @@ from app.models.schemas import (
     ConsolidatedReport,
     ReviewMetrics,
 )
+from app.config.settings import settings
 from app.services.database_service import DatabaseService, get_database_service
-from app.repositories import RoomRepository
+from app.repositories import KPIRollupRepository, RoomRepository
+from app.services.message_page_cache import MessagePage, get_message_page_cache
 from app.utils.helpers import get_current_timestamp
 
 logger = logging.getLogger(__name__)
@@ -46,6 +48,10 @@ class MessageRow(TypedDict):
 from app.core.secrets import SecretProvider, env_secrets_provider
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 class StorageService:
     """Unified storage service for file system and Firebase"""
 
@@ -53,6 +59,8 @@ class StorageService:
         super().__init__()
         self.db: DatabaseService = get_database_service()
         self._room_repository = RoomRepository(self.db)
+        self._kpi_rollups = KPIRollupRepository(self.db)
+        self._page_cache = get_message_page_cache()
         self.db_encryption_key = secret_provider.get("DB_ENCRYPTION_KEY")
         if not self.db_encryption_key:
             raise ValueError("DB_ENCRYPTION_KEY not found for StorageService.")
@@ -89,7 +97,9 @@ class StorageService:
 
     def delete_room(self, room_id: str) -> bool:
         """Delete a room and its associated data from the database."""
-        return self._room_repository.delete_room_and_dependencies(room_id)
+        deleted = self._room_repository.delete_room_and_dependencies(room_id)
+        self._page_cache.invalidate(room_id)
+        return deleted
 
     def get_rooms_by_owner(self, owner_id: str) -> List[Room]:
         """Get all rooms for a given owner from the database."""
@@ -132,10 +142,13 @@ class StorageService:
                 content_searchable = %s,
                 timestamp = %s
             WHERE message_id = %s
+            RETURNING room_id
         """
         params = (new_content, self.db_encryption_key, new_content_searchable, get_current_timestamp(), message_id)
-        rows_affected = self.db.execute_update(query, params)
-        return rows_affected > 0
+        updated = self.db.execute_returning(query, params)
+        for row in updated:
+            self._page_cache.invalidate(row["room_id"])
+        return len(updated) > 0
 
     def save_message(self, message: Message) -> None:
         """Save an encrypted message, update room stats, and dispatch embedding task."""
@@ -153,7 +166,12 @@ class StorageService:
         try:
             with self.db.transaction(query_type="write_message") as cur:
                 cur.execute(insert_query, insert_params)
-                self._room_repository.increment_message_count(message.room_id, cursor=cur)
+                self._room_repository.increment_message_count(
+                    message.room_id,
+                    cursor=cur,
+                    archive_due_at=message.timestamp + max(settings.MEMORY_ARCHIVE_AFTER_DAYS, 1) * 86400,
+                )
+            self._page_cache.invalidate(message.room_id)
 
             # Dispatch the embedding task after the transaction is successfully committed.
             # Only generate embeddings for user messages to save costs/resources.
@@ -227,6 +245,175 @@ class StorageService:
             results: List[MessageRow] = self.db.execute_query(query, params)
             return [Message(**row) for row in results]
 
+    def get_messages_page(
+        self,
+        room_id: str,
+        *,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100,
+    ) -> MessagePage:
+        """Return one keyset page of a room's history, oldest first, plus a ``has_more`` flag.
+
+        ``before``/``after`` are message ids; without either the newest page is
+        returned. ``has_more`` refers to the paging direction (older messages for
+        ``before`` and the newest page, newer messages for ``after``). Recently
+        decrypted pages are cached until the room is written to.
+        """
+        if before and after:
+            raise ValueError("Pass either 'before' or 'after', not both.")
+        cursor = (before, after, limit)
+        cached = self._page_cache.get(room_id, cursor)
+        if cached is not None:
+            return cached
+        page = self._query_messages_page(room_id, before=before, after=after, limit=limit)
+        self._page_cache.put(room_id, cursor, page)
+        return page
+
+    def iter_messages(self, room_id: str, page_size: int = 500) -> Iterator[Message]:
+        """Yield a room's full history oldest first, one bounded keyset page at a time."""
+        after: Optional[str] = None
+        while True:
+            messages, has_more = self._query_messages_page(
+                room_id, after=after, limit=page_size, from_start=after is None
+            )
+            yield from messages
+            if not messages or not has_more:
+                return
+            after = messages[-1].message_id
+
+    def _query_messages_page(
+        self,
+        room_id: str,
+        *,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int,
+        from_start: bool = False,
+    ) -> MessagePage:
+        """Keyset page over ``ix_messages_room_ts_id``; the cursor row is resolved in the same query."""
+        cursor_params: Tuple[Any, ...] = ()
+        condition = ""
+        order = "DESC"
+        if after:
+            condition = (
+                "AND (timestamp, message_id) > "
+                "(SELECT timestamp, message_id FROM messages WHERE message_id = %s AND room_id = %s)"
+            )
+            order = "ASC"
+            cursor_params = (after, room_id)
+        elif before:
+            condition = (
+                "AND (timestamp, message_id) < "
+                "(SELECT timestamp, message_id FROM messages WHERE message_id = %s AND room_id = %s)"
+            )
+            cursor_params = (before, room_id)
+        elif from_start:
+            order = "ASC"
+
+        query = f"""
+            SELECT message_id, room_id, user_id, role,
+                   pgp_sym_decrypt(content, %s) as content,
+                   timestamp
+            FROM messages
+            WHERE room_id = %s {condition}
+            ORDER BY timestamp {order}, message_id {order}
+            LIMIT %s
+        """
+        params = (self.db_encryption_key, room_id, *cursor_params, limit + 1)
+        rows: List[MessageRow] = self.db.execute_query(query, params)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if order == "DESC":
+            rows.reverse()
+        return [Message(**row) for row in rows], has_more
+
+    def search_recent_messages(
+        self,
+        room_id: str,
+        keywords: List[str],
+        *,
+        limit: int,
+        window: int,
+        roles: Sequence[str] = ("user", "assistant"),
+        exclude_phrases: Sequence[str] = (),
+    ) -> List[Message]:
+        """Return up to ``limit`` keyword-matching messages from the last ``window`` messages.
+
+        The window is resolved with a backward scan of ``ix_messages_room_ts_id``
+        and only the matching rows are decrypted, so the cost does not grow with the
+        size of the room. Results are ordered oldest first.
+        """
+        patterns = [f"%{_escape_like(keyword)}%" for keyword in keywords if keyword]
+        if not patterns or limit <= 0 or window <= 0:
+            return []
+        excluded = [f"%{_escape_like(phrase)}%" for phrase in exclude_phrases if phrase]
+
+        query = """
+            WITH recent AS (
+                SELECT message_id, room_id, user_id, role, content, content_searchable, timestamp
+                FROM messages
+                WHERE room_id = %s
+                ORDER BY timestamp DESC
+                LIMIT %s
+            )
+            SELECT message_id, room_id, user_id, role,
+                   pgp_sym_decrypt(content, %s) as content,
+                   timestamp
+            FROM recent
+            WHERE role = ANY(%s)
+              AND content_searchable ILIKE ANY(%s)
+              AND NOT (content_searchable ILIKE ANY(%s))
+            ORDER BY timestamp DESC
+            LIMIT %s
+        """
+        params = (room_id, window, self.db_encryption_key, list(roles), patterns, excluded, limit)
+        results: List[MessageRow] = self.db.execute_query(query, params)
+        return [Message(**row) for row in reversed(results)]
+
+    def get_user_messages_after(
+        self,
+        room_id: str,
+        *,
+        after_ts: int,
+        after_id: str,
+        limit: int,
+    ) -> List[Message]:
+        """Return user-authored messages strictly after the ``(timestamp, message_id)`` watermark."""
+        query = """
+            SELECT message_id, room_id, user_id, role,
+                   pgp_sym_decrypt(content, %s) as content,
+                   timestamp
+            FROM messages
+            WHERE room_id = %s
+              AND role = 'user'
+              AND (timestamp, message_id) > (%s, %s)
+            ORDER BY timestamp ASC, message_id ASC
+            LIMIT %s
+        """
+        params = (self.db_encryption_key, room_id, after_ts, after_id, limit)
+        results: List[MessageRow] = self.db.execute_query(query, params)
+        return [Message(**row) for row in results]
+
+    def copy_messages_to_room(self, source_room_id: str, message_ids: List[str], target_room_id: str) -> int:
+        """Copy the given messages of ``source_room_id`` into ``target_room_id`` inside Postgres."""
+        copied = self.db.copy_messages_to_room(source_room_id, message_ids, target_room_id)
+        if copied:
+            self._page_cache.invalidate(target_room_id)
+        return copied
+
+    def copy_room_messages(
+        self,
+        source_room_id: str,
+        target_room_id: str,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """Copy every message of ``source_room_id`` into ``target_room_id`` inside Postgres."""
+        copied = self.db.copy_room_messages(source_room_id, target_room_id, progress=progress)
+        if copied:
+            self._page_cache.invalidate(target_room_id)
+        return copied
+
     # Review operations
     def save_review_meta(self, review_meta: ReviewMeta) -> None:
         """Save review metadata to the database."""
@@ -364,6 +551,29 @@ class StorageService:
 
         self.db.execute_update(query, tuple(params))
 
+    def fail_review(self, review_id: str, final_report: Dict[str, Any]) -> None:
+        """Mark a review failed for good and count it in the KPI rollups, once."""
+        failed_at = int(time.time())
+        with self.db.transaction(query_type="fail_review") as cur:
+            # completed_at is only set by this terminal transition, so a repeat is a no-op.
+            cur.execute(
+                "UPDATE reviews SET status = 'failed', final_report = %s, completed_at = %s "
+                "WHERE review_id = %s AND completed_at IS NULL",
+                (json.dumps(final_report), failed_at, review_id),
+            )
+            if not cur.rowcount:
+                return
+            cur.execute(
+                "SELECT rm.owner_id FROM reviews r JOIN rooms rm ON rm.room_id = r.room_id WHERE r.review_id = %s",
+                (review_id,),
+            )
+            owner_row = cur.fetchone()
+            self._kpi_rollups.record_review_failure(
+                user_id=owner_row[0] if owner_row else None,
+                failed_at=failed_at,
+                cursor=cur,
+            )
+
     def save_panel_report(
         self, review_id: str, round_num: int, persona: str, report: PanelReport
     ) -> None:
@@ -487,10 +697,11 @@ class StorageService:
         return list(reversed(events))
 
     def save_review_metrics(self, metrics: ReviewMetrics) -> None:
-        """Save review metrics to the database."""
+        """Save review metrics and fold them into the KPI rollups in one transaction."""
         query = """
             INSERT INTO review_metrics (review_id, total_duration_seconds, total_tokens_used, total_cost_usd, round_metrics, created_at)
             VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (review_id) DO NOTHING
         """
         params = (
             metrics.review_id,
@@ -500,7 +711,24 @@ class StorageService:
             json.dumps(metrics.round_metrics),
             metrics.created_at,
         )
-        self.db.execute_update(query, params)
+        with self.db.transaction(query_type="write_review_metrics") as cur:
+            cur.execute(query, params)
+            if not cur.rowcount:
+                # Already recorded (e.g. a retried report task); keep rollups exact.
+                return
+            cur.execute(
+                "SELECT rm.owner_id FROM reviews r JOIN rooms rm ON rm.room_id = r.room_id WHERE r.review_id = %s",
+                (metrics.review_id,),
+            )
+            owner_row = cur.fetchone()
+            self._kpi_rollups.record_review(
+                user_id=owner_row[0] if owner_row else None,
+                completed_at=metrics.created_at,
+                duration_seconds=metrics.total_duration_seconds,
+                total_tokens=metrics.total_tokens_used,
+                cost_usd=metrics.total_cost_usd,
+                cursor=cur,
+            )
 
     def get_all_review_metrics(
         self, limit: int, since: Optional[int] = None
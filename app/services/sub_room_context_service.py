@@ -8,6 +8,7 @@ import re
 from dataclasses import dataclass
 from typing import List, Optional
 
+from app.config.settings import settings
 from app.core.alerts import AlertSeverity, alert_manager
 from app.models.schemas import Message
 from app.services.storage_service import StorageService, get_storage_service
@@ -16,6 +17,17 @@ from app.utils.helpers import generate_id, get_current_timestamp
 
 logger = logging.getLogger(__name__)
 
+_BLOCKLISTED_PHRASES = ("파일", "업로드", "첨부", "이미지", "스크린샷", "Interaction_Error", "로그")
+
+
+def _topic_keywords(topic: str) -> List[str]:
+    normalized_topic = topic.lower()
+    return [
+        token
+        for token in re.split(r"[\s,.;!?()\[\]{}\-_/]+", normalized_topic)
+        if len(token) >= 2
+    ]
+
 
 @dataclass
 class SubRoomContextRequest:
@@ -38,7 +50,7 @@ class SubRoomContextService:
 
     async def initialize_sub_room(self, request: SubRoomContextRequest) -> Optional[Message]:
         """Generate and persist the initial message for a new sub room."""
-        parent_messages = await self._load_parent_messages(request.parent_room_id)
+        parent_messages = await self._load_parent_messages(request.parent_room_id, request.new_room_name)
         persona_lines = await self._load_user_persona(request.user_id)
 
         try:
@@ -78,9 +90,20 @@ class SubRoomContextService:
             return None
         return message
 
-    async def _load_parent_messages(self, room_id: str) -> List[Message]:
+    async def _load_parent_messages(self, room_id: str, topic: str) -> List[Message]:
+        """Fetch only the recent parent messages that can become highlights."""
+        if not topic:
+            return []
+        search_terms = list(dict.fromkeys([topic.lower(), *_topic_keywords(topic)]))
         try:
-            messages = await asyncio.to_thread(self._storage.get_messages, room_id)
+            messages = await asyncio.to_thread(
+                self._storage.search_recent_messages,
+                room_id,
+                search_terms,
+                limit=settings.SUB_ROOM_HIGHLIGHT_LIMIT,
+                window=settings.SUB_ROOM_HIGHLIGHT_WINDOW,
+                exclude_phrases=_BLOCKLISTED_PHRASES,
+            )
         except Exception as fetch_error:
             logger.warning(
                 "Failed to load conversation history for parent room %s: %s",
@@ -125,14 +148,9 @@ class SubRoomContextService:
             return []
 
         normalized_topic = topic.lower()
-        keywords = [
-            token
-            for token in re.split(r"[\s,.;!?()\[\]{}\-_/]+", normalized_topic)
-            if len(token) >= 2
-        ]
+        keywords = _topic_keywords(topic)
 
         related: List[str] = []
-        blocklisted_phrases = ["파일", "업로드", "첨부", "이미지", "스크린샷", "Interaction_Error", "로그"]
         for message in messages:
             role = (getattr(message, "role", "") or "").lower()
             if role not in {"user", "assistant"}:
@@ -141,7 +159,7 @@ class SubRoomContextService:
             if not content:
                 continue
 
-            if any(keyword in content for keyword in blocklisted_phrases):
+            if any(keyword in content for keyword in _BLOCKLISTED_PHRASES):
                 continue
 
             if role != "user":
@@ -163,7 +181,7 @@ class SubRoomContextService:
                 related.append(trimmed)
 
         # Provide the most recent highlights, keeping the room lightweight.
-        return related[-3:]
+        return related[-settings.SUB_ROOM_HIGHLIGHT_LIMIT:]
 
     def _fallback_message(self, topic: str) -> str:
         return (
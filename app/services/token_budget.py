@@ -0,0 +1,401 @@
+"""
+Atomic daily token budgets backed by Redis scripts.
+
+A request reserves its estimated token cost against every applicable daily
+budget (per user, org-wide) in one script call: either all limits have room and
+the reservation is held against each of them, or nothing changes and the
+request is rejected. When the request finishes it settles its actual usage,
+which releases the reservation and adds the real token count to the daily
+counters; a cancelled request settles what it consumed, refunding the rest.
+
+Counters keep the keys the rest of the app already reads (``usage:{user}:{day}``
+and ``daily_token_usage:{day}``) and hold settled usage only. Outstanding
+reservations live beside them in a hash (amounts plus a ``__total`` field) and a
+sorted set of lease deadlines, so a reservation whose owner died stops counting
+once its lease expires instead of blocking the budget for the rest of the day.
+
+Redis errors fail open, as the previous checks did: the request proceeds
+unmetered and the failure is logged and counted.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import redis
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.config.settings import get_effective_redis_url, settings
+from app.core.metrics import (
+    TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL,
+    TOKEN_BUDGET_RESERVATIONS_TOTAL,
+    TOKEN_BUDGET_SETTLEMENTS_TOTAL,
+)
+from app.utils.helpers import generate_id
+
+logger = logging.getLogger(__name__)
+
+USER_SCOPE = "user"
+ORG_SCOPE = "org"
+
+_COUNTER_TTL_SECONDS = 60 * 60 * 25
+_POINTER_KEY = "token_budget:reservation:{reservation_id}"
+_REDIS_RETRY_SECONDS = 30.0
+
+# KEYS: reservation pointer, then (counter, held hash, lease zset) per scope.
+# ARGV: id, amount, now, lease deadline, key ttl, pointer payload, then one limit per scope (0 = unlimited).
+# Returns {1, 0, 0} when granted (or already held by this id), {0, scope index, used} when rejected.
+_RESERVE_SCRIPT = """
+local id = ARGV[1]
+local amount = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[5])
+local scopes = (#KEYS - 1) / 3
+if redis.call('HEXISTS', KEYS[3], id) == 1 then
+  return {1, 0, 0}
+end
+for s = 0, scopes - 1 do
+  local counter, held, leases = KEYS[s * 3 + 2], KEYS[s * 3 + 3], KEYS[s * 3 + 4]
+  local expired = redis.call('ZRANGEBYSCORE', leases, '-inf', now)
+  for _, lease in ipairs(expired) do
+    local stale = tonumber(redis.call('HGET', held, lease) or '0')
+    if redis.call('HDEL', held, lease) == 1 then
+      redis.call('HINCRBY', held, '__total', -stale)
+    end
+  end
+  if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', leases, '-inf', now)
+  end
+  local limit = tonumber(ARGV[7 + s])
+  if limit > 0 then
+    local used = tonumber(redis.call('GET', counter) or '0') + tonumber(redis.call('HGET', held, '__total') or '0')
+    if used + amount > limit then
+      return {0, s + 1, used}
+    end
+  end
+end
+for s = 0, scopes - 1 do
+  local held, leases = KEYS[s * 3 + 3], KEYS[s * 3 + 4]
+  redis.call('HSET', held, id, amount)
+  redis.call('HINCRBY', held, '__total', amount)
+  redis.call('ZADD', leases, ARGV[4], id)
+  redis.call('EXPIRE', held, ttl)
+  redis.call('EXPIRE', leases, ttl)
+end
+redis.call('SET', KEYS[1], ARGV[6], 'EX', ttl)
+return {1, 0, 0}
+"""
+
+# KEYS: reservation pointer, then (counter, held hash, lease zset) per scope.
+# ARGV: id, actual tokens, key ttl, and '1' to settle only if the reservation pointer still exists.
+# Returns {reserved or -1 if the lease was gone, then per scope: settled + still reserved after this call},
+# or {-2} if the pointer was required and is gone (the reservation was already settled).
+_SETTLE_SCRIPT = """
+local id = ARGV[1]
+local actual = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+if ARGV[4] == '1' and redis.call('EXISTS', KEYS[1]) == 0 then
+  return {-2}
+end
+local result = {tonumber(redis.call('HGET', KEYS[3], id) or '-1')}
+for s = 0, (#KEYS - 1) / 3 - 1 do
+  local counter, held, leases = KEYS[s * 3 + 2], KEYS[s * 3 + 3], KEYS[s * 3 + 4]
+  local amount = tonumber(redis.call('HGET', held, id) or '0')
+  if redis.call('HDEL', held, id) == 1 then
+    redis.call('HINCRBY', held, '__total', -amount)
+  end
+  redis.call('ZREM', leases, id)
+  local used = redis.call('INCRBY', counter, actual)
+  if redis.call('TTL', counter) < 0 then
+    redis.call('EXPIRE', counter, ttl)
+  end
+  table.insert(result, used + tonumber(redis.call('HGET', held, '__total') or '0'))
+end
+redis.call('DEL', KEYS[1])
+return result
+"""
+
+
+@dataclass(frozen=True)
+class BudgetScope:
+    name: str
+    counter_key: str
+    limit: int
+
+
+@dataclass(frozen=True)
+class Reservation:
+    id: str
+    tokens: int
+    granted: bool
+    scopes: Tuple[BudgetScope, ...] = ()
+    rejected_scope: Optional[BudgetScope] = None
+    used: int = 0
+    enforced: bool = True
+
+    @property
+    def detail(self) -> str:
+        if self.granted or self.rejected_scope is None:
+            return ""
+        label = "Daily token budget" if self.rejected_scope.name == USER_SCOPE else "Daily organization token budget"
+        return f"{label} of {self.rejected_scope.limit} exceeded. Please try again tomorrow."
+
+
+def user_usage_key(user_id: str) -> str:
+    # Same key TokenUsageTracker reads for /usage/today.
+    return f"usage:{user_id}:{time.strftime('%Y-%m-%d')}"
+
+
+def org_usage_key() -> str:
+    return f"daily_token_usage:{datetime.utcnow().strftime('%Y-%m-%d')}"
+
+
+def budget_scopes(user_id: Optional[str] = None, include_org: bool = True) -> Tuple[BudgetScope, ...]:
+    """The daily budgets a request by ``user_id`` counts against; scopes without a limit are still metered."""
+    scopes: List[BudgetScope] = []
+    if user_id and user_id != "anonymous":
+        scopes.append(BudgetScope(USER_SCOPE, user_usage_key(user_id), int(settings.DAILY_TOKEN_BUDGET or 0)))
+    if include_org and settings.DAILY_ORG_TOKEN_BUDGET:
+        scopes.append(BudgetScope(ORG_SCOPE, org_usage_key(), int(settings.DAILY_ORG_TOKEN_BUDGET)))
+    return tuple(scopes)
+
+
+def _script_keys(reservation_id: str, scopes: Sequence[BudgetScope]) -> List[str]:
+    keys = [_POINTER_KEY.format(reservation_id=reservation_id)]
+    for scope in scopes:
+        keys.extend([scope.counter_key, f"{scope.counter_key}:held", f"{scope.counter_key}:leases"])
+    return keys
+
+
+def _reserve_args(reservation_id: str, tokens: int, scopes: Sequence[BudgetScope], lease_seconds: float) -> List:
+    now = time.time()
+    pointer = json.dumps([[scope.name, scope.counter_key, scope.limit] for scope in scopes])
+    return [reservation_id, tokens, now, now + lease_seconds, _COUNTER_TTL_SECONDS, pointer] + [
+        scope.limit for scope in scopes
+    ]
+
+
+def _scopes_from_pointer(raw: Optional[str]) -> Tuple[BudgetScope, ...]:
+    if not raw:
+        return ()
+    try:
+        return tuple(BudgetScope(name, key, int(limit)) for name, key, limit in json.loads(raw))
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring malformed token budget reservation pointer: {raw!r}")
+        return ()
+
+
+class TokenBudget:
+    """Reserve, settle and refund token usage against the daily user and org budgets."""
+
+    def __init__(self, redis_url: Optional[str] = None) -> None:
+        self._redis_url = redis_url
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_redis: Optional[aioredis.Redis] = None
+        self._sync_client: Optional[redis.Redis] = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+
+    # --- Async API (request path) ---
+
+    async def reserve(
+        self,
+        tokens: int,
+        user_id: Optional[str] = None,
+        include_org: bool = True,
+        reservation_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> Reservation:
+        """Atomically hold ``tokens`` against every applicable daily budget, or reject without holding any."""
+        scopes = budget_scopes(user_id, include_org)
+        reservation_id = reservation_id or f"rsv_{generate_id()}"
+        client = self._async_client()
+        if not scopes or client is None:
+            return Reservation(reservation_id, tokens, granted=True, scopes=scopes, enforced=False)
+        script = client.register_script(_RESERVE_SCRIPT)
+        try:
+            result = await script(
+                keys=_script_keys(reservation_id, scopes),
+                args=_reserve_args(reservation_id, tokens, scopes, lease_seconds or settings.TOKEN_BUDGET_LEASE_SECONDS),
+            )
+        except RedisError as e:
+            return self._unavailable(reservation_id, tokens, scopes, e)
+        return self._reservation(reservation_id, tokens, scopes, result)
+
+    async def settle(self, reservation: Reservation, actual_tokens: int) -> None:
+        """Release ``reservation`` and record the tokens it actually used. Call exactly once per reservation."""
+        if not reservation.enforced or not reservation.granted:
+            return
+        client = self._async_client()
+        if client is None:
+            return
+        script = client.register_script(_SETTLE_SCRIPT)
+        try:
+            result = await script(
+                keys=_script_keys(reservation.id, reservation.scopes),
+                args=[reservation.id, max(0, int(actual_tokens)), _COUNTER_TTL_SECONDS],
+            )
+        except RedisError as e:
+            self._failed(e)
+            return
+        self._settled(reservation.scopes, actual_tokens, result)
+
+    async def refund(self, reservation: Reservation) -> None:
+        await self.settle(reservation, 0)
+
+    async def usage(self, user_id: str) -> int:
+        """Settled plus reserved tokens for ``user_id`` today."""
+        client = self._async_client()
+        if client is None:
+            return 0
+        key = user_usage_key(user_id)
+        try:
+            used, held = await asyncio.gather(client.get(key), client.hget(f"{key}:held", "__total"))
+        except RedisError as e:
+            self._failed(e)
+            return 0
+        return int(used or 0) + int(held or 0)
+
+    # --- Sync API (Celery workers) ---
+
+    def reserve_sync(
+        self,
+        tokens: int,
+        user_id: Optional[str] = None,
+        include_org: bool = True,
+        reservation_id: Optional[str] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> Reservation:
+        scopes = budget_scopes(user_id, include_org)
+        reservation_id = reservation_id or f"rsv_{generate_id()}"
+        client = self._client()
+        if not scopes or client is None:
+            return Reservation(reservation_id, tokens, granted=True, scopes=scopes, enforced=False)
+        try:
+            result = client.register_script(_RESERVE_SCRIPT)(
+                keys=_script_keys(reservation_id, scopes),
+                args=_reserve_args(reservation_id, tokens, scopes, lease_seconds or settings.TOKEN_BUDGET_LEASE_SECONDS),
+            )
+        except RedisError as e:
+            return self._unavailable(reservation_id, tokens, scopes, e)
+        return self._reservation(reservation_id, tokens, scopes, result)
+
+    def settle_sync(self, reservation_id: str, actual_tokens: int) -> None:
+        """
+        Settle a reservation made by another task, looked up by id.
+
+        If the lease already expired, the usage is still recorded against the
+        reservation's budgets. Settling is idempotent: once the reservation has
+        been settled (or was never held) this is a no-op, so a retried task does
+        not count its usage twice.
+        """
+        client = self._client()
+        if client is None:
+            return
+        try:
+            scopes = _scopes_from_pointer(client.get(_POINTER_KEY.format(reservation_id=reservation_id)))
+            if not scopes:
+                return
+            # The script re-checks the pointer so two concurrent settles cannot both count.
+            result = client.register_script(_SETTLE_SCRIPT)(
+                keys=_script_keys(reservation_id, scopes),
+                args=[reservation_id, max(0, int(actual_tokens)), _COUNTER_TTL_SECONDS, 1],
+            )
+        except RedisError as e:
+            self._failed(e)
+            return
+        if int(result[0]) == -2:
+            return
+        self._settled(scopes, actual_tokens, result)
+
+    # --- Internals ---
+
+    def _reservation(
+        self, reservation_id: str, tokens: int, scopes: Tuple[BudgetScope, ...], result: Sequence[int]
+    ) -> Reservation:
+        granted, scope_index, used = (int(value) for value in result)
+        if granted:
+            TOKEN_BUDGET_RESERVATIONS_TOTAL.labels(outcome="granted").inc()
+            return Reservation(reservation_id, tokens, granted=True, scopes=scopes)
+        TOKEN_BUDGET_RESERVATIONS_TOTAL.labels(outcome="rejected").inc()
+        rejected = scopes[scope_index - 1]
+        logger.info(f"Token budget reservation of {tokens} rejected by {rejected.name} budget ({used}/{rejected.limit})")
+        return Reservation(reservation_id, tokens, granted=False, scopes=scopes, rejected_scope=rejected, used=used)
+
+    def _settled(self, scopes: Sequence[BudgetScope], actual_tokens: int, result: Sequence[int]) -> None:
+        reserved, totals = int(result[0]), [int(total) for total in result[1:]]
+        if reserved < 0:
+            TOKEN_BUDGET_SETTLEMENTS_TOTAL.labels(outcome="expired").inc()
+            reserved = 0
+        else:
+            TOKEN_BUDGET_SETTLEMENTS_TOTAL.labels(outcome="settled" if actual_tokens else "refunded").inc()
+        excess = actual_tokens - reserved
+        if excess <= 0:
+            return
+        for scope, total in zip(scopes, totals):
+            if scope.limit and total > scope.limit:
+                # Only the part of the excess that landed beyond the limit is overshoot.
+                TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL.labels(scope=scope.name).inc(min(excess, total - scope.limit))
+
+    def _unavailable(
+        self, reservation_id: str, tokens: int, scopes: Tuple[BudgetScope, ...], error: Exception
+    ) -> Reservation:
+        self._failed(error)
+        TOKEN_BUDGET_RESERVATIONS_TOTAL.labels(outcome="unavailable").inc()
+        return Reservation(reservation_id, tokens, granted=True, scopes=scopes, enforced=False)
+
+    def _failed(self, error: Exception) -> None:
+        logger.warning(f"Skipping token budget enforcement due to Redis error: {error}")
+        self._retry_at = time.monotonic() + _REDIS_RETRY_SECONDS
+
+    def _url(self) -> Optional[str]:
+        if time.monotonic() < self._retry_at:
+            return None
+        return self._redis_url or get_effective_redis_url()
+
+    def _async_client(self) -> Optional[aioredis.Redis]:
+        url = self._url()
+        if not url:
+            return None
+        # redis.asyncio pools are bound to the event loop that created their connections.
+        loop = asyncio.get_running_loop()
+        if self._async_redis is None or self._async_client_loop is not loop:
+            self._async_redis = aioredis.from_url(
+                url,
+                decode_responses=True,
+                max_connections=settings.TOKEN_BUDGET_REDIS_MAX_CONNECTIONS,
+                socket_timeout=1.0,
+                socket_connect_timeout=1.0,
+            )
+            self._async_client_loop = loop
+        return self._async_redis
+
+    def _client(self) -> Optional[redis.Redis]:
+        url = self._url()
+        if not url:
+            return None
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = redis.from_url(
+                    url,
+                    decode_responses=True,
+                    max_connections=settings.TOKEN_BUDGET_REDIS_MAX_CONNECTIONS,
+                    socket_timeout=1.0,
+                    socket_connect_timeout=1.0,
+                )
+            return self._sync_client
+
+
+_token_budget: Optional[TokenBudget] = None
+
+
+def get_token_budget() -> TokenBudget:
+    global _token_budget
+    if _token_budget is None:
+        _token_budget = TokenBudget()
+    return _token_budget
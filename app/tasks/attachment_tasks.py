@@ -1,33 +1,63 @@
 import logging
-import asyncio
-from PyPDF2 import PdfReader
+import os
+import time
 from pathlib import Path
 
 from app.celery_app import celery_app
+from app.config.settings import settings
+from app.core.green import is_gevent_patched, run_coroutine_sync
+from app.core.metrics import ATTACHMENT_CHUNKS_TOTAL, ATTACHMENT_INGEST_SECONDS
 from app.services.rag_service import get_rag_service
 from app.services.conversation_service import get_conversation_service
 from app.services.cloud_storage_service import get_cloud_storage_service
+from app.utils.documents import SentenceChunker, detect_document_format, iter_document_blocks
 
 logger = logging.getLogger(__name__)
 
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100):
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        yield text[start:end]
-        start += chunk_size - overlap
+
+def _extract_workers() -> int:
+    if is_gevent_patched():
+        # Process pools are unsafe under a monkey-patched parent; the ingestion queue runs on prefork workers.
+        return 1
+    if settings.INGESTION_EXTRACT_WORKERS > 0:
+        return settings.INGESTION_EXTRACT_WORKERS
+    return min(4, os.cpu_count() or 1)
+
+
+def ingest_document(attachment_id: str, file_path: Path, fmt: str) -> int:
+    """Stream ``file_path`` through extraction, chunking, embedding and storage; returns chunks stored."""
+    blocks = iter_document_blocks(
+        file_path,
+        fmt,
+        workers=_extract_workers(),
+        pages_per_task=settings.INGESTION_PDF_PAGES_PER_TASK,
+    )
+    chunker = SentenceChunker(
+        max_tokens=settings.INGESTION_CHUNK_TOKENS,
+        overlap_tokens=settings.INGESTION_CHUNK_OVERLAP_TOKENS,
+    )
+    return run_coroutine_sync(
+        get_rag_service().ingest_chunks(
+            attachment_id, chunker.chunks(blocks), batch_size=settings.INGESTION_EMBED_BATCH_SIZE
+        )
+    )
+
 
 @celery_app.task(name="tasks.process_attachment")
 def process_attachment(attachment_id: str):
     logger.info(f"Starting RAG processing for attachment: {attachment_id}")
     convo_service = get_conversation_service()
-    rag_service = get_rag_service()
 
     attachment = convo_service.get_attachment_by_id(attachment_id)
     if not attachment:
         logger.error(f"Attachment {attachment_id} not found.")
         return
 
+    fmt = detect_document_format(attachment.get("mime"), attachment.get("name"))
+    if fmt is None:
+        logger.warning(f"Unsupported MIME type for extraction: {attachment.get('mime')}")
+        return
+
     cloud_storage = get_cloud_storage_service()
     try:
         file_path = cloud_storage.ensure_local_copy(attachment["url"])
@@ -36,38 +66,23 @@ def process_attachment(attachment_id: str):
         return
 
     cleanup_temp = file_path != Path(attachment["url"])
-
-    text_content = ""
-    if attachment["mime"] == "application/pdf":
-        try:
-            reader = PdfReader(str(file_path))
-            for page in reader.pages:
-                text_content += page.extract_text() or ""
-        except Exception as e:
-            logger.error(f"Failed to extract text from PDF {file_path}: {e}")
-            return
-    else:
-        logger.warning(f"Unsupported MIME type for extraction: {attachment['mime']}")
-        return
-
-    if not text_content.strip():
-        logger.warning(f"No text content extracted from {file_path}")
-        if cleanup_temp:
-            file_path.unlink(missing_ok=True)
-        return
-
-    text_chunks = list(chunk_text(text_content))
-
+    started = time.perf_counter()
     try:
-        asyncio.run(rag_service.create_and_store_chunks(attachment_id, text_chunks))
+        stored = ingest_document(attachment_id, file_path, fmt)
     except Exception as e:
-        logger.error(f"Async call to create_and_store_chunks failed: {e}")
+        logger.error(f"Failed to ingest attachment {attachment_id} ({fmt}): {e}", exc_info=True)
+        # Drop the chunks of a partial run so a retry starts from a clean slate.
+        get_rag_service().delete_chunks(attachment_id)
+        return
+    finally:
         if cleanup_temp:
             file_path.unlink(missing_ok=True)
-        return
 
-    if cleanup_temp:
-        file_path.unlink(missing_ok=True)
+    ATTACHMENT_INGEST_SECONDS.labels(format=fmt).observe(time.perf_counter() - started)
+    ATTACHMENT_CHUNKS_TOTAL.labels(format=fmt).inc(stored)
+    if not stored:
+        logger.warning(f"No text content extracted from {file_path}")
+        return
 
-    logger.info(f"Finished RAG processing for attachment: {attachment_id}")
+    logger.info(f"Finished RAG processing for attachment: {attachment_id} ({stored} chunks)")
     return {"attachment_id": attachment_id, "status": "complete"}
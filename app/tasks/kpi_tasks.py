@@ -1,9 +1,9 @@
 import logging
 from datetime import date, timedelta
-from asgiref.sync import async_to_sync
 from celery.schedules import crontab
 
 from app.celery_app import celery_app
+from app.core.green import run_coroutine_sync
 from app.services.kpi_service import get_kpi_service
 
 logger = logging.getLogger(__name__)
@@ -26,4 +26,4 @@ def generate_kpi_snapshot():
     today = date.today()
     # We run it for the previous day to ensure all data is final
     yesterday = today - timedelta(days=1)
-    async_to_sync(kpi_service.calculate_and_store_daily_snapshot)(snapshot_date=yesterday)
+    run_coroutine_sync(kpi_service.calculate_and_store_daily_snapshot(snapshot_date=yesterday))
@@ -2,13 +2,15 @@
 Celery tasks for memory management, including archival and summarization.
 """
 import logging
-from datetime import date, timedelta
-from asgiref.sync import async_to_sync
+from datetime import date, datetime, timezone
+from typing import Optional
 from celery.schedules import crontab
 
 from app.celery_app import celery_app
-from app.services.memory_service import get_memory_service
-from app.services.storage_service import get_storage_service
+from app.core.green import run_coroutine_sync
+from app.services.memory_service import get_memory_service, last_complete_week_start, weekly_digest_bounds
+from app.repositories.room_repository import get_room_repository
+from app.utils.helpers import get_current_timestamp
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -19,33 +21,58 @@ def setup_periodic_tasks(sender, **kwargs):
     # Run daily at 01:00 UTC to archive old memories
     sender.add_periodic_task(
         crontab(hour=1, minute=0),
-        archive_all_rooms.s(),
-        name='Archive old memories for all rooms'
+        archive_due_rooms.s(),
+        name='Archive old memories for due rooms'
     )
-    # Run weekly on Sunday at 02:00 UTC to create summaries
+    # Run weekly on Monday at 02:00 UTC to digest the week that just ended
     sender.add_periodic_task(
-        crontab(hour=2, minute=0, day_of_week='sunday'),
+        crontab(hour=2, minute=0, day_of_week='monday'),
         summarize_all_rooms_weekly.s(),
-        name='Generate weekly summaries for all rooms'
+        name='Generate weekly digests for active rooms'
     )
 
 @celery_app.task
-def archive_all_rooms():
-    """Iterates through all rooms and triggers archival for each."""
-    logger.info("Starting daily memory archival for all rooms.")
-    storage = get_storage_service()
-    all_rooms = async_to_sync(storage.get_all_rooms)() # Assumes this method exists
-    for room in all_rooms:
-        archive_old_memories_task.delay(room.room_id)
+def archive_due_rooms():
+    """Triggers archival for the rooms whose archival ledger says they are due.
+
+    Rooms without messages past the memory window are never read, so the daily
+    run scales with the rooms that have new data to archive, not the room count.
+    """
+    logger.info("Starting daily memory archival for due rooms.")
+    rooms = get_room_repository()
+    now = get_current_timestamp()
+    page_size = max(settings.MEMORY_ARCHIVE_DISPATCH_PAGE_SIZE, 1)
+    after = None
+    dispatched = 0
+    while True:
+        due = rooms.list_rooms_due_for_archival(now, page_size, after=after)
+        for _, room_id in due:
+            archive_old_memories_task.delay(room_id)
+        dispatched += len(due)
+        if len(due) < page_size:
+            break
+        after = due[-1]
+    logger.info(f"Dispatched memory archival for {dispatched} due rooms.")
 
 @celery_app.task
 def summarize_all_rooms_weekly():
-    """Iterates through all rooms and triggers weekly summarization."""
-    logger.info("Starting weekly summary generation for all rooms.")
-    storage = get_storage_service()
-    all_rooms = async_to_sync(storage.get_all_rooms)()
-    for room in all_rooms:
-        weekly_room_summary_task.delay(room.room_id)
+    """Triggers a digest of the last complete week for every room active since it began."""
+    week_start = last_complete_week_start(datetime.now(timezone.utc).date())
+    since, _ = weekly_digest_bounds(week_start)
+    logger.info(f"Starting weekly digest generation for the week of {week_start}.")
+    rooms = get_room_repository()
+    page_size = max(settings.WEEKLY_DIGEST_DISPATCH_PAGE_SIZE, 1)
+    after = None
+    dispatched = 0
+    while True:
+        room_ids = rooms.list_rooms_updated_since(since, page_size, after=after)
+        for room_id in room_ids:
+            weekly_room_summary_task.delay(room_id, week_start.isoformat())
+        dispatched += len(room_ids)
+        if len(room_ids) < page_size:
+            break
+        after = room_ids[-1]
+    logger.info(f"Dispatched weekly digests for {dispatched} active rooms.")
 
 @celery_app.task
 def archive_old_memories_task(room_id: str):
@@ -55,15 +82,18 @@ def archive_old_memories_task(room_id: str):
     """
     logger.info(f"Running archival task for room_id: {room_id}")
     memory_service = get_memory_service()
-    # This is a placeholder for the complex logic of fetching, summarizing,
-    # and deleting old messages based on settings.
-    async_to_sync(memory_service.archive_old_memories)(room_id)
+    archived = run_coroutine_sync(memory_service.archive_old_memories(room_id))
+    logger.info(f"Archived {archived} messages for room_id: {room_id}")
 
 @celery_app.task
-def weekly_room_summary_task(room_id: str):
+def weekly_room_summary_task(room_id: str, week_start: Optional[str] = None):
     """
-    Summarizes the last 7 days of conversation in a room.
+    Summarizes one week (by default the last complete one) of conversation in a room
+    into summary_notes, using the previous week's digest as context.
     """
-    logger.info(f"Running weekly summary task for room_id: {room_id}")
-    # Placeholder for the summarization logic.
-    pass
+    week = date.fromisoformat(week_start) if week_start else last_complete_week_start(datetime.now(timezone.utc).date())
+    logger.info(f"Running weekly summary task for room_id: {room_id}, week of {week}")
+    memory_service = get_memory_service()
+    digest = run_coroutine_sync(memory_service.generate_weekly_digest(room_id, week))
+    if digest:
+        logger.info(f"Stored weekly digest for room_id: {room_id} ({digest['tokens_saved_estimate']} tokens saved)")
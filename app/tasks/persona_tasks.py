@@ -1,98 +1,197 @@
 """
 Celery tasks for persona generation.
 """
+import asyncio
 import logging
 import json
-from asgiref.sync import async_to_sync
+from typing import Any, Dict, List, Tuple
+
 from app.celery_app import celery_app
-from app.services.storage_service import StorageService
-from app.services.memory_service import MemoryService
-from app.services.llm_service import LLMService
+from app.config.settings import settings
+from app.core.green import run_coroutine_sync
+from app.core.metrics import PERSONA_ROWS_SCANNED_TOTAL, PERSONA_TOKENS_TOTAL
+from app.models.schemas import Message
+from app.repositories.persona_state_repository import get_persona_state_repository
+from app.services.storage_service import get_storage_service
+from app.services.user_fact_service import get_user_fact_service
+from app.services.llm_service import get_llm_service
 from app.utils.trace_id import trace_id_var
 
 logger = logging.getLogger(__name__)
 
+MAX_PERSONA_INTERESTS = 10
+
+PERSONA_SYSTEM_PROMPT = (
+    "You maintain a concise persona profile of a user based on what they write. "
+    "You are given the current persona (possibly empty) and only the user's NEW messages "
+    "since it was last updated. Update the persona to reflect the new messages while keeping "
+    "still-valid information from the current persona. Respond with a JSON object with keys "
+    "\"conversation_style\" (short string), \"interests\" (list of short strings, most relevant first) "
+    "and \"summary\" (one or two sentences)."
+)
+
 
 @celery_app.task(bind=True)
 def generate_user_persona(self, user_id: str):
     """
-    Analyzes a user's message history in their 'main' room to generate and
-    update their persona profile.
+    Analyzes a user's new messages in their 'main' room and folds them into
+    their running persona profile.
     """
     # Set a trace_id for logging and tracking
     trace_id = self.request.id or "persona-gen-" + user_id
     trace_id_var.set(trace_id)
     logger.info(f"Starting persona generation for user_id: {user_id} with trace_id: {trace_id}")
 
-    # Use async_to_sync to call async functions from this sync Celery task
-    async_to_sync(persona_generation_logic)(user_id, trace_id)
+    # Run the async logic from this sync Celery task without blocking other greenlets
+    run_coroutine_sync(persona_generation_logic(user_id, trace_id))
+
+
+def _format_new_history(messages: List[Message], max_chars: int) -> Tuple[str, List[Message]]:
+    """
+    Format new turns oldest first up to ``max_chars``; returns the history and
+    the messages it includes. Turns past the budget are left for the next run,
+    so the watermark must only advance to the last included message.
+    """
+    lines: List[str] = []
+    included: List[Message] = []
+    used = 0
+    for msg in messages:
+        line = f"{msg.role}: {msg.content}"
+        cost = len(line) + (1 if lines else 0)
+        if included and used + cost > max_chars:
+            break
+        # A single turn longer than the budget is truncated rather than blocking the backlog.
+        lines.append(line[:max_chars])
+        included.append(msg)
+        used += cost
+    return "\n".join(lines), included
+
+
+def _merge_persona(prior: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold an LLM persona update into the running persona, keeping prior facts the update omits."""
+    merged = dict(prior)
+
+    style = update.get("conversation_style")
+    if isinstance(style, str) and style.strip():
+        merged["conversation_style"] = style.strip()
+
+    summary = update.get("summary")
+    if isinstance(summary, str) and summary.strip():
+        merged["summary"] = summary.strip()
+
+    interests: List[str] = []
+    seen = set()
+    for interest in list(update.get("interests") or []) + list(prior.get("interests") or []):
+        if not isinstance(interest, str) or not interest.strip():
+            continue
+        key = interest.strip().lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        interests.append(interest.strip())
+    merged["interests"] = interests[:MAX_PERSONA_INTERESTS]
+    return merged
 
 
 async def persona_generation_logic(user_id: str, trace_id: str):
     """
-    The core async logic for generating a user persona.
+    The core async logic for incrementally updating a user persona.
+
+    Only user messages past the stored ``(timestamp, message_id)`` watermark are
+    read, so DB load and LLM tokens scale with new activity rather than history.
     """
-    storage_service = StorageService()
-    memory_service = MemoryService()
-    llm_service = LLMService()
+    storage_service = get_storage_service()
+    user_fact_service = get_user_fact_service()
+    llm_service = get_llm_service()
+    persona_states = get_persona_state_repository()
 
     try:
         # 1. Find the user's main room
-        user_rooms = await storage_service.get_rooms_by_owner(user_id)
+        user_rooms = await asyncio.to_thread(storage_service.get_rooms_by_owner, user_id)
         main_room = next((room for room in user_rooms if room.type == "main"), None)
 
         if not main_room:
             logger.warning(f"No main room found for user {user_id}. Cannot generate persona.")
             return
 
-        # 2. Get message history from the main room
-        messages = await storage_service.get_messages(main_room.room_id)
-
-        # We need a certain amount of history to create a meaningful persona
-        if len(messages) < 10:
-            logger.info(f"Not enough message history for user {user_id} to generate persona (found {len(messages)} messages).")
+        # 2. Read only the user turns written since the last successful run
+        state = await asyncio.to_thread(persona_states.get_state, user_id)
+        prior_persona: Dict[str, Any] = state["persona"] if state else {}
+        new_messages = await asyncio.to_thread(
+            storage_service.get_user_messages_after,
+            main_room.room_id,
+            after_ts=state["last_message_ts"] if state else 0,
+            after_id=state["last_message_id"] if state else "",
+            limit=settings.PERSONA_MAX_MESSAGES_PER_RUN,
+        )
+        rows_scanned = len(new_messages)
+        PERSONA_ROWS_SCANNED_TOTAL.inc(rows_scanned)
+
+        # We need a certain amount of new history to make an update worthwhile
+        min_messages = settings.PERSONA_MIN_NEW_MESSAGES if state else settings.PERSONA_MIN_INITIAL_MESSAGES
+        if rows_scanned < min_messages:
+            logger.info(
+                f"Not enough new messages for user {user_id} to update persona "
+                f"(found {rows_scanned}, need {min_messages})."
+            )
             return
 
-        # 3. Format message history for the LLM
-        message_history = "\n".join(
-            [f"{msg.role}: {msg.content}" for msg in messages if msg.role == 'user']
+        # 3. Ask the LLM to fold the new turns into the current persona
+        history, included = _format_new_history(new_messages, settings.PERSONA_MAX_HISTORY_CHARS)
+        user_prompt = (
+            f"Current persona:\n{json.dumps(prior_persona, ensure_ascii=False)}\n\n"
+            f"New messages:\n{history}"
         )
-
-        # Limit history size to avoid excessive token usage
-        max_history_length = 10000 # Approx 2500 tokens
-        if len(message_history) > max_history_length:
-            message_history = message_history[-max_history_length:]
-
-
-        # 4. Call LLM to generate the persona summary
-        logger.info(f"Generating persona summary for user {user_id} from {len(messages)} messages.")
-        persona_json_str, _ = await llm_service.generate_persona_summary(
-            message_history=message_history,
-            request_id=trace_id
+        provider_name, model, _ = llm_service.select_model_for_task(task="summary")
+        persona_json_str, llm_metrics = await llm_service.invoke(
+            model=model,
+            system_prompt=PERSONA_SYSTEM_PROMPT,
+            user_prompt=user_prompt,
+            request_id=trace_id,
+            response_format="json",
+            provider_name=provider_name,
+        )
+        tokens_used = int((llm_metrics or {}).get("total_tokens", 0) or 0)
+        PERSONA_TOKENS_TOTAL.inc(tokens_used)
+        logger.info(
+            f"Persona run for user {user_id}: rows_scanned={rows_scanned} tokens_used={tokens_used}"
         )
 
-        # 5. Parse the response and update the user's profile
+        # 4. Merge, advance the watermark and update the user's profile
         try:
-            persona_data = json.loads(persona_json_str)
-            logger.info(f"Generated persona data for user {user_id}: {persona_data}")
-
-            # Ensure we only update fields that are part of the persona generation
-            update_payload = {
-                "conversation_style": persona_data.get("conversation_style"),
-                "interests": persona_data.get("interests", [])
-            }
-            # Filter out any None values so we don't overwrite existing fields with null
-            update_payload = {k: v for k, v in update_payload.items() if v is not None}
-
-            if update_payload:
-                await memory_service.update_user_profile(user_id, update_payload)
-            else:
-                logger.warning(f"Persona generation for user {user_id} resulted in empty payload.")
-
-        except json.JSONDecodeError:
+            persona_update = json.loads(persona_json_str)
+            if not isinstance(persona_update, dict):
+                raise ValueError("persona response is not a JSON object")
+        except (json.JSONDecodeError, ValueError):
+            # The watermark is left untouched so the same messages are retried next run.
             logger.error(f"Failed to decode JSON from LLM response for user {user_id}: {persona_json_str}")
-        except Exception as e:
-            logger.error(f"Failed to parse and save persona for user {user_id}: {e}")
+            return
+
+        persona = _merge_persona(prior_persona, persona_update)
+        # Only up to the last turn the LLM saw; the rest is picked up by the next run.
+        last_message = included[-1]
+        await asyncio.to_thread(
+            persona_states.save_state,
+            user_id,
+            persona=persona,
+            last_message_ts=last_message.timestamp,
+            last_message_id=last_message.message_id,
+            messages_processed=len(included),
+            rows_scanned=rows_scanned,
+            tokens_used=tokens_used,
+        )
+
+        update_payload = {
+            "conversation_style": persona.get("conversation_style"),
+            "interests": persona.get("interests") or None,
+        }
+        # Filter out any None values so we don't overwrite existing fields with null
+        update_payload = {k: v for k, v in update_payload.items() if v is not None}
+
+        if update_payload:
+            await user_fact_service.update_user_profile(user_id, update_payload)
+        else:
+            logger.warning(f"Persona generation for user {user_id} resulted in empty payload.")
 
     except Exception as e:
         logger.error(f"An unexpected error occurred during persona generation for user {user_id}: {e}", exc_info=True)
@@ -0,0 +1,322 @@
+"""
+Orchestrated review mode: a whole review runs as one asyncio state machine.
+
+In the chained mode every round is its own Celery task that ``.delay()``s the
+next one, so a review pays five broker round trips, queue waits and
+result-backend writes. With ``REVIEW_ORCHESTRATOR_ENABLED`` a review is one
+``orchestrate_review`` message on the ``review_orchestrator`` queue: the worker
+records a durable run row and hands the review to the process's orchestrator,
+an event loop on a background thread that runs many reviews at once.
+
+The steps are the ones the chained tasks run. Panelist calls of a round go out
+concurrently on the event loop; the database and Redis work of a step runs on
+a thread pool sized to the number of reviews in flight. After every step the
+run row stores the next step and its arguments, and the process renews a lease
+on its runs. When a worker dies, another orchestrator takes its runs over once
+the lease expires and resumes each at the step it was on; panelist checkpoints
+cover the work done inside that step.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional
+
+from celery.exceptions import Ignore
+
+from app.celery_app import celery_app
+from app.config.settings import settings
+from app.core.metrics import (
+    REVIEW_ORCHESTRATOR_ACTIVE_REVIEWS,
+    REVIEW_ORCHESTRATOR_RECOVERED_TOTAL,
+    REVIEW_ORCHESTRATOR_STEP_SECONDS,
+)
+from app.core.secrets import env_secrets_provider
+from app.repositories.review_run_repository import FAILED, ReviewRunRepository, get_review_run_repository
+from app.services.llm_service import LLMService
+from app.services.review_checkpoints import RoundCheckpoints
+from app.services.review_stream import RoundStream, stream_panelist_turn
+from app.tasks.review_tasks import (
+    INITIAL_STEP,
+    REPORT_STEP,
+    REVIEW_ROUND_STEPS,
+    BudgetExceededError,
+    PanelResult,
+    ProviderPanelistConfig,
+    ReviewStep,
+    RoundPlan,
+    _checkpoint_turn,
+    _checkpointed_turn,
+    _fail_review,
+    _report_step,
+)
+from app.utils.trace_id import trace_id_var
+
+logger = logging.getLogger(__name__)
+
+
+async def _panelist_turn(
+    llm_service: LLMService,
+    checkpoints: RoundCheckpoints,
+    panelist_config: ProviderPanelistConfig,
+    prompt: str,
+    request_id: str,
+    round_stream: Optional[RoundStream] = None,
+) -> PanelResult:
+    """Async counterpart of ``_run_checkpointed_turn``."""
+    checkpointed = _checkpointed_turn(checkpoints, panelist_config)
+    if checkpointed is not None:
+        return checkpointed
+    try:
+        if round_stream is None:
+            result = await llm_service.invoke(
+                model=panelist_config.model,
+                system_prompt=panelist_config.system_prompt,
+                user_prompt=prompt,
+                request_id=f"{request_id}-{panelist_config.provider}",
+                response_format="json",
+                provider_name=panelist_config.provider,
+            )
+        else:
+            result = await stream_panelist_turn(
+                llm_service,
+                round_stream,
+                panelist_config.persona,
+                panelist_config.provider,
+                panelist_config.model,
+                panelist_config.system_prompt,
+                prompt,
+                f"{request_id}-{panelist_config.provider}",
+            )
+        turn: PanelResult = (panelist_config, result)
+    except Exception as e:
+        logger.error(f"Failed to get response from {panelist_config.provider} for persona {panelist_config.persona}: {e}", exc_info=True)
+        return panelist_config, e
+    await asyncio.to_thread(_checkpoint_turn, checkpoints, panelist_config.persona, turn)
+    return turn
+
+
+async def _run_round_calls_async(llm_service: LLMService, plan: RoundPlan, checkpoints: RoundCheckpoints) -> List[PanelResult]:
+    """Calls all panelists of the round at once, then the fallbacks for any that failed."""
+    round_stream = plan.live_stream()
+    results = list(await asyncio.gather(*(
+        _panelist_turn(llm_service, checkpoints, p_config, prompt, plan.request_id(p_config), round_stream)
+        for p_config, prompt in plan.calls
+    )))
+    fallbacks = {}
+    for index, (p_config, result) in enumerate(results):
+        fallback_config = plan.fallback_for(p_config, result)
+        if fallback_config is not None:
+            fallbacks[index] = _panelist_turn(
+                llm_service,
+                checkpoints,
+                fallback_config,
+                plan.prompt_for(p_config.persona),
+                plan.fallback_request_id,
+                round_stream,
+            )
+    for index, result in zip(fallbacks, await asyncio.gather(*fallbacks.values())):
+        results[index] = result
+    return results
+
+
+def _retry_delay(attempts: int) -> float:
+    # Same exponential back-off the chained tasks get from Celery's retry_backoff.
+    return float(min(2 ** attempts, 600))
+
+
+class ReviewOrchestrator:
+    """Runs orchestrated reviews on an event loop owned by this process."""
+
+    def __init__(
+        self,
+        runs: Optional[ReviewRunRepository] = None,
+        llm_service: Optional[LLMService] = None,
+        max_concurrent_reviews: Optional[int] = None,
+    ) -> None:
+        self._runs = runs
+        self._llm_service = llm_service
+        self._max_concurrent_reviews = max_concurrent_reviews or settings.REVIEW_ORCHESTRATOR_MAX_CONCURRENCY
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Step threads mostly wait on panel calls running on the loop, so there is one per
+        # review in flight. Run bookkeeping and checkpoint writes use the loop's default
+        # executor, so they never queue behind a step that is waiting for them.
+        self._step_executor = ThreadPoolExecutor(
+            max_workers=self._max_concurrent_reviews, thread_name_prefix="review-step"
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._active: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    # --- Thread-safe API (Celery task, worker signals) ---
+
+    def start(self) -> None:
+        """Start the event loop thread and the lease keeper; safe to call more than once."""
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="review-orchestrator", daemon=True).start()
+            self._loop = loop
+        asyncio.run_coroutine_threadsafe(self._keep_leases(), loop)
+
+    def submit(self, review_id: str) -> Future:
+        """Run (or resume) a review; the returned future resolves when it stops."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._start(review_id), self._loop)
+
+    # --- Event loop ---
+
+    async def _start(self, review_id: str) -> None:
+        task = self._active.get(review_id)
+        if task is None:
+            task = asyncio.create_task(self.run_review(review_id))
+            self._active[review_id] = task
+            task.add_done_callback(lambda _: self._active.pop(review_id, None))
+        await asyncio.shield(task)
+
+    async def run_review(self, review_id: str) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_concurrent_reviews)
+        async with self._slots:
+            run = await asyncio.to_thread(
+                self._repo().claim, review_id, self.owner, settings.REVIEW_ORCHESTRATOR_LEASE_SECONDS
+            )
+            if run is None:
+                # Already finished, or another orchestrator holds a live lease on it.
+                return
+            REVIEW_ORCHESTRATOR_ACTIVE_REVIEWS.inc()
+            try:
+                await self._run_steps(review_id, run["step"], run["state"], run["attempts"])
+            finally:
+                REVIEW_ORCHESTRATOR_ACTIVE_REVIEWS.dec()
+
+    async def _run_steps(self, review_id: str, step: str, state: Dict, attempts: int) -> None:
+        runs = self._repo()
+        while True:
+            try:
+                next_step, next_state = await self._run_step(step, state)
+            except BudgetExceededError as e:
+                logger.error(f"Review {review_id} stopped at step {step}: {e}")
+                await self._fail(review_id, str(e))
+                return
+            except Ignore:
+                await self._fail(review_id, "An unexpected error occurred.")
+                return
+            except Exception as e:
+                attempts += 1
+                if attempts > settings.REVIEW_ORCHESTRATOR_STEP_MAX_RETRIES:
+                    logger.error(f"Review {review_id} failed at step {step}: {e}", exc_info=True)
+                    error = "Failed to generate final report." if step == REPORT_STEP else "An unexpected error occurred."
+                    await self._fail(review_id, error)
+                    return
+                logger.warning(f"Review {review_id} step {step} failed (attempt {attempts}), retrying: {e}")
+                await asyncio.to_thread(runs.record_attempt, review_id, self.owner, attempts)
+                await asyncio.sleep(_retry_delay(attempts))
+                continue
+
+            if next_step is None:
+                await asyncio.to_thread(runs.finish, review_id, self.owner)
+                return
+            if not await asyncio.to_thread(runs.advance, review_id, self.owner, next_step, next_state):
+                logger.warning(f"Review {review_id} was taken over by another orchestrator; stopping here")
+                return
+            step, state, attempts = next_step, next_state, 0
+
+    async def _run_step(self, step: str, state: Dict) -> ReviewStep:
+        loop = asyncio.get_running_loop()
+        llm_service = self._llm()
+        if step == REPORT_STEP:
+            call = partial(_report_step, llm_service, **state)
+        else:
+            def run_panel(plan: RoundPlan, checkpoints: RoundCheckpoints) -> List[PanelResult]:
+                # Runs on the step's thread: the panel calls themselves go out on the loop.
+                future = asyncio.run_coroutine_threadsafe(_run_round_calls_async(llm_service, plan, checkpoints), loop)
+                return future.result()
+
+            call = partial(REVIEW_ROUND_STEPS[step], run_panel, **state)
+
+        def run_with_trace() -> ReviewStep:
+            trace_id_var.set(state.get("trace_id"))
+            return call()
+
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._step_executor, run_with_trace)
+        finally:
+            REVIEW_ORCHESTRATOR_STEP_SECONDS.labels(step=step).observe(time.perf_counter() - started)
+
+    async def _fail(self, review_id: str, error: str) -> None:
+        try:
+            await asyncio.to_thread(_fail_review, review_id, error)
+        finally:
+            await asyncio.to_thread(self._repo().finish, review_id, self.owner, FAILED)
+
+    async def _keep_leases(self) -> None:
+        """Renew the leases of running reviews and take over runs whose owner died."""
+        interval = max(1.0, settings.REVIEW_ORCHESTRATOR_LEASE_SECONDS / 3)
+        while True:
+            try:
+                runs = self._repo()
+                await asyncio.to_thread(
+                    runs.renew, self.owner, list(self._active), settings.REVIEW_ORCHESTRATOR_LEASE_SECONDS
+                )
+                free = self._max_concurrent_reviews - len(self._active)
+                if free > 0:
+                    for review_id in await asyncio.to_thread(
+                        runs.claim_expired, self.owner, settings.REVIEW_ORCHESTRATOR_LEASE_SECONDS, free
+                    ):
+                        logger.info(f"Resuming review {review_id} after its orchestrator stopped renewing its lease")
+                        REVIEW_ORCHESTRATOR_RECOVERED_TOTAL.inc()
+                        asyncio.ensure_future(self._start(review_id))
+            except Exception as e:
+                logger.warning(f"Review orchestrator lease upkeep failed: {e}", exc_info=True)
+            await asyncio.sleep(interval)
+
+    def _repo(self) -> ReviewRunRepository:
+        if self._runs is None:
+            self._runs = get_review_run_repository()
+        return self._runs
+
+    def _llm(self) -> LLMService:
+        if self._llm_service is None:
+            self._llm_service = LLMService(env_secrets_provider)
+        return self._llm_service
+
+
+_review_orchestrator: Optional[ReviewOrchestrator] = None
+
+
+def get_review_orchestrator() -> ReviewOrchestrator:
+    global _review_orchestrator
+    if _review_orchestrator is None:
+        _review_orchestrator = ReviewOrchestrator()
+    return _review_orchestrator
+
+
+@celery_app.task
+def orchestrate_review(
+    review_id: str,
+    review_room_id: str,
+    topic: str,
+    instruction: str,
+    panelists_override: Optional[List[str]],
+    trace_id: str,
+):
+    """Record the review's run and hand it to this worker's orchestrator; returns without waiting."""
+    get_review_run_repository().create(review_id, INITIAL_STEP, {
+        "review_id": review_id,
+        "review_room_id": review_room_id,
+        "topic": topic,
+        "instruction": instruction,
+        "panelists_override": panelists_override,
+        "trace_id": trace_id,
+    })
+    get_review_orchestrator().submit(review_id)
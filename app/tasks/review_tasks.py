@@ -3,18 +3,18 @@ import time
 import json
 import asyncio
 import inspect
-import redis
-from redis.exceptions import RedisError
-from datetime import datetime
-from typing import List, Dict, Any, Tuple, Union, Optional, Type, Coroutine
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, List, Dict, Any, Tuple, Union, Optional, Type, Coroutine
 
 from celery import states
 from celery.exceptions import Ignore
 from pydantic import BaseModel, ValidationError
 
 from app.celery_app import celery_app
-from app.config.settings import get_effective_redis_url, settings
-from app.models.schemas import Message, WebSocketMessage, ReviewMeta
+from app.core.green import run_coroutine_sync
+from app.config.settings import settings
+from app.models.schemas import Message, WebSocketMessage, ReviewMeta, ReviewMetrics
 from app.models.review_schemas import LLMReviewTurn, LLMReviewResolution, LLMFinalReport
 from app.services.redis_pubsub import redis_pubsub_manager
 from app.services.llm_strategy import llm_strategy_service, ProviderPanelistConfig
@@ -26,6 +26,11 @@ from app.utils.helpers import generate_id, get_current_timestamp
 from app.tasks.base_task import BaseTask
 from app.services.llm_service import LLMService
 from app.services.storage_service import storage_service
+from app.services.token_budget import get_token_budget
+from app.services.review_checkpoints import RoundCheckpoints, get_review_checkpoints
+from app.services.prompt_budget import PromptBudget, PromptSection
+from app.services.review_stream import RoundStream, stream_panelist_turn
+from app.core.metrics import REVIEW_PROMPT_SECTIONS_COMPRESSED_TOTAL, REVIEW_PROMPT_TOKENS
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +57,9 @@ class BudgetExceededError(Exception):
     """Custom exception for when a budget is exceeded."""
     pass
 
+# A panelist config paired with its (content, metrics) output, or the exception it failed with.
+PanelResult = Tuple[ProviderPanelistConfig, Union[Tuple[Any, Dict[str, Any]], BaseException]]
+
 def run_panelist_turn(
     llm_service: LLMService,
     panelist_config: ProviderPanelistConfig,
@@ -69,12 +77,68 @@ def run_panelist_turn(
             response_format="json"
         )
         if inspect.isawaitable(result):
-            result = asyncio.run(result)
+            result = run_coroutine_sync(result)
         return panelist_config, result
     except Exception as e:
         logger.error(f"Failed to get response from {panelist_config.provider} for persona {panelist_config.persona}: {e}", exc_info=True)
         return panelist_config, e
 
+def run_streamed_panelist_turn(
+    llm_service: LLMService,
+    panelist_config: ProviderPanelistConfig,
+    prompt: str,
+    request_id: str,
+    round_stream: RoundStream,
+) -> PanelResult:
+    """Like ``run_panelist_turn``, publishing the panelist's text to review subscribers as it is generated."""
+    try:
+        result = run_coroutine_sync(stream_panelist_turn(
+            llm_service,
+            round_stream,
+            panelist_config.persona,
+            panelist_config.provider,
+            panelist_config.model,
+            panelist_config.system_prompt,
+            prompt,
+            f"{request_id}-{panelist_config.provider}",
+        ))
+        return panelist_config, result
+    except Exception as e:
+        logger.error(f"Failed to stream response from {panelist_config.provider} for persona {panelist_config.persona}: {e}", exc_info=True)
+        return panelist_config, e
+
+def _checkpointed_turn(checkpoints: RoundCheckpoints, panelist_config: ProviderPanelistConfig) -> Optional[PanelResult]:
+    """The output an earlier attempt of this round checkpointed for the panelist, if any."""
+    checkpoint = checkpoints.get(panelist_config.persona)
+    if checkpoint is None:
+        return None
+    return ProviderPanelistConfig(**checkpoint.config), (checkpoint.content, checkpoint.metrics)
+
+def _checkpoint_turn(checkpoints: RoundCheckpoints, persona: str, turn: PanelResult) -> None:
+    config, result = turn
+    if not isinstance(result, BaseException):
+        content, metrics = result
+        checkpoints.save(persona, config.model_dump(), content, metrics)
+
+def _run_checkpointed_turn(
+    llm_service: LLMService,
+    checkpoints: RoundCheckpoints,
+    panelist_config: ProviderPanelistConfig,
+    prompt: str,
+    request_id: str,
+    round_stream: Optional[RoundStream] = None,
+) -> PanelResult:
+    """Runs a panelist turn unless an earlier attempt of this round already checkpointed its output."""
+    checkpointed = _checkpointed_turn(checkpoints, panelist_config)
+    if checkpointed is not None:
+        return checkpointed
+    if round_stream is None:
+        turn = run_panelist_turn(llm_service, panelist_config, prompt, request_id)
+    else:
+        turn = run_streamed_panelist_turn(llm_service, panelist_config, prompt, request_id, round_stream)
+    _checkpoint_turn(checkpoints, panelist_config.persona, turn)
+    return turn
+
 def _save_panelist_message(review_room_id: str, content: str, persona: str, round_num: int) -> Message:
     """Saves a panelist's output as a message in the review room."""
     try:
@@ -209,7 +273,7 @@ def _run_coroutine_safely(coro: Coroutine[Any, Any, Any]) -> None:
     """Execute a coroutine in synchronous contexts, falling back to scheduling if needed."""
 
     try:
-        asyncio.run(coro)
+        run_coroutine_sync(coro)
     except RuntimeError:
         loop = asyncio.get_event_loop()
         loop.create_task(coro)
@@ -311,6 +375,28 @@ def _sync_review_outcome_to_hierarchy(
         )
 
 
+def _persist_review_metrics(
+    review_id: str, review_meta: ReviewMeta, all_metrics: List[List[Dict[str, Any]]]
+) -> None:
+    """Store review-level metrics, which also feeds the incremental KPI rollups."""
+
+    completed_at = get_current_timestamp()
+    flat_metrics = [m for r in all_metrics for m in r if isinstance(m, dict)]
+    try:
+        storage_service.save_review_metrics(
+            ReviewMetrics(
+                review_id=review_id,
+                total_duration_seconds=float(max(0, completed_at - (review_meta.created_at or completed_at))),
+                total_tokens_used=int(sum(m.get("total_tokens", 0) or 0 for m in flat_metrics)),
+                total_cost_usd=float(sum(m.get("cost_usd", 0.0) or 0.0 for m in flat_metrics)),
+                round_metrics=all_metrics,
+                created_at=completed_at,
+            )
+        )
+    except Exception as exc:  # noqa: BLE001 - metrics must never fail a review
+        logger.warning("Failed to persist review metrics for %s: %s", review_id, exc, exc_info=True)
+
+
 def _all_panelists_declined(turn_outputs: Dict[str, Any]) -> bool:
     """Return True if every panelist flagged that they have no new arguments."""
 
@@ -459,68 +545,85 @@ def _quote_text(text: str, max_len: int = 160) -> str:
     return f"“{squashed}”"
 
 
-def _round1_self_snapshot(output: Dict[str, Any]) -> str:
+# Detail levels of the digests that go into round prompts; the prompt budget
+# falls back to a lower level when a digest does not fit.
+FULL_DETAIL, KEY_POINTS, HEADLINES = 2, 1, 0
+DIGEST_DETAIL_LEVELS = (FULL_DETAIL, KEY_POINTS, HEADLINES)
+
+
+def _round1_self_snapshot(output: Dict[str, Any], detail: int = FULL_DETAIL) -> str:
     snapshot = {
         "round": output.get("round", 1),
         "key_takeaway": output.get("key_takeaway", ""),
-        "sample_line": _quote_text(output.get("message", ""), 140),
     }
+    if detail >= FULL_DETAIL:
+        snapshot["sample_line"] = _quote_text(output.get("message", ""), 140)
+    if detail <= HEADLINES:
+        return json.dumps(snapshot, ensure_ascii=False)
     return json.dumps(snapshot, ensure_ascii=False, indent=2)
 
 
 def _round1_competitor_digest(
-    target_persona: str, turn_1_outputs: Dict[str, Dict[str, Any]]
+    target_persona: str, turn_1_outputs: Dict[str, Dict[str, Any]], detail: int = FULL_DETAIL
 ) -> str:
     sections: List[str] = []
     for persona, output in turn_1_outputs.items():
         if persona == target_persona:
             continue
-        key = _quote_text(output.get("key_takeaway") or output.get("message", "")) or "요약 없음"
+        key_len = 160 if detail > HEADLINES else 80
+        key = _quote_text(output.get("key_takeaway") or output.get("message", ""), key_len) or "요약 없음"
         lines = [f"- {persona}: {key}"]
-        tone_hint = _persona_style(persona)
-        if tone_hint:
-            lines.append(f"  • 톤: {tone_hint}")
-        excerpt = _quote_text(output.get("message", ""), 140)
-        if excerpt:
-            lines.append(f"  • 한 줄 메모: {excerpt}")
+        if detail >= FULL_DETAIL:
+            tone_hint = _persona_style(persona)
+            if tone_hint:
+                lines.append(f"  • 톤: {tone_hint}")
+        if detail >= KEY_POINTS:
+            excerpt = _quote_text(output.get("message", ""), 140 if detail >= FULL_DETAIL else 80)
+            if excerpt:
+                lines.append(f"  • 한 줄 메모: {excerpt}")
         sections.append("\n".join(lines))
     if not sections:
         return "- 다른 패널의 발언이 아직 없습니다."
     return "\n".join(sections)
 
 
-def _summarize_round2_output(output: Dict[str, Any]) -> str:
+def _summarize_round2_output(output: Dict[str, Any], detail: int = FULL_DETAIL) -> str:
     if output.get("no_new_arguments"):
         return "no new arguments"
     parts: List[str] = []
-    for ref in _clip_references(output.get("references", []), 2):
+    ref_limit = 2 if detail >= FULL_DETAIL else 1
+    for ref in _clip_references(output.get("references", []), ref_limit):
         stance = STANCE_SUMMARY.get(ref.get("stance"), "참조")
-        quote = _quote_text(ref.get("quote", ""), 120)
+        quote = _quote_text(ref.get("quote", ""), 120 if detail >= FULL_DETAIL else 80)
         target = ref.get("panelist") or "다른 패널"
         round_info = ref.get("round")
         round_str = f" R{round_info}" if round_info else ""
         fragment = f"{stance} {target}{round_str} {quote}".strip()
         parts.append(fragment)
-    message_excerpt = _quote_text(output.get("message", ""), 140)
-    if message_excerpt:
-        parts.append(f"메시지: {message_excerpt}")
+    if detail >= FULL_DETAIL:
+        message_excerpt = _quote_text(output.get("message", ""), 140)
+        if message_excerpt:
+            parts.append(f"메시지: {message_excerpt}")
     return "; ".join(filter(None, parts))
 
 
 def _conversation_digest(
     turn_1_outputs: Dict[str, Dict[str, Any]],
     turn_2_outputs: Dict[str, Dict[str, Any]],
+    detail: int = FULL_DETAIL,
 ) -> str:
     blocks: List[str] = []
     for speaker, round1 in turn_1_outputs.items():
-        key_line = _quote_text(round1.get("key_takeaway") or round1.get("message", "")) or "요약 없음"
+        key_len = 160 if detail > HEADLINES else 80
+        key_line = _quote_text(round1.get("key_takeaway") or round1.get("message", ""), key_len) or "요약 없음"
         block_lines = [f"- {speaker} R1: {key_line}"]
-        tone_hint = _persona_style(speaker)
-        if tone_hint:
-            block_lines.append(f"  • 톤: {tone_hint}")
-        r2 = turn_2_outputs.get(speaker)
+        if detail >= FULL_DETAIL:
+            tone_hint = _persona_style(speaker)
+            if tone_hint:
+                block_lines.append(f"  • 톤: {tone_hint}")
+        r2 = turn_2_outputs.get(speaker) if detail > HEADLINES else None
         if r2:
-            summary = _summarize_round2_output(r2)
+            summary = _summarize_round2_output(r2, detail)
             if summary:
                 block_lines.append(f"  • R2: {summary}")
         blocks.append("\n".join(block_lines))
@@ -530,7 +633,7 @@ def _conversation_digest(
 
 
 def _build_resolution_context(
-    panel_history: Dict[str, Dict[str, Any]], target_persona: Optional[str]
+    panel_history: Dict[str, Dict[str, Any]], target_persona: Optional[str], detail: int = FULL_DETAIL
 ) -> str:
     lines: List[str] = []
 
@@ -552,10 +655,12 @@ def _build_resolution_context(
             continue
         summary = _quote_text(
             round_three.get("key_takeaway")
-            or round_three.get("message", "")
+            or round_three.get("message", ""),
+            160 if detail > HEADLINES else 80,
         ) or "요약 없음"
         overview.append(f"- {persona}: {summary}")
-        for ref in _clip_references(round_three.get("references"), 2):
+        ref_limit = {FULL_DETAIL: 2, KEY_POINTS: 1}.get(detail, 0)
+        for ref in _clip_references(round_three.get("references"), ref_limit):
             stance = STANCE_SUMMARY.get(ref.get("stance"), "참조")
             quote = _quote_text(ref.get("quote", ""), 120)
             target = ref.get("panelist") or "다른 패널"
@@ -574,6 +679,37 @@ def _build_resolution_context(
     return "\n".join(lines)
 
 
+# Round prompt sections, in the order the budget may shorten them (lowest first).
+COMPETITOR_PRIORITY, OWN_HISTORY_PRIORITY, INSTRUCTION_PRIORITY = 1, 2, 3
+INSTRUCTION_MAX_SHARE = 0.3
+OWN_HISTORY_MAX_SHARE = 0.25
+
+
+def _instruction_section(instruction: str) -> PromptSection:
+    return PromptSection("instruction", [instruction], INSTRUCTION_PRIORITY, INSTRUCTION_MAX_SHARE)
+
+
+def _budgeted_prompt(
+    template: str,
+    round_num: int,
+    panelist_config: ProviderPanelistConfig,
+    sections: List[PromptSection],
+    **fields: Any,
+) -> str:
+    """Render a round prompt with its sections fitted to the panelist model's token budget."""
+    budget = PromptBudget(settings.REVIEW_PROMPT_TOKEN_BUDGET, model=panelist_config.model)
+    budgeted = budget.assemble(partial(prompt_service.get_prompt, template, **fields), sections)
+    REVIEW_PROMPT_TOKENS.labels(round=str(round_num)).observe(budgeted.tokens)
+    for name in budgeted.compressed:
+        REVIEW_PROMPT_SECTIONS_COMPRESSED_TOTAL.labels(round=str(round_num), section=name).inc()
+    if budgeted.compressed:
+        logger.info(
+            f"Round {round_num} prompt for {panelist_config.persona} shortened {budgeted.compressed} "
+            f"to fit {budget.max_tokens} tokens ({budgeted.tokens} used)"
+        )
+    return budgeted.prompt
+
+
 def _build_fallback_final_report(topic: str, instruction: str) -> Dict[str, Any]:
     return {
         "topic": topic,
@@ -595,17 +731,49 @@ def _build_fallback_final_report(topic: str, instruction: str) -> Dict[str, Any]
     }
 
 
+def _save_and_publish_panelist_message(
+    review_id: str,
+    review_room_id: str,
+    content: str,
+    persona: str,
+    round_num: int,
+    checkpoints: Optional[RoundCheckpoints],
+) -> None:
+    saved_message = None
+    if checkpoints is not None and checkpoints.saved_message_id(persona):
+        if checkpoints.message_published(persona):
+            return
+        # Saved by an earlier attempt whose publish failed: publish the saved message.
+        saved_message = storage_service.get_message(checkpoints.saved_message_id(persona))
+    if saved_message is None:
+        saved_message = _save_panelist_message(review_room_id, content, persona, round_num)
+        if checkpoints is not None:
+            checkpoints.mark_message_saved(persona, saved_message.message_id)
+    redis_pubsub_manager.publish_sync(
+        f"review_{review_id}",
+        WebSocketMessage(
+            type="new_message",
+            review_id=review_id,
+            payload=saved_message.model_dump()
+        ).model_dump_json()
+    )
+    if checkpoints is not None:
+        checkpoints.mark_message_published(persona)
+
+
 def _process_turn_results(
     review_id: str,
     review_room_id: str,
     round_num: int,
     results: List[Tuple[ProviderPanelistConfig, Union[Tuple[Any, Dict[str, Any]], BaseException]]],
     all_previous_metrics: List[List[Dict[str, Any]]],
-    validation_model: Type[BaseModel]
+    validation_model: Type[BaseModel],
+    checkpoints: Optional[RoundCheckpoints] = None,
 ) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[ProviderPanelistConfig]]:
     """
     Processes results from a single turn, validates against a Pydantic model,
-    saves messages, and collects metrics.
+    saves messages, and collects metrics. Messages already saved by an earlier
+    attempt of the round (per ``checkpoints``) are not saved again.
     """
     turn_outputs, round_metrics, successful_panelists = {}, [], []
     for panelist_config, result in results:
@@ -627,17 +795,8 @@ def _process_turn_results(
 
                 round_metrics.append(metrics)
                 successful_panelists.append(panelist_config)
-                # Save the original, validated JSON content to the database
-                saved_message = _save_panelist_message(review_room_id, content, persona, round_num)
-                # Publish the new message event to the live stream
-                redis_pubsub_manager.publish_sync(
-                    f"review_{review_id}",
-                    WebSocketMessage(
-                        type="new_message",
-                        review_id=review_id,
-                        payload=saved_message.model_dump()
-                    ).model_dump_json()
-                )
+                # Save the original, validated JSON content and publish it to the live stream
+                _save_and_publish_panelist_message(review_id, review_room_id, content, persona, round_num, checkpoints)
             except (json.JSONDecodeError, ValidationError) as e:
                 error_message = f"Panelist {persona} in round {round_num} returned invalid or non-validating JSON. Error: {e}. Raw content: {content}"
                 logger.error(error_message)
@@ -654,19 +813,13 @@ def _process_turn_results(
                     turn_outputs[persona] = fallback_payload
                     round_metrics.append(metrics_record)
                     successful_panelists.append(panelist_config)
-                    saved_message = _save_panelist_message(
+                    _save_and_publish_panelist_message(
+                        review_id,
                         review_room_id,
                         json.dumps(fallback_payload, ensure_ascii=False),
                         persona,
                         round_num,
-                    )
-                    redis_pubsub_manager.publish_sync(
-                        f"review_{review_id}",
-                        WebSocketMessage(
-                            type="new_message",
-                            review_id=review_id,
-                            payload=saved_message.model_dump()
-                        ).model_dump_json(),
+                        checkpoints,
                     )
                 else:
                     round_metrics.append({
@@ -679,141 +832,588 @@ def _process_turn_results(
     _check_review_budget(review_id, all_previous_metrics + [round_metrics])
     return turn_outputs, round_metrics, successful_panelists
 
-@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3}, retry_backoff=True)
-def run_initial_panel_turn(self: BaseTask, review_id: str, review_room_id: str, topic: str, instruction: str, panelists_override: Optional[List[str]], trace_id: str):
-    try:
-        _record_status_update(review_id, "processing")
-
-        if settings.DAILY_ORG_TOKEN_BUDGET:
-            redis_url = get_effective_redis_url()
-            redis_client = None
-            if redis_url:
-                try:
-                    redis_client = redis.from_url(redis_url, decode_responses=True)
-                    today_key = f"daily_token_usage:{datetime.utcnow().strftime('%Y-%m-%d')}"
-                    current_usage = int(redis_client.get(today_key) or 0)
-                    if current_usage > settings.DAILY_ORG_TOKEN_BUDGET:
-                        raise BudgetExceededError(f"Daily token budget of {settings.DAILY_ORG_TOKEN_BUDGET} exceeded.")
-                except RedisError as exc:
-                    logger.warning(
-                        "Skipping org budget enforcement due to Redis error: %s",
-                        exc,
-                    )
-                finally:
-                    if redis_client:
-                        redis_client.close()
-            else:
-                logger.info("Daily org token budget check skipped (Redis unavailable)")
-
-        if panelists_override:
-            panel_configs = llm_strategy_service.get_panelists_for_providers(panelists_override)
-        else:
-            panel_configs = llm_strategy_service.get_default_panelists()
 
-        if not panel_configs:
-            logger.error(
-                "No panel configurations available for providers: %s",
-                panelists_override or "default",
-            )
-            raise Ignore()
+def _openai_config(panel_configs: List[ProviderPanelistConfig]) -> Optional[ProviderPanelistConfig]:
+    return next((p for p in panel_configs if p.provider == 'openai'), None)
 
-        try:
-            storage_service.update_review(review_id, {"status": "in_progress"})
-        except Exception as exc:
-            logger.warning(
-                "Failed to update review %s status to in_progress: %s",
-                review_id,
-                exc,
-                exc_info=True,
+
+@dataclass
+class RoundPlan:
+    """The prompts of one review round, ready to be sent to the panel."""
+
+    round_num: int
+    calls: List[Tuple[ProviderPanelistConfig, str]]
+    openai_config: Optional[ProviderPanelistConfig]
+    trace_id: str
+    review_id: str
+
+    def request_id(self, panelist_config: ProviderPanelistConfig) -> str:
+        return f"{self.trace_id}-r{self.round_num}-{panelist_config.provider}"
+
+    @property
+    def fallback_request_id(self) -> str:
+        return f"{self.trace_id}-r{self.round_num}-fallback"
+
+    def live_stream(self) -> Optional[RoundStream]:
+        """Where the round's panelist output is streamed to subscribers, when streaming is on."""
+        if not settings.REVIEW_STREAMING_ENABLED:
+            return None
+        return RoundStream(self.review_id, self.round_num)
+
+    def prompt_for(self, persona: str) -> str:
+        return next((prompt for config, prompt in self.calls if config.persona == persona), "")
+
+    def fallback_for(self, panelist_config: ProviderPanelistConfig, result: Any) -> Optional[ProviderPanelistConfig]:
+        """The OpenAI stand-in for a failed non-OpenAI panelist, as per README; None if there is none."""
+        if not isinstance(result, BaseException) or panelist_config.provider == 'openai' or not self.openai_config:
+            return None
+        logger.warning(
+            f"Panelist {panelist_config.persona} ({panelist_config.provider}) failed in round {self.round_num}. "
+            "Retrying with fallback provider OpenAI."
+        )
+        return ProviderPanelistConfig(
+            provider='openai',
+            persona=panelist_config.persona,
+            model=self.openai_config.model,
+            system_prompt=panelist_config.system_prompt or self.openai_config.system_prompt,
+            timeout_s=self.openai_config.timeout_s,
+            max_retries=0,
+        )
+
+
+# Sends a round's prompts to the panel and returns one result per planned call.
+PanelRunner = Callable[[RoundPlan, RoundCheckpoints], List[PanelResult]]
+# The next step of a review and its keyword arguments; the step is None once the review is done.
+ReviewStep = Tuple[Optional[str], Dict[str, Any]]
+
+INITIAL_STEP = "initial"
+REBUTTAL_STEP = "rebuttal"
+SYNTHESIS_STEP = "synthesis"
+RESOLUTION_STEP = "resolution"
+REPORT_STEP = "report"
+
+
+def _run_round_calls(llm_service: LLMService, plan: RoundPlan, checkpoints: RoundCheckpoints) -> List[PanelResult]:
+    """Calls the panelists one after another, then the fallbacks for any that failed."""
+    round_stream = plan.live_stream()
+    results = [
+        _run_checkpointed_turn(llm_service, checkpoints, p_config, prompt, plan.request_id(p_config), round_stream)
+        for p_config, prompt in plan.calls
+    ]
+    final_results = []
+    for p_config, result in results:
+        fallback_config = plan.fallback_for(p_config, result)
+        if fallback_config is None:
+            final_results.append((p_config, result))
+        else:
+            final_results.append(
+                _run_checkpointed_turn(
+                    llm_service,
+                    checkpoints,
+                    fallback_config,
+                    plan.prompt_for(p_config.persona),
+                    plan.fallback_request_id,
+                    round_stream,
+                )
             )
+    return final_results
+
+
+def _review_topic(review_id: str) -> Tuple[str, str]:
+    review_meta = storage_service.get_review_meta(review_id)
+    if not review_meta:
+        return "", ""
+    return review_meta.topic, review_meta.instruction
+
+
+def _persist_round(review_id: str, round_num: int, review_data: Dict[str, Any]) -> None:
+    try:
+        storage_service.update_review(review_id, review_data)
+    except Exception as exc:
+        logger.warning(
+            "Failed to persist round %s metadata for review %s: %s",
+            round_num,
+            review_id,
+            exc,
+            exc_info=True,
+        )
+
+
+def _report_step_kwargs(
+    review_id: str,
+    panel_history: Dict[str, Dict[str, Any]],
+    all_metrics: List[List[Dict[str, Any]]],
+    trace_id: str,
+) -> ReviewStep:
+    return REPORT_STEP, {
+        "review_id": review_id,
+        "panel_history": panel_history,
+        "all_metrics": all_metrics,
+        "executed_rounds": _collect_completed_rounds(panel_history),
+        "trace_id": trace_id,
+    }
+
+
+def _initial_panel_step(
+    run_panel: PanelRunner,
+    review_id: str,
+    review_room_id: str,
+    topic: str,
+    instruction: str,
+    panelists_override: Optional[List[str]],
+    trace_id: str,
+) -> ReviewStep:
+    _record_status_update(review_id, "processing")
+
+    # Hold the review's expected cost against the org budget up front; the final
+    # report settles the actual usage. Idempotent across task retries.
+    reservation = get_token_budget().reserve_sync(
+        settings.PER_REVIEW_TOKEN_BUDGET or settings.TOKEN_BUDGET_REVIEW_ESTIMATE,
+        reservation_id=f"review:{review_id}",
+        lease_seconds=settings.TOKEN_BUDGET_REVIEW_LEASE_SECONDS,
+    )
+    if not reservation.granted:
+        raise BudgetExceededError(reservation.detail)
+
+    if panelists_override:
+        panel_configs = llm_strategy_service.get_panelists_for_providers(panelists_override)
+    else:
+        panel_configs = llm_strategy_service.get_default_panelists()
+
+    if not panel_configs:
+        logger.error(
+            "No panel configurations available for providers: %s",
+            panelists_override or "default",
+        )
+        raise Ignore()
+
+    try:
+        storage_service.update_review(review_id, {"status": "in_progress"})
+    except Exception as exc:
+        logger.warning(
+            "Failed to update review %s status to in_progress: %s",
+            review_id,
+            exc,
+            exc_info=True,
+        )
 
-        prompts_by_persona: Dict[str, str] = {}
-        initial_results = []
-        for p_config in panel_configs:
-            prompt = prompt_service.get_prompt(
+    checkpoints = get_review_checkpoints().load_round(review_id, 1)
+    calls = [
+        (
+            p_config,
+            _budgeted_prompt(
                 "review_initial_analysis",
+                1,
+                p_config,
+                [_instruction_section(instruction)],
                 topic=topic,
-                instruction=instruction,
                 panelist=p_config.persona,
                 persona_trait=_persona_style(p_config.persona),
-            )
-            prompts_by_persona[p_config.persona] = prompt
-            initial_results.append(
-                run_panelist_turn(
-                    self.llm_service,
-                    p_config,
-                    prompt,
-                    f"{trace_id}-r1-{p_config.provider}",
-                )
-            )
+            ),
+        )
+        for p_config in panel_configs
+    ]
+    plan = RoundPlan(1, calls, _openai_config(panel_configs), trace_id, review_id)
 
-        # Implement fallback logic as per README
-        final_results = []
-        openai_config = next((p for p in panel_configs if p.provider == 'openai'), None)
-
-        for p_config, result in initial_results:
-            if isinstance(result, BaseException) and p_config.provider != 'openai' and openai_config:
-                logger.warning(f"Panelist {p_config.persona} ({p_config.provider}) failed. Retrying with fallback provider OpenAI.")
-
-                fallback_config = ProviderPanelistConfig(
-                    provider='openai',
-                    persona=p_config.persona,
-                    model=openai_config.model,
-                    system_prompt=p_config.system_prompt or openai_config.system_prompt,
-                    timeout_s=openai_config.timeout_s,
-                    max_retries=0
-                )
+    turn_outputs, round_metrics, successful_panelists = _process_turn_results(
+        review_id, review_room_id, 1, run_panel(plan, checkpoints), [], validation_model=LLMReviewTurn, checkpoints=checkpoints
+    )
 
-                fb_prompt = prompts_by_persona.get(p_config.persona, "")
-                fb_p_config, fb_result = run_panelist_turn(
-                    self.llm_service,
-                    fallback_config,
-                    fb_prompt,
-                    f"{trace_id}-r1-fallback",
-                )
-                final_results.append((fb_p_config, fb_result))
-            else:
-                final_results.append((p_config, result))
+    panel_history = _merge_round_outputs({}, 1, turn_outputs)
+    _persist_round(review_id, 1, {"status": "in_progress", "current_round": 1})
+    _record_status_update(review_id, "initial_turn_complete", round_num=1)
+
+    return REBUTTAL_STEP, {
+        "review_id": review_id,
+        "review_room_id": review_room_id,
+        "turn_1_outputs": turn_outputs,
+        "panel_history": panel_history,
+        "all_metrics": [round_metrics],
+        "successful_panelists": [p.model_dump() for p in successful_panelists],
+        "trace_id": trace_id,
+    }
+
+
+def _rebuttal_step(
+    run_panel: PanelRunner,
+    review_id: str,
+    review_room_id: str,
+    turn_1_outputs: Dict[str, Any],
+    panel_history: Dict[str, Dict[str, Any]],
+    all_metrics: List[List[Dict[str, Any]]],
+    successful_panelists: List[Dict[str, Any]],
+    trace_id: str,
+) -> ReviewStep:
+    panel_configs = [ProviderPanelistConfig(**p) for p in successful_panelists]
+    topic, instruction = _review_topic(review_id)
+    checkpoints = get_review_checkpoints().load_round(review_id, 2)
+    # Build custom prompts for each panelist so the second round references real quotes.
+    calls = []
+    for p_config in panel_configs:
+        # Get the panelist's own previous turn output
+        own_turn_output = turn_1_outputs.get(p_config.persona)
+        if not own_turn_output:
+            continue
+
+        prompt = _budgeted_prompt(
+            "review_rebuttal",
+            2,
+            p_config,
+            [
+                _instruction_section(instruction),
+                PromptSection(
+                    "self_snapshot",
+                    [_round1_self_snapshot(own_turn_output, detail) for detail in DIGEST_DETAIL_LEVELS],
+                    OWN_HISTORY_PRIORITY,
+                    OWN_HISTORY_MAX_SHARE,
+                ),
+                PromptSection(
+                    "others_digest",
+                    [
+                        _round1_competitor_digest(p_config.persona, turn_1_outputs, detail)
+                        for detail in DIGEST_DETAIL_LEVELS
+                    ],
+                    COMPETITOR_PRIORITY,
+                ),
+            ],
+            panelist=p_config.persona,
+            topic=topic,
+            persona_trait=_persona_style(p_config.persona),
+        )
+        calls.append((p_config, prompt))
+    plan = RoundPlan(2, calls, _openai_config(panel_configs), trace_id, review_id)
+
+    turn_outputs, round_metrics, successful = _process_turn_results(
+        review_id, review_room_id, 2, run_panel(plan, checkpoints), all_metrics, validation_model=LLMReviewTurn, checkpoints=checkpoints
+    )
+
+    panel_history = _merge_round_outputs(panel_history, 2, turn_outputs)
+    _persist_round(review_id, 2, {"current_round": 2})
+    all_metrics.append(round_metrics)
+    _record_status_update(review_id, "rebuttal_turn_complete", round_num=2)
+
+    if _all_panelists_declined(turn_outputs):
+        _record_status_update(review_id, "no_new_arguments_stop", round_num=2)
+        return _report_step_kwargs(review_id, panel_history, all_metrics, trace_id)
+
+    return SYNTHESIS_STEP, {
+        "review_id": review_id,
+        "review_room_id": review_room_id,
+        "turn_1_outputs": turn_1_outputs,
+        "turn_2_outputs": turn_outputs,
+        "panel_history": panel_history,
+        "all_metrics": all_metrics,
+        "successful_panelists": [p.model_dump() for p in successful],
+        "trace_id": trace_id,
+    }
+
+
+def _synthesis_step(
+    run_panel: PanelRunner,
+    review_id: str,
+    review_room_id: str,
+    turn_1_outputs: Dict[str, Any],
+    turn_2_outputs: Dict[str, Any],
+    panel_history: Dict[str, Dict[str, Any]],
+    all_metrics: List[List[Dict[str, Any]]],
+    successful_panelists: List[Dict[str, Any]],
+    trace_id: str,
+) -> ReviewStep:
+    panel_configs = [ProviderPanelistConfig(**p) for p in successful_panelists]
+    topic, instruction = _review_topic(review_id)
+    checkpoints = get_review_checkpoints().load_round(review_id, 3)
+    # The digest is the same for every panelist; only its budget depends on the model.
+    digests = [_conversation_digest(turn_1_outputs, turn_2_outputs, detail) for detail in DIGEST_DETAIL_LEVELS]
+    calls = []
+    for p_config in panel_configs:
+        persona = p_config.persona
+        if not turn_1_outputs.get(persona) or not turn_2_outputs.get(persona):
+            continue
+
+        prompt = _budgeted_prompt(
+            "review_synthesis",
+            3,
+            p_config,
+            [
+                _instruction_section(instruction),
+                PromptSection("conversation_digest", digests, COMPETITOR_PRIORITY),
+            ],
+            panelist=persona,
+            topic=topic,
+            persona_trait=_persona_style(persona),
+        )
+        calls.append((p_config, prompt))
+    plan = RoundPlan(3, calls, _openai_config(panel_configs), trace_id, review_id)
+
+    turn_outputs, round_metrics, successful = _process_turn_results(
+        review_id, review_room_id, 3, run_panel(plan, checkpoints), all_metrics, validation_model=LLMReviewTurn, checkpoints=checkpoints
+    )
+
+    panel_history = _merge_round_outputs(panel_history, 3, turn_outputs)
+    _persist_round(review_id, 3, {"current_round": 3})
+    all_metrics.append(round_metrics)
+    _record_status_update(review_id, "synthesis_turn_complete", round_num=3)
+
+    if _all_panelists_declined(turn_outputs):
+        _record_status_update(review_id, "no_new_arguments_stop", round_num=3)
+        return _report_step_kwargs(review_id, panel_history, all_metrics, trace_id)
+
+    return RESOLUTION_STEP, {
+        "review_id": review_id,
+        "review_room_id": review_room_id,
+        "panel_history": panel_history,
+        "all_metrics": all_metrics,
+        "successful_panelists": [p.model_dump() for p in successful],
+        "trace_id": trace_id,
+    }
+
+
+def _resolution_step(
+    run_panel: PanelRunner,
+    review_id: str,
+    review_room_id: str,
+    panel_history: Dict[str, Dict[str, Any]],
+    all_metrics: List[List[Dict[str, Any]]],
+    successful_panelists: List[Dict[str, Any]],
+    trace_id: str,
+) -> ReviewStep:
+    panel_configs = [ProviderPanelistConfig(**p) for p in successful_panelists]
+    if not panel_configs:
+        logger.error("No panel configurations available for resolution turn on review %s", review_id)
+        raise Ignore()
+
+    # One panelist writes the resolution on behalf of the panel.
+    summary_panel_config = panel_configs[0]
+    topic, instruction = _review_topic(review_id)
+    checkpoints = get_review_checkpoints().load_round(review_id, 4)
+    prompt = _budgeted_prompt(
+        "review_resolution",
+        4,
+        summary_panel_config,
+        [
+            _instruction_section(instruction),
+            PromptSection(
+                "resolution_context",
+                [
+                    _build_resolution_context(panel_history, summary_panel_config.persona, detail)
+                    for detail in DIGEST_DETAIL_LEVELS
+                ],
+                COMPETITOR_PRIORITY,
+            ),
+        ],
+        panelist=summary_panel_config.persona,
+        topic=topic,
+        persona_trait=_persona_style(summary_panel_config.persona),
+    )
+    plan = RoundPlan(4, [(summary_panel_config, prompt)], _openai_config(panel_configs), trace_id, review_id)
+
+    turn_outputs, round_metrics, _ = _process_turn_results(
+        review_id,
+        review_room_id,
+        4,
+        run_panel(plan, checkpoints),
+        all_metrics,
+        validation_model=LLMReviewResolution,
+        checkpoints=checkpoints,
+    )
 
+    panel_history = _merge_round_outputs(panel_history, 4, turn_outputs)
+    _persist_round(review_id, 4, {"current_round": 4})
+    all_metrics.append(round_metrics)
+    _record_status_update(review_id, "resolution_turn_complete", round_num=4)
 
-        turn_outputs, round_metrics, successful_panelists = _process_turn_results(
-            review_id, review_room_id, 1, final_results, [], validation_model=LLMReviewTurn
+    if _all_panelists_declined(turn_outputs):
+        _record_status_update(review_id, "no_new_arguments_stop", round_num=4)
+
+    return _report_step_kwargs(review_id, panel_history, all_metrics, trace_id)
+
+
+def _report_step(
+    llm_service: LLMService,
+    review_id: str,
+    panel_history: Dict[str, Dict[str, Any]],
+    all_metrics: List[List[Dict[str, Any]]],
+    executed_rounds: List[int],
+    trace_id: str,
+) -> ReviewStep:
+    system_prompt = "You are the Chief Editor. Your task is to synthesize final reports from multiple AI panelists into a single, cohesive, and actionable final report for a key decision-maker. Pay close attention to points of consensus and disagreement."
+
+    panelist_reports = []
+    for persona, rounds in panel_history.items():
+        sorted_rounds = sorted(
+            rounds.items(),
+            key=lambda item: int(item[0]) if isinstance(item[0], str) and item[0].isdigit() else item[0],
         )
+        normalized_rounds = {str(round_key): data for round_key, data in sorted_rounds}
+        panelist_reports.append({"persona": persona, "rounds": normalized_rounds})
+
+    rounds_completed = ", ".join(f"Round {round_num}" for round_num in executed_rounds) or "None"
+    if executed_rounds and executed_rounds[-1] < 3:
+        rounds_completed = f"{rounds_completed} (stopped early)"
 
-        panel_history = _merge_round_outputs({}, 1, turn_outputs)
+    user_prompt = prompt_service.get_prompt(
+        "review_final_report",
+        panelist_reports=json.dumps(panelist_reports, indent=2),
+        rounds_completed=rounds_completed,
+    )
+    # Use a powerful model for the final synthesis
+    final_report_result = llm_service.invoke_sync(
+        provider_name="openai",
+        model="gpt-4-turbo",
+        system_prompt=system_prompt,
+        user_prompt=user_prompt,
+        request_id=f"{trace_id}-report",
+        response_format="json"
+    )
+    if inspect.isawaitable(final_report_result):
+        final_report_result = run_coroutine_sync(final_report_result)
+    final_report_str, _ = final_report_result
+
+    review_meta = storage_service.get_review_meta(review_id)
+
+    final_report_json = json.loads(final_report_str)
+    try:
+        final_report_data = LLMFinalReport.model_validate(final_report_json)
+        final_report_dict = final_report_data.model_dump()
+        for key, value in final_report_json.items():
+            if key not in final_report_dict:
+                final_report_dict[key] = value
+    except ValidationError as validation_error:
+        logger.warning(
+            "Final report validation failed for review %s: %s -- using fallback payload.",
+            review_id,
+            validation_error,
+        )
+        topic_value = review_meta.topic if review_meta else final_report_json.get("topic", "Review Topic")
+        instruction_value = (
+            review_meta.instruction if review_meta else final_report_json.get("instruction", "Provide a balanced review.")
+        )
+        final_report_dict = _build_fallback_final_report(topic_value, instruction_value)
+    else:
+        if review_meta:
+            # Always prefer the persisted review metadata for key identifiers.
+            # The mock LLM fallback occasionally emits generic placeholders
+            # such as "Test Topic", which causes E2E expectations to fail.
+            final_report_dict["topic"] = review_meta.topic
+            final_report_dict["instruction"] = review_meta.instruction
+        else:
+            final_report_dict.setdefault("topic", final_report_json.get("topic", "Review Topic"))
+            final_report_dict.setdefault("instruction", final_report_json.get("instruction", "Provide a balanced review."))
 
+    storage_service.save_final_report(review_id=review_id, report_data=final_report_dict)
+
+    if review_meta:
+        final_message_content = build_final_report_message(
+            review_meta.topic,
+            final_report_dict,
+        )
         try:
-            storage_service.update_review(review_id, {"status": "in_progress", "current_round": 1})
-        except Exception as exc:
+            message = Message(
+                message_id=generate_id(),
+                room_id=review_meta.room_id,
+                user_id="observer",
+                role="assistant",
+                content=final_message_content,
+                timestamp=get_current_timestamp(),
+            )
+            storage_service.save_message(message)
+        except Exception as save_error:
+            logger.error(
+                "Failed to persist final observer summary for review %s: %s",
+                review_id,
+                save_error,
+                exc_info=True,
+            )
+        else:
+            redis_pubsub_manager.publish_sync(
+                f"review_{review_id}",
+                WebSocketMessage(
+                    type="new_message",
+                    review_id=review_id,
+                    payload=message.model_dump(),
+                ).model_dump_json(),
+            )
+
+        try:
+            _sync_review_outcome_to_hierarchy(
+                review_id=review_id,
+                review_meta=review_meta,
+                final_report=final_report_dict,
+            )
+        except Exception as sync_error:  # noqa: BLE001 - defensive logging
             logger.warning(
-                "Failed to persist round 1 metadata for review %s: %s",
+                "Failed to synchronize review outcome for %s: %s",
                 review_id,
-                exc,
+                sync_error,
                 exc_info=True,
             )
 
-        _record_status_update(review_id, "initial_turn_complete", round_num=1)
+    if settings.METRICS_ENABLED and review_meta:
+        _persist_review_metrics(review_id, review_meta, all_metrics)
+    # Settling is idempotent, so a retried report step does not count the usage twice.
+    total_tokens = sum(m.get("total_tokens", 0) for r in all_metrics for m in r if m)
+    get_token_budget().settle_sync(f"review:{review_id}", total_tokens)
+
+    _record_status_update(review_id, "completed")
+    return None, {}
+
+
+# Round steps of a review, keyed by step name; the report step takes the LLM service
+# instead of a panel runner.
+REVIEW_ROUND_STEPS: Dict[str, Callable[..., ReviewStep]] = {
+    INITIAL_STEP: _initial_panel_step,
+    REBUTTAL_STEP: _rebuttal_step,
+    SYNTHESIS_STEP: _synthesis_step,
+    RESOLUTION_STEP: _resolution_step,
+}
+
+
+def _fail_review(review_id: str, error: str, refund: bool = True) -> None:
+    """Mark the review failed and, unless the step will be retried, count the failure and release its token reservation."""
+    if not refund:
+        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": error}})
+        return
+    storage_service.fail_review(review_id, {"error": error})
+    get_token_budget().settle_sync(f"review:{review_id}", 0)
 
-        run_rebuttal_turn.delay(
+
+def _final_attempt(task: BaseTask) -> bool:
+    return task.request.retries >= _STEP_MAX_RETRIES
+
+
+# --- Chained mode: one Celery task per step, each .delay()-ing the next ---
+
+_STEP_MAX_RETRIES = 3
+
+def _dispatch_review_step(step: ReviewStep) -> None:
+    next_step, kwargs = step
+    if next_step is not None:
+        _STEP_TASKS[next_step].delay(**kwargs)
+
+
+@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': _STEP_MAX_RETRIES}, retry_backoff=True)
+def run_initial_panel_turn(self: BaseTask, review_id: str, review_room_id: str, topic: str, instruction: str, panelists_override: Optional[List[str]], trace_id: str):
+    try:
+        _dispatch_review_step(_initial_panel_step(
+            partial(_run_round_calls, self.llm_service),
             review_id=review_id,
             review_room_id=review_room_id,
-            turn_1_outputs=turn_outputs,
-            panel_history=panel_history,
-            all_metrics=[round_metrics],
-            successful_panelists=[p.model_dump() for p in successful_panelists],
+            topic=topic,
+            instruction=instruction,
+            panelists_override=panelists_override,
             trace_id=trace_id,
-        )
+        ))
     except BudgetExceededError as e:
         logger.error(f"Failed to start review {review_id}: {e}")
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": str(e)}})
+        _fail_review(review_id, str(e))
         self.update_state(state=states.FAILURE, meta={'exc_type': 'BudgetExceededError', 'exc_message': str(e)})
         raise Ignore()
     except Exception as e:
         logger.error(f"Unhandled error in initial turn for review {review_id}: {e}", exc_info=True)
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": "An unexpected error occurred."}})
+        _fail_review(review_id, "An unexpected error occurred.", refund=_final_attempt(self))
         raise
 
-@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3}, retry_backoff=True)
+@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': _STEP_MAX_RETRIES}, retry_backoff=True)
 def run_rebuttal_turn(
     self: BaseTask,
     review_id: str,
@@ -825,122 +1425,27 @@ def run_rebuttal_turn(
     trace_id: str,
 ):
     try:
-        panel_configs = [ProviderPanelistConfig(**p) for p in successful_panelists]
-        review_meta = storage_service.get_review_meta(review_id)
-        topic = review_meta.topic if review_meta else ""
-        instruction = review_meta.instruction if review_meta else ""
-        # Build custom prompts for each panelist so the second round references real quotes.
-        all_results = []
-        prompts_by_persona: Dict[str, str] = {}
-        for p_config in panel_configs:
-            # Get the panelist's own previous turn output
-            own_turn_output = turn_1_outputs.get(p_config.persona)
-            if not own_turn_output:
-                continue
-
-            self_snapshot = _round1_self_snapshot(own_turn_output)
-            competitors_digest = _round1_competitor_digest(p_config.persona, turn_1_outputs)
-
-            prompt = prompt_service.get_prompt(
-                "review_rebuttal",
-                panelist=p_config.persona,
-                self_snapshot=self_snapshot,
-                others_digest=competitors_digest,
-                topic=topic,
-                instruction=instruction,
-                persona_trait=_persona_style(p_config.persona),
-            )
-
-            prompts_by_persona[p_config.persona] = prompt
-            all_results.append(run_panelist_turn(self.llm_service, p_config, prompt, f"{trace_id}-r2-{p_config.provider}"))
-
-        initial_results = all_results
-        
-        # Implement fallback logic as per README
-        final_results = []
-        openai_config = next((p for p in panel_configs if p.provider == 'openai'), None)
-
-        for p_config, result in initial_results:
-            if isinstance(result, BaseException) and p_config.provider != 'openai' and openai_config:
-                logger.warning(f"Panelist {p_config.persona} ({p_config.provider}) failed in round 2. Retrying with fallback provider OpenAI.")
-
-                fallback_config = ProviderPanelistConfig(
-                    provider='openai',
-                    persona=p_config.persona,
-                    model=openai_config.model,
-                    system_prompt=p_config.system_prompt or openai_config.system_prompt,
-                    timeout_s=openai_config.timeout_s,
-                    max_retries=0
-                )
-
-                prompt_text = prompts_by_persona.get(p_config.persona)
-                if not prompt_text:
-                    logger.warning(
-                        "Missing stored rebuttal prompt for %s during fallback; using empty prompt.",
-                        p_config.persona,
-                    )
-                fb_p_config, fb_result = run_panelist_turn(
-                    self.llm_service,
-                    fallback_config,
-                    prompt_text or "",
-                    f"{trace_id}-r2-fallback",
-                )
-                final_results.append((fb_p_config, fb_result))
-            else:
-                final_results.append((p_config, result))
-
-        turn_outputs, round_metrics, successful_panelists = _process_turn_results(
-            review_id, review_room_id, 2, final_results, all_metrics, validation_model=LLMReviewTurn
-        )
-
-        panel_history = _merge_round_outputs(panel_history, 2, turn_outputs)
-
-        try:
-            storage_service.update_review(review_id, {"current_round": 2})
-        except Exception as exc:
-            logger.warning(
-                "Failed to persist round 2 metadata for review %s: %s",
-                review_id,
-                exc,
-                exc_info=True,
-            )
-
-        all_metrics.append(round_metrics)
-        _record_status_update(review_id, "rebuttal_turn_complete", round_num=2)
-
-        if _all_panelists_declined(turn_outputs):
-            _record_status_update(review_id, "no_new_arguments_stop", round_num=2)
-            executed_rounds = _collect_completed_rounds(panel_history)
-            generate_consolidated_report.delay(
-                review_id=review_id,
-                panel_history=panel_history,
-                all_metrics=all_metrics,
-                executed_rounds=executed_rounds,
-                trace_id=trace_id,
-            )
-            return
-
-        run_synthesis_turn.delay(
+        _dispatch_review_step(_rebuttal_step(
+            partial(_run_round_calls, self.llm_service),
             review_id=review_id,
             review_room_id=review_room_id,
             turn_1_outputs=turn_1_outputs,
-            turn_2_outputs=turn_outputs,
             panel_history=panel_history,
             all_metrics=all_metrics,
-            successful_panelists=[p.model_dump() for p in successful_panelists],
+            successful_panelists=successful_panelists,
             trace_id=trace_id,
-        )
+        ))
     except BudgetExceededError as e:
         logger.error(f"Failed rebuttal turn for review {review_id}: {e}")
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": str(e)}})
+        _fail_review(review_id, str(e))
         self.update_state(state=states.FAILURE, meta={'exc_type': 'BudgetExceededError', 'exc_message': str(e)})
         raise Ignore()
     except Exception as e:
         logger.error(f"Unhandled error in rebuttal turn for review {review_id}: {e}", exc_info=True)
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": "An unexpected error occurred."}})
+        _fail_review(review_id, "An unexpected error occurred.", refund=_final_attempt(self))
         raise
 
-@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3}, retry_backoff=True)
+@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': _STEP_MAX_RETRIES}, retry_backoff=True)
 def run_synthesis_turn(
     self: BaseTask,
     review_id: str,
@@ -953,119 +1458,29 @@ def run_synthesis_turn(
     trace_id: str,
 ):
     try:
-        panel_configs = [ProviderPanelistConfig(**p) for p in successful_panelists]
-        review_meta = storage_service.get_review_meta(review_id)
-        topic = review_meta.topic if review_meta else ""
-        instruction = review_meta.instruction if review_meta else ""
-        all_results = []
-        prompts_by_persona: Dict[str, str] = {}
-        for p_config in panel_configs:
-            persona = p_config.persona
-            own_r1 = turn_1_outputs.get(persona)
-            own_r2 = turn_2_outputs.get(persona)
-            if not own_r1 or not own_r2:
-                continue
-
-            conversation_digest = _conversation_digest(turn_1_outputs, turn_2_outputs)
-
-            prompt = prompt_service.get_prompt(
-                "review_synthesis",
-                panelist=persona,
-                conversation_digest=conversation_digest,
-                topic=topic,
-                instruction=instruction,
-                persona_trait=_persona_style(persona),
-            )
-            prompts_by_persona[persona] = prompt
-            all_results.append(run_panelist_turn(self.llm_service, p_config, prompt, f"{trace_id}-r3-{p_config.provider}"))
-
-        initial_results = all_results
-
-        # Implement fallback logic as per README
-        final_results = []
-        openai_config = next((p for p in panel_configs if p.provider == 'openai'), None)
-
-        for p_config, result in initial_results:
-            if isinstance(result, BaseException) and p_config.provider != 'openai' and openai_config:
-                logger.warning(f"Panelist {p_config.persona} ({p_config.provider}) failed in round 3. Retrying with fallback provider OpenAI.")
-
-                fallback_config = ProviderPanelistConfig(
-                    provider='openai',
-                    persona=p_config.persona,
-                    model=openai_config.model,
-                    system_prompt=p_config.system_prompt or openai_config.system_prompt,
-                    timeout_s=openai_config.timeout_s,
-                    max_retries=0
-                )
-
-                prompt_text = prompts_by_persona.get(p_config.persona)
-                if not prompt_text:
-                    logger.warning(
-                        "Missing stored synthesis prompt for %s during fallback; using empty prompt.",
-                        p_config.persona,
-                    )
-                fb_p_config, fb_result = run_panelist_turn(
-                    self.llm_service,
-                    fallback_config,
-                    prompt_text or "",
-                    f"{trace_id}-r3-fallback",
-                )
-                final_results.append((fb_p_config, fb_result))
-            else:
-                final_results.append((p_config, result))
-
-        turn_outputs, round_metrics, successful_panelists = _process_turn_results(
-            review_id, review_room_id, 3, final_results, all_metrics, validation_model=LLMReviewTurn
-        )
-
-        panel_history = _merge_round_outputs(panel_history, 3, turn_outputs)
-
-        try:
-            storage_service.update_review(review_id, {"current_round": 3})
-        except Exception as exc:
-            logger.warning(
-                "Failed to persist round 3 metadata for review %s: %s",
-                review_id,
-                exc,
-                exc_info=True,
-            )
-
-        all_metrics.append(round_metrics)
-        _record_status_update(review_id, "synthesis_turn_complete", round_num=3)
-
-        if _all_panelists_declined(turn_outputs):
-            _record_status_update(review_id, "no_new_arguments_stop", round_num=3)
-
-            executed_rounds = _collect_completed_rounds(panel_history)
-            generate_consolidated_report.delay(
-                review_id=review_id,
-                panel_history=panel_history,
-                all_metrics=all_metrics,
-                executed_rounds=executed_rounds,
-                trace_id=trace_id,
-            )
-            return
-
-        run_resolution_turn.delay(
+        _dispatch_review_step(_synthesis_step(
+            partial(_run_round_calls, self.llm_service),
             review_id=review_id,
             review_room_id=review_room_id,
+            turn_1_outputs=turn_1_outputs,
+            turn_2_outputs=turn_2_outputs,
             panel_history=panel_history,
             all_metrics=all_metrics,
-            successful_panelists=[p.model_dump() for p in successful_panelists],
+            successful_panelists=successful_panelists,
             trace_id=trace_id,
-        )
+        ))
     except BudgetExceededError as e:
         logger.error(f"Failed synthesis turn for review {review_id}: {e}")
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": str(e)}})
+        _fail_review(review_id, str(e))
         self.update_state(state=states.FAILURE, meta={'exc_type': 'BudgetExceededError', 'exc_message': str(e)})
         raise Ignore()
     except Exception as e:
         logger.error(f"Unhandled error in synthesis turn for review {review_id}: {e}", exc_info=True)
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": "An unexpected error occurred."}})
+        _fail_review(review_id, "An unexpected error occurred.", refund=_final_attempt(self))
         raise
 
 
-@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3}, retry_backoff=True)
+@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': _STEP_MAX_RETRIES}, retry_backoff=True)
 def run_resolution_turn(
     self: BaseTask,
     review_id: str,
@@ -1076,113 +1491,27 @@ def run_resolution_turn(
     trace_id: str,
 ):
     try:
-        panel_configs = [ProviderPanelistConfig(**p) for p in successful_panelists]
-        if not panel_configs:
-            logger.error("No panel configurations available for resolution turn on review %s", review_id)
-            raise Ignore()
-
-        summary_panel_config = panel_configs[0]
-        target_panel_configs = [summary_panel_config]
-        review_meta = storage_service.get_review_meta(review_id)
-        topic = review_meta.topic if review_meta else ""
-        instruction = review_meta.instruction if review_meta else ""
-        all_results: List[Tuple[ProviderPanelistConfig, Union[Tuple[Any, Dict[str, Any]], BaseException]]] = []
-        prompts_by_persona: Dict[str, str] = {}
-
-        for p_config in target_panel_configs:
-            resolution_context = _build_resolution_context(panel_history, p_config.persona)
-            prompt = prompt_service.get_prompt(
-                "review_resolution",
-                panelist=p_config.persona,
-                resolution_context=resolution_context,
-                topic=topic,
-                instruction=instruction,
-                persona_trait=_persona_style(p_config.persona),
-            )
-            prompts_by_persona[p_config.persona] = prompt
-            all_results.append(
-                run_panelist_turn(
-                    self.llm_service,
-                    p_config,
-                    prompt,
-                    f"{trace_id}-r4-{p_config.provider}",
-                )
-            )
-
-        final_results: List[Tuple[ProviderPanelistConfig, Union[Tuple[Any, Dict[str, Any]], BaseException]]] = []
-        openai_config = next((p for p in panel_configs if p.provider == 'openai'), None)
-
-        for p_config, result in all_results:
-            if isinstance(result, BaseException) and p_config.provider != 'openai' and openai_config:
-                logger.warning(
-                    f"Panelist {p_config.persona} ({p_config.provider}) failed in round 4. Retrying with fallback provider OpenAI."
-                )
-                fallback_config = ProviderPanelistConfig(
-                    provider='openai',
-                    persona=p_config.persona,
-                    model=openai_config.model,
-                    system_prompt=p_config.system_prompt or openai_config.system_prompt,
-                    timeout_s=openai_config.timeout_s,
-                    max_retries=0,
-                )
-                prompt_text = prompts_by_persona.get(p_config.persona, "")
-                fb_p_config, fb_result = run_panelist_turn(
-                    self.llm_service,
-                    fallback_config,
-                    prompt_text,
-                    f"{trace_id}-r4-fallback",
-                )
-                final_results.append((fb_p_config, fb_result))
-            else:
-                final_results.append((p_config, result))
-
-        turn_outputs, round_metrics, successful_panelists = _process_turn_results(
-            review_id,
-            review_room_id,
-            4,
-            final_results,
-            all_metrics,
-            validation_model=LLMReviewResolution,
-        )
-
-        panel_history = _merge_round_outputs(panel_history, 4, turn_outputs)
-
-        try:
-            storage_service.update_review(review_id, {"current_round": 4})
-        except Exception as exc:
-            logger.warning(
-                "Failed to persist round 4 metadata for review %s: %s",
-                review_id,
-                exc,
-                exc_info=True,
-            )
-
-        all_metrics.append(round_metrics)
-        _record_status_update(review_id, "resolution_turn_complete", round_num=4)
-
-        if _all_panelists_declined(turn_outputs):
-            _record_status_update(review_id, "no_new_arguments_stop", round_num=4)
-
-        executed_rounds = _collect_completed_rounds(panel_history)
-        generate_consolidated_report.delay(
+        _dispatch_review_step(_resolution_step(
+            partial(_run_round_calls, self.llm_service),
             review_id=review_id,
+            review_room_id=review_room_id,
             panel_history=panel_history,
             all_metrics=all_metrics,
-            executed_rounds=executed_rounds,
+            successful_panelists=successful_panelists,
             trace_id=trace_id,
-        )
+        ))
     except BudgetExceededError as e:
         logger.error(f"Failed resolution turn for review {review_id}: {e}")
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": str(e)}})
+        _fail_review(review_id, str(e))
         self.update_state(state=states.FAILURE, meta={'exc_type': 'BudgetExceededError', 'exc_message': str(e)})
         raise Ignore()
     except Exception as e:
         logger.error(f"Unhandled error in resolution turn for review {review_id}: {e}", exc_info=True)
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": "An unexpected error occurred."}})
+        _fail_review(review_id, "An unexpected error occurred.", refund=_final_attempt(self))
         raise
 
 
-@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3}, retry_backoff=True)
+@celery_app.task(bind=True, base=BaseTask, autoretry_for=(Exception,), retry_kwargs={'max_retries': _STEP_MAX_RETRIES}, retry_backoff=True)
 def generate_consolidated_report(
     self: BaseTask,
     review_id: str,
@@ -1192,139 +1521,24 @@ def generate_consolidated_report(
     trace_id: str,
 ):
     try:
-        system_prompt = "You are the Chief Editor. Your task is to synthesize final reports from multiple AI panelists into a single, cohesive, and actionable final report for a key decision-maker. Pay close attention to points of consensus and disagreement."
-
-        panelist_reports = []
-        for persona, rounds in panel_history.items():
-            sorted_rounds = sorted(
-                rounds.items(),
-                key=lambda item: int(item[0]) if isinstance(item[0], str) and item[0].isdigit() else item[0],
-            )
-            normalized_rounds = {str(round_key): data for round_key, data in sorted_rounds}
-            panelist_reports.append({"persona": persona, "rounds": normalized_rounds})
-
-        rounds_completed = ", ".join(f"Round {round_num}" for round_num in executed_rounds) or "None"
-        if executed_rounds and executed_rounds[-1] < 3:
-            rounds_completed = f"{rounds_completed} (stopped early)"
-
-        user_prompt = prompt_service.get_prompt(
-            "review_final_report",
-            panelist_reports=json.dumps(panelist_reports, indent=2),
-            rounds_completed=rounds_completed,
-        )
-        # Use a powerful model for the final synthesis
-        final_report_result = self.llm_service.invoke_sync(
-            provider_name="openai",
-            model="gpt-4-turbo",
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            request_id=f"{trace_id}-report",
-            response_format="json"
+        _report_step(
+            self.llm_service,
+            review_id=review_id,
+            panel_history=panel_history,
+            all_metrics=all_metrics,
+            executed_rounds=executed_rounds,
+            trace_id=trace_id,
         )
-        if inspect.isawaitable(final_report_result):
-            final_report_result = asyncio.run(final_report_result)
-        final_report_str, _ = final_report_result
-
-        review_meta = storage_service.get_review_meta(review_id)
-
-        final_report_json = json.loads(final_report_str)
-        try:
-            final_report_data = LLMFinalReport.model_validate(final_report_json)
-            final_report_dict = final_report_data.model_dump()
-            for key, value in final_report_json.items():
-                if key not in final_report_dict:
-                    final_report_dict[key] = value
-        except ValidationError as validation_error:
-            logger.warning(
-                "Final report validation failed for review %s: %s -- using fallback payload.",
-                review_id,
-                validation_error,
-            )
-            topic_value = review_meta.topic if review_meta else final_report_json.get("topic", "Review Topic")
-            instruction_value = (
-                review_meta.instruction if review_meta else final_report_json.get("instruction", "Provide a balanced review.")
-            )
-            final_report_dict = _build_fallback_final_report(topic_value, instruction_value)
-        else:
-            if review_meta:
-                # Always prefer the persisted review metadata for key identifiers.
-                # The mock LLM fallback occasionally emits generic placeholders
-                # such as "Test Topic", which causes E2E expectations to fail.
-                final_report_dict["topic"] = review_meta.topic
-                final_report_dict["instruction"] = review_meta.instruction
-            else:
-                final_report_dict.setdefault("topic", final_report_json.get("topic", "Review Topic"))
-                final_report_dict.setdefault("instruction", final_report_json.get("instruction", "Provide a balanced review."))
-
-        storage_service.save_final_report(review_id=review_id, report_data=final_report_dict)
-
-        if review_meta:
-            final_message_content = build_final_report_message(
-                review_meta.topic,
-                final_report_dict,
-            )
-            try:
-                message = Message(
-                    message_id=generate_id(),
-                    room_id=review_meta.room_id,
-                    user_id="observer",
-                    role="assistant",
-                    content=final_message_content,
-                    timestamp=get_current_timestamp(),
-                )
-                storage_service.save_message(message)
-            except Exception as save_error:
-                logger.error(
-                    "Failed to persist final observer summary for review %s: %s",
-                    review_id,
-                    save_error,
-                    exc_info=True,
-                )
-            else:
-                redis_pubsub_manager.publish_sync(
-                    f"review_{review_id}",
-                    WebSocketMessage(
-                        type="new_message",
-                        review_id=review_id,
-                        payload=message.model_dump(),
-                    ).model_dump_json(),
-                )
-
-            try:
-                _sync_review_outcome_to_hierarchy(
-                    review_id=review_id,
-                    review_meta=review_meta,
-                    final_report=final_report_dict,
-                )
-            except Exception as sync_error:  # noqa: BLE001 - defensive logging
-                logger.warning(
-                    "Failed to synchronize review outcome for %s: %s",
-                    review_id,
-                    sync_error,
-                    exc_info=True,
-                )
-
-        if settings.METRICS_ENABLED:
-            total_tokens = sum(m.get("total_tokens", 0) for r in all_metrics for m in r if m)
-            if settings.DAILY_ORG_TOKEN_BUDGET:
-                redis_url = get_effective_redis_url()
-                redis_client = None
-                if redis_url:
-                    try:
-                        redis_client = redis.from_url(redis_url, decode_responses=True)
-                        today_key = f"daily_token_usage:{datetime.utcnow().strftime('%Y-%m-%d')}"
-                        redis_client.incrby(today_key, total_tokens)
-                        redis_client.expire(today_key, 60 * 60 * 25)
-                    except RedisError as exc:
-                        logger.warning("Failed to update daily org usage in Redis: %s", exc)
-                    finally:
-                        if redis_client:
-                            redis_client.close()
-                else:
-                    logger.info("Daily org token usage tracking skipped (Redis unavailable)")
-
-        _record_status_update(review_id, "completed")
     except Exception as e:
         logger.error(f"Error generating consolidated report for review {review_id}: {e}", exc_info=True)
-        storage_service.update_review(review_id, {"status": "failed", "final_report": {"error": "Failed to generate final report."}})
+        _fail_review(review_id, "Failed to generate final report.", refund=_final_attempt(self))
         raise
+
+
+_STEP_TASKS = {
+    INITIAL_STEP: run_initial_panel_turn,
+    REBUTTAL_STEP: run_rebuttal_turn,
+    SYNTHESIS_STEP: run_synthesis_turn,
+    RESOLUTION_STEP: run_resolution_turn,
+    REPORT_STEP: generate_consolidated_report,
+}
@@ -0,0 +1,257 @@
+"""
+Streaming text extraction and token-aware chunking for uploaded documents.
+
+Readers yield a document as a sequence of text blocks (PDF pages, paragraphs)
+without ever holding the whole text in memory. PDF pages are extracted in
+batches by a pool of worker processes; the pool only runs ahead a bounded
+number of batches, so memory stays flat however long the document is.
+
+:class:`SentenceChunker` turns those blocks into chunks of at most
+``max_tokens`` tokens that end on sentence boundaries, carrying a few trailing
+sentences into the next chunk as overlap.
+
+This module is imported by the PDF worker processes, so it must stay free of
+service, database and settings imports.
+"""
+import logging
+import multiprocessing
+import re
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from app.utils.tokens import count_tokens, split_by_tokens
+
+logger = logging.getLogger(__name__)
+
+PDF = "pdf"
+DOCX = "docx"
+MARKDOWN = "markdown"
+TEXT = "text"
+
+_MIME_FORMATS = {
+    "application/pdf": PDF,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": DOCX,
+    "text/markdown": MARKDOWN,
+    "text/x-markdown": MARKDOWN,
+    "text/plain": TEXT,
+}
+_EXTENSION_FORMATS = {".pdf": PDF, ".docx": DOCX, ".md": MARKDOWN, ".markdown": MARKDOWN, ".txt": TEXT}
+
+# A sentence ends at terminal punctuation followed by whitespace; a blank line ends a paragraph.
+_BOUNDARY = re.compile(r"(?<=[.!?。！？])\s+|\n\s*\n")
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def detect_document_format(mime: Optional[str], name: Optional[str] = None) -> Optional[str]:
+    """Map an upload's MIME type, or failing that its file extension, to a supported format."""
+    fmt = _MIME_FORMATS.get((mime or "").split(";")[0].strip().lower())
+    if fmt is None and name:
+        fmt = _EXTENSION_FORMATS.get(Path(name).suffix.lower())
+    return fmt
+
+
+def iter_document_blocks(path: Path, fmt: str, workers: int = 1, pages_per_task: int = 16) -> Iterator[str]:
+    """Yield the text of ``path`` block by block, in document order."""
+    if fmt == PDF:
+        return iter_pdf_pages(path, workers=workers, pages_per_task=pages_per_task)
+    if fmt == DOCX:
+        return iter_docx_paragraphs(path)
+    if fmt in (TEXT, MARKDOWN):
+        return iter_text_paragraphs(path)
+    raise ValueError(f"Unsupported document format: {fmt}")
+
+
+# --- PDF ---
+
+_worker_reader = None
+
+
+def _open_pdf_in_worker(path: str) -> None:
+    global _worker_reader
+    from PyPDF2 import PdfReader
+
+    _worker_reader = PdfReader(path)
+
+
+def _extract_pdf_pages(start: int, stop: int) -> List[str]:
+    return [_worker_reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def _pdf_page_count(path: Path) -> int:
+    from PyPDF2 import PdfReader
+
+    return len(PdfReader(str(path)).pages)
+
+
+def iter_pdf_pages(path: Path, workers: int = 1, pages_per_task: int = 16) -> Iterator[str]:
+    """
+    Yield each page's text in order, extracted by up to ``workers`` processes.
+
+    At most ``2 * workers`` batches of ``pages_per_task`` pages are in flight or
+    buffered at a time. With one worker pages are extracted in-process.
+    """
+    page_count = _pdf_page_count(path)
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    if workers <= 1 or len(ranges) <= 1:
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(str(path))
+        for page in reader.pages:
+            # Page separators are not sentence boundaries: a sentence may continue on the next page.
+            yield (page.extract_text() or "") + "\n"
+        return
+
+    # "spawn" keeps workers independent of the parent's threads, sockets and gevent state.
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_open_pdf_in_worker,
+        initargs=(str(path),),
+    )
+    try:
+        pending_ranges = iter(ranges)
+        in_flight: Deque = deque(pool.submit(_extract_pdf_pages, *page_range) for page_range in _take(pending_ranges, workers * 2))
+        while in_flight:
+            pages = in_flight.popleft().result()
+            for page_range in _take(pending_ranges, 1):
+                in_flight.append(pool.submit(_extract_pdf_pages, *page_range))
+            for text in pages:
+                yield text + "\n"
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _take(iterator: Iterator[Tuple[int, int]], count: int) -> List[Tuple[int, int]]:
+    items = []
+    for _ in range(count):
+        item = next(iterator, None)
+        if item is None:
+            break
+        items.append(item)
+    return items
+
+
+# --- DOCX ---
+
+def iter_docx_paragraphs(path: Path) -> Iterator[str]:
+    """Yield the text of each paragraph in ``word/document.xml``, parsed incrementally."""
+    with zipfile.ZipFile(path) as archive:
+        with archive.open("word/document.xml") as document:
+            parts: List[str] = []
+            for event, element in ElementTree.iterparse(document, events=("start", "end")):
+                if element.tag == f"{_WORD_NAMESPACE}p" and event == "start":
+                    parts = []
+                elif event != "end":
+                    continue
+                elif element.tag == f"{_WORD_NAMESPACE}t":
+                    parts.append(element.text or "")
+                elif element.tag == f"{_WORD_NAMESPACE}tab":
+                    parts.append("\t")
+                elif element.tag in (f"{_WORD_NAMESPACE}br", f"{_WORD_NAMESPACE}cr"):
+                    parts.append("\n")
+                elif element.tag == f"{_WORD_NAMESPACE}p":
+                    text = "".join(parts).strip()
+                    if text:
+                        yield text + "\n\n"
+                    element.clear()
+
+
+# --- Plain text and Markdown ---
+
+def iter_text_paragraphs(path: Path, max_block_chars: int = 64 * 1024) -> Iterator[str]:
+    """Yield blank-line separated paragraphs, splitting pathological single paragraphs."""
+    with open(path, "r", encoding="utf-8", errors="replace") as handle:
+        lines: List[str] = []
+        size = 0
+        for line in handle:
+            if not line.strip():
+                if lines:
+                    yield "".join(lines) + "\n"
+                    lines, size = [], 0
+                continue
+            lines.append(line)
+            size += len(line)
+            if size >= max_block_chars:
+                yield "".join(lines)
+                lines, size = [], 0
+        if lines:
+            yield "".join(lines) + "\n"
+
+
+# --- Chunking ---
+
+class SentenceChunker:
+    """Packs sentences into chunks of at most ``max_tokens`` tokens with sentence overlap."""
+
+    def __init__(self, max_tokens: int = 400, overlap_tokens: int = 50) -> None:
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self._carry = ""
+        self._sentences: List[Tuple[str, int]] = []
+        self._tokens = 0
+        self._fresh = False  # True once the buffer holds text not yet emitted
+
+    def feed(self, block: str) -> Iterator[str]:
+        """Add a block of text; yields every chunk that is complete."""
+        text = self._carry + block
+        pieces = _BOUNDARY.split(text)
+        # The last piece may be a sentence that continues in the next block.
+        self._carry = pieces.pop() if pieces else ""
+        for piece in pieces:
+            yield from self._add_sentence(piece)
+        if count_tokens(self._carry) > self.max_tokens:
+            # No sentence boundary in sight; do not let the carry grow without bound.
+            carry, self._carry = self._carry, ""
+            yield from self._add_sentence(carry)
+
+    def flush(self) -> Iterator[str]:
+        """Emit whatever is buffered at the end of the document."""
+        carry, self._carry = self._carry, ""
+        yield from self._add_sentence(carry)
+        if self._fresh and self._sentences:
+            yield self._emit()
+        self._sentences, self._tokens, self._fresh = [], 0, False
+
+    def chunks(self, blocks: Iterable[str]) -> Iterator[str]:
+        for block in blocks:
+            yield from self.feed(block)
+        yield from self.flush()
+
+    def _add_sentence(self, sentence: str) -> Iterator[str]:
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            return
+        tokens = count_tokens(sentence)
+        if tokens > self.max_tokens:
+            for piece in split_by_tokens(sentence, self.max_tokens):
+                yield from self._add_sentence(piece)
+            return
+        if self._tokens + tokens > self.max_tokens and self._fresh:
+            yield self._emit()
+            self._keep_overlap()
+        while self._sentences and self._tokens + tokens > self.max_tokens:
+            _, dropped = self._sentences.pop(0)
+            self._tokens -= dropped
+        self._sentences.append((sentence, tokens))
+        self._tokens += tokens
+        self._fresh = True
+
+    def _emit(self) -> str:
+        self._fresh = False
+        return " ".join(sentence for sentence, _ in self._sentences)
+
+    def _keep_overlap(self) -> None:
+        kept: List[Tuple[str, int]] = []
+        total = 0
+        for sentence, tokens in reversed(self._sentences):
+            if total + tokens > self.overlap_tokens:
+                break
+            kept.insert(0, (sentence, tokens))
+            total += tokens
+        self._sentences, self._tokens = kept, total
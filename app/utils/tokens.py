@@ -0,0 +1,88 @@
+"""
+Token counting for budgeting text sent to OpenAI models.
+
+Uses tiktoken's ``cl100k_base`` encoding (shared by the chat and
+``text-embedding-3`` models) unless a model is given: OpenAI models use their
+own encoding (``o200k_base`` for the gpt-4o family), and models tiktoken does
+not know, such as Claude and Gemini, are counted with ``cl100k_base``, whose
+counts are close to theirs. When an encoding cannot be loaded, e.g. on a host
+without network access to fetch it, counts fall back to a conservative
+estimate: ASCII text averages about four characters per token, while Hangul
+and other non-ASCII text is close to one token per character.
+"""
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ENCODING_NAME = "cl100k_base"
+
+_encodings: Dict[str, Any] = {}
+_encoding_lock = threading.Lock()
+
+
+def get_encoding(name: str = ENCODING_NAME):
+    """Return the shared tiktoken encoding ``name``, or ``None`` if it is unavailable."""
+    if name in _encodings:
+        return _encodings[name]
+    with _encoding_lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                logger.warning(f"tiktoken encoding {name} unavailable, estimating token counts: {e}")
+                _encodings[name] = None
+    return _encodings[name]
+
+
+def encoding_name_for_model(model: Optional[str]) -> str:
+    if not model:
+        return ENCODING_NAME
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_name_for_model(model)
+    except Exception:
+        return ENCODING_NAME
+
+
+def estimate_tokens(text: str) -> int:
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    encoding = get_encoding(encoding_name_for_model(model))
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_by_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """Cut ``text`` into consecutive pieces of at most ``max_tokens`` tokens each."""
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    encoding = get_encoding(encoding_name_for_model(model))
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return [encoding.decode(tokens[start:start + max_tokens]) for start in range(0, len(tokens), max_tokens)]
+
+    pieces: List[str] = []
+    start = ascii_chars = other_chars = 0
+    for index, char in enumerate(text):
+        if ord(char) < 128:
+            ascii_chars += 1
+        else:
+            other_chars += 1
+        if (ascii_chars + 3) // 4 + other_chars > max_tokens and index > start:
+            pieces.append(text[start:index])
+            start = index
+            ascii_chars, other_chars = (1, 0) if ord(char) < 128 else (0, 1)
+    if start < len(text):
+        pieces.append(text[start:])
+    return pieces
@@ -0,0 +1,545 @@
+#!/usr/bin/env python
+"""Benchmark complete reviews against simulated LLM providers.
+
+Runs full reviews (all rounds plus the consolidated report) through the real
+review tasks, with every panelist backed by ``MockLLMProvider`` configured
+from a per-provider profile: a lognormal latency with an optional slow tail,
+a rate of retryable failures and a range of completion token counts. No API
+keys are needed, but the database and Redis must be reachable (see
+``PERFORMANCE_TESTING.md``).
+
+Draws are seeded by the request id and attempt number of each call, so a run
+with the same seed simulates the same latencies, failures and token counts
+whatever order the calls happen in. Retry backoff is scaled by
+``--retry-base-delay`` and has no jitter.
+
+Tasks run in-process, either eagerly (``--mode eager``) or through the
+configured broker with an in-process worker (``--mode broker``). The run
+records per review and per round:
+
+* wall time, and the LLM critical path: from the first provider call of the
+  round to the last one finishing, so retries and fallbacks are included;
+* database round trips: transactions and statements through ``DatabaseService``;
+* messages and bytes sent to the broker (task bodies as serialized by Celery).
+
+Results are written as JSON. With ``--baseline`` the summary is compared with
+an earlier result and the script exits non-zero when a metric regressed by
+more than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import json
+import math
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from unittest import mock
+
+from celery.app.task import Task
+from kombu.serialization import dumps
+
+from app.celery_app import celery_app
+from app.config.settings import settings
+from app.core.secrets import env_secrets_provider
+from app.models.schemas import ReviewMeta
+from app.services import retry_policy
+from app.services.database_service import DatabaseService, get_database_service
+from app.services.llm_service import LLMService, MockLLMProvider
+from app.services.storage_service import storage_service
+from app.tasks import review_tasks
+from app.tasks.base_task import BaseTask
+from app.tasks.review_tasks import ProviderPanelistConfig, run_initial_panel_turn
+
+TOPIC = "Should we launch the pilot next quarter?"
+INSTRUCTION = "Weigh cost, risk and adoption, and recommend a decision."
+TERMINAL_STATUSES = ("completed", "failed")
+
+# Round key of each review step; the key is also how LLM request ids are attributed.
+STEP_ROUNDS = {
+    "_initial_panel_step": "round_1",
+    "_rebuttal_step": "round_2",
+    "_synthesis_step": "round_3",
+    "_resolution_step": "round_4",
+    "_report_step": "report",
+}
+_ROUND_IN_REQUEST_ID = re.compile(r"-r(\d+)-")
+
+
+@dataclass
+class ProviderProfile:
+    """Simulated behaviour of one provider; latencies are in seconds before ``--time-scale``."""
+
+    model: str
+    persona: str
+    median_seconds: float
+    sigma: float = 0.3
+    tail_probability: float = 0.0
+    tail_seconds: float = 0.0
+    failure_rate: float = 0.0
+    min_completion_tokens: int = 200
+    max_completion_tokens: int = 600
+
+
+DEFAULT_PROFILES: Dict[str, ProviderProfile] = {
+    "openai": ProviderProfile(
+        model="gpt-4o-mini", persona="GPT-4o", median_seconds=2.0, sigma=0.35,
+        tail_probability=0.05, tail_seconds=9.0, failure_rate=0.02,
+    ),
+    "claude": ProviderProfile(
+        model="claude-3-haiku", persona="Claude 3 Haiku", median_seconds=2.5, sigma=0.25,
+        failure_rate=0.01, min_completion_tokens=250, max_completion_tokens=700,
+    ),
+    "gemini": ProviderProfile(
+        model="gemini-1.5-flash", persona="Gemini 1.5 Flash", median_seconds=1.6, sigma=0.45,
+        tail_probability=0.08, tail_seconds=7.0, failure_rate=0.04,
+    ),
+}
+
+# The draw for the provider call in progress; samplers read it instead of sharing one RNG.
+_current_draw: contextvars.ContextVar[Optional[random.Random]] = contextvars.ContextVar("review_benchmark_draw", default=None)
+_current_round = threading.local()
+
+
+def _round_of_request(request_id: str) -> str:
+    if "-report" in request_id:
+        return "report"
+    match = _ROUND_IN_REQUEST_ID.search(request_id)
+    return f"round_{match.group(1)}" if match else "other"
+
+
+def _review_of_request(request_id: str) -> str:
+    return request_id.split("-r", 1)[0].split("-report", 1)[0]
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _distribution(values: List[float]) -> Dict[str, float]:
+    return {
+        "mean": round(statistics.fmean(values), 4) if values else 0.0,
+        "p50": round(_percentile(values, 50), 4),
+        "p95": round(_percentile(values, 95), 4),
+        "max": round(max(values), 4) if values else 0.0,
+    }
+
+
+class Recorder:
+    """Collects provider calls, step timings, database round trips and broker messages."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.attempts: Dict[str, int] = defaultdict(int)
+        self.calls: List[Dict[str, Any]] = []
+        self.steps: List[Dict[str, Any]] = []
+        self.db: Dict[str, Dict[str, int]] = defaultdict(lambda: {"transactions": 0, "statements": 0})
+        self.messages: Dict[str, Dict[str, int]] = defaultdict(lambda: {"messages": 0, "bytes": 0})
+
+    def next_attempt(self, request_id: str) -> int:
+        with self._lock:
+            self.attempts[request_id] += 1
+            return self.attempts[request_id]
+
+    def call(self, provider: str, request_id: str, started: float, ended: float, ok: bool) -> None:
+        with self._lock:
+            self.calls.append({
+                "provider": provider, "request_id": request_id, "review": _review_of_request(request_id),
+                "round": _round_of_request(request_id), "started": started, "ended": ended, "ok": ok,
+            })
+
+    def step(self, review: str, round_key: str, seconds: float) -> None:
+        with self._lock:
+            self.steps.append({"review": review, "round": round_key, "seconds": seconds})
+
+    def db_round_trip(self, statements: int) -> None:
+        key = getattr(_current_round, "key", None) or "other"
+        with self._lock:
+            self.db[key]["transactions"] += 1
+            self.db[key]["statements"] += statements
+
+    def message(self, task_name: str, size: int) -> None:
+        with self._lock:
+            self.messages[task_name]["messages"] += 1
+            self.messages[task_name]["bytes"] += size
+
+
+def _provider(name: str, profile: ProviderProfile, time_scale: float, seed: int, recorder: Recorder) -> MockLLMProvider:
+    def draw() -> random.Random:
+        return _current_draw.get() or random.Random(seed)
+
+    def latency() -> float:
+        rng = draw()
+        if rng.random() < profile.tail_probability:
+            return profile.tail_seconds * time_scale
+        return rng.lognormvariate(0, profile.sigma) * profile.median_seconds * time_scale
+
+    provider = MockLLMProvider(
+        latency=latency,
+        failure=lambda: draw().random() < profile.failure_rate,
+        completion_tokens=lambda: draw().randint(profile.min_completion_tokens, profile.max_completion_tokens),
+    )
+
+    def seed_call(request_id: str) -> contextvars.Token:
+        attempt = recorder.next_attempt(request_id)
+        return _current_draw.set(random.Random(f"{seed}|{name}|{request_id}|{attempt}"))
+
+    invoke_sync, invoke, stream_invoke = provider.invoke_sync, provider.invoke, provider.stream_invoke
+
+    def recorded_invoke_sync(model, system_prompt, user_prompt, request_id, response_format="text"):
+        token, started, ok = seed_call(request_id), time.perf_counter(), False
+        try:
+            result = invoke_sync(model, system_prompt, user_prompt, request_id, response_format)
+            ok = True
+            return result
+        finally:
+            recorder.call(name, request_id, started, time.perf_counter(), ok)
+            _current_draw.reset(token)
+
+    async def recorded_invoke(model, system_prompt, user_prompt, request_id, response_format="text"):
+        token, started, ok = seed_call(request_id), time.perf_counter(), False
+        try:
+            result = await invoke(model, system_prompt, user_prompt, request_id, response_format)
+            ok = True
+            return result
+        finally:
+            recorder.call(name, request_id, started, time.perf_counter(), ok)
+            _current_draw.reset(token)
+
+    async def recorded_stream_invoke(model, system_prompt, user_prompt, request_id, response_format="text"):
+        _current_draw.set(random.Random(f"{seed}|{name}|{request_id}|{recorder.next_attempt(request_id)}"))
+        started, ok = time.perf_counter(), False
+        try:
+            async for chunk in stream_invoke(model, system_prompt, user_prompt, request_id, response_format):
+                yield chunk
+            ok = True
+        finally:
+            recorder.call(name, request_id, started, time.perf_counter(), ok)
+
+    provider.invoke_sync = recorded_invoke_sync
+    provider.invoke = recorded_invoke
+    provider.stream_invoke = recorded_stream_invoke
+    return provider
+
+
+class _CountingCursor:
+    def __init__(self, cursor) -> None:
+        self._cursor = cursor
+        self.statements = 0
+
+    def execute(self, *args, **kwargs):
+        self.statements += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        self.statements += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+def _instrument(stack: ExitStack, recorder: Recorder, llm_service: LLMService, panelists: List[ProviderPanelistConfig], args) -> None:
+    stack.enter_context(mock.patch.object(BaseTask, "llm_service", property(lambda self: llm_service)))
+    stack.enter_context(mock.patch.object(review_tasks.llm_strategy_service, "get_default_panelists", lambda: panelists))
+    stack.enter_context(mock.patch.object(settings, "REVIEW_STREAMING_ENABLED", args.streaming))
+    stack.enter_context(mock.patch.object(retry_policy.retry_manager.retry_config, "base_delay", args.retry_base_delay))
+    stack.enter_context(mock.patch.object(retry_policy, "get_retry_delay", lambda attempt, base: min(base * 2 ** attempt, 60.0)))
+    retry_policy.retry_manager.circuit_breakers.clear()
+
+    for step_name, round_key in STEP_ROUNDS.items():
+        step = getattr(review_tasks, step_name)
+
+        def timed(*step_args, _step=step, _round=round_key, **kwargs):
+            _current_round.key = _round
+            started = time.perf_counter()
+            try:
+                return _step(*step_args, **kwargs)
+            finally:
+                recorder.step(kwargs.get("review_id", "?"), _round, time.perf_counter() - started)
+                _current_round.key = None
+
+        # Chained tasks look the steps up as module globals, the orchestrator in REVIEW_ROUND_STEPS.
+        stack.enter_context(mock.patch.object(review_tasks, step_name, timed))
+        for key, value in list(review_tasks.REVIEW_ROUND_STEPS.items()):
+            if value is step:
+                stack.enter_context(mock.patch.dict(review_tasks.REVIEW_ROUND_STEPS, {key: timed}))
+
+    transaction = DatabaseService.transaction
+
+    @contextmanager
+    def counting_transaction(self, query_type: str = "unknown"):
+        with transaction(self, query_type) as cur:
+            counting = _CountingCursor(cur)
+            try:
+                yield counting
+            finally:
+                recorder.db_round_trip(counting.statements)
+
+    stack.enter_context(mock.patch.object(DatabaseService, "transaction", counting_transaction))
+
+    apply_async = Task.apply_async
+
+    def counting_apply_async(task, task_args=None, task_kwargs=None, *rest, **options):
+        # Protocol 2 message body: (args, kwargs, embed).
+        body = (list(task_args or ()), dict(task_kwargs or {}), {})
+        _, _, payload = dumps(body, serializer=celery_app.conf.task_serializer)
+        recorder.message(task.name, len(payload))
+        return apply_async(task, task_args, task_kwargs, *rest, **options)
+
+    stack.enter_context(mock.patch.object(Task, "apply_async", counting_apply_async))
+
+
+def _panelists(profiles: Dict[str, ProviderProfile]) -> List[ProviderPanelistConfig]:
+    return [
+        ProviderPanelistConfig(provider=name, persona=profile.persona, model=profile.model)
+        for name, profile in profiles.items()
+    ]
+
+
+def _llm_service(profiles: Dict[str, ProviderProfile], args, recorder: Recorder) -> LLMService:
+    service = LLMService(env_secrets_provider)
+    service._initialized = True
+    service.providers = {
+        name: _provider(name, profile, args.time_scale, args.seed, recorder) for name, profile in profiles.items()
+    }
+    return service
+
+
+def _create_reviews(room_id: str, count: int) -> List[str]:
+    db = get_database_service()
+    now = int(time.time())
+    db.execute_update(
+        "INSERT INTO rooms (room_id, name, owner_id, type, created_at, updated_at, message_count) "
+        "VALUES (%s, %s, %s, 'review', %s, %s, 0)",
+        (room_id, "Review benchmark", "review-benchmark", now, now),
+    )
+    review_ids = [f"{room_id}-{index}" for index in range(count)]
+    for review_id in review_ids:
+        storage_service.save_review_meta(ReviewMeta(
+            review_id=review_id, room_id=room_id, topic=TOPIC, instruction=INSTRUCTION,
+            total_rounds=4, created_at=now,
+        ))
+    return review_ids
+
+
+def _start_review(review_id: str, room_id: str, index: int) -> None:
+    run_initial_panel_turn.delay(
+        review_id=review_id, review_room_id=room_id, topic=TOPIC, instruction=INSTRUCTION,
+        panelists_override=None, trace_id=f"bench{index}",
+    )
+
+
+def _wait_for(review_id: str, timeout: float) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        meta = storage_service.get_review_meta(review_id)
+        if meta and meta.status in TERMINAL_STATUSES:
+            return meta.status
+        time.sleep(0.05)
+    return "timeout"
+
+
+def _run_reviews(args, review_ids: List[str], room_id: str) -> Dict[str, Dict[str, Any]]:
+    outcomes: Dict[str, Dict[str, Any]] = {}
+
+    def one(index: int, review_id: str) -> None:
+        started = time.perf_counter()
+        _start_review(review_id, room_id, index)
+        status = _wait_for(review_id, args.timeout)
+        outcomes[f"bench{index}"] = {"review_id": review_id, "status": status, "seconds": time.perf_counter() - started}
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(one, index, review_id) for index, review_id in enumerate(review_ids)]:
+            future.result()
+    return outcomes
+
+
+def _summarize(recorder: Recorder, outcomes: Dict[str, Dict[str, Any]], wall_seconds: float, args, profiles) -> Dict[str, Any]:
+    reviews = len(outcomes)
+    rounds: Dict[str, Dict[str, Any]] = {}
+    round_keys = sorted({step["round"] for step in recorder.steps} | {call["round"] for call in recorder.calls})
+    for round_key in round_keys:
+        step_seconds = [step["seconds"] for step in recorder.steps if step["round"] == round_key]
+        critical_paths = []
+        calls = [call for call in recorder.calls if call["round"] == round_key]
+        for trace in {call["review"] for call in calls}:
+            review_calls = [call for call in calls if call["review"] == trace]
+            critical_paths.append(max(c["ended"] for c in review_calls) - min(c["started"] for c in review_calls))
+        db = recorder.db.get(round_key, {"transactions": 0, "statements": 0})
+        rounds[round_key] = {
+            "wall_seconds": _distribution(step_seconds),
+            "critical_path_seconds": _distribution(critical_paths),
+            "llm_calls": len(calls),
+            "llm_failures": sum(not call["ok"] for call in calls),
+            "db_transactions_per_review": round(db["transactions"] / max(1, reviews), 2),
+            "db_statements_per_review": round(db["statements"] / max(1, reviews), 2),
+        }
+
+    db_totals = {
+        "transactions": sum(entry["transactions"] for entry in recorder.db.values()),
+        "statements": sum(entry["statements"] for entry in recorder.db.values()),
+    }
+    broker_totals = {
+        "messages": sum(entry["messages"] for entry in recorder.messages.values()),
+        "bytes": sum(entry["bytes"] for entry in recorder.messages.values()),
+    }
+    statuses: Dict[str, int] = defaultdict(int)
+    for outcome in outcomes.values():
+        statuses[outcome["status"]] += 1
+    return {
+        "config": {
+            "mode": args.mode,
+            "reviews": reviews,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "time_scale": args.time_scale,
+            "retry_base_delay": args.retry_base_delay,
+            "streaming": args.streaming,
+            "profiles": {name: asdict(profile) for name, profile in profiles.items()},
+        },
+        "summary": {
+            "wall_seconds": round(wall_seconds, 4),
+            "review_seconds": _distribution([outcome["seconds"] for outcome in outcomes.values()]),
+            "statuses": dict(statuses),
+            "db_transactions_per_review": round(db_totals["transactions"] / max(1, reviews), 2),
+            "db_statements_per_review": round(db_totals["statements"] / max(1, reviews), 2),
+            "broker_messages_per_review": round(broker_totals["messages"] / max(1, reviews), 2),
+            "broker_bytes_per_review": round(broker_totals["bytes"] / max(1, reviews), 2),
+        },
+        "rounds": rounds,
+        "db": {key: dict(value) for key, value in recorder.db.items()},
+        "broker": {key: dict(value) for key, value in recorder.messages.items()},
+    }
+
+
+# Metrics compared against a baseline, as paths into the result; higher is worse for all of them.
+REGRESSION_METRICS = (
+    ("summary", "review_seconds", "p50"),
+    ("summary", "review_seconds", "p95"),
+    ("summary", "db_statements_per_review"),
+    ("summary", "broker_bytes_per_review"),
+)
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every metric that is more than ``tolerance`` worse than in ``baseline``."""
+    paths = list(REGRESSION_METRICS)
+    for round_key in result.get("rounds", {}):
+        paths.append(("rounds", round_key, "critical_path_seconds", "p50"))
+        paths.append(("rounds", round_key, "wall_seconds", "p50"))
+        paths.append(("rounds", round_key, "db_statements_per_review"))
+
+    regressions = []
+    for path in paths:
+        current, previous = result, baseline
+        for key in path:
+            current = current.get(key, {}) if isinstance(current, dict) else {}
+            previous = previous.get(key, {}) if isinstance(previous, dict) else {}
+        if not isinstance(current, (int, float)) or not isinstance(previous, (int, float)) or previous <= 0:
+            continue
+        if current > previous * (1 + tolerance):
+            regressions.append(f"{'.'.join(path)}: {previous} -> {current} (+{(current / previous - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run(args) -> Dict[str, Any]:
+    profiles = DEFAULT_PROFILES
+    if args.profiles:
+        raw = json.loads(Path(args.profiles).read_text(encoding="utf-8"))
+        profiles = {name: ProviderProfile(**values) for name, values in raw.items()}
+
+    recorder = Recorder()
+    room_id = f"review-bench-{uuid.uuid4().hex[:8]}"
+    review_ids = _create_reviews(room_id, args.reviews)
+    try:
+        with ExitStack() as stack:
+            _instrument(stack, recorder, _llm_service(profiles, args, recorder), _panelists(profiles), args)
+            if args.mode == "eager":
+                stack.enter_context(mock.patch.object(celery_app.conf, "task_always_eager", True))
+                stack.enter_context(mock.patch.object(celery_app.conf, "task_store_eager_result", False))
+            else:
+                from celery.contrib.testing.worker import start_worker
+
+                stack.enter_context(mock.patch.object(celery_app.conf, "task_always_eager", False))
+                stack.enter_context(start_worker(
+                    celery_app, pool="threads", concurrency=args.concurrency, perform_ping_check=False,
+                    queues=["high_priority", "default", "low_priority"],
+                ))
+            started = time.perf_counter()
+            outcomes = _run_reviews(args, review_ids, room_id)
+            wall_seconds = time.perf_counter() - started
+    finally:
+        get_database_service().execute_update("DELETE FROM rooms WHERE room_id = %s", (room_id,))
+    return _summarize(recorder, outcomes, wall_seconds, args, profiles)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--mode", choices=("eager", "broker"), default="eager")
+    parser.add_argument("--reviews", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4, help="Reviews in flight (worker threads in broker mode)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-scale", type=float, default=0.05, help="Multiplier applied to simulated latencies")
+    parser.add_argument("--retry-base-delay", type=float, default=0.05)
+    parser.add_argument("--streaming", action="store_true", help="Run panelists with REVIEW_STREAMING_ENABLED")
+    parser.add_argument("--profiles", help="JSON file of provider profiles, keyed by provider name")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for each review")
+    parser.add_argument("--output", default="review_benchmark.json")
+    parser.add_argument("--baseline", help="Earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    result = run(args)
+    Path(args.output).write_text(json.dumps(result, indent=2, sort_keys=True), encoding="utf-8")
+
+    summary = result["summary"]
+    print(
+        f"{args.reviews} reviews ({args.mode}): {summary['wall_seconds']:.2f}s, "
+        f"review p50 {summary['review_seconds']['p50']:.2f}s / p95 {summary['review_seconds']['p95']:.2f}s, "
+        f"{summary['db_statements_per_review']} statements and {summary['broker_bytes_per_review']} broker bytes per review"
+    )
+    for round_key, stats in result["rounds"].items():
+        print(
+            f"  {round_key}: wall p50 {stats['wall_seconds']['p50']:.3f}s, "
+            f"critical path p50 {stats['critical_path_seconds']['p50']:.3f}s, "
+            f"{stats['llm_calls']} calls ({stats['llm_failures']} failed)"
+        )
+    print(f"Results written to {args.output}")
+
+    if summary["statuses"].get("completed", 0) != args.reviews:
+        print(f"Not every review completed: {summary['statuses']}", file=sys.stderr)
+        return 2
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover - script entry point
+    raise SystemExit(main())
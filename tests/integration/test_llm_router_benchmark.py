@@ -0,0 +1,80 @@
+"""Offline latency benchmark for the LLM router: static primary vs latency routing with hedging."""
+
+import asyncio
+import random
+import statistics
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.core.secrets import SecretProvider
+from app.services.llm_service import LLMService, MockLLMProvider
+from app.services.provider_router import LatencyRouter
+
+pytestmark = pytest.mark.heavy
+
+REQUESTS = 300
+CONCURRENCY = 20
+
+
+def _lognormal(median, sigma, tail_probability=0.0, tail_seconds=0.0, seed=0):
+    rng = random.Random(seed)
+
+    def sample():
+        if rng.random() < tail_probability:
+            return tail_seconds
+        return rng.lognormvariate(0, sigma) * median
+
+    return sample
+
+
+def _service():
+    secrets = Mock(spec=SecretProvider)
+    secrets.get.return_value = None
+    service = LLMService(secrets)
+    service._initialized = True
+    # The static preference favours openai, which has a heavy tail; claude is steadier.
+    service.providers = {
+        "openai": MockLLMProvider(latency=_lognormal(0.02, 0.3, tail_probability=0.08, tail_seconds=0.4, seed=1)),
+        "claude": MockLLMProvider(latency=_lognormal(0.03, 0.2, seed=2)),
+    }
+    return service
+
+
+async def _run(service, hedged):
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(index):
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            if hedged:
+                provider, model, _ = service.select_model_for_task(task="search", interactive=True)
+                await service.invoke_hedged(provider, model, "system", "user", f"req-{index}")
+            else:
+                await service.invoke("gpt", "system", "user", f"req-{index}", provider_name="openai")
+            latencies.append(loop.time() - started)
+
+    await asyncio.gather(*(one(index) for index in range(REQUESTS)))
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+@pytest.mark.asyncio
+async def test_hedged_routing_cuts_tail_latency():
+    service = _service()
+    router = LatencyRouter(use_redis=False, min_samples=10)
+    with patch("app.services.llm_service.get_latency_router", return_value=router), \
+            patch.object(service, "_runtime_config", return_value=None), \
+            patch("app.services.provider_router.settings.LLM_HEDGE_MIN_DELAY_SECONDS", 0.01), \
+            patch("app.services.provider_router.settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS", 0.1):
+        static = await _run(service, hedged=False)
+        routed = await _run(service, hedged=True)
+
+    assert routed["p99"] < static["p99"] / 2
+    assert routed["p50"] <= static["p50"] * 1.5
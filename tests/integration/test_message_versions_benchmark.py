@@ -0,0 +1,73 @@
+"""Benchmark for message version history: per-hop lookups vs one recursive query over 100 edits."""
+
+import time
+import uuid
+
+import pytest
+
+from app.services.conversation_repository import ConversationRepository
+from app.services.database_service import get_database_service
+
+pytestmark = pytest.mark.heavy
+
+EDITS = 100
+
+
+@pytest.fixture
+def edit_chain():
+    db = get_database_service()
+    repo = ConversationRepository(db=db)
+    room_id = f"bench-versions-{uuid.uuid4().hex[:8]}"
+    now = int(time.time())
+    db.execute_update(
+        "INSERT INTO rooms (room_id, name, owner_id, type, created_at, updated_at, message_count) "
+        "VALUES (%s, %s, %s, 'main', %s, %s, 0)",
+        (room_id, "Benchmark versions", "bench-user", now, now),
+    )
+    thread = repo.create_thread(room_id, "bench-user", "Versions")
+    message = repo.create_message(thread.id, "user", "version 0", status="complete", user_id="bench-user")
+    ids = [message["id"]]
+    for edit in range(1, EDITS + 1):
+        ids.append(repo.create_message_version(ids[-1], f"version {edit}")["id"])
+    yield repo, ids
+    db.execute_update("DELETE FROM conversation_messages WHERE thread_id = %s", (thread.id,))
+    db.execute_update("DELETE FROM conversation_threads WHERE id = %s", (thread.id,))
+    db.execute_update("DELETE FROM rooms WHERE room_id = %s", (room_id,))
+
+
+def _per_hop_versions(repo, message_id):
+    """The previous implementation: one SELECT per version."""
+    versions = []
+    current_id = message_id
+    while current_id:
+        message = repo.get_message(current_id)
+        if not message:
+            break
+        versions.append(message)
+        current_id = message["meta"].get("parentId")
+    return list(reversed(versions))
+
+
+def _timed(call, repeats=5):
+    best = float("inf")
+    result = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = call()
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def test_recursive_version_chain_for_100_edits(edit_chain):
+    repo, ids = edit_chain
+    latest = ids[-1]
+
+    per_hop, per_hop_seconds = _timed(lambda: _per_hop_versions(repo, latest))
+    recursive, recursive_seconds = _timed(lambda: repo.list_message_versions(latest))
+    from_middle = repo.list_message_versions(ids[EDITS // 2])
+
+    assert [version["id"] for version in recursive] == ids
+    assert [version["id"] for version in per_hop] == ids
+    # Any version resolves to the whole chain, including later edits.
+    assert [version["id"] for version in from_middle] == ids
+    assert recursive_seconds < per_hop_seconds
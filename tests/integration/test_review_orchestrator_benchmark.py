@@ -0,0 +1,128 @@
+"""Benchmark: chained Celery review tasks vs. the async review orchestrator, on mock providers."""
+
+import time
+import uuid
+from unittest.mock import Mock
+
+import pytest
+from celery.app.task import Task
+
+from app.celery_app import celery_app
+from app.core.secrets import SecretProvider
+from app.models.schemas import ReviewMeta
+from app.services.database_service import get_database_service
+from app.services.llm_service import LLMService, MockLLMProvider
+from app.services.storage_service import storage_service
+from app.tasks import review_orchestrator, review_tasks
+from app.tasks.base_task import BaseTask
+from app.tasks.review_orchestrator import ReviewOrchestrator, orchestrate_review
+from app.tasks.review_tasks import ProviderPanelistConfig, run_initial_panel_turn
+
+pytestmark = pytest.mark.heavy
+
+REVIEWS = 10
+PROVIDER_LATENCY_SECONDS = 0.05
+PANELISTS = [
+    ProviderPanelistConfig(provider="openai", persona="GPT-4o", model="gpt-4o-mini"),
+    ProviderPanelistConfig(provider="claude", persona="Claude 3 Haiku", model="claude-3-haiku"),
+    ProviderPanelistConfig(provider="gemini", persona="Gemini 1.5 Flash", model="gemini-1.5-flash"),
+]
+
+
+def _llm_service():
+    secrets = Mock(spec=SecretProvider)
+    secrets.get.return_value = None
+    service = LLMService(secrets)
+    service._initialized = True
+    service.providers = {
+        p.provider: MockLLMProvider(latency=lambda: PROVIDER_LATENCY_SECONDS) for p in PANELISTS
+    }
+    return service
+
+
+@pytest.fixture
+def bench(monkeypatch):
+    db = get_database_service()
+    now = int(time.time())
+    room_id = f"bench-review-{uuid.uuid4().hex[:8]}"
+    db.execute_update(
+        "INSERT INTO rooms (room_id, name, owner_id, type, created_at, updated_at, message_count) "
+        "VALUES (%s, %s, %s, 'review', %s, %s, 0)",
+        (room_id, "Benchmark review", "bench-user", now, now),
+    )
+    service = _llm_service()
+    monkeypatch.setattr(BaseTask, "llm_service", property(lambda self: service))
+    monkeypatch.setattr(review_tasks.llm_strategy_service, "get_default_panelists", lambda: PANELISTS)
+    monkeypatch.setattr(review_tasks.redis_pubsub_manager, "publish_sync", lambda *args, **kwargs: None)
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery_app.conf, "task_store_eager_result", False)
+
+    # Every .delay()/apply_async() would be one message through the broker.
+    messages = []
+    apply_async = Task.apply_async
+
+    def counting_apply_async(task, *args, **kwargs):
+        messages.append(task.name)
+        return apply_async(task, *args, **kwargs)
+
+    monkeypatch.setattr(Task, "apply_async", counting_apply_async)
+
+    def new_reviews(prefix):
+        review_ids = [f"{room_id}-{prefix}-{i}" for i in range(REVIEWS)]
+        for review_id in review_ids:
+            storage_service.save_review_meta(ReviewMeta(
+                review_id=review_id, room_id=room_id, topic="Launch a pilot?", instruction="Decide.",
+                total_rounds=4, created_at=now,
+            ))
+        return review_ids
+
+    yield service, messages, new_reviews, room_id
+    db.execute_update("DELETE FROM rooms WHERE room_id = %s", (room_id,))
+
+
+def _kwargs(review_id, room_id):
+    return {
+        "review_id": review_id, "review_room_id": room_id, "topic": "Launch a pilot?",
+        "instruction": "Decide.", "panelists_override": None, "trace_id": f"trace-{review_id}",
+    }
+
+
+def _completed(review_ids):
+    return sum(storage_service.get_review_meta(review_id).status == "completed" for review_id in review_ids)
+
+
+def test_orchestrated_reviews_beat_the_task_chain(bench, monkeypatch):
+    service, messages, new_reviews, room_id = bench
+
+    # Chained: one worker slot runs each review's five tasks back to back. Eager mode
+    # leaves out broker latency and queue waits, so this understates the chain's cost.
+    chained_ids = new_reviews("chained")
+    started = time.perf_counter()
+    for review_id in chained_ids:
+        run_initial_panel_turn.delay(**_kwargs(review_id, room_id))
+    chained_seconds = time.perf_counter() - started
+    chained_messages = len(messages)
+    messages.clear()
+
+    # Orchestrated: one message per review, all reviews in flight on one event loop.
+    orchestrator = ReviewOrchestrator(llm_service=service)
+    futures = []
+    monkeypatch.setattr(review_orchestrator, "get_review_orchestrator", lambda: orchestrator)
+    monkeypatch.setattr(orchestrator, "submit", lambda review_id: futures.append(
+        ReviewOrchestrator.submit(orchestrator, review_id)
+    ))
+    orchestrated_ids = new_reviews("orchestrated")
+    started = time.perf_counter()
+    for review_id in orchestrated_ids:
+        orchestrate_review.delay(**_kwargs(review_id, room_id))
+    for future in futures:
+        future.result(timeout=120)
+    orchestrated_seconds = time.perf_counter() - started
+    orchestrated_messages = len(messages)
+
+    assert _completed(chained_ids) == REVIEWS
+    assert _completed(orchestrated_ids) == REVIEWS
+    assert chained_messages == 5 * REVIEWS
+    assert orchestrated_messages == REVIEWS
+    # Sequential panel calls across serial reviews vs. concurrent calls across concurrent reviews.
+    assert orchestrated_seconds < chained_seconds / 3
@@ -0,0 +1,70 @@
+"""Benchmark for copying a 100k-message room with set-based INSERT ... SELECT batches."""
+
+import time
+import uuid
+
+import pytest
+
+from app.config.settings import settings
+from app.services.database_service import get_database_service
+from app.services.storage_service import get_storage_service
+
+pytestmark = pytest.mark.heavy
+
+ROOM_MESSAGES = 100_000
+# Copying stays inside Postgres, so it scales with rows rather than round trips; the
+# budget leaves headroom for slow CI hosts.
+COPY_BUDGET_SECONDS = 30.0
+
+
+@pytest.fixture
+def rooms():
+    db = get_database_service()
+    storage = get_storage_service()
+    source, target = (f"bench-copy-{uuid.uuid4().hex[:8]}" for _ in range(2))
+    now = int(time.time())
+    for room_id in (source, target):
+        db.execute_update(
+            "INSERT INTO rooms (room_id, name, owner_id, type, created_at, updated_at, message_count) "
+            "VALUES (%s, %s, %s, 'main', %s, %s, 0)",
+            (room_id, "Benchmark copy", "bench-user", now, now),
+        )
+    db.execute_update(
+        """
+        INSERT INTO messages (message_id, room_id, user_id, role, content, content_searchable, timestamp)
+        SELECT %s || '-' || g, %s, 'bench-user',
+               CASE WHEN g %% 2 = 0 THEN 'user' ELSE 'assistant' END,
+               pgp_sym_encrypt(body, %s), body, %s + g
+        FROM generate_series(1, %s) AS g,
+             LATERAL (SELECT 'copied message number ' || g || ' with some padding text' AS body) AS b
+        """,
+        (source, source, storage.db_encryption_key, now - ROOM_MESSAGES, ROOM_MESSAGES),
+    )
+    db.execute_update("ANALYZE messages")
+    yield source, target
+    db.execute_update("DELETE FROM rooms WHERE room_id IN (%s, %s)", (source, target))
+
+
+def test_copy_100k_messages_in_bounded_time(rooms):
+    source, target = rooms
+    db = get_database_service()
+    progress = []
+
+    started = time.perf_counter()
+    copied = db.copy_room_messages(source, target, progress=lambda done, total: progress.append(done))
+    elapsed = time.perf_counter() - started
+
+    assert copied == ROOM_MESSAGES
+    assert progress[-1] == ROOM_MESSAGES and len(progress) > 1
+    assert elapsed < COPY_BUDGET_SECONDS
+
+    storage = get_storage_service()
+    page, _ = storage.get_messages_page(target, limit=2)
+    assert [message.content for message in page] == [
+        f"copied message number {ROOM_MESSAGES - 1} with some padding text",
+        f"copied message number {ROOM_MESSAGES} with some padding text",
+    ]
+    rows = db.execute_query("SELECT message_count, archive_due_at FROM rooms WHERE room_id = %s", (target,))
+    assert rows[0]["message_count"] == ROOM_MESSAGES
+    oldest = db.execute_query("SELECT MIN(timestamp) AS ts FROM messages WHERE room_id = %s", (target,))[0]["ts"]
+    assert rows[0]["archive_due_at"] == oldest + max(settings.MEMORY_ARCHIVE_AFTER_DAYS, 1) * 86400
@@ -0,0 +1,80 @@
+"""Latency benchmark for paged room history against a large room."""
+
+import time
+import uuid
+
+import pytest
+
+from app.services.database_service import get_database_service
+from app.services.storage_service import get_storage_service
+
+pytestmark = pytest.mark.heavy
+
+ROOM_MESSAGES = 50_000
+PAGE_SIZE = 100
+# A keyset page touches PAGE_SIZE + 1 index entries however long the room is; the
+# budget leaves headroom for slow CI hosts.
+PAGE_LATENCY_BUDGET_SECONDS = 0.1
+
+
+@pytest.fixture
+def large_room():
+    db = get_database_service()
+    storage = get_storage_service()
+    room_id = f"bench-history-{uuid.uuid4().hex[:8]}"
+    now = int(time.time())
+    db.execute_update(
+        "INSERT INTO rooms (room_id, name, owner_id, type, created_at, updated_at, message_count) "
+        "VALUES (%s, %s, %s, 'main', %s, %s, %s)",
+        (room_id, "Benchmark history", "bench-user", now, now, ROOM_MESSAGES),
+    )
+    db.execute_update(
+        """
+        INSERT INTO messages (message_id, room_id, user_id, role, content, content_searchable, timestamp)
+        SELECT %s || '-' || g,
+               %s,
+               'bench-user',
+               CASE WHEN g %% 2 = 0 THEN 'user' ELSE 'assistant' END,
+               pgp_sym_encrypt(body, %s),
+               body,
+               %s + g
+        FROM generate_series(1, %s) AS g,
+             LATERAL (SELECT 'history message number ' || g || ' with some padding text' AS body) AS b
+        """,
+        (room_id, room_id, storage.db_encryption_key, now - ROOM_MESSAGES, ROOM_MESSAGES),
+    )
+    db.execute_update("ANALYZE messages")
+    yield room_id
+    db.execute_update("DELETE FROM rooms WHERE room_id = %s", (room_id,))
+
+
+def _median(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2]
+
+
+def test_paged_history_is_bounded_for_50k_messages(large_room):
+    storage = get_storage_service()
+
+    started = time.perf_counter()
+    full = storage.get_messages(large_room)
+    full_seconds = time.perf_counter() - started
+
+    page_timings = []
+    before = None
+    for _ in range(5):
+        # Walk backwards so every read is an uncached keyset page.
+        started = time.perf_counter()
+        page, has_more = storage.get_messages_page(large_room, before=before, limit=PAGE_SIZE)
+        page_timings.append(time.perf_counter() - started)
+        assert len(page) == PAGE_SIZE
+        assert has_more
+        before = page[0].message_id
+
+    newest, _ = storage.get_messages_page(large_room, limit=PAGE_SIZE)
+    assert [m.message_id for m in newest] == [m.message_id for m in full[-PAGE_SIZE:]]
+
+    page_median = _median(page_timings)
+    assert len(full) == ROOM_MESSAGES
+    assert page_median < PAGE_LATENCY_BUDGET_SECONDS
+    assert page_median < full_seconds
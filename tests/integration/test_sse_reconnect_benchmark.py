@@ -0,0 +1,44 @@
+"""Reconnect storm: bytes sent to reconnecting SSE clients, full history vs. Last-Event-ID replay."""
+
+import asyncio
+import random
+import uuid
+
+import pytest
+
+from app.services.realtime_service import RealtimeService
+from app.services.sse_replay import SSEJournal, journal_key
+
+pytestmark = pytest.mark.heavy
+
+CHANNEL_EVENTS = 500
+CLIENTS = 200
+# A dropped mobile connection typically misses a few seconds of a review.
+MAX_MISSED_EVENTS = 20
+
+
+def _event(n):
+    return RealtimeService.format_event(
+        "panelist_delta", {"round": 2, "persona": "GPT-4o", "seq": n, "delta": "파일럿을 먼저 진행하죠. " * 4}
+    )
+
+
+@pytest.mark.asyncio
+async def test_last_event_id_reconnects_send_only_missed_events():
+    journal = SSEJournal()
+    channel = f"review_bench-{uuid.uuid4().hex[:8]}"
+    ids = [await journal.append(channel, "message", _event(n)) for n in range(CHANNEL_EVENTS)]
+    assert all(ids)
+
+    rng = random.Random(7)
+    last_seen = [rng.randrange(CHANNEL_EVENTS - MAX_MISSED_EVENTS, CHANNEL_EVENTS) for _ in range(CLIENTS)]
+    full_history_bytes = CLIENTS * sum(len(_event(n)) for n in range(CHANNEL_EVENTS))
+
+    replays = await asyncio.gather(*(journal.replay(channel, ids[index], "review") for index in last_seen))
+
+    replayed_bytes = sum(len(event.data) for replay in replays for event in replay.events)
+    for index, replay in zip(last_seen, replays):
+        assert [event.id for event in replay.events] == ids[index + 1:]
+    assert replayed_bytes * 20 < full_history_bytes
+
+    await journal._client().delete(journal_key(channel))
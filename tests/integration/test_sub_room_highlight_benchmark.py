@@ -0,0 +1,87 @@
+"""Latency benchmark for sub room highlight lookup against a large parent room."""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from app.services.database_service import get_database_service
+from app.services.storage_service import get_storage_service
+from app.services.sub_room_context_service import (
+    SubRoomContextRequest,
+    SubRoomContextService,
+)
+
+pytestmark = pytest.mark.heavy
+
+PARENT_MESSAGES = 100_000
+# Highlight lookup only touches a bounded recent window, so creation latency should
+# stay flat regardless of parent size; the budget leaves headroom for slow CI hosts.
+LATENCY_BUDGET_SECONDS = 0.5
+
+
+class _NoProfileMemory:
+    async def get_user_profile(self, user_id):
+        return None
+
+
+@pytest.fixture
+def large_parent_room():
+    db = get_database_service()
+    storage = get_storage_service()
+    room_id = f"bench-parent-{uuid.uuid4().hex[:8]}"
+    now = int(time.time())
+    db.execute_update(
+        "INSERT INTO rooms (room_id, name, owner_id, type, created_at, updated_at, message_count) "
+        "VALUES (%s, %s, %s, 'main', %s, %s, %s)",
+        (room_id, "Benchmark parent", "bench-user", now, now, PARENT_MESSAGES),
+    )
+    db.execute_update(
+        """
+        INSERT INTO messages (message_id, room_id, user_id, role, content, content_searchable, timestamp)
+        SELECT %s || '-' || g,
+               %s,
+               'bench-user',
+               CASE WHEN g %% 2 = 0 THEN 'user' ELSE 'assistant' END,
+               pgp_sym_encrypt(body, %s),
+               body,
+               %s + g
+        FROM generate_series(1, %s) AS g,
+             LATERAL (SELECT CASE WHEN g %% 97 = 0 THEN 'Kubernetes rollout 메모 ' || g
+                                  ELSE 'general chatter ' || g END AS body) AS b
+        """,
+        (room_id, room_id, storage.db_encryption_key, now - PARENT_MESSAGES, PARENT_MESSAGES),
+    )
+    db.execute_update("ANALYZE messages")
+    yield room_id
+    db.execute_update("DELETE FROM rooms WHERE room_id LIKE %s", (f"{room_id}%",))
+
+
+def test_sub_room_initialisation_latency_is_flat_for_100k_parent_messages(large_parent_room):
+    storage = get_storage_service()
+    service = SubRoomContextService(storage_service=storage, memory_service=_NoProfileMemory())
+
+    timings = []
+    for attempt in range(5):
+        sub_room_id = f"{large_parent_room}-sub-{attempt}"
+        get_database_service().execute_update(
+            "INSERT INTO rooms (room_id, name, owner_id, type, parent_id, created_at, updated_at) "
+            "VALUES (%s, 'Kubernetes', 'bench-user', 'sub', %s, 0, 0)",
+            (sub_room_id, large_parent_room),
+        )
+        request = SubRoomContextRequest(
+            parent_room_id=large_parent_room,
+            new_room_name="Kubernetes",
+            new_room_id=sub_room_id,
+            user_id="bench-user",
+        )
+        started = time.perf_counter()
+        message = asyncio.run(service.initialize_sub_room(request))
+        timings.append(time.perf_counter() - started)
+        assert message is not None
+        assert "Kubernetes rollout" in message.content
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    assert median < LATENCY_BUDGET_SECONDS
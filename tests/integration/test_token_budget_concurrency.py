@@ -0,0 +1,72 @@
+"""Concurrency test for token budgets: check-then-increment overshoots, atomic reservations do not."""
+
+import asyncio
+import os
+import random
+import uuid
+from unittest.mock import patch
+
+import pytest
+import redis.asyncio as aioredis
+
+from app.core.metrics import TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL
+from app.services.token_budget import USER_SCOPE, TokenBudget, user_usage_key
+
+pytestmark = pytest.mark.heavy
+
+LIMIT = 50_000
+ESTIMATE = 1_000
+REQUESTS = 200
+
+
+def _redis_url():
+    return os.getenv("REDIS_URL") or f"redis://{os.getenv('TEST_REDIS_HOST', 'localhost')}:{os.getenv('TEST_REDIS_PORT', '6379')}/0"
+
+
+async def _legacy_check_then_increment(client, key):
+    """The previous flow: read usage, call the provider, add usage afterwards."""
+    if int(await client.get(key) or 0) >= LIMIT:
+        return False
+    await asyncio.sleep(random.uniform(0.001, 0.01))
+    await client.incrby(key, ESTIMATE)
+    return True
+
+
+@pytest.mark.asyncio
+async def test_reservations_never_overshoot_under_concurrency():
+    client = aioredis.from_url(_redis_url(), decode_responses=True)
+    legacy_key = f"usage:legacy-{uuid.uuid4().hex}"
+    user_id = f"budget-{uuid.uuid4().hex}"
+    budget = TokenBudget(redis_url=_redis_url())
+    rng = random.Random(7)
+
+    async def request():
+        reservation = await budget.reserve(ESTIMATE, user_id=user_id, include_org=False)
+        if not reservation.granted:
+            return "rejected"
+        await asyncio.sleep(rng.uniform(0.001, 0.01))
+        if rng.random() < 0.2:
+            await budget.refund(reservation)  # cancelled before any tokens were used
+            return "refunded"
+        await budget.settle(reservation, rng.randint(600, ESTIMATE))
+        return "settled"
+
+    try:
+        await asyncio.gather(*(_legacy_check_then_increment(client, legacy_key) for _ in range(REQUESTS)))
+        legacy_used = int(await client.get(legacy_key))
+
+        with patch("app.services.token_budget.settings.DAILY_TOKEN_BUDGET", LIMIT):
+            overshoot_before = TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL.labels(scope=USER_SCOPE)._value.get()
+            outcomes = await asyncio.gather(*(request() for _ in range(REQUESTS)))
+            key = user_usage_key(user_id)
+            used = int(await client.get(key) or 0)
+            held = int(await client.hget(f"{key}:held", "__total") or 0)
+            overshoot = TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL.labels(scope=USER_SCOPE)._value.get() - overshoot_before
+
+        assert legacy_used > LIMIT
+        assert used <= LIMIT and held == 0 and overshoot == 0
+        assert outcomes.count("rejected") > 0
+    finally:
+        key = user_usage_key(user_id)
+        await client.delete(legacy_key, key, f"{key}:held", f"{key}:leases")
+        await client.aclose()
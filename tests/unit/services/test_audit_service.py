@@ -0,0 +1,79 @@
+"""Unit tests for the batched audit log writer."""
+
+import asyncio
+from typing import Any, List, Tuple
+
+from app.services.audit_service import AuditLogWriter, AuditService
+
+
+class _FakeDatabaseService:
+    def __init__(self) -> None:
+        self.updates: List[Tuple[str, Tuple[Any, ...]]] = []
+        self.fail = False
+
+    def execute_update(self, query: str, params: Tuple[Any, ...]) -> int:
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.updates.append((query, params))
+        return len(params) // 4
+
+
+def _writer(db, tmp_path, batch_size=10, max_queue_size=100):
+    return AuditLogWriter(
+        db,
+        batch_size=batch_size,
+        flush_interval=60.0,
+        max_queue_size=max_queue_size,
+        spill_path=str(tmp_path / "audit-spill.jsonl"),
+    )
+
+
+def test_log_action_is_queued_and_flushed_as_one_multi_row_insert(tmp_path):
+    db = _FakeDatabaseService()
+    writer = _writer(db, tmp_path)
+    service = AuditService(db, writer=writer)
+
+    async def log_many():
+        for index in range(3):
+            await service.log_action("admin-1", f"action-{index}", {"n": index})
+
+    asyncio.run(log_many())
+    assert db.updates == [], "log_action must not hit the database inline"
+
+    service.shutdown()
+
+    assert len(db.updates) == 1
+    query, params = db.updates[0]
+    assert query.count("(%s, %s, %s, %s)") == 3
+    assert params[1:3] == ("admin-1", "action-0")
+
+
+def test_failed_batch_is_spilled_and_replayed_on_next_flush(tmp_path):
+    db = _FakeDatabaseService()
+    writer = _writer(db, tmp_path)
+    db.fail = True
+    writer.enqueue((1, "admin-1", "delete_user", "{}"))
+    writer.enqueue((2, "admin-1", "ban_user", "{}"))
+
+    assert writer.flush() == 0
+    assert (tmp_path / "audit-spill.jsonl").exists()
+
+    db.fail = False
+    assert writer.flush() == 2
+    assert not (tmp_path / "audit-spill.jsonl").exists()
+    _, params = db.updates[0]
+    assert params == (1, "admin-1", "delete_user", "{}", 2, "admin-1", "ban_user", "{}")
+    writer.close()
+
+
+def test_queue_overflow_goes_to_spill_file(tmp_path):
+    db = _FakeDatabaseService()
+    writer = _writer(db, tmp_path, batch_size=1, max_queue_size=1)
+    writer._ensure_started = lambda: None  # keep the flush deterministic for the assertion below
+
+    writer.enqueue((1, "admin-1", "a", "{}"))
+    writer.enqueue((2, "admin-1", "b", "{}"))
+
+    lines = (tmp_path / "audit-spill.jsonl").read_text(encoding="utf-8").splitlines()
+    assert lines == ['[2, "admin-1", "b", "{}"]']
+    assert writer.flush() == 2
@@ -0,0 +1,100 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.background_task_service import (
+    BackgroundTaskRejected,
+    BackgroundTaskService,
+    TaskStatus,
+)
+
+
+def _service(**overrides):
+    options = dict(max_retries=0, concurrency={"context_refresh": 2}, default_concurrency=1, max_pending=100)
+    options.update(overrides)
+    return BackgroundTaskService(**options)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_limited_per_kind():
+    service = _service()
+    running = {"context_refresh": 0, "fact_extraction": 0}
+    peak = dict(running)
+
+    async def job(kind):
+        running[kind] += 1
+        peak[kind] = max(peak[kind], running[kind])
+        await asyncio.sleep(0.01)
+        running[kind] -= 1
+
+    for n in range(10):
+        service.create_background_task(f"refresh-{n}", job, "context_refresh", kind="context_refresh")
+        service.create_background_task(f"facts-{n}", job, "fact_extraction", kind="fact_extraction")
+    await service.shutdown(timeout=5)
+
+    assert peak == {"context_refresh": 2, "fact_extraction": 1}
+    assert service.get_running_tasks() == {}
+    assert all(service.get_task_status(f"facts-{n}").status is TaskStatus.SUCCESS for n in range(10))
+
+
+@pytest.mark.asyncio
+async def test_repeated_pending_jobs_are_deduplicated():
+    service = _service(concurrency={"context_refresh": 1})
+    release = asyncio.Event()
+    calls = []
+
+    async def refresh(room_id):
+        calls.append(room_id)
+        await release.wait()
+
+    first = service.create_background_task("refresh:room-1:m1", refresh, "room-1", kind="context_refresh", dedupe_key="room-1")
+    await asyncio.sleep(0)  # the first refresh is running; the next one waits for its slot
+    pending = service.create_background_task("refresh:room-1:m2", refresh, "room-1", kind="context_refresh", dedupe_key="room-1")
+    for n in range(3, 10):
+        assert service.create_background_task(
+            f"refresh:room-1:m{n}", refresh, "room-1", kind="context_refresh", dedupe_key="room-1"
+        ) is pending
+    assert pending is not first
+
+    release.set()
+    await service.shutdown(timeout=5)
+    assert calls == ["room-1", "room-1"]
+
+
+@pytest.mark.asyncio
+async def test_finished_results_expire_and_are_bounded():
+    service = _service(result_ttl_seconds=60, max_results=5)
+
+    async def job():
+        return "ok"
+
+    with patch("app.services.background_task_service.time.time", return_value=1000.0):
+        await service.create_background_task("old", job)
+    with patch("app.services.background_task_service.time.time", return_value=1100.0):
+        await service.create_background_task("new", job)
+    assert service.get_task_status("old") is None
+    assert service.get_task_status("new").result == "ok"
+
+    for n in range(20):
+        await service.create_background_task(f"job-{n}", job)
+    assert len(service.task_results) == 5
+
+
+@pytest.mark.asyncio
+async def test_shutdown_drains_then_cancels_and_rejects_new_jobs():
+    service = _service(default_concurrency=4)
+    finished = []
+
+    async def job(seconds):
+        await asyncio.sleep(seconds)
+        finished.append(seconds)
+
+    quick = service.create_background_task("quick", job, 0.01)
+    stuck = service.create_background_task("stuck", job, 60)
+    await service.shutdown(timeout=0.2)
+
+    assert finished == [0.01] and quick.done()
+    assert stuck.cancelled()
+    with pytest.raises(BackgroundTaskRejected):
+        service.create_background_task("late", job, 0)
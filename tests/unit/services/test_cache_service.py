@@ -0,0 +1,118 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services.cache_service import CACHE_INVALIDATION_CHANNEL, CacheService, LocalCache, _pack
+
+
+class FakeAsyncRedis:
+    def __init__(self):
+        self.data = {}
+        self.get_calls = 0
+        self.published = []
+
+    async def get(self, key):
+        self.get_calls += 1
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+@pytest.fixture
+def redis_client():
+    return FakeAsyncRedis()
+
+
+@pytest.fixture
+def cache(redis_client):
+    return CacheService(redis_client, local_cache=LocalCache(max_entries=16, ttl_seconds=5))
+
+
+def test_concurrent_misses_share_one_loader_call(cache):
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"rooms": [1, 2]}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_set("rooms:u1", loader) for _ in range(20)))
+
+    results = asyncio.run(run())
+
+    assert calls == 1
+    assert all(result == {"rooms": [1, 2]} for result in results)
+
+
+def test_local_tier_serves_repeat_reads_without_redis(cache, redis_client):
+    async def run():
+        await cache.set("fact_query:u1:name", ["Alice"])
+        return [await cache.get("fact_query:u1:name") for _ in range(3)]
+
+    assert asyncio.run(run()) == [["Alice"]] * 3
+    assert redis_client.get_calls == 0
+
+
+def test_redis_hit_populates_the_local_tier(cache, redis_client):
+    redis_client.data["rooms:u1"] = _pack([{"room_id": "r1"}], 0.0, time.time() + 60)
+
+    async def run():
+        return await cache.get("rooms:u1"), await cache.get("rooms:u1")
+
+    assert asyncio.run(run()) == ([{"room_id": "r1"}], [{"room_id": "r1"}])
+    assert redis_client.get_calls == 1
+
+
+def test_legacy_json_values_are_still_readable(cache, redis_client):
+    redis_client.data["weather:seoul"] = json.dumps({"temp": 21}).encode()
+
+    assert asyncio.run(cache.get("weather:seoul")) == {"temp": 21}
+
+
+def test_value_near_expiry_with_expensive_loader_is_refreshed_early(cache, redis_client):
+    # Took 10s to compute and expires in 1s: XFetch refreshes it with near certainty.
+    redis_client.data["kpi:summary"] = _pack({"reviews": 1}, 10.0, time.time() + 1)
+
+    async def loader():
+        return {"reviews": 2}
+
+    assert asyncio.run(cache.get_or_set("kpi:summary", loader, ttl=30)) == {"reviews": 2}
+
+
+def test_delete_drops_both_tiers_and_notifies_other_processes(cache, redis_client):
+    async def run():
+        await cache.set("rooms:u1", ["r1"])
+        await cache.delete("rooms:u1")
+        return await cache.get("rooms:u1")
+
+    assert asyncio.run(run()) is None
+    assert [channel for channel, _ in redis_client.published] == [CACHE_INVALIDATION_CHANNEL] * 2
+    assert redis_client.published[-1][1].endswith("|rooms:u1")
+
+
+def test_none_results_are_not_cached(cache, redis_client):
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return None
+
+    async def run():
+        await cache.get_or_set("fact_query:u1:hobby", loader)
+        await cache.get_or_set("fact_query:u1:hobby", loader)
+
+    asyncio.run(run())
+    assert calls == 2
+    assert redis_client.data == {}
@@ -5,6 +5,7 @@ from unittest.mock import MagicMock
 import pytest
 import unittest
 
+from app.services.conversation_repository import ConversationRepository
 from app.services.conversation_service import ConversationService
 from app.services.token_usage_tracker import TokenUsageTracker
 from app.models.conversation_schemas import ConversationThread, ConversationThreadCreate
@@ -29,6 +30,7 @@ def mock_repo():
     repo.create_attachment = MagicMock()
     repo.get_room_hierarchy = MagicMock()
     repo.list_message_versions = MagicMock()
+    repo.create_message_version = MagicMock()
     return repo
 
 @pytest.fixture
@@ -78,24 +80,19 @@ def test_increment_token_usage(conversation_service, mock_redis_client):
 
 def test_create_new_message_version(conversation_service, mock_repo):
     """
-    Test that creating a new version of a message correctly sets the parentId.
+    Test that a new version is created by the repository in one statement, linked to the original.
     """
-    original_message = {
-        "id": "msg_orig", "thread_id": "thr_1", "role": "user", "content": "Original", "meta": {}
+    mock_repo.create_message_version.return_value = {
+        "id": "msg_new", "thread_id": "thr_1", "role": "user", "content": "New content", "meta": {"parentId": "msg_orig"}
     }
-    # Mock the get_message_by_id call
-    conversation_service.get_message_by_id = MagicMock(return_value=original_message)
-    # Mock the create_message call to just return its input
-    conversation_service.create_message = MagicMock(side_effect=lambda **kwargs: kwargs)
 
     new_message = conversation_service.create_new_message_version("msg_orig", "New content")
 
-    conversation_service.get_message_by_id.assert_called_once_with("msg_orig")
+    mock_repo.create_message_version.assert_called_once_with("msg_orig", "New content")
+    assert new_message["meta"]["parentId"] == "msg_orig"
 
-    # Check that create_message was called with the correct parameters
-    args, kwargs = conversation_service.create_message.call_args
-    assert kwargs["content"] == "New content"
-    assert kwargs["meta"]["parentId"] == "msg_orig"
+    mock_repo.create_message_version.return_value = None
+    assert conversation_service.create_new_message_version("msg_assistant", "New content") is None
 
 def test_create_message(conversation_service, mock_repo):
     """
@@ -132,3 +129,23 @@ def test_create_message(conversation_service, mock_repo):
     )
     assert result["thread_id"] == "thr_123"
     assert result["meta"]["model"] == "gpt-4o"
+
+
+def test_list_message_versions_fetches_chain_in_one_query():
+    db = MagicMock()
+    db.execute_query.return_value = [
+        {"id": f"msg_{index}", "thread_id": "thr_1", "user_id": "u1", "role": "user", "content": f"v{index}",
+         "model": None, "status": "complete", "created_at": 1700000000 + index,
+         "meta": {"parentId": f"msg_{index - 1}"} if index else {}, "depth": index - 50}
+        for index in range(100)
+    ]
+    repo = ConversationRepository(db=db)
+
+    versions = repo.list_message_versions("msg_50")
+
+    db.execute_query.assert_called_once()
+    sql, params = db.execute_query.call_args.args
+    assert "WITH RECURSIVE" in sql and "meta->>'parentId'" in sql
+    assert params == ("msg_50", 200, "msg_50", 200)
+    assert [version["content"] for version in versions] == [f"v{index}" for index in range(100)]
+
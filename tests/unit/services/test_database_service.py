@@ -0,0 +1,168 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.pool import PoolError
+
+from app.services.database_service import BlockingConnectionPool
+
+
+def _idle_connection(*_args, **_kwargs):
+    conn = MagicMock(closed=False)
+    conn.info.transaction_status = TRANSACTION_STATUS_IDLE
+    return conn
+
+
+@pytest.fixture
+def fake_connect():
+    with patch("psycopg2.pool.psycopg2.connect", side_effect=_idle_connection) as connect:
+        yield connect
+
+
+def test_getconn_times_out_when_pool_is_exhausted(fake_connect):
+    pool = BlockingConnectionPool(0, 1, dsn="postgresql://test", timeout=0.05)
+    pool.getconn()
+
+    with pytest.raises(PoolError):
+        pool.getconn()
+
+
+def test_waiting_caller_gets_the_connection_once_it_is_returned(fake_connect):
+    pool = BlockingConnectionPool(1, 1, dsn="postgresql://test", timeout=2)
+    first = pool.getconn()
+    acquired = []
+
+    waiter = threading.Thread(target=lambda: acquired.append(pool.getconn()))
+    waiter.start()
+    time.sleep(0.05)
+    assert acquired == []
+
+    pool.putconn(first)
+    waiter.join(1)
+    assert acquired == [first]
+    assert fake_connect.call_count == 1
+
+
+def test_failed_connect_releases_its_slot(fake_connect):
+    pool = BlockingConnectionPool(0, 1, dsn="postgresql://test", timeout=0.05)
+    fake_connect.side_effect = RuntimeError("connection refused")
+    with pytest.raises(RuntimeError):
+        pool.getconn()
+
+    fake_connect.side_effect = _idle_connection
+    assert pool.getconn() is not None
+
+
+def test_pool_size_is_capped_by_the_process_share_of_the_budget():
+    from app.services.database_service import budgeted_pool_size
+
+    with patch("app.services.database_service.settings") as settings:
+        settings.DB_CONNECTION_BUDGET = 240
+        settings.DB_POOL_PROCESS_COUNT = 14
+        assert budgeted_pool_size(50) == 17
+        assert budgeted_pool_size(5) == 5
+
+        settings.DB_CONNECTION_BUDGET = 0
+        assert budgeted_pool_size(50) == 50
+
+
+def test_vector_type_is_registered_once_per_process(monkeypatch):
+    from app.services.database_service import DatabaseService
+
+    monkeypatch.setenv("DATABASE_URL", "postgresql://test@localhost/test")
+    service = DatabaseService(secret_provider=MagicMock())
+    service.pool = MagicMock()
+    conn = service.pool.getconn.return_value
+
+    with patch("app.services.database_service.register_vector") as register:
+        for _ in range(3):
+            with service.get_connection():
+                pass
+
+    register.assert_called_once_with(conn)
+    conn.rollback.assert_called_once()
+    assert service.pool.putconn.call_count == 3
+
+
+class _FakeCopyCursor:
+    """Replays keyset batches of a room with ``total`` messages, ``batch`` rows at a time."""
+
+    def __init__(self, total, batch):
+        self.total, self.batch, self.remaining = total, batch, total
+        self.statements = []
+        self.rowcount = 0
+        self._row = None
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        if sql.startswith("SELECT count(*)"):
+            self._row = (self.total,)
+        elif "WITH batch AS" in sql:
+            count = min(self.batch, self.remaining)
+            self.remaining -= count
+            position = self.total - self.remaining
+            self._row = (count, position, f"msg-{position}") if count else None
+
+    def fetchone(self):
+        return self._row
+
+
+def _service_with_cursor(cursor):
+    from contextlib import contextmanager
+
+    from app.services.database_service import DatabaseService
+
+    service = DatabaseService.__new__(DatabaseService)
+
+    @contextmanager
+    def transaction(query_type="unknown"):
+        yield cursor
+
+    service.transaction = transaction
+    return service
+
+
+def test_copy_room_messages_runs_keyset_batches_inside_postgres():
+    cursor = _FakeCopyCursor(total=12_500, batch=5_000)
+    service = _service_with_cursor(cursor)
+    progress = []
+
+    copied = service.copy_room_messages("src", "dst", batch_size=5_000, progress=lambda done, total: progress.append((done, total)))
+
+    assert copied == 12_500
+    assert progress == [(5_000, 12_500), (10_000, 12_500), (12_500, 12_500)]
+    batches = [params for sql, params in cursor.statements if "WITH batch AS" in sql]
+    # Each batch resumes after the last (timestamp, message_id) of the previous one.
+    assert [params[1:3] for params in batches] == [(-(2 ** 63), ""), (5_000, "msg-5000"), (10_000, "msg-10000")]
+    assert all("pgp_sym" not in sql for sql, _ in cursor.statements)
+    sql, params = cursor.statements[-1]
+    assert sql.startswith("UPDATE rooms SET message_count = message_count + %s")
+    assert params[0] == 12_500 and params[2] == "dst" and params[-1] == "dst"
+
+
+def test_copied_room_becomes_due_for_archival():
+    cursor = _FakeCopyCursor(total=0, batch=0)
+    cursor.rowcount = 2
+    service = _service_with_cursor(cursor)
+
+    with patch("app.services.database_service.settings.MEMORY_ARCHIVE_AFTER_DAYS", 14):
+        service.copy_messages_to_room("src", ["m0", "m1"], "dst")
+
+    sql, params = cursor.statements[-1]
+    # Due once the oldest copied message leaves the window, unless the room is already due earlier.
+    assert "archive_due_at = COALESCE(archive_due_at, (SELECT MIN(timestamp) FROM messages WHERE room_id = %s) + %s)" in sql
+    assert params[2:] == ("dst", 14 * 86400, "dst")
+
+
+def test_copy_messages_to_room_sends_only_ids():
+    cursor = _FakeCopyCursor(total=0, batch=0)
+    cursor.rowcount = 2
+    service = _service_with_cursor(cursor)
+
+    assert service.copy_messages_to_room("src", ["m0", "m1"], "dst") == 2
+
+    sql, params = cursor.statements[0]
+    assert "INSERT INTO messages" in sql and "WHERE room_id = %s AND message_id = ANY(%s)" in sql
+    assert params == ("dst", "src", ["m0", "m1"])
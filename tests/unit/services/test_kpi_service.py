@@ -6,6 +6,13 @@ from typing import Any, Dict, List, Tuple
 
 import pytest
 
+from app.repositories.kpi_rollup_repository import (
+    HOUR,
+    LATENCY_BUCKETS_MS,
+    estimate_percentile,
+    merge_histograms,
+    one_hot_histogram,
+)
 from app.services.kpi_service import KPIService
 
 
@@ -57,3 +64,67 @@ async def test_get_historical_kpis_pivots_results() -> None:
     assert data["weekly"]["dates"] == ["2024-01-02"]
     assert data["weekly"]["values"] == [99.9]
 
+
+
+class _FakeRollups:
+    def __init__(self, rows: List[Dict[str, Any]], distinct_users: int = 0) -> None:
+        self.rows = rows
+        self.distinct_users = distinct_users
+
+    def fetch_buckets(self, granularity: str, start_ts: int, end_ts: int) -> List[Dict[str, Any]]:
+        return self.rows
+
+    def count_distinct_users(self, granularity: str, start_ts: int, end_ts: int) -> int:
+        return self.distinct_users
+
+
+def test_estimate_percentile_interpolates_within_bucket() -> None:
+    bounds = LATENCY_BUCKETS_MS
+    histogram = merge_histograms([one_hot_histogram(300, bounds), one_hot_histogram(800, bounds)], bounds)
+
+    assert histogram[0] == 1 and histogram[1] == 1
+    assert estimate_percentile(histogram, bounds, 0.5) == pytest.approx(500.0)
+    assert estimate_percentile(histogram, bounds, 1.0) == pytest.approx(1000.0)
+    assert estimate_percentile([0] * (len(bounds) + 1), bounds, 0.95) == 0.0
+
+
+def test_summarize_window_folds_buckets() -> None:
+    latency = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    latency[1] = 4
+    rows = [
+        {"reviews_count": 2, "review_duration_sum": 3.0, "review_cost_sum": 0.2, "tokens_total": 100,
+         "cost_usd": 0.5, "active_users": 3, "latency_histogram": latency},
+        {"reviews_count": 2, "reviews_failed": 1, "review_duration_sum": 1.0, "review_cost_sum": 0.2,
+         "tokens_total": 50, "cost_usd": 0.25, "active_users": 2, "latency_histogram": latency},
+    ]
+    service = KPIService(_FakeDatabaseService(), rollups=_FakeRollups(rows))
+
+    summary = service.summarize_window(HOUR, 0, 7200)
+
+    assert summary["reviews_count"] == 4
+    assert summary["reviews_failed"] == 1
+    assert summary["review_success_rate"] == pytest.approx(0.8)
+    assert summary["avg_review_duration_seconds"] == pytest.approx(1.0)
+    assert summary["avg_review_cost"] == pytest.approx(0.1)
+    assert summary["tokens_total"] == 150
+    assert summary["cost_usd"] == pytest.approx(0.75)
+    assert 500.0 < summary["review_latency_p95_ms"] <= 1000.0
+    assert summary["active_users"] is None
+
+
+@pytest.mark.asyncio
+async def test_daily_snapshot_writes_all_kpis_in_one_upsert() -> None:
+    fake_db = _FakeDatabaseService()
+    rows = [{"reviews_count": 5, "review_cost_sum": 1.0, "tokens_total": 900, "cost_usd": 2.5, "active_users": 7}]
+    service = KPIService(fake_db, rollups=_FakeRollups(rows, distinct_users=11))
+
+    await service.calculate_and_store_daily_snapshot(date(2024, 1, 2))
+
+    assert len(fake_db.updates) == 1
+    _, params = fake_db.updates[0]
+    values = {params[i + 1]: params[i + 2] for i in range(0, len(params), 3)}
+    assert values["daily_active_users"] == 7
+    assert values["weekly_active_users"] == 11
+    assert values["new_reviews_created"] == 5
+    assert values["avg_review_cost"] == pytest.approx(0.2)
+    assert values["total_token_cost"] == pytest.approx(2.5)
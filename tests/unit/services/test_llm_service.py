@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
-from app.services.llm_service import LLMService, OpenAIProvider, ClaudeProvider, GeminiProvider
+from app.services.llm_service import LLMService, MockLLMProvider, OpenAIProvider, ClaudeProvider, GeminiProvider
 from app.core.errors import LLMError, LLMErrorCode
 from app.core.secrets import SecretProvider
 
@@ -200,3 +200,30 @@ class TestGeminiProvider:
         
         assert result[0] == "test response"
         assert result[1]["total_tokens"] == 0
+
+
+class TestMockLLMProvider:
+    def test_samplers_set_failures_and_completion_tokens(self):
+        failures = iter([True, False])
+        provider = MockLLMProvider(failure=lambda: next(failures), completion_tokens=lambda: 321)
+
+        with pytest.raises(LLMError) as exc_info:
+            provider.invoke_sync("gpt", "system", "user", "req-1")
+        content, metrics = provider.invoke_sync("gpt", "system", "user", "req-1")
+
+        assert exc_info.value.error_code == LLMErrorCode.RATE_LIMIT
+        assert exc_info.value.retryable
+        assert content.startswith("[mock-response]")
+        assert metrics["completion_tokens"] == 321
+        assert metrics["total_tokens"] == metrics["prompt_tokens"] + 321
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_partway_through(self):
+        provider = MockLLMProvider(latency=lambda: 0.0, failure=lambda: True)
+        chunks = []
+
+        with pytest.raises(LLMError):
+            async for chunk in provider.stream_invoke("gpt", "system", "user " * 40, "req-2"):
+                chunks.append(chunk)
+
+        assert chunks
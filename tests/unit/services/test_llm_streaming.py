@@ -0,0 +1,212 @@
+"""Streaming tests for the Claude and Gemini providers against local mock streams."""
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from anthropic import AsyncAnthropic
+
+from app.core.secrets import SecretProvider
+from app.services import llm_adapters
+from app.services.llm_service import ClaudeProvider, GeminiProvider
+from app.services.llm_streaming import CancellationWatcher, gemini_usage_from_chunk
+
+CHUNK_DELAY = 0.05
+CHUNKS = ["Hel", "lo ", "wor", "ld", "!"]
+
+
+def _anthropic_events():
+    yield "message_start", {
+        "type": "message_start",
+        "message": {
+            "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-3-haiku-20240307",
+            "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 12, "output_tokens": 1},
+        },
+    }
+    yield "content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+    for text in CHUNKS:
+        yield "content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text}}
+    yield "content_block_stop", {"type": "content_block_stop", "index": 0}
+    yield "message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 5}}
+    yield "message_stop", {"type": "message_stop"}
+
+
+@pytest_asyncio.fixture
+async def anthropic_server():
+    """Local Messages API that streams one event every ``CHUNK_DELAY`` seconds."""
+    state = {"events_sent": 0, "disconnected": False}
+
+    async def messages(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            for event, data in _anthropic_events():
+                await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                state["events_sent"] += 1
+                await asyncio.sleep(CHUNK_DELAY)
+        except (ConnectionResetError, asyncio.CancelledError):
+            state["disconnected"] = True
+            raise
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/messages", messages)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    client = AsyncAnthropic(api_key="test-key", base_url=f"http://127.0.0.1:{port}", max_retries=0)
+    yield client, state
+    await client.close()
+    await runner.cleanup()
+
+
+def _secret_provider():
+    provider = Mock(spec=SecretProvider)
+    provider.get.return_value = "test-api-key"
+    return provider
+
+
+class _FakeGeminiResponse:
+    """Async-iterable stand-in for a streamed Gemini response with simulated chunk timing."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            await asyncio.sleep(CHUNK_DELAY)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+def _gemini_chunks():
+    chunks = [SimpleNamespace(text=text, candidates=[], usage_metadata=None) for text in CHUNKS]
+    chunks[-1].usage_metadata = SimpleNamespace(prompt_token_count=9, candidates_token_count=5, total_token_count=14)
+    return chunks
+
+
+async def _collect_timed(stream):
+    started = time.perf_counter()
+    first_at = None
+    pieces = []
+    async for piece in stream:
+        if first_at is None:
+            first_at = time.perf_counter() - started
+        pieces.append(piece)
+    return pieces, first_at, time.perf_counter() - started
+
+
+@pytest.mark.asyncio
+async def test_claude_stream_invoke_yields_incrementally(anthropic_server):
+    client, _ = anthropic_server
+    provider = ClaudeProvider(_secret_provider())
+    provider.async_client = client
+
+    usage = {}
+    with patch("app.services.llm_service.logger") as mock_logger:
+        pieces, first_at, total = await _collect_timed(
+            provider.stream_invoke("claude-3-haiku-20240307", "system", "user", "req-1", usage=usage)
+        )
+
+    assert "".join(pieces) == "Hello world!"
+    assert len(pieces) == len(CHUNKS)
+    # The first token arrives well before the full response has been generated.
+    assert first_at < total / 2
+    extra = mock_logger.info.call_args.kwargs["extra"]
+    assert extra["tokens_used"] == 17
+    assert usage == {"prompt_tokens": 12, "completion_tokens": 5, "total_tokens": 17}
+
+
+@pytest.mark.asyncio
+async def test_claude_stream_invoke_closes_upstream_on_early_exit(anthropic_server):
+    client, state = anthropic_server
+    provider = ClaudeProvider(_secret_provider())
+    provider.async_client = client
+
+    stream = provider.stream_invoke("claude-3-haiku-20240307", "system", "user", "req-2")
+    assert await stream.__anext__() == "Hel"
+    await stream.aclose()
+    await asyncio.sleep(CHUNK_DELAY * 3)
+
+    assert state["disconnected"] is True
+    assert state["events_sent"] < len(list(_anthropic_events()))
+
+
+@pytest.mark.asyncio
+async def test_anthropic_adapter_streams_usage_and_honours_cancellation(anthropic_server):
+    client, state = anthropic_server
+    adapter = llm_adapters.AnthropicAdapter()
+    messages = [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "Hi"}]
+
+    with patch.object(llm_adapters, "anthropic_client", client), \
+            patch.object(adapter, "_ensure_redis_client", return_value=None):
+        events = [event async for event in adapter.generate_stream("m1", messages, "claude-3-haiku-20240307", 0.2, 64)]
+
+    deltas = [event.data.content for event in events if event.event == "delta"]
+    usage = next(event.data for event in events if event.event == "usage")
+    assert "".join(deltas) == "Hello world!"
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.total_tokens) == (12, 5, 17)
+    assert usage.cost_usd > 0
+    assert events[-1].event == "done"
+
+    redis_client = Mock()
+    redis_client.exists.side_effect = [False, True]
+    with patch.object(llm_adapters, "anthropic_client", client), \
+            patch.object(adapter, "_ensure_redis_client", return_value=redis_client):
+        events = [event async for event in adapter.generate_stream("m2", messages, "claude-3-haiku-20240307", 0.2, 64)]
+
+    assert [event.event for event in events][-1] == "done"
+    assert not any(event.event == "error" for event in events)
+    redis_client.delete.assert_called_once_with("cancel:stream:m2")
+    await asyncio.sleep(CHUNK_DELAY * 3)
+    assert state["disconnected"] is True
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_invoke_yields_incrementally_with_usage():
+    with patch("app.services.llm_service.genai"):
+        provider = GeminiProvider(_secret_provider())
+    response = _FakeGeminiResponse(_gemini_chunks())
+
+    async def generate_content_async(prompt, stream=False):
+        assert stream is True
+        return response
+
+    provider._model_cache["gemini-pro"] = SimpleNamespace(generate_content_async=generate_content_async)
+
+    usage = {}
+    with patch("app.services.llm_service.logger") as mock_logger:
+        pieces, first_at, total = await _collect_timed(
+            provider.stream_invoke("gemini-pro", "system", "user", "req-3", usage=usage)
+        )
+
+    assert pieces == CHUNKS
+    assert first_at < total / 2
+    assert mock_logger.info.call_args.kwargs["extra"]["tokens_used"] == 14
+    assert usage == {"prompt_tokens": 9, "completion_tokens": 5, "total_tokens": 14}
+    assert response.closed is True
+
+
+def test_gemini_usage_falls_back_to_candidate_token_count():
+    chunk = SimpleNamespace(candidates=[SimpleNamespace(token_count=7)])
+    assert gemini_usage_from_chunk(chunk) == {"prompt_tokens": 0, "completion_tokens": 7, "total_tokens": 7}
+    assert gemini_usage_from_chunk(SimpleNamespace(candidates=[])) is None
+
+
+def test_cancellation_watcher_throttles_redis_checks():
+    redis_client = Mock()
+    redis_client.exists.return_value = False
+    watcher = CancellationWatcher(redis_client, "m3", interval=60)
+
+    assert not any(watcher.cancelled() for _ in range(100))
+    assert redis_client.exists.call_count == 1
@@ -0,0 +1,66 @@
+from unittest.mock import patch
+
+from app.services.prompt_budget import ELLIPSIS, PromptBudget, PromptSection
+from app.utils.tokens import count_tokens, split_by_tokens
+
+TEMPLATE = "Instruction: {instruction}\nYou: {own}\nOthers: {others}"
+
+
+def _render(**fields):
+    return TEMPLATE.format(**fields)
+
+
+def _sections(instruction="Decide by Friday.", others_variants=None):
+    return [
+        PromptSection("instruction", [instruction], priority=3, max_share=0.5),
+        PromptSection("own", ["my full history " * 20, "my summary"], priority=2),
+        PromptSection("others", others_variants or ["their full digest " * 40, "their headlines " * 5], priority=1),
+    ]
+
+
+def test_prompts_within_budget_are_unchanged():
+    budgeted = PromptBudget(10_000).assemble(_render, _sections())
+
+    assert budgeted.compressed == []
+    assert budgeted.prompt == _render(
+        instruction="Decide by Friday.", own="my full history " * 20, others="their full digest " * 40
+    )
+    assert budgeted.tokens == count_tokens(budgeted.prompt)
+
+
+def test_lowest_priority_section_is_compressed_first():
+    full = PromptBudget(10_000).assemble(_render, _sections())
+    # Room for everything except the competitor digest at full detail.
+    budget = full.tokens - full.section_tokens["others"] + full.section_tokens["others"] // 2
+
+    budgeted = PromptBudget(budget).assemble(_render, _sections())
+
+    assert budgeted.compressed == ["others"]
+    assert "their headlines" in budgeted.prompt
+    assert "my full history" in budgeted.prompt
+    assert budgeted.tokens <= budget
+
+
+def test_sections_are_cut_when_no_shorter_rendering_fits():
+    budget = count_tokens(_render(instruction="", own="", others="")) + 40
+    long_instruction = "Please weigh every department's constraints carefully. " * 30
+
+    budgeted = PromptBudget(budget).assemble(_render, _sections(instruction=long_instruction))
+
+    assert set(budgeted.compressed) == {"instruction", "own", "others"}
+    # The instruction is capped at its share and is the last section to give up tokens.
+    assert budgeted.section_tokens["instruction"] <= 20
+    assert budgeted.prompt.startswith("Instruction: Please weigh")
+    assert ELLIPSIS in budgeted.prompt
+    assert budgeted.tokens <= budget + 2  # section counts are summed separately from the rendered prompt
+
+
+def test_sections_are_cut_with_the_models_tokenizer():
+    budget = count_tokens(_render(instruction="", own="", others=""), "gpt-4o") + 40
+    long_instruction = "Please weigh every department's constraints carefully. " * 30
+
+    with patch("app.services.prompt_budget.split_by_tokens", wraps=split_by_tokens) as split:
+        PromptBudget(budget, model="gpt-4o").assemble(_render, _sections(instruction=long_instruction))
+
+    assert split.call_args_list
+    assert all(call.args[2] == "gpt-4o" for call in split.call_args_list)
@@ -0,0 +1,65 @@
+"""Unit tests for the cached provider configuration snapshot."""
+
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services import provider_config_service as module
+from app.services.llm_strategy import LLMStrategyService
+from app.services.provider_config_service import ProviderConfigService
+
+
+class _FakeDatabaseService:
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self.rows = rows
+        self.queries = 0
+
+    def execute_query(self, query, params=None):
+        self.queries += 1
+        return self.rows
+
+
+@pytest.fixture(autouse=True)
+def _no_redis(monkeypatch):
+    monkeypatch.setattr(module, "get_effective_redis_url", lambda: None)
+
+
+def _rows(enabled: bool = True, model: str = "claude-3-5-sonnet") -> List[Dict[str, Any]]:
+    return [
+        {"provider_name": "claude", "model": model, "timeout_ms": 12500, "retries": 1, "enabled": enabled},
+        {"provider_name": "gemini", "model": "gemini-1.5-flash", "timeout_ms": 45000, "retries": 2, "enabled": False},
+    ]
+
+
+def test_snapshot_is_cached_until_invalidated():
+    db = _FakeDatabaseService(_rows())
+    service = ProviderConfigService(db, max_age_seconds=3600)
+
+    first = service.snapshot()
+    assert service.snapshot() is first
+    assert db.queries == 1
+    assert first.get("claude").timeout_s == 13
+    assert not first.is_enabled("gemini")
+    assert first.is_enabled("openai"), "providers without a row stay enabled"
+
+    db.rows = _rows(model="claude-3-opus")
+    service.publish_update()
+
+    # The stale snapshot keeps being served while the reload runs in the background.
+    assert service.snapshot() is first
+    service._refresher.join(timeout=5)
+    assert service.snapshot().get("claude").model == "claude-3-opus"
+    assert db.queries == 2
+
+
+def test_strategy_applies_runtime_overrides():
+    service = ProviderConfigService(_FakeDatabaseService(_rows()), max_age_seconds=3600)
+    strategy = LLMStrategyService(provider_configs=service)
+
+    panelists = {p.provider: p for p in strategy.get_default_panelists()}
+
+    assert "gemini" not in panelists
+    assert panelists["claude"].model == "claude-3-5-sonnet"
+    assert panelists["claude"].timeout_s == 13
+    assert panelists["claude"].max_retries == 1
+    assert panelists["openai"].model == "gpt-4o-mini"
@@ -0,0 +1,293 @@
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.core.errors import LLMError, LLMErrorCode
+from app.core.secrets import SecretProvider
+from app.services.llm_service import LLMService, MockLLMProvider
+from app.services.provider_config_service import ProviderRuntimeConfig
+from app.services.provider_router import LatencyRouter
+
+
+def _router(**kwargs):
+    kwargs.setdefault("min_samples", 3)
+    return LatencyRouter(use_redis=False, **kwargs)
+
+
+def _record_many(router, provider, model, latencies, ok=True):
+    for latency in latencies:
+        router.record(provider, model, latency, ok)
+
+
+def test_health_reports_percentiles_and_error_rate():
+    router = _router()
+    _record_many(router, "openai", "gpt", [0.1 * i for i in range(1, 21)])
+    _record_many(router, "openai", "gpt", [5.0] * 5, ok=False)
+
+    health = router.health("openai", "gpt")
+
+    assert health.samples == 25
+    assert health.p50 == pytest.approx(1.0)
+    assert health.p95 == pytest.approx(1.9)
+    assert health.error_rate == pytest.approx(0.2)
+
+
+def test_rank_prefers_fastest_healthy_then_unknown_then_failing():
+    router = _router(max_error_rate=0.5)
+    _record_many(router, "openai", "gpt", [1.2, 1.0, 1.1])
+    _record_many(router, "claude", "haiku", [0.4, 0.5, 0.6])
+    _record_many(router, "gemini", "pro", [0.1, 0.1, 0.1], ok=False)
+
+    ranked = router.rank([("gemini", "pro"), ("openai", "gpt"), ("mock", "m"), ("claude", "haiku")])
+
+    assert ranked == [("claude", "haiku"), ("openai", "gpt"), ("mock", "m"), ("gemini", "pro")]
+
+
+def test_hedge_delay_uses_p95_once_measured():
+    router = _router()
+    with patch("app.services.provider_router.settings") as settings:
+        settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS = 2.0
+        settings.LLM_HEDGE_MIN_DELAY_SECONDS = 0.05
+        assert router.hedge_delay("openai", "gpt") == 2.0
+        _record_many(router, "openai", "gpt", [0.2, 0.3, 0.4])
+        assert router.hedge_delay("openai", "gpt") == pytest.approx(0.4)
+
+
+@pytest.mark.asyncio
+async def test_hedged_starts_duplicate_after_p95_and_cancels_loser():
+    router = _router()
+    _record_many(router, "slow", "m", [0.05, 0.05, 0.05])
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "slow"
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "fast"
+
+    with patch("app.services.provider_router.settings") as settings:
+        settings.LLM_HEDGE_MIN_DELAY_SECONDS = 0.01
+        result = await asyncio.wait_for(router.hedged([(("slow", "m"), slow), (("fast", "m"), fast)]), 1)
+
+    assert result == "fast"
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_hedged_keeps_primary_when_it_answers_within_budget():
+    router = _router()
+    _record_many(router, "primary", "m", [0.5, 0.5, 0.5])
+    hedge = Mock()
+
+    async def primary():
+        await asyncio.sleep(0.01)
+        return "primary"
+
+    result = await router.hedged([(("primary", "m"), primary), (("backup", "m"), hedge)])
+
+    assert result == "primary"
+    hedge.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_hedged_fails_over_immediately_and_raises_when_all_fail():
+    router = _router()
+
+    async def broken():
+        raise LLMError(error_code=LLMErrorCode.API_ERROR, provider="a", retryable=True, error_message="boom")
+
+    async def backup():
+        return "backup"
+
+    result = await asyncio.wait_for(router.hedged([(("a", "m"), broken), (("b", "m"), backup)]), 0.5)
+    assert result == "backup"
+
+    with pytest.raises(LLMError):
+        await router.hedged([(("a", "m"), broken), (("b", "m"), broken)])
+
+
+@pytest.mark.asyncio
+async def test_llm_service_routes_and_hedges_interactive_calls():
+    router = _router()
+    secrets = Mock(spec=SecretProvider)
+    secrets.get.return_value = None
+    service = LLMService(secrets)
+    service._initialized = True
+    service.providers = {
+        "openai": MockLLMProvider(latency=lambda: 2.0),
+        "claude": MockLLMProvider(latency=lambda: 0.02),
+    }
+    _record_many(router, "openai", service._default_model("openai"), [0.05] * 3)
+    _record_many(router, "claude", service._default_model("claude"), [0.3] * 3)
+
+    with patch("app.services.llm_service.get_latency_router", return_value=router), \
+            patch.object(service, "_runtime_config", return_value=None):
+        provider, model, _ = service.select_model_for_task(task="summary", interactive=True)
+        assert provider == "openai"
+        content, _ = await asyncio.wait_for(
+            service.invoke_hedged(provider, model, "system", "user", "req-1"), 1
+        )
+
+    assert content
+    # The hedge to claude won and its latency was recorded; the cancelled openai call was not.
+    assert router.health("claude", service._default_model("claude")).samples == 4
+    assert router.health("openai", model).samples == 3
+
+
+class _FlakyStreamProvider:
+    """Streams ``chunks``; the first ``failures`` streams fail before any output."""
+
+    def __init__(self, chunks, failures=0, stall=0.0):
+        self.chunks = chunks
+        self.failures = failures
+        self.stall = stall
+        self.opened = 0
+
+    async def stream_invoke(self, model, system_prompt, user_prompt, request_id, response_format="text", usage=None):
+        self.opened += 1
+        if self.opened <= self.failures:
+            raise LLMError(error_code=LLMErrorCode.RATE_LIMIT, provider="openai", retryable=True, error_message="busy")
+        for chunk in self.chunks:
+            await asyncio.sleep(self.stall)
+            yield chunk
+
+
+def _streaming_service(provider):
+    secrets = Mock(spec=SecretProvider)
+    secrets.get.return_value = None
+    service = LLMService(secrets)
+    service._initialized = True
+    service.providers = {"openai": provider}
+    return service
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
+
+
+@pytest.mark.asyncio
+async def test_stream_invoke_retries_before_first_chunk_and_records_outcomes():
+    router = _router()
+    provider = _FlakyStreamProvider(["a", "b"], failures=1)
+    service = _streaming_service(provider)
+    runtime = ProviderRuntimeConfig(provider_name="openai", model="m", timeout_ms=1000, retries=2)
+
+    with patch("app.services.llm_service.get_latency_router", return_value=router), \
+            patch.object(service, "_runtime_config", return_value=runtime), \
+            patch("app.services.retry_policy.get_retry_delay", return_value=0):
+        chunks = await _collect(service.stream_invoke("openai", "m", "system", "user", "req-1"))
+
+    assert chunks == ["a", "b"]
+    assert provider.opened == 2
+    health = router.health("openai", "m")
+    assert health.samples == 2 and health.error_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_stream_invoke_times_out_a_stalled_stream():
+    router = _router()
+    service = _streaming_service(_FlakyStreamProvider(["a"], stall=1.0))
+    runtime = ProviderRuntimeConfig(provider_name="openai", model="m", timeout_ms=20, retries=0)
+
+    with patch("app.services.llm_service.get_latency_router", return_value=router), \
+            patch.object(service, "_runtime_config", return_value=runtime):
+        with pytest.raises(LLMError) as exc_info:
+            await _collect(service.stream_invoke("openai", "m", "system", "user", "req-2"))
+
+    assert exc_info.value.error_code == LLMErrorCode.TIMEOUT
+    assert router.health("openai", "m").error_rate == 1.0
+
+
+@pytest.mark.asyncio
+async def test_stream_invoke_passes_provider_usage_to_the_caller():
+    service = _streaming_service(MockLLMProvider())
+    usage = {}
+
+    with patch("app.services.llm_service.get_latency_router", return_value=_router()), \
+            patch.object(service, "_runtime_config", return_value=None):
+        chunks = await _collect(service.stream_invoke("openai", "m", "system", "one two three", "req-5", usage=usage))
+
+    assert chunks
+    assert usage["prompt_tokens"] == 3 and usage["total_tokens"] > 3
+
+
+def test_invoke_sync_enforces_the_runtime_timeout():
+    service = _streaming_service(MockLLMProvider(latency=lambda: 1.0))
+    runtime = ProviderRuntimeConfig(provider_name="openai", model="m", timeout_ms=20, retries=0)
+
+    with patch.object(service, "_runtime_config", return_value=runtime):
+        started = time.perf_counter()
+        with pytest.raises(LLMError) as exc_info:
+            service.invoke_sync("openai", "m", "system", "user", "req-3")
+
+    assert exc_info.value.error_code == LLMErrorCode.TIMEOUT
+    assert exc_info.value.retryable
+    assert time.perf_counter() - started < 0.5
+
+
+def test_invoke_sync_returns_calls_within_the_runtime_timeout():
+    service = _streaming_service(MockLLMProvider(latency=lambda: 0.0))
+    runtime = ProviderRuntimeConfig(provider_name="openai", model="m", timeout_ms=1000, retries=0)
+
+    with patch.object(service, "_runtime_config", return_value=runtime):
+        content, metrics = service.invoke_sync("openai", "m", "system", "user", "req-4")
+
+    assert content and "total_tokens" in metrics
+
+
+class _FakeRedisLists:
+    def __init__(self, lists=None):
+        self.lists = {key: list(values) for key, values in (lists or {}).items()}
+        self.pipelines = 0
+
+    def pipeline(self, transaction=False):
+        redis_lists = self
+        commands = []
+
+        class _Pipeline:
+            def lpush(self, key, value):
+                commands.append(lambda: redis_lists.lists.setdefault(key, []).insert(0, value))
+
+            def ltrim(self, key, start, end):
+                commands.append(lambda: redis_lists.lists.__setitem__(key, redis_lists.lists.get(key, [])[start:end + 1]))
+
+            def expire(self, key, seconds):
+                commands.append(lambda: True)
+
+            def lrange(self, key, start, end):
+                commands.append(lambda: list(redis_lists.lists.get(key, [])[start:end + 1]))
+
+            def execute(self):
+                redis_lists.pipelines += 1
+                return [command() for command in commands]
+
+        return _Pipeline()
+
+
+def test_sync_shares_recorded_samples_and_fetches_candidates_only_ranked_here():
+    now = time.time()
+    shared = _FakeRedisLists({"llm_router:samples:claude:m": [f"{now:.3f}:0.2000:1"] * 3})
+    router = LatencyRouter(min_samples=3)
+
+    with patch.object(router, "_redis_client", return_value=shared), \
+            patch.object(router, "_ensure_started") as ensure_started:
+        router.record("openai", "m", 0.5, ok=True)
+        # Ranking a provider this process never called registers it for syncing.
+        assert router.rank([("openai", "m"), ("claude", "m")]) == [("openai", "m"), ("claude", "m")]
+        # Neither call touched Redis; the sync thread does, in a single pipeline.
+        assert shared.pipelines == 0
+        ensure_started.assert_called()
+        router.sync()
+
+        assert shared.pipelines == 1
+        assert len(shared.lists["llm_router:samples:openai:m"]) == 1
+        assert router.health("claude", "m").samples == 3
+        assert router.rank([("openai", "m"), ("claude", "m")])[0] == ("claude", "m")
@@ -3,7 +3,7 @@ import json
 
 import pytest
 
-from app.core.realtime import ConnectionManager
+from app.core.realtime import ConnectionManager, OutboundQueue, RealtimeConfig
 from app.services.realtime_service import RealtimeService
 
 
@@ -37,3 +37,104 @@ def test_format_event_includes_meta():
     assert parsed['payload'] == payload
     assert parsed['meta']['delivery'] == 'live'
     assert parsed['meta']['attempt'] == 3
+
+
+class FakeWebSocket:
+    def __init__(self, send_delay=0.0):
+        self.send_delay = send_delay
+        self.sent = []
+        self.closed_with = None
+        self.client = "fake"
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append(message)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def _delta(seq, text='가나다 '):
+    return RealtimeService.format_event(
+        'panelist_delta', {'round': 2, 'persona': 'GPT-4o', 'seq': seq, 'delta': text}
+    )
+
+
+def _manager(policy, queue_size=8):
+    return ConnectionManager(RealtimeConfig(
+        max_connections=0,
+        sse_queue_size=queue_size,
+        send_timeout=5.0,
+        send_retries=0,
+        retry_backoff=0.0,
+        disconnect_on_backpressure=True,
+        outbound_queue_size=queue_size,
+        overflow_policy=policy,
+    ))
+
+
+@pytest.mark.asyncio
+async def test_slow_websocket_does_not_delay_fast_ones():
+    manager = _manager('coalesce', queue_size=16)
+    fast = [FakeWebSocket() for _ in range(3)]
+    slow = FakeWebSocket(send_delay=0.5)
+    for websocket in [*fast, slow]:
+        await manager.connect(websocket, 'review_r1')
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for seq in range(1, 101):
+        await manager.broadcast(_delta(seq), 'review_r1')
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.01)
+    elapsed = loop.time() - started
+
+    # Sent one after another, the slow client alone would take 50 seconds.
+    assert elapsed < 2.0
+    for websocket in fast:
+        assert [json.loads(message)['payload']['seq'] for message in websocket.sent] == list(range(1, 101))
+    assert slow.sent == []
+    queued = list(manager._outbound[slow]._queue)
+    assert len(queued) <= 16
+    # Coalescing keeps the slow client's text complete, in fewer events.
+    first = json.loads(queued[0])['payload']
+    last = json.loads(queued[-1])['payload']
+    assert last['seq'] == 100 and 'first_seq' in last
+    assert first['seq'] in (1, 2)
+    total_text = ''.join(json.loads(message)['payload']['delta'] for message in queued)
+    assert len(total_text) >= len('가나다 ') * 98
+
+    for websocket in [*fast, slow]:
+        manager.disconnect(websocket, 'review_r1')
+    await asyncio.sleep(0.01)
+    assert manager._writers == {}
+
+
+@pytest.mark.asyncio
+async def test_overflow_policies():
+    drop = OutboundQueue(3, 'drop_oldest', 'sse')
+    drop.put_nowait(json.dumps({'type': 'new_message'}))
+    for seq in range(1, 4):
+        drop.put_nowait(_delta(seq))
+    assert [json.loads(message).get('payload', {}).get('seq') for message in drop._queue] == [None, 2, 3]
+
+    other_stream = OutboundQueue(2, 'coalesce', 'sse')
+    other_stream.put_nowait(_delta(1))
+    other_stream.put_nowait(_delta(2))
+    other_stream.put_nowait(RealtimeService.format_event(
+        'panelist_delta', {'round': 2, 'persona': 'Claude', 'seq': 3, 'delta': 'x'}
+    ))
+    assert [json.loads(message)['payload']['seq'] for message in other_stream._queue] == [2, 3]
+
+    manager = _manager('disconnect', queue_size=2)
+    slow = FakeWebSocket(send_delay=1.0)
+    await manager.connect(slow, 'room-1')
+    for seq in range(1, 5):
+        await manager.broadcast(_delta(seq), 'room-1')
+    await asyncio.sleep(0.01)
+    assert 'room-1' not in manager.active_connections
+    assert slow.closed_with == 1013
@@ -0,0 +1,104 @@
+import json
+from unittest.mock import patch
+
+from app.core.metrics import REVIEW_STREAM_FIRST_OUTPUT_SECONDS
+from app.services.review_stream import RoundStream, VisibleTextReader
+from app.tasks.review_tasks import ProviderPanelistConfig, run_streamed_panelist_turn
+
+PANELIST = ProviderPanelistConfig(provider="claude", persona="Claude 3 Haiku", model="claude-3-haiku")
+MESSAGE = "파일럿부터 시작하죠. \"통제\" 절차는\n1주차에 넣습니다. " * 8
+
+
+def _chunks(text, size):
+    return [text[start:start + size] for start in range(0, len(text), size)]
+
+
+class FakeStreamingLLM:
+    def __init__(self, content, chunk_size=7, fail_after=None, reported_usage=None):
+        self.chunks = _chunks(content, chunk_size)
+        self.fail_after = fail_after
+        self.reported_usage = reported_usage
+
+    async def stream_invoke(self, provider_name, model, system_prompt, user_prompt, request_id, response_format="text", usage=None):
+        assert response_format == "json"
+        for index, chunk in enumerate(self.chunks):
+            if index == self.fail_after:
+                raise ConnectionError("stream dropped")
+            yield chunk
+        if self.reported_usage and usage is not None:
+            usage.update(self.reported_usage)
+
+
+def _events(publish):
+    return [json.loads(call.args[1]) for call in publish.call_args_list]
+
+
+def test_visible_text_is_decoded_across_chunk_boundaries():
+    content = json.dumps({"round": 2, "panelist": "GPT-4o", "message": "a \"quoted\" line\n끝 é", "key_takeaway": "k"})
+    reader = VisibleTextReader()
+
+    decoded = "".join(reader.feed(chunk) for chunk in _chunks(content, 3))
+
+    assert decoded == "a \"quoted\" line\n끝 é"
+    assert reader.done
+
+
+@patch("app.services.review_stream.redis_pubsub_manager.publish_sync")
+def test_streamed_turn_publishes_bounded_sequenced_deltas(mock_publish):
+    content = json.dumps(
+        {"round": 2, "panelist": PANELIST.persona, "message": MESSAGE, "key_takeaway": "k"}, ensure_ascii=False
+    )
+    round_stream = RoundStream("review-1", 2)
+    observations_before = REVIEW_STREAM_FIRST_OUTPUT_SECONDS.labels(round="2")._sum.get()
+
+    with patch("app.services.review_stream.settings.REVIEW_STREAM_MAX_EVENT_CHARS", 50), \
+            patch("app.services.review_stream.settings.REVIEW_STREAM_FLUSH_SECONDS", 60):
+        config, (result, metrics) = run_streamed_panelist_turn(
+            FakeStreamingLLM(content), PANELIST, "prompt", "trace-r2", round_stream
+        )
+
+    assert config == PANELIST and result == content
+    assert metrics["usage_estimated"] and metrics["total_tokens"] > 0
+    events = _events(mock_publish)
+    assert {call.args[0] for call in mock_publish.call_args_list} == {"review_review-1"}
+    deltas = [event["payload"] for event in events if event["type"] == "panelist_delta"]
+    assert "".join(delta["delta"] for delta in deltas) == MESSAGE
+    assert all(len(delta["delta"]) <= 50 for delta in deltas)
+    assert [event["payload"]["seq"] for event in events] == list(range(1, len(events) + 1))
+    assert events[-1]["type"] == "panelist_stream_end"
+    assert events[-1]["payload"] == {"round": 2, "persona": PANELIST.persona, "seq": len(events), "status": "complete"}
+    assert round_stream.first_output_at is not None
+    assert REVIEW_STREAM_FIRST_OUTPUT_SECONDS.labels(round="2")._sum.get() > observations_before
+
+
+@patch("app.services.review_stream.redis_pubsub_manager.publish_sync")
+def test_streamed_turn_uses_usage_reported_by_the_provider(mock_publish):
+    content = json.dumps({"round": 2, "message": MESSAGE}, ensure_ascii=False)
+    reported = {"prompt_tokens": 321, "completion_tokens": 45, "total_tokens": 366}
+
+    _, (result, metrics) = run_streamed_panelist_turn(
+        FakeStreamingLLM(content, reported_usage=reported), PANELIST, "prompt", "trace-r2", RoundStream("review-3", 2)
+    )
+
+    assert result == content
+    assert metrics == reported
+
+
+@patch("app.services.review_stream.redis_pubsub_manager.publish_sync")
+def test_failed_stream_is_closed_and_the_fallback_continues_the_sequence(mock_publish):
+    content = json.dumps({"round": 3, "message": MESSAGE}, ensure_ascii=False)
+    round_stream = RoundStream("review-2", 3)
+    fallback = PANELIST.model_copy(update={"provider": "openai", "model": "gpt-4o-mini"})
+
+    with patch("app.services.review_stream.settings.REVIEW_STREAM_FLUSH_SECONDS", 0):
+        _, error = run_streamed_panelist_turn(
+            FakeStreamingLLM(content, fail_after=10), PANELIST, "prompt", "trace-r3", round_stream
+        )
+        failed_events = _events(mock_publish)
+        run_streamed_panelist_turn(FakeStreamingLLM(content), fallback, "prompt", "trace-r3-fallback", round_stream)
+
+    assert isinstance(error, ConnectionError)
+    assert failed_events[-1]["payload"]["status"] == "failed"
+    sequence = [event["payload"]["seq"] for event in _events(mock_publish)]
+    assert sequence == list(range(1, len(sequence) + 1))
+    assert _events(mock_publish)[-1]["payload"]["status"] == "complete"
@@ -0,0 +1,235 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.core.realtime import RealtimeConfig
+from app.services.sse_replay import JournalFanout, SSEJournal
+
+
+class FakeStreams:
+    """The subset of redis.asyncio stream commands the journal uses."""
+
+    def __init__(self):
+        self.streams = {}
+        self._next_id = 0
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self._next_id += 1
+        entry_id = f"{1000 + self._next_id}-0"
+        entries = self.streams.setdefault(key, [])
+        entries.append((entry_id, dict(fields)))
+        if maxlen is not None:
+            del entries[:-maxlen]
+        return entry_id
+
+    def expire(self, key, seconds):
+        return True
+
+    def pipeline(self, transaction=True):
+        streams = self
+
+        class Pipeline:
+            def __init__(self):
+                self.calls = []
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+            async def execute(self):
+                return [getattr(streams, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+        return Pipeline()
+
+    async def xrange(self, key, min="-", max="+"):
+        return [entry for entry in self.streams.get(key, []) if _key(entry[0]) >= _key(min)]
+
+    async def xrevrange(self, key, max="+", min="-", count=None):
+        return list(reversed(self.streams.get(key, [])))[:count]
+
+    async def xread(self, streams, block=None):
+        (key, after_id), = streams.items()
+        entries = [entry for entry in self.streams.get(key, []) if _key(entry[0]) > _key(after_id)]
+        if not entries:
+            await asyncio.sleep(0.01)
+            return []
+        return [(key, entries)]
+
+
+def _key(entry_id):
+    millis, _, seq = entry_id.partition("-")
+    return int(millis), int(seq or 0)
+
+
+@pytest.fixture
+def journal():
+    journal = SSEJournal(redis_url="redis://unused")
+    fake = FakeStreams()
+    journal._client = lambda: fake
+    return journal
+
+
+def _request():
+    request = Mock()
+    request.is_disconnected = AsyncMock(return_value=False)
+    return request
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_only_the_missed_events(journal):
+    ids = [await journal.append("room-1", "new_message", f"event {n}") for n in range(10)]
+
+    replay = await journal.replay("room-1", ids[5], "room")
+
+    assert [event.data for event in replay.events] == [f"event {n}" for n in range(6, 10)]
+    assert [event.id for event in replay.events] == ids[6:]
+    assert not replay.finished
+    assert (await journal.replay("room-1", ids[-1], "room")).events == []
+
+
+@pytest.mark.asyncio
+async def test_ids_trimmed_from_the_journal_are_not_resumable(journal):
+    with patch("app.services.sse_replay.settings.SSE_REPLAY_MAX_EVENTS", 5):
+        ids = [await journal.append("review_r1", "message", f"event {n}") for n in range(10)]
+
+    assert await journal.replay("review_r1", ids[2], "review") is None
+    assert await journal.replay("review_r1", "not-an-id", "review") is None
+    assert await journal.replay("review_other", ids[-1], "review") is None
+    assert (await journal.replay("review_r1", ids[5], "review")).events[0].id == ids[6]
+
+
+@pytest.mark.asyncio
+async def test_follow_sends_missed_then_live_events_until_the_final_one(journal):
+    first = await journal.append("message_stream_m1", "delta", "a")
+    await journal.append("message_stream_m1", "delta", "b")
+    replay = await journal.replay("message_stream_m1", first, "message_stream")
+
+    async def producer():
+        await asyncio.sleep(0.02)
+        await journal.append("message_stream_m1", "delta", "c")
+        await journal.append("message_stream_m1", "done", "d", final=True)
+        await journal.append("message_stream_m1", "delta", "after the end")
+
+    task = asyncio.create_task(producer())
+    with patch("app.services.sse_replay.settings.SSE_HEARTBEAT_SECONDS", 0.01):
+        received = [
+            event async for event in journal.follow(
+                _request(), "message_stream_m1", first,
+                lambda event: {"event": event.event, "data": event.data},
+                lambda: {"event": "ping", "data": ""},
+                replay=replay,
+            )
+        ]
+    await task
+
+    events = [event for event in received if event["event"] != "ping"]
+    assert [event["data"] for event in events] == ["b", "c", "d"]
+    assert all("id" in event for event in events)
+    assert (await journal.replay("message_stream_m1", events[-1]["id"], "message_stream")).finished
+
+
+def _fanout(journal, queue_size=16, policy="coalesce"):
+    config = RealtimeConfig(
+        max_connections=0,
+        sse_queue_size=queue_size,
+        send_timeout=1.0,
+        send_retries=0,
+        retry_backoff=0.0,
+        disconnect_on_backpressure=True,
+        overflow_policy=policy,
+    )
+    return JournalFanout(journal, config)
+
+
+async def _take(stream, count):
+    events = []
+    try:
+        async for event in stream:
+            if event["event"] != "ping":
+                events.append(event)
+            if len(events) == count:
+                break
+    finally:
+        await stream.aclose()
+    return events
+
+
+async def _readers_stopped(fanout):
+    await asyncio.wait_for(asyncio.gather(*fanout._readers.values()), timeout=1)
+    return fanout._readers == {}
+
+
+def _render(data):
+    return {"event": "new_message", "data": data}
+
+
+def _ping():
+    return {"event": "ping", "data": ""}
+
+
+@pytest.mark.asyncio
+async def test_fanout_shares_one_reader_between_subscribers(journal):
+    fanout = _fanout(journal)
+    with patch("app.services.sse_replay.settings.SSE_HEARTBEAT_SECONDS", 0.01):
+        first = await fanout.subscribe("room-1")
+        second = await fanout.subscribe("room-1")
+        assert len(fanout._readers) == 1
+
+        ids = [await journal.append("room-1", "new_message", f"event {n}") for n in range(3)]
+        received = await asyncio.gather(
+            _take(fanout.follow(_request(), "room-1", first, _render, _ping), 3),
+            _take(fanout.follow(_request(), "room-1", second, _render, _ping), 3),
+        )
+
+        for events in received:
+            assert [event["id"] for event in events] == ids
+            assert [event["data"] for event in events] == ["event 0", "event 1", "event 2"]
+        # Both followers have ended, so the reader stops after its current read.
+        assert await _readers_stopped(fanout)
+
+
+@pytest.mark.asyncio
+async def test_fanout_skips_events_the_client_was_already_sent(journal):
+    fanout = _fanout(journal)
+    with patch("app.services.sse_replay.settings.SSE_HEARTBEAT_SECONDS", 0.01):
+        queue = await fanout.subscribe("room-2")
+        ids = [await journal.append("room-2", "new_message", f"event {n}") for n in range(4)]
+        await asyncio.sleep(0.05)  # the reader queues all four
+        replay = await journal.replay("room-2", ids[1], "room")
+
+        async def producer():
+            await asyncio.sleep(0.02)
+            ids.append(await journal.append("room-2", "new_message", "event 4"))
+
+        task = asyncio.create_task(producer())
+        events = await _take(
+            fanout.follow(_request(), "room-2", queue, _render, _ping, replay=replay, after_id=ids[1]), 3
+        )
+        await task
+        assert await _readers_stopped(fanout)
+
+    # Replayed events first, then only the live events after them.
+    assert [event["id"] for event in events] == ids[2:]
+
+
+@pytest.mark.asyncio
+async def test_fanout_disconnects_a_subscriber_whose_queue_overflows(journal):
+    fanout = _fanout(journal, queue_size=2, policy="disconnect")
+    with patch("app.services.sse_replay.settings.SSE_HEARTBEAT_SECONDS", 0.01):
+        slow = await fanout.subscribe("room-3")
+        for n in range(3):
+            await journal.append("room-3", "new_message", f"event {n}")
+        await asyncio.sleep(0.05)
+
+        assert not fanout.is_subscribed("room-3", slow)
+        # The queued events are still sent, then the stream ends so the client reconnects and resumes.
+        events = [event async for event in fanout.follow(_request(), "room-3", slow, _render, _ping)]
+        assert await _readers_stopped(fanout)
+
+    assert [event["data"] for event in events if event["event"] != "ping"] == ["event 0", "event 1"]
@@ -171,3 +171,110 @@ class TestStorageServiceWithDB:
         mock_db_service.execute_update.assert_called_once()
         query = mock_db_service.execute_update.call_args[0][0]
         assert "INSERT INTO review_events" in query
+
+    @pytest.mark.parametrize("already_terminal", [False, True])
+    def test_fail_review_counts_each_failure_once(self, storage_service, mock_db_service, already_terminal):
+        cursor = mock_db_service.transaction.return_value.__enter__.return_value
+        cursor.rowcount = 0 if already_terminal else 1
+        cursor.fetchone.return_value = ("owner-1",)
+        storage_service._kpi_rollups = MagicMock()
+
+        storage_service.fail_review("review-db", {"error": "boom"})
+
+        update_query = cursor.execute.call_args_list[0].args[0]
+        assert "status = 'failed'" in update_query and "completed_at IS NULL" in update_query
+        if already_terminal:
+            storage_service._kpi_rollups.record_review_failure.assert_not_called()
+        else:
+            storage_service._kpi_rollups.record_review_failure.assert_called_once()
+            assert storage_service._kpi_rollups.record_review_failure.call_args.kwargs["user_id"] == "owner-1"
+
+def _message_rows(room_id, timestamps):
+    return [
+        {"message_id": f"msg-{ts}", "room_id": room_id, "user_id": "user-1", "content": f"Msg {ts}", "timestamp": ts, "role": "user"}
+        for ts in timestamps
+    ]
+
+
+class TestMessagePaging:
+    """Keyset paging of room history and the decrypted-page cache."""
+
+    @pytest.fixture(autouse=True)
+    def local_page_cache(self, storage_service):
+        from app.services.message_page_cache import MessagePageCache
+
+        with patch('app.services.message_page_cache.get_effective_redis_url', return_value=None):
+            storage_service._page_cache = MessagePageCache(max_pages=16, ttl_seconds=60)
+            yield
+
+    def test_newest_page_is_returned_oldest_first(self, storage_service, mock_db_service):
+        # DESC query with one extra row to detect an older page.
+        mock_db_service.execute_query.return_value = _message_rows("room-db", [5, 4, 3])
+
+        messages, has_more = storage_service.get_messages_page("room-db", limit=2)
+
+        assert [m.message_id for m in messages] == ["msg-4", "msg-5"]
+        assert has_more is True
+        query, params = mock_db_service.execute_query.call_args.args
+        assert "ORDER BY timestamp DESC, message_id DESC" in query
+        assert "LIMIT %s" in query
+        assert params[-1] == 3
+
+    def test_before_cursor_is_resolved_in_the_query(self, storage_service, mock_db_service):
+        mock_db_service.execute_query.return_value = _message_rows("room-db", [2, 1])
+
+        messages, has_more = storage_service.get_messages_page("room-db", before="msg-3", limit=5)
+
+        assert [m.message_id for m in messages] == ["msg-1", "msg-2"]
+        assert has_more is False
+        query, params = mock_db_service.execute_query.call_args.args
+        assert "(timestamp, message_id) <" in query
+        assert params[2:4] == ("msg-3", "room-db")
+
+    def test_repeated_page_reads_hit_the_cache(self, storage_service, mock_db_service):
+        mock_db_service.execute_query.return_value = _message_rows("room-db", [2, 1])
+
+        first = storage_service.get_messages_page("room-db", limit=5)
+        second = storage_service.get_messages_page("room-db", limit=5)
+
+        assert first == second
+        assert mock_db_service.execute_query.call_count == 1
+
+    @patch('app.tasks.embedding_tasks.generate_embedding_for_record.delay')
+    def test_save_message_invalidates_cached_pages(self, mock_delay, storage_service, mock_db_service):
+        mock_db_service.execute_query.return_value = _message_rows("room-db", [1])
+        storage_service.get_messages_page("room-db", limit=5)
+
+        storage_service.save_message(
+            Message(message_id="msg-2", room_id="room-db", user_id="user-1", content="new", timestamp=2, role="user")
+        )
+        storage_service.get_messages_page("room-db", limit=5)
+
+        assert mock_db_service.execute_query.call_count == 2
+
+    def test_copying_into_a_room_invalidates_its_cached_pages(self, storage_service, mock_db_service):
+        mock_db_service.execute_query.return_value = _message_rows("room-db", [1])
+        mock_db_service.copy_messages_to_room.return_value = 2
+        mock_db_service.copy_room_messages.return_value = 3
+        storage_service.get_messages_page("room-db", limit=5)
+
+        assert storage_service.copy_messages_to_room("sub-db", ["msg-a", "msg-b"], "room-db") == 2
+        storage_service.get_messages_page("room-db", limit=5)
+        assert storage_service.copy_room_messages("sub-db", "room-db") == 3
+        storage_service.get_messages_page("room-db", limit=5)
+
+        mock_db_service.copy_messages_to_room.assert_called_once_with("sub-db", ["msg-a", "msg-b"], "room-db")
+        assert mock_db_service.execute_query.call_count == 3
+
+    def test_iter_messages_walks_pages_forward(self, storage_service, mock_db_service):
+        mock_db_service.execute_query.side_effect = [
+            _message_rows("room-db", [1, 2, 3]),
+            _message_rows("room-db", [3]),
+        ]
+
+        ids = [m.message_id for m in storage_service.iter_messages("room-db", page_size=2)]
+
+        assert ids == ["msg-1", "msg-2", "msg-3"]
+        second_query, second_params = mock_db_service.execute_query.call_args.args
+        assert "(timestamp, message_id) >" in second_query
+        assert second_params[2:4] == ("msg-2", "room-db")
@@ -13,8 +13,21 @@ class FakeStorage:
         self._messages = messages
         self.saved_messages = []
 
+        self.search_calls = []
+
     def get_messages(self, room_id):
-        return list(self._messages)
+        raise AssertionError("Sub room initialisation must not load the full parent history")
+
+    def search_recent_messages(self, room_id, keywords, *, limit, window, roles=("user", "assistant"), exclude_phrases=()):
+        self.search_calls.append({"room_id": room_id, "keywords": keywords, "limit": limit, "window": window})
+        matched = [
+            message
+            for message in self._messages[-window:]
+            if message.role in roles
+            and any(keyword in message.content.lower() for keyword in keywords)
+            and not any(phrase.lower() in message.content.lower() for phrase in exclude_phrases)
+        ]
+        return matched[-limit:]
 
     def save_message(self, message: Message):
         self.saved_messages.append(message)
@@ -107,3 +120,26 @@ def test_initialize_sub_room_fallback_when_no_related_context(monkeypatch):
         assert captured_alerts, "Alert must be sent when fallback is used"
 
     asyncio.run(runner())
+
+
+def test_initialize_sub_room_uses_bounded_highlight_search(monkeypatch):
+    history = [SimpleNamespace(role="user", content=f"Rust 이야기 {index}") for index in range(1000)]
+    storage = FakeStorage(history)
+    service = SubRoomContextService(storage_service=storage, memory_service=FakeMemoryService())
+    monkeypatch.setattr("app.services.sub_room_context_service.settings.SUB_ROOM_HIGHLIGHT_WINDOW", 50)
+
+    request = SubRoomContextRequest(
+        parent_room_id="parent-3",
+        new_room_name="Rust",
+        new_room_id="sub-3",
+        user_id="user-3",
+    )
+
+    message = asyncio.run(service.initialize_sub_room(request))
+
+    assert storage.search_calls == [
+        {"room_id": "parent-3", "keywords": ["rust"], "limit": 3, "window": 50}
+    ]
+    assert message is not None
+    assert "Rust 이야기 999" in message.content
+    assert "Rust 이야기 996" not in message.content
@@ -0,0 +1,133 @@
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.metrics import TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL
+from app.services.token_budget import ORG_SCOPE, USER_SCOPE, TokenBudget
+
+
+@pytest.fixture
+def budget_settings():
+    with patch("app.services.token_budget.settings") as settings:
+        settings.DAILY_TOKEN_BUDGET = 1000
+        settings.DAILY_ORG_TOKEN_BUDGET = 5000
+        settings.TOKEN_BUDGET_LEASE_SECONDS = 600
+        settings.TOKEN_BUDGET_REDIS_MAX_CONNECTIONS = 10
+        yield settings
+
+
+def _budget_with_script(result):
+    budget = TokenBudget(redis_url="redis://unused")
+    client = MagicMock()
+    script = AsyncMock(return_value=result)
+    client.register_script.return_value = script
+    budget._async_client = MagicMock(return_value=client)
+    return budget, script
+
+
+def _overshoot(scope):
+    return TOKEN_BUDGET_OVERSHOOT_TOKENS_TOTAL.labels(scope=scope)._value.get()
+
+
+@pytest.mark.asyncio
+async def test_reserve_holds_tokens_against_user_and_org_in_one_script_call(budget_settings):
+    budget, script = _budget_with_script([1, 0, 0])
+
+    reservation = await budget.reserve(300, user_id="u1", reservation_id="rsv_1")
+
+    assert reservation.granted and reservation.enforced
+    assert [scope.name for scope in reservation.scopes] == [USER_SCOPE, ORG_SCOPE]
+    script.assert_awaited_once()
+    keys, args = script.await_args.kwargs["keys"], script.await_args.kwargs["args"]
+    assert keys[0] == "token_budget:reservation:rsv_1"
+    assert keys[1].startswith("usage:u1:") and keys[2] == keys[1] + ":held" and keys[3] == keys[1] + ":leases"
+    assert keys[4].startswith("daily_token_usage:")
+    assert args[0:2] == ["rsv_1", 300]
+    assert args[3] - args[2] == pytest.approx(600)
+    assert json.loads(args[5])[0] == [USER_SCOPE, keys[1], 1000]
+    assert args[6:] == [1000, 5000]
+
+
+@pytest.mark.asyncio
+async def test_reserve_reports_the_budget_that_rejected_it(budget_settings):
+    budget, _ = _budget_with_script([0, 2, 4900])
+
+    reservation = await budget.reserve(300, user_id="u1")
+
+    assert not reservation.granted
+    assert reservation.rejected_scope.name == ORG_SCOPE
+    assert reservation.used == 4900
+    assert "organization token budget of 5000" in reservation.detail
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_fail_open_and_back_off(budget_settings):
+    budget, script = _budget_with_script(None)
+    script.side_effect = RedisConnectionError("down")
+
+    reservation = await budget.reserve(300, user_id="u1")
+
+    assert reservation.granted and not reservation.enforced
+    await budget.settle(reservation, 250)
+    assert script.await_count == 1
+    # Within the back-off window Redis is not contacted at all.
+    assert budget._url() is None
+
+
+@pytest.mark.asyncio
+async def test_settle_counts_only_usage_beyond_the_limit_as_overshoot(budget_settings):
+    budget, script = _budget_with_script([1, 0, 0])
+    reservation = await budget.reserve(300, user_id="u1")
+    user_before, org_before = _overshoot(USER_SCOPE), _overshoot(ORG_SCOPE)
+
+    # Reserved 300, used 450: the user total lands at 1100 (100 over), the org total stays under.
+    script.return_value = [300, 1100, 2000]
+    await budget.settle(reservation, 450)
+
+    assert script.await_args.kwargs["args"][:2] == [reservation.id, 450]
+    assert _overshoot(USER_SCOPE) - user_before == 100
+    assert _overshoot(ORG_SCOPE) == org_before
+
+    # A refund never overshoots.
+    script.return_value = [300, 900, 1800]
+    await budget.refund(reservation)
+    assert script.await_args.kwargs["args"][:2] == [reservation.id, 0]
+    assert _overshoot(USER_SCOPE) - user_before == 100
+
+
+def test_settle_sync_finds_scopes_of_a_reservation_made_elsewhere(budget_settings):
+    budget = TokenBudget(redis_url="redis://unused")
+    client = MagicMock()
+    client.get.return_value = json.dumps([[ORG_SCOPE, "daily_token_usage:2026-01-01", 5000]])
+    script = MagicMock(return_value=[20000, 18000])
+    client.register_script.return_value = script
+    budget._client = MagicMock(return_value=client)
+
+    budget.settle_sync("review:r1", 18000)
+
+    client.get.assert_called_once_with("token_budget:reservation:review:r1")
+    assert script.call_args.kwargs["keys"] == [
+        "token_budget:reservation:review:r1",
+        "daily_token_usage:2026-01-01",
+        "daily_token_usage:2026-01-01:held",
+        "daily_token_usage:2026-01-01:leases",
+    ]
+
+
+def test_settle_sync_is_a_no_op_once_the_reservation_is_settled(budget_settings):
+    budget = TokenBudget(redis_url="redis://unused")
+    client = MagicMock()
+    client.get.return_value = None
+    script = MagicMock(return_value=[-2])
+    client.register_script.return_value = script
+    budget._client = MagicMock(return_value=client)
+
+    budget.settle_sync("review:r1", 18000)
+    script.assert_not_called()
+
+    # A concurrent settle that removed the pointer after it was read is caught by the script.
+    client.get.return_value = json.dumps([[ORG_SCOPE, "daily_token_usage:2026-01-01", 5000]])
+    budget.settle_sync("review:r1", 18000)
+    assert script.call_args.kwargs["args"][3] == 1
@@ -100,6 +100,8 @@ def test_insert_fact_with_real_audit_service(mock_secret_provider):
     ))
 
     assert fact_id
+    # Audit rows are batched in the background; flush them as the shutdown hook would.
+    audit_service.shutdown()
     # Ensure the fact insert and audit log were both executed without raising errors
     assert any("user_facts" in query for query, _ in db_service.updates)
     assert any("audit_logs" in query for query, _ in db_service.updates)
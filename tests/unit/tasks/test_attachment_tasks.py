@@ -0,0 +1,138 @@
+import zipfile
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.services.rag_service import RAGService
+from app.tasks import attachment_tasks
+from app.utils.documents import (
+    DOCX,
+    MARKDOWN,
+    PDF,
+    TEXT,
+    SentenceChunker,
+    detect_document_format,
+    iter_docx_paragraphs,
+    iter_text_paragraphs,
+)
+from app.utils.tokens import count_tokens
+
+_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _write_docx(path, paragraphs):
+    body = "".join(
+        f'<w:p><w:r><w:t>{first}</w:t></w:r><w:r><w:tab/><w:t xml:space="preserve">{second}</w:t></w:r></w:p>'
+        for first, second in paragraphs
+    )
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{_W}"><w:body>{body}<w:p/></w:body></w:document>')
+
+
+def test_detect_document_format_by_mime_then_extension():
+    assert detect_document_format("application/pdf") == PDF
+    assert detect_document_format("text/plain; charset=utf-8") == TEXT
+    assert detect_document_format("application/octet-stream", "notes.MD") == MARKDOWN
+    assert detect_document_format(None, "report.docx") == DOCX
+    assert detect_document_format("image/png", "photo.png") is None
+
+
+def test_docx_paragraphs_are_streamed_in_order(tmp_path):
+    path = tmp_path / "doc.docx"
+    _write_docx(path, [("First", "paragraph."), ("Second", "one.")])
+
+    assert list(iter_docx_paragraphs(path)) == ["First\tparagraph.\n\n", "Second\tone.\n\n"]
+
+
+def test_text_paragraphs_split_on_blank_lines_and_cap_block_size(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("# Title\n\nline one\nline two\n\n\n" + "x" * 30 + "\n" + "y" * 30 + "\n" + "z" * 30 + "\n", encoding="utf-8")
+
+    blocks = list(iter_text_paragraphs(path, max_block_chars=40))
+
+    assert blocks[:2] == ["# Title\n\n", "line one\nline two\n\n"]
+    # The long paragraph is cut once it reaches the cap, at a line boundary.
+    assert blocks[2:] == ["x" * 30 + "\n" + "y" * 30 + "\n", "z" * 30 + "\n\n"]
+
+
+def test_chunker_respects_token_limit_and_sentence_boundaries():
+    sentences = [f"Sentence number {index} talks about the topic at some length." for index in range(60)]
+    chunker = SentenceChunker(max_tokens=60, overlap_tokens=20)
+
+    chunks = list(chunker.chunks([" ".join(sentences[:30]) + " ", " ".join(sentences[30:])]))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert count_tokens(chunk) <= 60
+        assert chunk.endswith(".")
+    # Each chunk after the first starts with the trailing sentence(s) of the one before.
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.endswith(current.split(". ")[0] + ".")
+    assert all(sentence in " ".join(chunks) for sentence in sentences)
+
+
+def test_chunker_joins_sentence_split_across_pages_and_splits_oversized_ones():
+    chunker = SentenceChunker(max_tokens=20, overlap_tokens=0)
+
+    chunks = list(chunker.chunks(["The first sentence is split across\n", "two pages. " + "z" * 200]))
+
+    assert chunks[0] == "The first sentence is split across two pages."
+    assert "".join(chunks[1:]) == "z" * 200
+    assert all(count_tokens(chunk) <= 20 for chunk in chunks)
+
+
+def test_chunker_rejects_overlap_not_smaller_than_chunk():
+    with pytest.raises(ValueError):
+        SentenceChunker(max_tokens=50, overlap_tokens=50)
+
+
+@pytest.mark.asyncio
+async def test_ingest_chunks_embeds_in_batches():
+    service = RAGService.__new__(RAGService)
+    service.store_chunk_batch = AsyncMock(side_effect=lambda attachment_id, batch: len(batch))
+
+    def chunks():
+        for index in range(7):
+            yield f"chunk {index}"
+
+    stored = await service.ingest_chunks("att_1", chunks(), batch_size=3)
+
+    assert stored == 7
+    assert [len(call.args[1]) for call in service.store_chunk_batch.await_args_list] == [3, 3, 1]
+
+
+def test_process_attachment_streams_document_and_cleans_up_on_failure(tmp_path):
+    source = tmp_path / "upload.txt"
+    source.write_text("One sentence. Another sentence.\n\nA second paragraph.", encoding="utf-8")
+    local_copy = tmp_path / "local.txt"
+    local_copy.write_bytes(source.read_bytes())
+
+    convo = Mock()
+    convo.get_attachment_by_id.return_value = {"mime": "text/plain", "name": "upload.txt", "url": str(source)}
+    storage = Mock()
+    storage.ensure_local_copy.return_value = local_copy
+    rag = Mock()
+    stored_batches = []
+
+    async def ingest_chunks(attachment_id, chunks, batch_size):
+        batch = list(chunks)
+        stored_batches.append(batch)
+        return len(batch)
+
+    rag.ingest_chunks.side_effect = ingest_chunks
+
+    with patch.object(attachment_tasks, "get_conversation_service", return_value=convo), \
+            patch.object(attachment_tasks, "get_cloud_storage_service", return_value=storage), \
+            patch.object(attachment_tasks, "get_rag_service", return_value=rag):
+        result = attachment_tasks.process_attachment("att_1")
+
+        assert result == {"attachment_id": "att_1", "status": "complete"}
+        assert " ".join(stored_batches[0]) == "One sentence. Another sentence. A second paragraph."
+        assert not local_copy.exists()
+
+        local_copy.write_bytes(source.read_bytes())
+        rag.ingest_chunks.side_effect = RuntimeError("embedding API down")
+        assert attachment_tasks.process_attachment("att_1") is None
+        rag.delete_chunks.assert_called_once_with("att_1")
+        assert not local_copy.exists()
+        assert source.exists()
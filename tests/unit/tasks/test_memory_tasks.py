@@ -0,0 +1,252 @@
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+from app.core.metrics import CONTEXT_DIGEST_TOKENS_SAVED_TOTAL
+from app.services import memory_service as memory_module
+from app.services.memory_service import MemoryService, weekly_digest_bounds
+from app.tasks import memory_tasks
+from app.utils.tokens import count_tokens
+
+DAY = 24 * 60 * 60
+NOW = 100 * DAY
+
+
+class FakeArchiveDB:
+    """The rooms/messages/memories statements used by archival, over in-memory rows."""
+
+    def __init__(self, timestamps):
+        self.messages = [
+            {"message_id": f"m{n:04d}", "room_id": "room-1", "user_id": "u1", "role": "user",
+             "content": f"message {n}", "timestamp": ts}
+            for n, ts in enumerate(timestamps)
+        ]
+        self.room = {"archived_through": 0, "archive_due_at": 0, "message_count": len(timestamps)}
+        self.memories = []
+        self.statements = []
+
+    def execute_query(self, query, params):
+        self.statements.append(query)
+        if "SELECT archived_through" in query:
+            return [dict(self.room)]
+        _, _, low, cutoff, limit = params
+        rows = [m for m in self.messages if low <= m["timestamp"] < cutoff]
+        return sorted(rows, key=lambda m: (m["timestamp"], m["message_id"]))[:limit]
+
+    def execute_update(self, query, params):
+        self.statements.append(query)
+        if "SELECT MIN(timestamp)" in query:
+            window, _, cutoff, _ = params
+            remaining = [m["timestamp"] for m in self.messages if m["timestamp"] >= cutoff]
+            self.room["archive_due_at"] = min(remaining) + window if remaining else None
+        else:
+            self.room["archive_due_at"] = params[0]
+        return 1
+
+    @contextmanager
+    def transaction(self, query_type="unknown"):
+        db = self
+        cursor = Mock()
+
+        def execute(query, params):
+            db.statements.append(query)
+            if query.lstrip().startswith("INSERT INTO memories"):
+                db.memories.append(params[3])
+            elif query.startswith("DELETE FROM messages"):
+                _, low, last_ts, last_id = params
+                keep = [m for m in db.messages if not (low <= m["timestamp"] and (m["timestamp"], m["message_id"]) <= (last_ts, last_id))]
+                cursor.rowcount = len(db.messages) - len(keep)
+                db.messages = keep
+            elif query.startswith("UPDATE rooms"):
+                deleted, watermark, _, _ = params
+                db.room["message_count"] -= deleted
+                db.room["archived_through"] = watermark
+
+        cursor.execute = execute
+        yield cursor
+
+
+def _service(db):
+    secrets = MagicMock()
+    secrets.get.return_value = "key"
+    llm = AsyncMock()
+    llm.invoke.return_value = ("summary", {})
+    llm.generate_embedding.return_value = ([0.1], {})
+    return MemoryService(db, llm, secrets, AsyncMock())
+
+
+@pytest.fixture(autouse=True)
+def archive_limits():
+    with patch.object(memory_module, "ARCHIVE_BATCH_SIZE", 10), \
+            patch.object(memory_module, "ARCHIVE_MIN_MESSAGES", 3), \
+            patch.object(memory_module, "ARCHIVE_MAX_BATCHES_PER_ROOM", 2), \
+            patch.object(memory_module, "ARCHIVE_WINDOW_DAYS", 14), \
+            patch.object(memory_module, "get_current_timestamp", return_value=NOW), \
+            patch.object(memory_module.storage_service, "get_room", return_value=None):
+        yield
+
+
+@pytest.fixture
+def page_cache():
+    with patch.object(memory_module, "get_message_page_cache") as get_page_cache:
+        yield get_page_cache.return_value
+
+
+@pytest.mark.asyncio
+async def test_archival_runs_bounded_batches_with_range_deletes_and_a_watermark(page_cache):
+    # 25 messages past the 14-day window, 5 recent ones.
+    db = FakeArchiveDB([50 * DAY + n for n in range(25)] + [95 * DAY + n for n in range(5)])
+    service = _service(db)
+
+    assert await service.archive_old_memories("room-1") == 20
+    assert len(db.memories) == 2
+    # Each committed batch retires the room's cached history pages.
+    assert page_cache.invalidate.call_count == 2
+    page_cache.invalidate.assert_called_with("room-1")
+    assert db.room["archived_through"] == 50 * DAY + 19
+    assert db.room["archive_due_at"] == NOW  # the batch limit was hit, so the room stays due
+    assert not any("IN (" in statement for statement in db.statements)
+
+    # The next run starts at the watermark and archives the rest.
+    assert await service.archive_old_memories("room-1") == 5
+    assert db.room["archive_due_at"] == 95 * DAY + 14 * DAY
+    assert [m["timestamp"] for m in db.messages] == [95 * DAY + n for n in range(5)]
+    assert db.room["message_count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_too_few_old_messages_are_left_until_the_next_message_leaves_the_window():
+    db = FakeArchiveDB([50 * DAY, 50 * DAY + 1, 90 * DAY])
+    service = _service(db)
+
+    assert await service.archive_old_memories("room-1") == 0
+    assert len(db.messages) == 3 and db.memories == []
+    assert db.room["archive_due_at"] == 90 * DAY + 14 * DAY
+
+
+def test_dispatcher_only_visits_due_rooms_in_keyset_pages():
+    rooms = Mock()
+    rooms.list_rooms_due_for_archival.side_effect = [
+        [(1, "room-a"), (2, "room-b")],
+        [(3, "room-c")],
+    ]
+    with patch.object(memory_tasks, "get_room_repository", return_value=rooms), \
+            patch.object(memory_tasks, "get_current_timestamp", return_value=NOW), \
+            patch.object(memory_tasks.settings, "MEMORY_ARCHIVE_DISPATCH_PAGE_SIZE", 2), \
+            patch.object(memory_tasks.archive_old_memories_task, "delay") as delay:
+        memory_tasks.archive_due_rooms()
+
+    assert [call.args[0] for call in delay.call_args_list] == ["room-a", "room-b", "room-c"]
+    assert rooms.list_rooms_due_for_archival.call_args_list[1].kwargs["after"] == (2, "room-b")
+
+
+def _digest_db(rows, previous=None, existing=False):
+    db = MagicMock()
+
+    def execute_query(query, params):
+        if query.startswith("SELECT 1 FROM summary_notes"):
+            return [{"?column?": 1}] if existing else []
+        if "FROM messages" in query:
+            return rows
+        if query.startswith("SELECT text FROM summary_notes"):
+            return [{"text": previous}] if previous else []
+        raise AssertionError(query)
+
+    db.execute_query.side_effect = execute_query
+    return db
+
+
+@pytest.mark.asyncio
+async def test_weekly_digest_builds_on_the_previous_week_and_estimates_tokens_saved():
+    rows = [{"role": "user", "content": "파일럿 일정은 다음 주 화요일로 확정했습니다. " * 5} for _ in range(40)]
+    db = _digest_db(rows, previous="지난주: 파일럿 범위를 논의함.")
+    service = _service(db)
+    service.llm_service.invoke.return_value = ("이번 주: 파일럿 일정 확정.", {})
+
+    digest = await service.generate_weekly_digest("room-1", date(2026, 10, 5))
+
+    prompt = service.llm_service.invoke.call_args.kwargs["user_prompt"]
+    assert prompt.startswith("Previous week's digest:\n지난주: 파일럿 범위를 논의함.")
+    expected = sum(count_tokens(f"user: {row['content'].strip()}") for row in rows) - count_tokens(digest["text"])
+    assert digest["tokens_saved_estimate"] == expected > 0
+    insert_query, insert_params = db.execute_update.call_args.args
+    assert "INSERT INTO summary_notes" in insert_query
+    assert insert_params[:4] == ("room-1", date(2026, 10, 5), "이번 주: 파일럿 일정 확정.", expected)
+    start, end = weekly_digest_bounds(date(2026, 10, 5))
+    assert end - start == 7 * DAY
+
+
+@pytest.mark.asyncio
+async def test_weekly_digest_skips_inactive_and_already_digested_weeks():
+    inactive = _service(_digest_db([]))
+    assert await inactive.generate_weekly_digest("room-1", date(2026, 10, 5)) is None
+    done = _service(_digest_db([{"role": "user", "content": "hi"}], existing=True))
+    assert await done.generate_weekly_digest("room-1", date(2026, 10, 5)) is None
+    inactive.llm_service.invoke.assert_not_called()
+    done.llm_service.invoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_hierarchical_context_serves_weekly_digests_in_place_of_covered_messages():
+    db = MagicMock()
+    digest_text = "이번 주: 파일럿 일정 확정."
+    db.execute_query.return_value = [
+        {"room_id": "room-1", "week_start": date(2026, 10, 5), "text": digest_text, "tokens_saved_estimate": 900},
+    ]
+    service = _service(db)
+    service.get_context = AsyncMock(return_value=None)
+    week_start, week_end = weekly_digest_bounds(date(2026, 10, 5))
+    covered = " ".join(["pilot schedule discussion"] * 40)
+    service.get_relevant_memories_hybrid = AsyncMock(return_value=[
+        Mock(content=covered, room_id="room-1", timestamp=week_start + DAY),
+        Mock(content="this week's follow-up", room_id="room-1", timestamp=week_end + DAY),
+    ])
+    room = Mock(room_id="room-1", parent_id=None)
+    room.name = "Planning"
+    saved_before = CONTEXT_DIGEST_TOKENS_SAVED_TOTAL._value.get()
+
+    with patch.object(memory_module.storage_service, "get_room", return_value=room):
+        blocks = await service.build_hierarchical_context_blocks("room-1", "u1", query="pilot")
+
+    assert blocks == [
+        {"content": digest_text, "room_id": "room-1", "room_name": "Planning", "source": "digest", "week_start": "2026-10-05"},
+        {"content": "this week's follow-up", "room_id": "room-1", "room_name": "Planning", "source": "memory"},
+    ]
+    # Only the message the digest replaced counts as saved.
+    saved = CONTEXT_DIGEST_TOKENS_SAVED_TOTAL._value.get() - saved_before
+    assert saved == count_tokens(covered) - count_tokens(digest_text) > 0
+    query, params = db.execute_query.call_args.args
+    assert "PARTITION BY room_id" in query and params == (["room-1"], memory_module.WEEKLY_DIGEST_CONTEXT_WEEKS)
+
+
+@pytest.mark.asyncio
+async def test_digests_without_displaced_messages_save_nothing():
+    db = MagicMock()
+    db.execute_query.return_value = [
+        {"room_id": "room-1", "week_start": date(2026, 10, 5), "text": "digest", "tokens_saved_estimate": 900},
+    ]
+    service = _service(db)
+    service.get_context = AsyncMock(return_value=None)
+    room = Mock(room_id="room-1", parent_id=None)
+    saved_before = CONTEXT_DIGEST_TOKENS_SAVED_TOTAL._value.get()
+
+    with patch.object(memory_module.storage_service, "get_room", return_value=room):
+        blocks = await service.build_hierarchical_context_blocks("room-1", "u1")
+
+    assert [block["source"] for block in blocks] == ["digest"]
+    assert CONTEXT_DIGEST_TOKENS_SAVED_TOTAL._value.get() == saved_before
+
+
+def test_weekly_dispatch_targets_the_last_complete_week():
+    rooms = Mock()
+    rooms.list_rooms_updated_since.return_value = ["room-a"]
+    with patch.object(memory_tasks, "get_room_repository", return_value=rooms), \
+            patch.object(memory_tasks.weekly_room_summary_task, "delay") as delay:
+        memory_tasks.summarize_all_rooms_weekly()
+
+    week_start = date.fromisoformat(delay.call_args.args[1])
+    assert week_start.weekday() == 0
+    since = rooms.list_rooms_updated_since.call_args.args[0]
+    assert since == weekly_digest_bounds(week_start)[0]
@@ -0,0 +1,125 @@
+"""Unit tests for incremental persona generation."""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.schemas import Message
+from app.tasks import persona_tasks
+
+
+def _user_message(index: int) -> Message:
+    return Message(
+        message_id=f"msg-{index:03d}",
+        room_id="main-1",
+        user_id="user-1",
+        role="user",
+        content=f"I keep reading about rust {index}",
+        timestamp=1000 + index,
+    )
+
+
+class _FakePersonaStates:
+    def __init__(self, state=None):
+        self.state = state
+        self.saved = []
+
+    def get_state(self, user_id):
+        return self.state
+
+    def save_state(self, user_id, **kwargs):
+        self.saved.append(kwargs)
+
+
+def _run(storage, states, llm_response, llm_tokens=120):
+    llm_service = MagicMock()
+    llm_service.select_model_for_task.return_value = ("mock", "mock-model", "test")
+    llm_service.invoke = AsyncMock(return_value=(llm_response, {"total_tokens": llm_tokens}))
+    fact_service = MagicMock()
+    fact_service.update_user_profile = AsyncMock()
+
+    with patch.object(persona_tasks, "get_storage_service", return_value=storage), \
+            patch.object(persona_tasks, "get_persona_state_repository", return_value=states), \
+            patch.object(persona_tasks, "get_llm_service", return_value=llm_service), \
+            patch.object(persona_tasks, "get_user_fact_service", return_value=fact_service):
+        asyncio.run(persona_tasks.persona_generation_logic("user-1", "trace-1"))
+    return llm_service, fact_service
+
+
+def test_persona_run_reads_past_watermark_and_merges_prior_persona():
+    storage = MagicMock()
+    storage.get_rooms_by_owner.return_value = [SimpleNamespace(room_id="main-1", type="main")]
+    storage.get_user_messages_after.return_value = [_user_message(i) for i in range(6)]
+    states = _FakePersonaStates(
+        {
+            "persona": {"conversation_style": "casual", "interests": ["Cooking"]},
+            "last_message_ts": 999,
+            "last_message_id": "msg-old",
+        }
+    )
+    response = json.dumps({"conversation_style": "analytical", "interests": ["Rust", "cooking"], "summary": "s"})
+
+    llm_service, fact_service = _run(storage, states, response)
+
+    _, kwargs = storage.get_user_messages_after.call_args
+    assert kwargs["after_ts"] == 999 and kwargs["after_id"] == "msg-old"
+    user_prompt = llm_service.invoke.call_args.kwargs["user_prompt"]
+    assert "Cooking" in user_prompt and "rust 5" in user_prompt
+
+    saved = states.saved[0]
+    assert saved["last_message_id"] == "msg-005"
+    assert saved["last_message_ts"] == 1005
+    assert saved["messages_processed"] == 6
+    assert saved["rows_scanned"] == 6
+    assert saved["tokens_used"] == 120
+    assert saved["persona"]["interests"] == ["Rust", "cooking"]
+    fact_service.update_user_profile.assert_awaited_once_with(
+        "user-1", {"conversation_style": "analytical", "interests": ["Rust", "cooking"]}
+    )
+
+
+def test_persona_run_skips_llm_without_enough_new_messages():
+    storage = MagicMock()
+    storage.get_rooms_by_owner.return_value = [SimpleNamespace(room_id="main-1", type="main")]
+    storage.get_user_messages_after.return_value = [_user_message(i) for i in range(3)]
+    states = _FakePersonaStates()
+
+    llm_service, fact_service = _run(storage, states, "{}")
+
+    llm_service.invoke.assert_not_called()
+    assert states.saved == []
+    fact_service.update_user_profile.assert_not_called()
+
+
+def test_persona_run_keeps_watermark_when_response_is_invalid():
+    storage = MagicMock()
+    storage.get_rooms_by_owner.return_value = [SimpleNamespace(room_id="main-1", type="main")]
+    storage.get_user_messages_after.return_value = [_user_message(i) for i in range(12)]
+    states = _FakePersonaStates()
+
+    _, fact_service = _run(storage, states, "not json")
+
+    assert states.saved == []
+    fact_service.update_user_profile.assert_not_called()
+
+
+def test_persona_run_advances_watermark_only_past_messages_sent_to_llm():
+    storage = MagicMock()
+    storage.get_rooms_by_owner.return_value = [SimpleNamespace(room_id="main-1", type="main")]
+    storage.get_user_messages_after.return_value = [_user_message(i) for i in range(12)]
+    states = _FakePersonaStates()
+    line_chars = len("user: I keep reading about rust 0") + 1
+    response = json.dumps({"conversation_style": "analytical", "interests": ["Rust"], "summary": "s"})
+
+    with patch.object(persona_tasks.settings, "PERSONA_MAX_HISTORY_CHARS", line_chars * 4):
+        llm_service, _ = _run(storage, states, response)
+
+    # The oldest turns that fit the budget are sent; the watermark stops at the last of them.
+    user_prompt = llm_service.invoke.call_args.kwargs["user_prompt"]
+    assert "rust 0" in user_prompt and "rust 3" in user_prompt and "rust 4" not in user_prompt
+    assert states.saved[0]["last_message_id"] == "msg-003"
+    assert states.saved[0]["last_message_ts"] == 1003
+    # Rows past the budget are refetched next run, so only the sent ones count as processed.
+    assert states.saved[0]["messages_processed"] == 4
+    assert states.saved[0]["rows_scanned"] == 12
@@ -0,0 +1,142 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.metrics import REVIEW_CHECKPOINT_RESUMES_TOTAL, REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL
+from app.services.review_checkpoints import ReviewCheckpointStore, RoundCheckpoints
+from app.tasks.review_tasks import ProviderPanelistConfig, _run_checkpointed_turn, run_rebuttal_turn
+
+PANELISTS = [
+    ProviderPanelistConfig(provider="openai", persona="GPT-4o", model="gpt-4o-mini"),
+    ProviderPanelistConfig(provider="claude", persona="Claude 3 Haiku", model="claude-3-haiku"),
+]
+TOKENS_PER_CALL = 700
+
+
+class FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def expire(self, key, seconds):
+        return True
+
+
+@pytest.fixture
+def store():
+    store = ReviewCheckpointStore(redis_url="redis://unused")
+    store._sync_client = FakeRedis()
+    return store
+
+
+def _turn(persona, round_num=2):
+    return json.dumps({"round": round_num, "panelist": persona, "message": f"{persona} says", "key_takeaway": "ok"})
+
+
+def _llm_call(llm_service, config, prompt, request_id):
+    return config, (_turn(config.persona), {"persona": config.persona, "total_tokens": TOKENS_PER_CALL})
+
+
+def _metric(counter, round_num=2):
+    return counter.labels(round=str(round_num))._value.get()
+
+
+@patch("app.tasks.review_tasks.run_synthesis_turn.delay")
+@patch("app.tasks.review_tasks.prompt_service")
+@patch("app.tasks.review_tasks.storage_service")
+@patch("app.tasks.review_tasks.redis_pubsub_manager")
+@patch("app.tasks.review_tasks.run_panelist_turn", side_effect=_llm_call)
+def test_retried_round_resumes_only_missing_work(
+    mock_run_panelist_turn, mock_pubsub, mock_storage, mock_prompt_service, mock_next_round, store
+):
+    mock_prompt_service.get_prompt.return_value = "prompt"
+    saved = {}
+    mock_storage.save_message.side_effect = lambda message: saved.setdefault(message.message_id, message)
+    mock_storage.get_message.side_effect = saved.get
+    # Fault injection: the live-stream publish of the second panelist's message fails
+    # once, after both LLM calls have returned and the first message was delivered.
+    publishes = []
+
+    def publish(channel, payload):
+        publishes.append(payload)
+        if len(publishes) == 2:
+            raise RedisConnectionError("publish failed")
+
+    mock_pubsub.publish_sync.side_effect = publish
+    resumes_before = _metric(REVIEW_CHECKPOINT_RESUMES_TOTAL)
+    duplicates_before = _metric(REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL)
+
+    with patch("app.tasks.review_tasks.get_review_checkpoints", return_value=store):
+        run_rebuttal_turn.apply(kwargs={
+            "review_id": "review-1",
+            "review_room_id": "room-1",
+            "turn_1_outputs": {p.persona: json.loads(_turn(p.persona, 1)) for p in PANELISTS},
+            "panel_history": {},
+            "all_metrics": [],
+            "successful_panelists": [p.model_dump() for p in PANELISTS],
+            "trace_id": "trace-1",
+        })
+
+    # Each panelist was billed once; the retry reused both checkpoints.
+    assert mock_run_panelist_turn.call_count == len(PANELISTS)
+    assert _metric(REVIEW_CHECKPOINT_RESUMES_TOTAL) - resumes_before == len(PANELISTS)
+    assert _metric(REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL) == duplicates_before
+    # Messages saved by the failed attempt are not posted again.
+    assert mock_storage.save_message.call_count == len(PANELISTS)
+    # The message whose publish failed is published by the retry; the delivered one is not re-sent.
+    events = [json.loads(payload) for payload in publishes]
+    published = [event["payload"]["message_id"] for event in events if event["type"] == "new_message"]
+    assert len(published) == len(PANELISTS) + 1
+    assert set(published) == set(saved)
+    assert published[1] == published[2]
+    mock_next_round.assert_called_once()
+    assert mock_next_round.call_args.kwargs["all_metrics"][0][0]["total_tokens"] == TOKENS_PER_CALL
+
+
+@patch("app.tasks.review_tasks.run_panelist_turn", side_effect=_llm_call)
+def test_rerunning_a_checkpointed_panelist_counts_duplicate_tokens(mock_run_panelist_turn, store):
+    llm_service = MagicMock()
+    first_attempt = store.load_round("review-2", 2)
+    _run_checkpointed_turn(llm_service, first_attempt, PANELISTS[0], "prompt", "trace")
+    duplicates_before = _metric(REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL)
+
+    # A redelivered task that started before the checkpoint was written calls the LLM again.
+    stale_attempt = RoundCheckpoints(store, "review-2", 2)
+    _run_checkpointed_turn(llm_service, stale_attempt, PANELISTS[0], "prompt", "trace")
+
+    assert mock_run_panelist_turn.call_count == 2
+    assert _metric(REVIEW_RETRY_DUPLICATE_TOKENS_TOTAL) - duplicates_before == TOKENS_PER_CALL
+
+    # A retry that loads the checkpoint does not.
+    config, (content, metrics) = _run_checkpointed_turn(
+        llm_service, store.load_round("review-2", 2), PANELISTS[0], "prompt", "trace"
+    )
+    assert mock_run_panelist_turn.call_count == 2
+    assert config == PANELISTS[0] and metrics["total_tokens"] == TOKENS_PER_CALL
+
+
+def test_redis_errors_run_the_round_without_checkpoints(store):
+    client = MagicMock()
+    client.hgetall.side_effect = RedisConnectionError("down")
+    store._sync_client = client
+
+    checkpoints = store.load_round("review-3", 1)
+    checkpoints.save("GPT-4o", PANELISTS[0].model_dump(), "{}", {"total_tokens": 10})
+
+    assert checkpoints.get("GPT-4o") is not None
+    # Within the back-off window Redis is not contacted again.
+    client.hsetnx.assert_not_called()
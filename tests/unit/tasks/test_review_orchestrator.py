@@ -0,0 +1,184 @@
+import asyncio
+import copy
+import json
+import re
+from unittest.mock import patch
+
+import pytest
+
+from app.repositories.review_run_repository import DONE, FAILED
+from app.services.review_checkpoints import ReviewCheckpointStore
+from app.tasks.review_orchestrator import ReviewOrchestrator
+from app.tasks.review_tasks import ProviderPanelistConfig
+
+PANELISTS = [
+    ProviderPanelistConfig(provider="openai", persona="GPT-4o", model="gpt-4o-mini"),
+    ProviderPanelistConfig(provider="claude", persona="Claude 3 Haiku", model="claude-3-haiku"),
+]
+REPORT = {
+    "executive_summary": "Ship it.",
+    "strongest_consensus": ["Pilot first"],
+    "remaining_disagreements": [],
+    "recommendations": ["Pilot"],
+}
+
+
+class FakeRuns:
+    """In-memory stand-in for ReviewRunRepository."""
+
+    def __init__(self):
+        self.runs = {}
+        self.steps = {}
+
+    def create(self, review_id, step, state):
+        self.runs.setdefault(review_id, {"step": step, "state": copy.deepcopy(state), "attempts": 0, "owner": None})
+        self.steps.setdefault(review_id, [step])
+
+    def claim(self, review_id, owner, lease_seconds):
+        run = self.runs.get(review_id)
+        if run is None or run["step"] in (DONE, FAILED):
+            return None
+        run["owner"] = owner
+        return {"review_id": review_id, **copy.deepcopy(run)}
+
+    def claim_expired(self, owner, lease_seconds, limit):
+        return []
+
+    def renew(self, owner, review_ids, lease_seconds):
+        pass
+
+    def advance(self, review_id, owner, step, state):
+        run = self.runs[review_id]
+        # Round-trip through JSON like the jsonb column does.
+        run.update(step=step, state=json.loads(json.dumps(state)), attempts=0)
+        self.steps[review_id].append(step)
+        return True
+
+    def record_attempt(self, review_id, owner, attempts):
+        self.runs[review_id]["attempts"] = attempts
+
+    def finish(self, review_id, owner, step=DONE):
+        self.runs[review_id].update(step=step, owner=None)
+        self.steps[review_id].append(step)
+
+
+class FakeLLM:
+    """Async panel calls with a fixed latency; records how many overlap."""
+
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rounds = []
+
+    async def invoke(self, model, system_prompt, user_prompt, request_id, response_format="text", provider_name="openai"):
+        round_num = int(re.search(r"-r(\d)-", request_id).group(1))
+        persona = next(p.persona for p in PANELISTS if p.provider in request_id)
+        self.rounds.append(round_num)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if round_num == 4:
+            payload = {"round": 4, "panelist": persona, "final_position": "adopt"}
+        else:
+            payload = {"round": round_num, "panelist": persona, "message": "m", "key_takeaway": "k"}
+        return json.dumps(payload), {"total_tokens": 100}
+
+    def invoke_sync(self, **kwargs):
+        self.rounds.append("report")
+        return json.dumps(REPORT), {"total_tokens": 200}
+
+
+@pytest.fixture
+def review_env():
+    checkpoints = ReviewCheckpointStore(redis_url="redis://unused")
+    checkpoints._retry_at = float("inf")  # no Redis: checkpoints stay in memory
+    with patch("app.tasks.review_tasks.storage_service") as storage, \
+            patch("app.tasks.review_tasks.redis_pubsub_manager"), \
+            patch("app.tasks.review_tasks.prompt_service") as prompts, \
+            patch("app.tasks.review_tasks.llm_strategy_service") as strategy, \
+            patch("app.tasks.review_tasks.get_token_budget"), \
+            patch("app.tasks.review_tasks.get_review_checkpoints", return_value=checkpoints), \
+            patch("app.tasks.review_tasks.run_rebuttal_turn.delay") as chained_delay:
+        storage.get_review_meta.return_value = None
+        prompts.get_prompt.return_value = "prompt"
+        strategy.get_default_panelists.return_value = PANELISTS
+        yield storage, chained_delay
+
+
+def _start(runs, review_id):
+    runs.create(review_id, "initial", {
+        "review_id": review_id,
+        "review_room_id": f"room-{review_id}",
+        "topic": "Topic",
+        "instruction": "Instruction",
+        "panelists_override": None,
+        "trace_id": f"trace-{review_id}",
+    })
+
+
+@pytest.mark.asyncio
+async def test_reviews_run_concurrently_with_a_checkpoint_per_step(review_env):
+    storage, chained_delay = review_env
+    runs, llm = FakeRuns(), FakeLLM()
+    orchestrator = ReviewOrchestrator(runs=runs, llm_service=llm, max_concurrent_reviews=10)
+    review_ids = [f"review-{i}" for i in range(3)]
+    for review_id in review_ids:
+        _start(runs, review_id)
+
+    await asyncio.gather(*(orchestrator.run_review(review_id) for review_id in review_ids))
+
+    for review_id in review_ids:
+        assert runs.steps[review_id] == ["initial", "rebuttal", "synthesis", "resolution", "report", DONE]
+    # Panelists of a round, and rounds of different reviews, overlap on the event loop.
+    assert llm.max_in_flight >= len(review_ids) * len(PANELISTS)
+    assert llm.rounds.count("report") == len(review_ids)
+    assert storage.save_final_report.call_count == len(review_ids)
+    chained_delay.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_review_resumes_at_its_checkpointed_step(review_env):
+    runs, llm = FakeRuns(), FakeLLM()
+    history = {p.persona: {"1": {}, "2": {}, "3": {}} for p in PANELISTS}
+    runs.create("review-r", "resolution", {
+        "review_id": "review-r",
+        "review_room_id": "room-r",
+        "panel_history": history,
+        "all_metrics": [[], [], []],
+        "successful_panelists": [p.model_dump() for p in PANELISTS],
+        "trace_id": "trace-r",
+    })
+
+    await ReviewOrchestrator(runs=runs, llm_service=llm).run_review("review-r")
+
+    assert llm.rounds == [4, "report"]
+    assert runs.steps["review-r"] == ["resolution", "report", DONE]
+
+
+@pytest.mark.asyncio
+async def test_step_failures_are_retried_then_fail_the_review(review_env):
+    storage, _ = review_env
+    runs, llm = FakeRuns(), FakeLLM()
+    _start(runs, "review-f")
+    prompts = []
+
+    def get_prompt(name, **kwargs):
+        prompts.append(name)
+        if name == "review_rebuttal":
+            raise RuntimeError("template store unavailable")
+        return "prompt"
+
+    with patch("app.tasks.review_tasks.prompt_service.get_prompt", side_effect=get_prompt), \
+            patch("app.tasks.review_orchestrator._retry_delay", return_value=0), \
+            patch("app.tasks.review_orchestrator.settings.REVIEW_ORCHESTRATOR_STEP_MAX_RETRIES", 1):
+        await ReviewOrchestrator(runs=runs, llm_service=llm).run_review("review-f")
+
+    # The rebuttal step ran twice (first try plus one retry); round 1 was not re-run.
+    assert prompts.count("review_rebuttal") == 2
+    assert llm.rounds == [1, 1]
+    assert runs.steps["review-f"] == ["initial", "rebuttal", FAILED]
+    storage.fail_review.assert_called_once_with("review-f", {"error": "An unexpected error occurred."})
@@ -0,0 +1,74 @@
+"""Regression benchmark: replays recorded reviews and compares round prompt tokens with and without budgets."""
+
+import json
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from app.services.review_checkpoints import ReviewCheckpointStore
+from app.tasks.review_tasks import (
+    INITIAL_STEP,
+    REPORT_STEP,
+    REVIEW_ROUND_STEPS,
+    ProviderPanelistConfig,
+    _initial_panel_step,
+)
+from app.utils.tokens import count_tokens
+
+FIXTURES = json.loads((Path(__file__).parent / "fixtures" / "recorded_reviews.json").read_text(encoding="utf-8"))
+BUDGET = 2000
+UNLIMITED = 10 ** 9
+
+
+def _replay(review, budget):
+    """Run the round steps against the recorded outputs; returns prompt tokens per round."""
+    panelists = [ProviderPanelistConfig(**p) for p in review["panelists"]]
+    prompt_tokens = {}
+
+    def run_panel(plan, checkpoints):
+        recorded = review["rounds"][str(plan.round_num)]
+        results = []
+        for config, prompt in plan.calls:
+            prompt_tokens.setdefault(plan.round_num, []).append(count_tokens(prompt, config.model))
+            content = json.dumps(recorded[config.persona], ensure_ascii=False)
+            results.append((config, (content, {"persona": config.persona, "total_tokens": 0})))
+        return results
+
+    checkpoints = ReviewCheckpointStore(redis_url="redis://unused")
+    checkpoints._retry_at = float("inf")
+    with patch("app.tasks.review_tasks.storage_service") as storage, \
+            patch("app.tasks.review_tasks.redis_pubsub_manager"), \
+            patch("app.tasks.review_tasks.get_token_budget"), \
+            patch("app.tasks.review_tasks.get_review_checkpoints", return_value=checkpoints), \
+            patch("app.tasks.review_tasks.llm_strategy_service.get_default_panelists", return_value=panelists), \
+            patch("app.tasks.review_tasks.settings.REVIEW_PROMPT_TOKEN_BUDGET", budget):
+        storage.get_review_meta.return_value.topic = review["topic"]
+        storage.get_review_meta.return_value.instruction = review["instruction"]
+        steps = {INITIAL_STEP: _initial_panel_step, **REVIEW_ROUND_STEPS}
+        step, kwargs = INITIAL_STEP, {
+            "review_id": review["name"],
+            "review_room_id": f"room-{review['name']}",
+            "topic": review["topic"],
+            "instruction": review["instruction"],
+            "panelists_override": None,
+            "trace_id": review["name"],
+        }
+        while step != REPORT_STEP:
+            step, kwargs = partial(steps[step], run_panel)(**kwargs)
+    return prompt_tokens
+
+
+@pytest.mark.parametrize("review", FIXTURES["reviews"], ids=lambda review: review["name"])
+def test_round_prompts_stay_within_budget(review):
+    baseline = _replay(review, UNLIMITED)
+    budgeted = _replay(review, BUDGET)
+
+    assert sorted(budgeted) == [1, 2, 3, 4]
+    assert all(tokens <= BUDGET for round_tokens in budgeted.values() for tokens in round_tokens)
+    if all(tokens <= BUDGET for round_tokens in baseline.values() for tokens in round_tokens):
+        # Prompts that already fit are sent unchanged.
+        assert budgeted == baseline
+    else:
+        assert sum(map(sum, budgeted.values())) < sum(map(sum, baseline.values()))
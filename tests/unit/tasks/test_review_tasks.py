@@ -12,7 +12,7 @@ class TestReviewTasks(unittest.TestCase):
     @patch('app.tasks.review_tasks.run_panelist_turn')
     @patch('app.tasks.review_tasks.prompt_service')
     @patch('app.tasks.review_tasks.llm_strategy_service')
-    @patch('app.tasks.review_tasks.redis.from_url')
+    @patch('redis.from_url')
     def test_fault_tolerance_fallback_to_openai(
         self,
         mock_redis,